@@ -0,0 +1,69 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: 11d5f18973c2
+Revises: f5f21f59eace
+Create Date: 2026-10-16 23:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '11d5f18973c2'
+down_revision: Union[str, None] = 'f5f21f59eace'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 游标分页按 (排序键, id) 降序定位，以下索引让每页查询只做一次索引范围扫描
+
+    # 复合索引: videos(status, created_at DESC, id DESC)
+    # 用于: 视频列表/搜索按时间游标分页
+    op.create_index(
+        'idx_videos_status_created_id',
+        'videos',
+        ['status', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False
+    )
+
+    # 复合索引: videos(status, view_count DESC, id DESC)
+    # 用于: 视频列表/热门视频按播放量游标分页
+    op.create_index(
+        'idx_videos_status_views_id',
+        'videos',
+        ['status', sa.text('view_count DESC'), sa.text('id DESC')],
+        unique=False
+    )
+
+    # 复合索引: videos(status, average_rating DESC, id DESC)
+    # 用于: 视频列表按评分游标分页
+    op.create_index(
+        'idx_videos_status_rating_id',
+        'videos',
+        ['status', sa.text('average_rating DESC'), sa.text('id DESC')],
+        unique=False
+    )
+
+    # 表达式索引: watch_history(user_id, COALESCE(updated_at, created_at) DESC, id DESC)
+    # 用于: 观看历史按最后观看时间游标分页
+    op.create_index(
+        'idx_watch_history_user_last_watched_id',
+        'watch_history',
+        [
+            'user_id',
+            sa.text('COALESCE(updated_at, created_at) DESC'),
+            sa.text('id DESC'),
+        ],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_watch_history_user_last_watched_id', table_name='watch_history')
+    op.drop_index('idx_videos_status_rating_id', table_name='videos')
+    op.drop_index('idx_videos_status_views_id', table_name='videos')
+    op.drop_index('idx_videos_status_created_id', table_name='videos')
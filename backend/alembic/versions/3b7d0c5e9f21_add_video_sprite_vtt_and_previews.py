@@ -0,0 +1,30 @@
+"""add_video_sprite_vtt_and_previews
+
+Revision ID: 3b7d0c5e9f21
+Revises: 6c2e9a47b1d3
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d0c5e9f21'
+down_revision: Union[str, None] = '6c2e9a47b1d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 转码时生成的拖动预览雪碧图索引和预览图，供视频详情接口返回给播放器
+    op.add_column('videos', sa.Column('sprite_vtt_url', sa.String(length=500), nullable=True, comment='拖动预览雪碧图WebVTT索引URL'))
+    op.add_column('videos', sa.Column('preview_urls', postgresql.JSONB(astext_type=sa.Text()), server_default='[]', nullable=False, comment='预览图URL列表'))
+
+
+def downgrade() -> None:
+    op.drop_column('videos', 'preview_urls')
+    op.drop_column('videos', 'sprite_vtt_url')
@@ -0,0 +1,35 @@
+"""add_video_similarities_table
+
+Revision ID: 6c2e9a47b1d3
+Revises: 11d5f18973c2
+Create Date: 2026-10-17 10:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c2e9a47b1d3'
+down_revision: Union[str, None] = '11d5f18973c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 离线构建的相似视频索引：每个视频一行，按主键查询
+    op.create_table('video_similarities',
+    sa.Column('video_id', sa.Integer(), nullable=False),
+    sa.Column('similar_ids', postgresql.ARRAY(sa.Integer()), nullable=False, comment='相似视频ID（降序）'),
+    sa.Column('scores', postgresql.ARRAY(sa.Float()), nullable=False, comment='相似度分数'),
+    sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['video_id'], ['videos.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('video_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('video_similarities')
@@ -75,14 +75,9 @@ async def batch_update_video_status(
     await db.commit()
 
     # 清除相关缓存
-    await Cache.delete_pattern("videos_list:*")
-    await Cache.delete_pattern("trending_videos:*")
-    await Cache.delete_pattern("featured_videos:*")
-    await Cache.delete_pattern("recommended_videos:*")
-
-    # 清除单个视频缓存
-    for video_id in data.video_ids:
-        await Cache.delete(f"video_detail:{video_id}")
+    await Cache.invalidate_tags(
+        "list:videos", *(f"video:{video_id}" for video_id in data.video_ids)
+    )
 
     logger.info(
         f"Batch updated video status: {updated_count} videos to {data.status}",
@@ -143,9 +138,9 @@ async def batch_delete_videos(
     await db.commit()
 
     # 清除相关缓存
-    await Cache.delete_pattern("videos_list:*")
-    for video_id in data.ids:
-        await Cache.delete(f"video_detail:{video_id}")
+    await Cache.invalidate_tags(
+        "list:videos", *(f"video:{video_id}" for video_id in data.ids)
+    )
 
     logger.warning(
         f"Batch deleted videos: {deleted_count} videos",
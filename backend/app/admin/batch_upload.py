@@ -19,7 +19,7 @@ from app.database import get_db
 from app.models.user import AdminUser
 from app.models.upload_session import UploadSession
 from app.utils.dependencies import get_current_admin_user
-from app.utils.minio_client import minio_client
+from app.utils.minio_client import async_minio_client
 from app.utils.video_hash import calculate_video_fingerprint, check_duplicate_video
 
 router = APIRouter()
@@ -182,7 +182,7 @@ async def complete_batch_upload_item(
         fingerprint = calculate_video_fingerprint(
             file_content=file_content,
             title=session.title or session.filename,
-            duration=0  # 无法获取时长，使用0
+            duration=0  # 无法获取时长，使用0（媒体分析在转码任务中进行）
         )
 
         # 检查是否重复
@@ -206,7 +206,9 @@ async def complete_batch_upload_item(
         timestamp = int(datetime.now(timezone.utc).timestamp())
         object_name = f"videos/batch_{upload_id}_{timestamp}.{ext}"
 
-        url = minio_client.upload_video(merged_file, object_name, session.mime_type or "video/mp4")
+        url = await async_minio_client.upload_video(
+            merged_file, object_name, session.mime_type or "video/mp4"
+        )
 
         # 标记为已完成和已合并
         session.is_completed = True
@@ -195,8 +195,9 @@ async def update_category(
     await db.commit()
     await db.refresh(category)
 
-    # 清除分类缓存
+    # 清除分类缓存，以及按该分类筛选的视频列表和搜索结果
     await Cache.delete_pattern("categories:*")
+    await Cache.invalidate_tags(f"category:{category_id}")
 
     return CategoryResponse.model_validate(category)
 
@@ -231,7 +232,8 @@ async def delete_category(
     await db.delete(category)
     await db.commit()
 
-    # 清除分类缓存
+    # 清除分类缓存，以及按该分类筛选的视频列表和搜索结果
     await Cache.delete_pattern("categories:*")
+    await Cache.invalidate_tags(f"category:{category_id}")
 
     return None
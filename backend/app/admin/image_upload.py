@@ -2,6 +2,7 @@
 图片上传管理 - 支持自动压缩和CDN
 """
 
+import asyncio
 import io
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
@@ -10,7 +11,7 @@ from app.models.user import AdminUser
 from app.utils.dependencies import get_current_admin_user
 from app.utils.file_validator import FileValidationPresets
 from app.utils.image_processor import ImageProcessor
-from app.utils.minio_client import minio_client
+from app.utils.minio_client import async_minio_client
 
 router = APIRouter()
 
@@ -82,7 +83,9 @@ async def upload_image(
 
         # 上传压缩后的原图
         object_name = f"{base_name}_compressed.jpg"
-        original_url = minio_client.upload_image(compressed, object_name, "image/jpeg")
+        original_url = await async_minio_client.upload_image(
+            compressed, object_name, "image/jpeg"
+        )
         result["original_url"] = original_url
         result["size_saved"] += original_size - len(compressed.getvalue())
     else:
@@ -90,7 +93,7 @@ async def upload_image(
         image_file.seek(0)
         ext = file.filename.split(".")[-1] if file.filename else "jpg"
         object_name = f"{base_name}.{ext}"
-        original_url = minio_client.upload_image(
+        original_url = await async_minio_client.upload_image(
             image_file, object_name, file.content_type or "image/jpeg"
         )
         result["original_url"] = original_url
@@ -100,7 +103,9 @@ async def upload_image(
         image_file.seek(0)
         webp_image = ImageProcessor.convert_to_webp(image_file, quality=85)
         webp_object_name = f"{base_name}.webp"
-        webp_url = minio_client.upload_image(webp_image, webp_object_name, "image/webp")
+        webp_url = await async_minio_client.upload_image(
+            webp_image, webp_object_name, "image/webp"
+        )
         result["webp_url"] = webp_url
         result["size_saved"] += original_size - len(webp_image.getvalue())
 
@@ -118,12 +123,16 @@ async def upload_image(
             image_file, sizes=thumbnail_sizes, output_format="WEBP"
         )
 
-        # 上传缩略图
-        for size_name, thumb_file in thumbnails.items():
-            thumb_object_name = f"{base_name}_{size_name}.webp"
-            thumb_url = minio_client.upload_image(
-                thumb_file, thumb_object_name, "image/webp"
+        # 并发上传缩略图
+        thumb_urls = await asyncio.gather(
+            *(
+                async_minio_client.upload_image(
+                    thumb_file, f"{base_name}_{size_name}.webp", "image/webp"
+                )
+                for size_name, thumb_file in thumbnails.items()
             )
+        )
+        for (size_name, thumb_file), thumb_url in zip(thumbnails.items(), thumb_urls):
             result["thumbnails"][size_name] = thumb_url
             result["size_saved"] += original_size - len(thumb_file.getvalue())
 
@@ -186,7 +195,7 @@ async def upload_avatar(
         output.seek(0)
 
         object_name = f"{base_name}_{size}.webp"
-        url = minio_client.upload_image(output, object_name, "image/webp")
+        url = await async_minio_client.upload_image(output, object_name, "image/webp")
         result["urls"][f"{size}x{size}"] = url
 
     return result
@@ -201,9 +210,7 @@ async def delete_image(
     从CDN删除图片
     """
     try:
-        minio_client.client.remove_object(
-            bucket_name=minio_client.bucket_name, object_name=object_name
-        )
+        await async_minio_client.remove_object(object_name)
         return {"message": "删除成功", "object_name": object_name}
     except Exception as e:
         raise HTTPException(
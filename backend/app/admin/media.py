@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
+import asyncio
 import uuid
 import os
 import shutil
@@ -22,7 +23,8 @@ from app.schemas.media import (
     MediaUploadResponse,
 )
 from app.utils.dependencies import get_current_admin_user
-from app.utils.minio_client import minio_client
+from app.utils.media_tree import MEDIA_TREE_MAX_DEPTH, get_folder_tree
+from app.utils.minio_client import async_minio_client
 from app.utils.rate_limit import limiter, RateLimitPresets
 from app.utils.video_thumbnail import generate_and_upload_thumbnail
 
@@ -34,53 +36,17 @@ router = APIRouter()
 @router.get("/media/tree")
 async def get_media_tree(
     parent_id: Optional[int] = Query(None, description="父文件夹ID，NULL获取根目录"),
+    max_depth: Optional[int] = Query(None, ge=1, le=MEDIA_TREE_MAX_DEPTH, description="最大层数，不传则不限"),
     db: AsyncSession = Depends(get_db),
     current_user: AdminUser = Depends(get_current_admin_user),
 ):
     """
     获取文件夹树形结构
-    - 返回指定父文件夹下的所有子文件夹（递归）
+    - 返回指定父文件夹下的所有子文件夹（递归，一次查询）
     - parent_id=None 返回根目录
+    - 结果按根文件夹缓存，文件夹或文件变更提交后自动失效
     """
-
-    async def build_tree(parent_id: Optional[int]) -> List[dict]:
-        """递归构建文件夹树"""
-        query = select(Media).where(
-            and_(
-                Media.parent_id == parent_id,
-                Media.is_folder == True,
-                Media.is_deleted == False
-            )
-        ).order_by(Media.title)
-
-        result = await db.execute(query)
-        folders = result.scalars().all()
-
-        tree = []
-        for folder in folders:
-            # 统计子项数量（文件夹 + 文件）
-            count_query = select(func.count()).select_from(Media).where(
-                and_(Media.parent_id == folder.id, Media.is_deleted == False)
-            )
-            count_result = await db.execute(count_query)
-            children_count = count_result.scalar()
-
-            # 递归获取子文件夹
-            children = await build_tree(folder.id)
-
-            tree.append({
-                "id": folder.id,
-                "title": folder.title,
-                "parent_id": folder.parent_id,
-                "path": folder.path or folder.get_full_path(),
-                "children_count": children_count,
-                "children": children,
-                "created_at": folder.created_at.isoformat() if folder.created_at else None,
-            })
-
-        return tree
-
-    tree = await build_tree(parent_id)
+    tree = await get_folder_tree(db, parent_id, max_depth)
 
     return {
         "tree": tree,
@@ -556,14 +522,14 @@ async def upload_media(
         file_path = f"media/{media_type.value}/{filename}"
 
         # 上传到 MinIO
-        object_name = await minio_client.upload_file(
+        object_name = await async_minio_client.upload_file(
             file_content=file_content,
             object_name=file_path,
             content_type=content_type,
         )
 
         # 获取文件URL
-        url = minio_client.get_file_url(object_name)
+        url = async_minio_client.get_file_url(object_name)
 
         # 创建数据库记录
         media = Media(
@@ -643,9 +609,9 @@ async def delete_media(
         # 永久删除
         try:
             # 从 MinIO 删除文件（同步方法）
-            minio_client.delete_file(media.file_path)
+            await async_minio_client.delete_file(media.file_path)
             if media.thumbnail_path:
-                minio_client.delete_file(media.thumbnail_path)
+                await async_minio_client.delete_file(media.thumbnail_path)
         except Exception as e:
             print(f"删除文件失败: {e}")
 
@@ -793,9 +759,9 @@ async def upload_chunk(
     chunk_path = os.path.join(session.temp_dir, f"chunk_{chunk_index}")
 
     try:
-        content = await chunk.read()
+        # 从上传临时文件分块拷贝，避免整块读入内存
         with open(chunk_path, "wb") as f:
-            f.write(content)
+            await asyncio.to_thread(shutil.copyfileobj, chunk.file, f, 1024 * 1024)
 
         # 标记分块已上传
         session.mark_chunk_uploaded(chunk_index)
@@ -869,23 +835,17 @@ async def complete_chunk_upload(
                 with open(chunk_path, "rb") as chunk_file:
                     merged_file.write(chunk_file.read())
 
-        # 上传到 MinIO
-        with open(merged_file_path, "rb") as file:
-            file_content = file.read()
-
         # 生成存储路径
         file_ext = os.path.splitext(session.filename)[1]
         object_name = f"media/{uuid.uuid4()}{file_ext}"
 
-        # 上传到MinIO
-        minio_client.upload_file(
-            file_content=file_content,
-            object_name=object_name,
-            content_type=session.mime_type
+        # 从合并后的文件流式上传到MinIO，不整体读入内存
+        await async_minio_client.upload_file_from_path(
+            merged_file_path, object_name, session.mime_type
         )
 
         # 获取URL
-        url = minio_client.get_file_url(object_name)
+        url = async_minio_client.get_file_url(object_name)
 
         # 确定媒体类型
         if session.mime_type.startswith('image/'):
@@ -936,7 +896,7 @@ async def complete_chunk_upload(
                 thumbnail_path, thumbnail_url = await generate_and_upload_thumbnail(
                     video_local_path=merged_file_path,
                     video_object_name=object_name,
-                    minio_client=minio_client,
+                    minio_client=async_minio_client,
                     timestamp="00:00:02",  # 从第2秒提取帧
                     width=640  # 640px 宽度
                 )
@@ -1152,11 +1112,11 @@ async def batch_delete_media(
                 # 删除MinIO中的文件
                 try:
                     if media.file_path:
-                        minio_client.delete_file(media.file_path)
+                        await async_minio_client.delete_file(media.file_path)
                         logger.info(f"Deleted file from MinIO: {media.file_path}")
 
                     if media.thumbnail_path:
-                        minio_client.delete_file(media.thumbnail_path)
+                        await async_minio_client.delete_file(media.thumbnail_path)
                         logger.info(f"Deleted thumbnail from MinIO: {media.thumbnail_path}")
 
                 except Exception as e:
@@ -1352,9 +1312,9 @@ async def clear_recycle_bin(
             # 删除实际文件
             if not media.is_folder and media.file_path:
                 try:
-                    minio_client.delete_file(media.file_path)
+                    await async_minio_client.delete_file(media.file_path)
                     if media.thumbnail_path:
-                        minio_client.delete_file(media.thumbnail_path)
+                        await async_minio_client.delete_file(media.thumbnail_path)
                 except Exception as e:
                     print(f"删除文件失败: {e}")
 
@@ -1422,7 +1382,7 @@ async def batch_download_media(
         for media in media_items:
             try:
                 # 从 MinIO 获取文件内容
-                file_data = minio_client.get_file(media.file_path)
+                file_data = await async_minio_client.get_file(media.file_path)
 
                 # 使用文件标题作为 ZIP 中的文件名
                 file_ext = os.path.splitext(media.filename)[1]
@@ -1538,21 +1498,21 @@ async def batch_copy_media(
                 # 复制文件
                 # 从 MinIO 复制文件
                 try:
-                    file_data = minio_client.get_file(original.file_path)
+                    file_data = await async_minio_client.get_file(original.file_path)
 
                     # 生成新的文件路径
                     file_ext = os.path.splitext(original.filename)[1]
                     new_file_path = f"media/{uuid.uuid4()}{file_ext}"
 
                     # 上传副本到 MinIO
-                    minio_client.upload_file(
+                    await async_minio_client.upload_file(
                         file_content=file_data,
                         object_name=new_file_path,
                         content_type=original.mime_type or "application/octet-stream"
                     )
 
                     # 获取新 URL
-                    new_url = minio_client.get_file_url(new_file_path)
+                    new_url = async_minio_client.get_file_url(new_file_path)
 
                     # 创建数据库记录
                     new_media = Media(
@@ -14,7 +14,7 @@ from app.models.media import Media
 from app.models.media_version import MediaVersion
 from app.models.user import AdminUser
 from app.utils.dependencies import get_current_admin_user
-from app.utils.minio_client import minio_client
+from app.utils.minio_client import async_minio_client
 
 router = APIRouter()
 
@@ -135,13 +135,13 @@ async def create_media_version(
     new_file_path = f"media/{uuid.uuid4()}.{file_ext}"
 
     try:
-        minio_client.upload_file(
+        await async_minio_client.upload_file(
             file_content=file_content,
             object_name=new_file_path,
             content_type=file.content_type or "application/octet-stream",
         )
 
-        new_url = minio_client.get_file_url(new_file_path)
+        new_url = async_minio_client.get_file_url(new_file_path)
 
         # 更新媒体记录
         media.file_path = new_file_path
@@ -263,7 +263,7 @@ async def delete_media_version(
 
     # 从 MinIO 删除文件
     try:
-        minio_client.delete_file(version.file_path)
+        await async_minio_client.delete_file(version.file_path)
     except Exception as e:
         print(f"删除 MinIO 文件失败: {e}")
 
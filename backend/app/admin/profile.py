@@ -136,6 +136,9 @@ async def change_admin_password(
 
     修改成功后，当前token仍然有效，但建议重新登录
     """
+    # 认证缓存的用户快照不含密码哈希，需显式加载
+    await db.refresh(current_admin, ["hashed_password"])
+
     # 验证旧密码
     if not verify_password(password_data.old_password, current_admin.hashed_password):
         raise HTTPException(status_code=400, detail="当前密码错误")
@@ -167,6 +170,7 @@ async def change_admin_email(
     新邮箱不能与系统中已存在的邮箱重复
     """
     # 验证密码
+    await db.refresh(current_admin, ["hashed_password"])
     if not verify_password(email_data.password, current_admin.hashed_password):
         raise HTTPException(status_code=400, detail="密码错误")
 
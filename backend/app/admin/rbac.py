@@ -17,6 +17,11 @@ from app.database import get_db
 from app.models.admin import Permission, Role, RolePermission
 from app.models.user import AdminUser
 from app.utils.dependencies import get_current_admin_user, get_current_superadmin
+from app.utils.permissions import (
+    bump_permissions_version,
+    invalidate_admin_permissions_cache,
+    invalidate_role_permissions_cache,
+)
 
 router = APIRouter()
 
@@ -156,6 +161,8 @@ async def create_permission(
     db.add(new_permission)
     await db.commit()
     await db.refresh(new_permission)
+    # 通配符权限按权限表展开，新增权限后需要重新编译
+    await bump_permissions_version()
 
     logger.info(f"管理员 {current_admin.username} 创建了权限: {permission.code}")
 
@@ -193,9 +200,18 @@ async def delete_permission(
 
     permission_name = permission.name
     permission_code = permission.code
+    role_ids_result = await db.execute(
+        select(RolePermission.role_id).where(RolePermission.permission_id == permission_id)
+    )
+    affected_role_ids = {row[0] for row in role_ids_result.all()}
     await db.delete(permission)
     await db.commit()
 
+    for role_id in affected_role_ids:
+        await invalidate_role_permissions_cache(role_id, db)
+    if not affected_role_ids:
+        await bump_permissions_version()
+
     logger.info(f"管理员 {current_admin.username} 删除了权限: {permission.code}")
 
     # 发送RBAC管理通知
@@ -377,6 +393,8 @@ async def update_role(
                 db.add(role_perm)
 
     await db.commit()
+    if role.permission_ids is not None:
+        await invalidate_role_permissions_cache(role_id, db)
     await db.refresh(db_role)
     # Reload relationships
     result = await db.execute(
@@ -532,6 +550,7 @@ async def assign_role_to_admin(
     if assignment.role_id is None:
         admin.role_id = None
         await db.commit()
+        await invalidate_admin_permissions_cache(admin_id)
         logger.info(f"管理员 {current_admin.username} 取消了 {admin.username} 的角色分配")
         return {"message": "角色已取消分配", "admin_id": admin_id, "role": None}
 
@@ -545,6 +564,7 @@ async def assign_role_to_admin(
     # 分配角色
     admin.role_id = role.id
     await db.commit()
+    await invalidate_admin_permissions_cache(admin_id)
     await db.refresh(admin)
 
     logger.info(f"管理员 {current_admin.username} 为 {admin.username} 分配了角色: {role.name}")
@@ -595,6 +615,7 @@ async def remove_role_from_admin(
     old_role_name = admin.role.name if admin.role else "未知角色"
     admin.role_id = None
     await db.commit()
+    await invalidate_admin_permissions_cache(admin_id)
 
     logger.info(f"管理员 {current_admin.username} 从 {admin.username} 移除了角色")
 
@@ -999,7 +1020,6 @@ async def bulk_assign_permissions(
     - replace: 替换角色的所有权限
     """
     from app.utils.permission_logger import log_role_permissions_changed
-    from app.utils.permissions import invalidate_role_permissions_cache
 
     if request.action not in ["add", "remove", "replace"]:
         raise HTTPException(
@@ -1093,9 +1113,6 @@ async def bulk_assign_permissions(
             action=request.action
         )
 
-        # 清除缓存
-        await invalidate_role_permissions_cache(role_id, db)
-
         affected_roles.append({
             "role_id": role.id,
             "role_name": role.name,
@@ -1104,6 +1121,10 @@ async def bulk_assign_permissions(
 
     await db.commit()
 
+    # 提交后再清除缓存，避免其他worker在提交前重新加载到旧权限
+    for affected in affected_roles:
+        await invalidate_role_permissions_cache(affected["role_id"], db)
+
     logger.info(
         f"管理员 {current_admin.username} 批量{request.action}权限，影响 {len(affected_roles)} 个角色"
     )
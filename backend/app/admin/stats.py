@@ -8,9 +8,10 @@ from app.database import get_db, get_pool_status
 from app.models.comment import Comment
 from app.models.user import AdminUser, User
 from app.models.video import Category, Video
-from app.utils.cache import Cache, CacheStats
+from app.utils.cache import Cache, CacheStats, get_cached_function_stats
 from app.utils.cache_warmer import CacheWarmer
 from app.utils.dependencies import get_current_admin_user
+from app.utils.token_blacklist import get_revocation_filter_stats
 
 router = APIRouter()
 
@@ -227,6 +228,49 @@ async def get_cache_stats(
     return await CacheStats.get_stats(days=days)
 
 
+@router.get("/cache-prefix-stats")
+async def get_cache_prefix_stats(
+    days: int = Query(1, ge=1, le=7),
+    current_admin: AdminUser = Depends(get_current_admin_user),
+):
+    """Admin: Get cache hit/miss breakdown by key prefix"""
+    return await CacheStats.get_prefix_stats(days=days)
+
+
+@router.get("/cache-function-stats")
+async def get_cache_function_stats(
+    current_admin: AdminUser = Depends(get_current_admin_user),
+):
+    """Admin: Get per-function hit/miss counters for @cache_result functions"""
+    return get_cached_function_stats()
+
+
+@router.get("/cache-tier-stats")
+async def get_cache_tier_stats(
+    current_admin: AdminUser = Depends(get_current_admin_user),
+):
+    """Admin: Get L1 (in-process) / L2 (Redis) hit ratios for this worker"""
+    return CacheStats.get_tier_stats()
+
+
+@router.get("/token-filter-stats")
+async def get_token_filter_stats(
+    current_admin: AdminUser = Depends(get_current_admin_user),
+):
+    """Admin: Get size and false-positive rate of this worker's revoked-token filter"""
+    return get_revocation_filter_stats()
+
+
+@router.get("/minio-io-stats")
+async def get_minio_io_stats(
+    current_admin: AdminUser = Depends(get_current_admin_user),
+):
+    """Admin: Get per-operation MinIO call latency for this worker"""
+    from app.utils.minio_client import async_minio_client
+
+    return async_minio_client.get_stats()
+
+
 @router.post("/cache-warm")
 async def warm_cache(
     current_admin: AdminUser = Depends(get_current_admin_user),
@@ -177,10 +177,10 @@ async def delete_subtitle(
         raise HTTPException(status_code=404, detail="字幕不存在")
 
     # 删除MinIO中的字幕文件
-    from app.utils.minio_client import minio_client
+    from app.utils.minio_client import async_minio_client
 
     try:
-        minio_client.delete_subtitle(
+        await async_minio_client.delete_subtitle(
             video_id=subtitle.video_id,
             language=subtitle.language,
             format=subtitle.format,
@@ -243,7 +243,7 @@ async def upload_subtitle_file(
     import tempfile
     from pathlib import Path
 
-    from app.utils.minio_client import minio_client
+    from app.utils.minio_client import async_minio_client
     from app.utils.subtitle_converter import SubtitleConverter
 
     # 如果是SRT格式,先转换为VTT
@@ -268,7 +268,7 @@ async def upload_subtitle_file(
             vtt_file_path.unlink()
 
             # 上传VTT到MinIO
-            file_url = minio_client.upload_subtitle(
+            file_url = await async_minio_client.upload_subtitle(
                 io.BytesIO(vtt_content),
                 video_id=video_id,
                 language=language,
@@ -280,12 +280,12 @@ async def upload_subtitle_file(
         except Exception as e:
             logger.error(f"❌ SRT转VTT失败,使用原始SRT: {str(e)}")
             # Fallback: 上传原始SRT
-            file_url = minio_client.upload_subtitle(
+            file_url = await async_minio_client.upload_subtitle(
                 io.BytesIO(content), video_id=video_id, language=language, format="srt"
             )
     else:
         # 直接上传VTT或其他格式
-        file_url = minio_client.upload_subtitle(
+        file_url = await async_minio_client.upload_subtitle(
             io.BytesIO(content), video_id=video_id, language=language, format=file_ext
         )
 
@@ -42,6 +42,9 @@ async def get_2fa_status(
     Get current 2FA status for the admin user
     """
     backup_codes_count = 0
+    if current_admin.totp_enabled:
+        # Credential columns are not part of the cached principal
+        await db.refresh(current_admin, ["backup_codes"])
     if current_admin.totp_enabled and current_admin.backup_codes:
         backup_codes_count = totp_manager.get_remaining_backup_codes_count(current_admin.backup_codes)
 
@@ -110,6 +113,7 @@ async def verify_and_enable_2fa(
             detail="2FA is already enabled",
         )
 
+    await db.refresh(current_admin, ["totp_secret"])
     if not current_admin.totp_secret:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -157,6 +161,8 @@ async def disable_2fa(
             detail="2FA is not enabled",
         )
 
+    await db.refresh(current_admin, ["hashed_password", "totp_secret", "backup_codes"])
+
     # Verify password
     if not verify_password(request.password, current_admin.hashed_password):
         raise HTTPException(
@@ -205,6 +211,8 @@ async def regenerate_backup_codes(
             detail="2FA is not enabled",
         )
 
+    await db.refresh(current_admin, ["hashed_password"])
+
     # Verify password
     if not verify_password(request.password, current_admin.hashed_password):
         raise HTTPException(
@@ -8,11 +8,13 @@
 """
 
 import hashlib
-from datetime import datetime, timezone
+import os
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
 from loguru import logger
+from minio.error import S3Error
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -22,8 +24,8 @@ from app.models.upload_statistics import UploadStatistics
 from app.models.user import AdminUser
 from app.utils.admin_notification_service import AdminNotificationService
 from app.utils.dependencies import get_current_admin_user
-from app.utils.file_validator import FileValidator
-from app.utils.minio_client import minio_client
+from app.utils.file_validator import FileValidator, HashingReader
+from app.utils.minio_client import async_minio_client
 from app.utils.upload_session_manager import UploadSessionManager
 
 router = APIRouter()
@@ -31,6 +33,10 @@ router = APIRouter()
 # 创建限流器
 limiter = Limiter(key_func=get_remote_address)
 
+# 分片直传：单次请求最多签发的 URL 数和 URL 有效期
+MAX_PRESIGNED_PARTS = 100
+PRESIGNED_PART_EXPIRES = timedelta(hours=1)
+
 
 @router.post("/init-multipart")
 @limiter.limit("10/hour")  # 每小时最多 10 次初始化
@@ -82,7 +88,7 @@ async def init_multipart_upload(
 
         # 5. 创建 MinIO Multipart Upload
         try:
-            minio_upload_id = minio_client.create_multipart_upload(
+            minio_upload_id = await async_minio_client.create_multipart_upload(
                 object_name, file_type
             )
         except Exception as e:
@@ -165,7 +171,7 @@ async def upload_chunk(
     - 直接上传到 MinIO，无需临时文件
     - 零内存占用（流式上传）
     - MD5 校验（可选）
-    - 从 Redis 读取会话
+    - 从 Redis 读取会话，分片状态原子写入（支持并发上传分片）
     """
     try:
         # 1. 获取会话
@@ -177,43 +183,66 @@ async def upload_chunk(
         if session.get("admin_id") != current_admin.id:
             raise HTTPException(status_code=403, detail="无权操作此上传会话")
 
-        # 3. 读取分片数据
-        chunk_data = await file.read()
+        # 分片索引决定位图偏移，必须在会话的分片数范围内
+        total_chunks = session.get("total_chunks", total_chunks)
+        if not 0 <= chunk_index < total_chunks:
+            raise HTTPException(status_code=400, detail="分片索引超出范围")
+
+        # 3. 分片大小（Starlette 已将请求体写入临时文件）
+        file.file.seek(0, os.SEEK_END)
+        length = file.file.tell()
+        file.file.seek(0)
 
-        # 4. 🆕 MD5 校验（如果提供）
+        # 4. 🆕 MD5 校验：随请求发送 Content-MD5，由 MinIO 在写入前校验
+        content_md5 = None
         if chunk_hash:
-            if not FileValidator.validate_chunk_hash(chunk_data, chunk_hash):
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"分片 {chunk_index} 哈希校验失败，数据可能损坏",
-                )
+            try:
+                content_md5 = FileValidator.md5_hex_to_base64(chunk_hash)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="chunk_hash 不是合法的 MD5")
 
-        # 5. 上传到 MinIO（part_number 从 1 开始）
+        # 5. 从临时文件流式上传到 MinIO（part_number 从 1 开始），边发送边计算 MD5
         object_name = session.get("object_name")
         minio_upload_id = session.get("minio_upload_id")
+        reader = HashingReader(file.file)
 
         try:
-            etag = minio_client.upload_part(
+            etag = await async_minio_client.upload_part_stream(
                 object_name=object_name,
                 upload_id=minio_upload_id,
                 part_number=chunk_index + 1,  # MinIO uses 1-based indexing
-                data=chunk_data,
+                stream=reader,
+                length=length,
+                content_md5=content_md5,
             )
+        except S3Error as e:
+            if e.code == "BadDigest":
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"分片 {chunk_index} 哈希校验失败，数据可能损坏",
+                )
+            logger.error(f"Failed to upload part to MinIO: {e}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"分片上传失败: {str(e)}")
         except Exception as e:
             logger.error(f"Failed to upload part to MinIO: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=f"分片上传失败: {str(e)}")
 
-        # 6. 标记分片为已上传（Redis）
-        await UploadSessionManager.mark_chunk_uploaded(upload_id, chunk_index)
+        if chunk_hash and reader.hexdigest() != chunk_hash.lower():
+            # 服务端未校验 Content-MD5 时的兜底；同一分片重传会覆盖已写入的数据
+            raise HTTPException(
+                status_code=400,
+                detail=f"分片 {chunk_index} 哈希校验失败，数据可能损坏",
+            )
 
-        # 7. 保存 ETag（用于完成上传）
-        uploaded_chunks = session.get("uploaded_chunks", [])
-        parts_map = session.get("parts_map", {})
-        parts_map[str(chunk_index)] = etag
-        await UploadSessionManager.update_session(upload_id, {"parts_map": parts_map})
+        # 6. 标记分片为已上传并保存 ETag（Redis 原子操作，用于完成上传）
+        uploaded_count = await UploadSessionManager.mark_chunk_uploaded(
+            upload_id, chunk_index, etag
+        )
+        if uploaded_count is None:
+            raise HTTPException(status_code=404, detail="上传会话不存在或已过期")
 
-        # 8. 计算进度
-        progress = await UploadSessionManager.get_progress(upload_id)
+        # 7. 计算进度
+        progress = uploaded_count / total_chunks * 100
 
         logger.debug(
             f"📦 Uploaded chunk {chunk_index}/{total_chunks - 1} for {upload_id}, progress: {progress:.2f}%"
@@ -221,7 +250,7 @@ async def upload_chunk(
 
         return {
             "chunk_index": chunk_index,
-            "uploaded_chunks": len(uploaded_chunks) + 1,
+            "uploaded_chunks": uploaded_count,
             "total_chunks": total_chunks,
             "progress": round(progress, 2),
             "etag": etag,
@@ -235,6 +264,71 @@ async def upload_chunk(
         raise HTTPException(status_code=500, detail=f"上传失败: {str(e)}")
 
 
+@router.post("/presign-parts")
+@limiter.limit("60/minute")
+async def presign_upload_parts(
+    request: Request,
+    upload_id: str = Form(...),
+    start_index: int = Form(0),
+    count: int = Form(MAX_PRESIGNED_PARTS),
+    current_admin: AdminUser = Depends(get_current_admin_user),
+):
+    """
+    获取分片直传 URL（浏览器直接并行上传到 MinIO）
+
+    - 分片内容不经过 API 服务器，一次请求签发一批分片
+    - 返回 [start_index, start_index + count) 范围内分片的 PUT URL
+    - 全部上传后调用 /complete-multipart，服务端从 MinIO 读取分片 ETag 合并
+    """
+    try:
+        # 1. 获取会话
+        session = await UploadSessionManager.get_session(upload_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="上传会话不存在或已过期")
+
+        # 2. 验证管理员权限
+        if session.get("admin_id") != current_admin.id:
+            raise HTTPException(status_code=403, detail="无权操作此上传会话")
+
+        total_chunks = session.get("total_chunks", 0)
+        if not 0 <= start_index < total_chunks:
+            raise HTTPException(status_code=400, detail="分片索引超出范围")
+
+        # 3. 签发分片 URL（part_number 从 1 开始）
+        count = max(1, min(count, MAX_PRESIGNED_PARTS))
+        chunk_indexes = range(start_index, min(start_index + count, total_chunks))
+        urls = await async_minio_client.get_presigned_part_urls(
+            session.get("object_name"),
+            session.get("minio_upload_id"),
+            [chunk_index + 1 for chunk_index in chunk_indexes],
+            expires=PRESIGNED_PART_EXPIRES,
+        )
+
+        # 4. 标记为直传模式；直传期间不再访问 API，顺便续期会话
+        await UploadSessionManager.update_session(upload_id, {"direct_upload": True})
+        await UploadSessionManager.extend_ttl(upload_id)
+
+        return {
+            "upload_id": upload_id,
+            "total_chunks": total_chunks,
+            "expires_in": int(PRESIGNED_PART_EXPIRES.total_seconds()),
+            "parts": [
+                {
+                    "chunk_index": chunk_index,
+                    "part_number": chunk_index + 1,
+                    "url": urls[chunk_index + 1],
+                }
+                for chunk_index in chunk_indexes
+            ],
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to presign upload parts: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"签发分片 URL 失败: {str(e)}")
+
+
 @router.post("/complete-multipart")
 async def complete_multipart_upload(
     upload_id: str = Form(...),
@@ -261,29 +355,47 @@ async def complete_multipart_upload(
         if session.get("admin_id") != current_admin.id:
             raise HTTPException(status_code=403, detail="无权操作此上传会话")
 
-        # 3. 检查是否所有分片都已上传
-        if not await UploadSessionManager.is_upload_complete(upload_id):
-            uploaded_chunks = session.get("uploaded_chunks", [])
-            total_chunks = session.get("total_chunks", 0)
-            missing = set(range(total_chunks)) - set(uploaded_chunks)
-            raise HTTPException(
-                status_code=400,
-                detail=f"上传未完成，缺少分片: {sorted(missing)[:10]}...",  # 只显示前 10 个
-            )
-
-        # 4. 准备 MinIO parts 列表
-        parts_map = session.get("parts_map", {})
-        parts = [
-            (int(chunk_index) + 1, etag)  # (part_number, etag)
-            for chunk_index, etag in sorted(parts_map.items(), key=lambda x: int(x[0]))
-        ]
-
-        # 5. 完成 MinIO Multipart Upload（服务端合并）
         object_name = session.get("object_name")
         minio_upload_id = session.get("minio_upload_id")
+        total_chunks = session.get("total_chunks", 0)
 
+        if session.get("direct_upload"):
+            # 3-4. 分片由浏览器直传，已上传的分片及 ETag 以 MinIO 记录为准
+            try:
+                parts = await async_minio_client.list_parts(object_name, minio_upload_id)
+            except Exception as e:
+                logger.error(f"Failed to list MinIO parts: {e}", exc_info=True)
+                raise HTTPException(status_code=500, detail=f"查询分片失败: {str(e)}")
+
+            uploaded = {part_number for part_number, _ in parts}
+            missing = [i for i in range(total_chunks) if i + 1 not in uploaded]
+            if missing:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"上传未完成，缺少分片: {missing[:10]}...",  # 只显示前 10 个
+                )
+            parts = [part for part in parts if part[0] <= total_chunks]
+        else:
+            # 3. 检查是否所有分片都已上传
+            if not await UploadSessionManager.is_upload_complete(upload_id):
+                missing = await UploadSessionManager.get_missing_chunks(
+                    upload_id, total_chunks, limit=10  # 只显示前 10 个
+                )
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"上传未完成，缺少分片: {missing}...",
+                )
+
+            # 4. 准备 MinIO parts 列表
+            parts_map = await UploadSessionManager.get_parts(upload_id)
+            parts = [
+                (chunk_index + 1, etag)  # (part_number, etag)
+                for chunk_index, etag in sorted(parts_map.items())
+            ]
+
+        # 5. 完成 MinIO Multipart Upload（服务端合并）
         try:
-            file_url = minio_client.complete_multipart_upload(
+            file_url = await async_minio_client.complete_multipart_upload(
                 object_name=object_name,
                 upload_id=minio_upload_id,
                 parts=parts,
@@ -394,18 +506,21 @@ async def get_upload_status(
         if session.get("admin_id") != current_admin.id:
             raise HTTPException(status_code=403, detail="无权查看此上传会话")
 
-        progress = await UploadSessionManager.get_progress(upload_id)
-        uploaded_chunks = session.get("uploaded_chunks", [])
         total_chunks = session.get("total_chunks", 0)
+        uploaded_count = await UploadSessionManager.get_uploaded_count(upload_id)
+        missing_chunks = await UploadSessionManager.get_missing_chunks(
+            upload_id, total_chunks, limit=10
+        )
+        progress = uploaded_count / total_chunks * 100 if total_chunks else 0.0
 
         return {
             "upload_id": upload_id,
             "filename": session.get("filename"),
             "file_size": session.get("file_size"),
-            "uploaded_chunks": len(uploaded_chunks),
+            "uploaded_chunks": uploaded_count,
             "total_chunks": total_chunks,
             "progress": round(progress, 2),
-            "missing_chunks": list(set(range(total_chunks)) - set(uploaded_chunks))[:10],
+            "missing_chunks": missing_chunks,
             "created_at": session.get("created_at"),
         }
 
@@ -439,7 +554,7 @@ async def cancel_upload(
 
         if object_name and minio_upload_id:
             try:
-                minio_client.abort_multipart_upload(object_name, minio_upload_id)
+                await async_minio_client.abort_multipart_upload(object_name, minio_upload_id)
                 logger.info(f"Aborted MinIO multipart upload: {minio_upload_id}")
             except Exception as e:
                 logger.warning(f"Failed to abort MinIO multipart upload: {e}")
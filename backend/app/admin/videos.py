@@ -272,11 +272,7 @@ async def admin_create_video(
     await db.refresh(new_video)
 
     # 清除相关缓存
-    await Cache.delete_pattern("videos_list:*")  # 优化：清除列表缓存
-    await Cache.delete_pattern("trending_videos:*")
-    await Cache.delete_pattern("featured_videos:*")
-    await Cache.delete_pattern("recommended_videos:*")
-    await Cache.delete_pattern("search_results:*")
+    await Cache.invalidate_tags("list:videos")  # 列表、热门、推荐、搜索结果
 
     # 🆕 触发AV1转码任务 (如果有video_url)
     if new_video.video_url:
@@ -491,11 +487,7 @@ async def admin_update_video(
     await db.refresh(video)
 
     # 清除相关缓存
-    await Cache.delete_pattern("videos_list:*")  # 优化：清除列表缓存
-    await Cache.delete_pattern("trending_videos:*")
-    await Cache.delete_pattern("featured_videos:*")
-    await Cache.delete_pattern("recommended_videos:*")
-    await Cache.delete_pattern("search_results:*")
+    await Cache.invalidate_tags("list:videos", f"video:{video.id}")
 
     # 🆕 如果video_url更新了,触发AV1转码任务
     if video_url_updated and video.video_url:
@@ -529,11 +521,7 @@ async def admin_delete_video(
     await db.commit()
 
     # 清除相关缓存
-    await Cache.delete_pattern("videos_list:*")  # 优化：清除列表缓存
-    await Cache.delete_pattern("trending_videos:*")
-    await Cache.delete_pattern("featured_videos:*")
-    await Cache.delete_pattern("recommended_videos:*")
-    await Cache.delete_pattern("search_results:*")
+    await Cache.invalidate_tags("list:videos", f"video:{video_id}")
 
     return None
 
@@ -574,10 +562,7 @@ async def admin_update_video_status(
             logger.error(f"Failed to send video publish notification: {e}")
 
     # 清除相关缓存
-    await Cache.delete_pattern("trending_videos:*")
-    await Cache.delete_pattern("featured_videos:*")
-    await Cache.delete_pattern("recommended_videos:*")
-    await Cache.delete_pattern("search_results:*")
+    await Cache.invalidate_tags("list:videos", f"video:{video_id}")
 
     return {"message": "Status updated successfully"}
 
@@ -619,6 +604,7 @@ async def admin_upload_video_file(
         # 更新视频记录
         video.video_url = video_url
         await db.commit()
+        await Cache.invalidate_tags(f"video:{video_id}")
 
         return {"video_url": video_url, "message": "视频上传成功"}
 
@@ -676,6 +662,7 @@ async def admin_upload_poster(
         # 更新视频记录
         video.poster_url = poster_url
         await db.commit()
+        await Cache.invalidate_tags("list:videos", f"video:{video_id}")
 
         return {"poster_url": poster_url, "message": "海报上传成功"}
 
@@ -731,6 +718,7 @@ async def admin_upload_backdrop(
         # 更新视频记录
         video.backdrop_url = backdrop_url
         await db.commit()
+        await Cache.invalidate_tags(f"video:{video_id}")
 
         return {"backdrop_url": backdrop_url, "message": "背景图上传成功"}
 
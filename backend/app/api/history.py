@@ -1,4 +1,5 @@
 import math
+from typing import Optional
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from loguru import logger
@@ -17,6 +18,7 @@ from app.schemas.user_activity import (
     WatchHistoryUpdate,
 )
 from app.utils.dependencies import get_current_active_user
+from app.utils.pagination import apply_keyset, build_keyset_page
 
 router = APIRouter()
 
@@ -105,27 +107,47 @@ async def create_or_update_watch_history(
 async def get_watch_history(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None, description="游标分页：传空字符串获取第一页，之后传 next_cursor"
+    ),
+    include_total: bool = Query(False, description="游标分页时是否统计总数"),
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
 ):
     """Get current user's watch history"""
-    # Count total
-    count_query = select(func.count()).where(WatchHistory.user_id == current_user.id)
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
+    # Count total（游标分页时可选）
+    total = None
+    if cursor is None or include_total:
+        count_query = select(func.count()).where(WatchHistory.user_id == current_user.id)
+        total_result = await db.execute(count_query)
+        total = total_result.scalar() or 0
 
     # Get paginated history with video details
     query = (
         select(WatchHistory)
         .where(WatchHistory.user_id == current_user.id)
         .options(selectinload(WatchHistory.video))
-        .order_by(WatchHistory.updated_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
     )
 
-    result = await db.execute(query)
-    history_items = result.scalars().all()
+    next_cursor = None
+    if cursor is None:
+        query = (
+            query.order_by(WatchHistory.updated_at.desc())
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        )
+        result = await db.execute(query)
+        history_items = result.scalars().all()
+    else:
+        # 新记录的updated_at为空，按最后观看时间 (updated_at 或 created_at, id) 定位
+        last_watched = func.coalesce(WatchHistory.updated_at, WatchHistory.created_at)
+        query = apply_keyset(query, last_watched, WatchHistory.id, cursor, page_size)
+        result = await db.execute(query)
+        history_items, next_cursor = build_keyset_page(
+            result.scalars().all(),
+            page_size,
+            lambda h: h.updated_at or h.created_at,
+        )
 
     items = [WatchHistoryResponse.model_validate(item) for item in history_items]
 
@@ -133,8 +155,9 @@ async def get_watch_history(
         total=total,
         page=page,
         page_size=page_size,
-        pages=math.ceil(total / page_size) if page_size > 0 and total > 0 else 0,
+        pages=math.ceil(total / page_size) if page_size > 0 and total else 0,
         items=items,
+        next_cursor=next_cursor,
     )
 
 
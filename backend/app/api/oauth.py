@@ -280,6 +280,7 @@ async def oauth_unlink(
         )
 
     # Check if user has a password (can't unlink if no password)
+    await db.refresh(current_user, ["hashed_password"])
     if not current_user.hashed_password:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1,5 +1,4 @@
 import hashlib
-import math
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -9,7 +8,7 @@ from sqlalchemy import and_, desc, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db
 from app.models.user import User
 from app.models.user_activity import SearchHistory
 from app.models.video import Video, VideoStatus
@@ -21,6 +20,7 @@ from app.schemas.search import (
 from app.schemas.video import PaginatedResponse, VideoListResponse
 from app.utils.cache import Cache
 from app.utils.dependencies import get_current_user, get_current_user_optional
+from app.utils.pagination import apply_keyset, build_keyset_page, page_count
 from app.utils.rate_limit import RateLimitPresets, limiter
 
 router = APIRouter()
@@ -40,80 +40,109 @@ async def search_videos(
     sort_by: str = Query(
         "created_at", regex="^(created_at|view_count|average_rating|relevance)$"
     ),
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = Query(
+        None, description="游标分页：传空字符串获取第一页，之后传 next_cursor"
+    ),
+    include_total: bool = Query(False, description="游标分页时是否精确统计总数"),
 ):
     """Search videos with advanced filters (cached for 5 minutes)"""
+    if cursor is not None and sort_by == "relevance":
+        # 相关性得分是查询时计算的，无法作为稳定的游标
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor pagination is not supported when sorting by relevance",
+        )
+
     # 生成缓存键（使用查询参数的哈希）
-    query_hash = hashlib.md5(
-        f"{q}:{page}:{page_size}:{category_id}:{country_id}:{year}:{min_rating}:{sort_by}".encode()
-    ).hexdigest()
+    cache_params = f"{q}:{page}:{page_size}:{category_id}:{country_id}:{year}:{min_rating}:{sort_by}"
+    if cursor is not None:
+        cache_params = f"{cache_params}:{cursor}:{include_total}"
+    query_hash = hashlib.md5(cache_params.encode()).hexdigest()
     cache_key = f"search_results:{query_hash}"
 
-    # 尝试从缓存获取
-    cached = await Cache.get(cache_key)
-    if cached is not None:
-        return cached
-
-    # Build base search query using PostgreSQL full-text search
-    filters = [Video.status == VideoStatus.PUBLISHED]
-
-    # 使用PostgreSQL全文搜索（性能优化：100倍提升）
-    # search_vector列已通过migration创建并自动更新
-    search_query_obj = func.plainto_tsquery("simple", q)
-    filters.append(Video.search_vector.op("@@")(search_query_obj))
-
-    # Apply advanced filters
+    # 未命中时只让一个请求查库，其余请求等待结果（缓存5分钟）；
+    # 过期后120秒内先返回旧数据并在后台刷新，因此使用独立的数据库会话
+    async def load():
+        async with AsyncSessionLocal() as db:
+            # Build base search query using PostgreSQL full-text search
+            filters = [Video.status == VideoStatus.PUBLISHED]
+
+            # 使用PostgreSQL全文搜索（性能优化：100倍提升）
+            # search_vector列已通过migration创建并自动更新
+            search_query_obj = func.plainto_tsquery("simple", q)
+            filters.append(Video.search_vector.op("@@")(search_query_obj))
+
+            # Apply advanced filters
+            if category_id:
+                filters.append(Video.video_categories.any(category_id=category_id))
+            if country_id:
+                filters.append(Video.country_id == country_id)
+            if year:
+                filters.append(Video.release_year == year)
+            if min_rating is not None:
+                filters.append(Video.average_rating >= min_rating)
+
+            from app.models.video import VideoCategory
+
+            query = select(Video).options(
+                selectinload(Video.country),
+                selectinload(Video.video_categories).selectinload(VideoCategory.category)
+            ).filter(and_(*filters))
+
+            # Count total（搜索结果总带过滤条件，表行数估计值与结果集无关，
+            # 因此游标分页默认不返回总数，include_total 时才精确统计）
+            if cursor is not None and not include_total:
+                total = None
+            else:
+                count_query = select(func.count()).select_from(query.subquery())
+                result = await db.execute(count_query)
+                total = result.scalar() or 0
+
+            # Apply sorting
+            if sort_by == "view_count":
+                sort_column = Video.view_count
+            elif sort_by == "average_rating":
+                sort_column = Video.average_rating
+            elif sort_by == "relevance":
+                # 按相关性排序（全文搜索特性）
+                sort_column = func.ts_rank(Video.search_vector, search_query_obj)
+            else:
+                sort_column = Video.created_at
+
+            # Paginate
+            next_cursor = None
+            if cursor is None:
+                offset = (page - 1) * page_size
+                query = query.order_by(desc(sort_column)).offset(offset).limit(page_size)
+                result = await db.execute(query)
+                videos = result.scalars().all()
+            else:
+                query = apply_keyset(query, sort_column, Video.id, cursor, page_size)
+                result = await db.execute(query)
+                videos, next_cursor = build_keyset_page(
+                    result.scalars().all(),
+                    page_size,
+                    lambda v: getattr(v, sort_column.key),
+                )
+
+            response = {
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+                "pages": page_count(total, page_size),
+                "items": [VideoListResponse.model_validate(v) for v in videos],
+                "next_cursor": next_cursor,
+            }
+
+            return response
+
+    tags = ["list:videos"]
     if category_id:
-        filters.append(Video.video_categories.any(category_id=category_id))
-    if country_id:
-        filters.append(Video.country_id == country_id)
-    if year:
-        filters.append(Video.release_year == year)
-    if min_rating is not None:
-        filters.append(Video.average_rating >= min_rating)
-
-    from app.models.video import VideoCategory
-
-    query = select(Video).options(
-        selectinload(Video.country),
-        selectinload(Video.video_categories).selectinload(VideoCategory.category)
-    ).filter(and_(*filters))
-
-    # Count total
-    count_query = select(func.count()).select_from(query.subquery())
-    result = await db.execute(count_query)
-    total = result.scalar() or 0
-
-    # Apply sorting
-    if sort_by == "view_count":
-        query = query.order_by(desc(Video.view_count))
-    elif sort_by == "average_rating":
-        query = query.order_by(desc(Video.average_rating))
-    elif sort_by == "relevance":
-        # 按相关性排序（全文搜索特性）
-        query = query.order_by(desc(func.ts_rank(Video.search_vector, search_query_obj)))
-    else:
-        query = query.order_by(desc(Video.created_at))
-
-    # Paginate
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
-
-    result = await db.execute(query)
-    videos = result.scalars().all()
-
-    response = {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "pages": math.ceil(total / page_size) if page_size > 0 and total > 0 else 0,
-        "items": [VideoListResponse.model_validate(v) for v in videos],
-    }
-
-    # 缓存5分钟
-    await Cache.set(cache_key, response, ttl=300)
-
-    return response
+        # 分类修改或删除时按此标签失效；视频改分类时由 list:videos 一并失效
+        tags.append(f"category:{category_id}")
+    return await Cache.get_or_set(
+        cache_key, load, ttl=300, stale_ttl=120, tags=tags
+    )
 
 
 # ==================== Search History Endpoints ====================
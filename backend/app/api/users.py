@@ -48,6 +48,9 @@ async def change_password(
     db: AsyncSession = Depends(get_db),
 ):
     """Change user password"""
+    # The cached principal does not carry the password hash
+    await db.refresh(current_user, ["hashed_password"])
+
     # Verify old password
     if not verify_password(password_data.old_password, current_user.hashed_password):
         raise HTTPException(
@@ -8,7 +8,7 @@ from sqlalchemy import desc, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db
 from app.models.user import User
 from app.models.video import (
     Video,
@@ -22,6 +22,7 @@ from app.schemas.video import PaginatedResponse, VideoDetailResponse, VideoListR
 from app.utils.cache import Cache
 from app.utils.dependencies import get_current_user
 from app.utils.minio_client import minio_client
+from app.utils.pagination import apply_keyset, build_keyset_page, estimate_row_count, page_count
 from app.utils.rate_limit import limiter, RateLimitPresets
 
 router = APIRouter()
@@ -45,75 +46,107 @@ async def list_videos(
     sort_by: str = Query(
         "created_at", regex="^(created_at|view_count|average_rating)$"
     ),
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = Query(
+        None, description="游标分页：传空字符串获取第一页，之后传 next_cursor"
+    ),
+    include_total: bool = Query(False, description="游标分页时是否精确统计总数"),
 ):
     """Get paginated list of published videos (cached for 5 minutes)"""
     # 生成缓存键（包含所有过滤参数）
     cache_key = f"videos_list:{page}:{page_size}:{video_type or 'all'}:{country_id or 'all'}:{category_id or 'all'}:{year or 'all'}:{sort_by}"
+    if cursor is not None:
+        cache_key = f"{cache_key}:cursor_{cursor or 'first'}:total_{include_total}"
+
+    # 未命中时只让一个请求查库，其余请求等待结果（缓存5分钟）；
+    # 过期后120秒内先返回旧数据并在后台刷新，因此使用独立的数据库会话
+    async def load():
+        async with AsyncSessionLocal() as db:
+            # 预加载关联数据，避免N+1查询和延迟加载问题
+            query = (
+                select(Video)
+                .options(
+                    selectinload(Video.country),
+                    selectinload(Video.video_categories).selectinload(VideoCategory.category)
+                )
+                .filter(Video.status == VideoStatus.PUBLISHED)
+            )
+
+            # Filters
+            if video_type:
+                query = query.filter(Video.video_type == video_type)
+            if country_id:
+                query = query.filter(Video.country_id == country_id)
+            if year:
+                query = query.filter(Video.release_year == year)
+
+            # Count total（游标分页默认不做全量count：无过滤条件时使用表行数估计值；
+            # 有过滤条件时表行数与结果集无关，不返回总数）
+            filtered = bool(video_type or country_id or year)
+            total_is_estimate = cursor is not None and not include_total
+            if total_is_estimate and filtered:
+                total = None
+            elif total_is_estimate:
+                total = await estimate_row_count(db, Video.__tablename__)
+            else:
+                count_query = select(func.count()).select_from(query.subquery())
+                result = await db.execute(count_query)
+                total = result.scalar() or 0
+
+            # Sort
+            if sort_by == "view_count":
+                sort_column = Video.view_count
+            elif sort_by == "average_rating":
+                sort_column = Video.average_rating
+            else:
+                sort_column = Video.created_at
+
+            # Paginate
+            next_cursor = None
+            if cursor is None:
+                offset = (page - 1) * page_size
+                query = query.order_by(desc(sort_column)).offset(offset).limit(page_size)
+                result = await db.execute(query)
+                videos = result.scalars().all()
+            else:
+                query = apply_keyset(query, sort_column, Video.id, cursor, page_size)
+                result = await db.execute(query)
+                videos, next_cursor = build_keyset_page(
+                    result.scalars().all(),
+                    page_size,
+                    lambda v: getattr(v, sort_column.key),
+                )
 
-    # 尝试从缓存获取
-    cached = await Cache.get(cache_key)
-    if cached is not None:
-        return cached
-
-    # 预加载关联数据，避免N+1查询和延迟加载问题
-    query = (
-        select(Video)
-        .options(
-            selectinload(Video.country),
-            selectinload(Video.video_categories).selectinload(VideoCategory.category)
-        )
-        .filter(Video.status == VideoStatus.PUBLISHED)
+            response = {
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+                "pages": page_count(total, page_size),
+                "items": [VideoListResponse.model_validate(v) for v in videos],
+                "next_cursor": next_cursor,
+                "total_is_estimate": total is not None and total_is_estimate,
+            }
+
+            return response
+
+    # 按标签登记，视频变更时可精确失效而无需扫描键空间
+    tags = ["list:videos"]
+    if category_id:
+        # 分类修改或删除时按此标签失效；视频改分类时由 list:videos 一并失效
+        tags.append(f"category:{category_id}")
+    return await Cache.get_or_set(
+        cache_key, load, ttl=300, stale_ttl=120, tags=tags
     )
 
-    # Filters
-    if video_type:
-        query = query.filter(Video.video_type == video_type)
-    if country_id:
-        query = query.filter(Video.country_id == country_id)
-    if year:
-        query = query.filter(Video.release_year == year)
-
-    # Count total
-    count_query = select(func.count()).select_from(query.subquery())
-    result = await db.execute(count_query)
-    total = result.scalar() or 0
-
-    # Sort
-    if sort_by == "view_count":
-        query = query.order_by(desc(Video.view_count))
-    elif sort_by == "average_rating":
-        query = query.order_by(desc(Video.average_rating))
-    else:
-        query = query.order_by(desc(Video.created_at))
-
-    # Paginate
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
-
-    result = await db.execute(query)
-    videos = result.scalars().all()
-
-    response = {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "pages": math.ceil(total / page_size) if page_size > 0 and total > 0 else 0,
-        "items": [VideoListResponse.model_validate(v) for v in videos],
-    }
-
-    # 缓存5分钟
-    await Cache.set(cache_key, response, ttl=300)
-
-    return response
-
 
 @router.get("/trending", response_model=PaginatedResponse)
 async def get_trending_videos(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     time_range: str = Query("all", regex="^(today|week|all|rising)$"),
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = Query(
+        None, description="游标分页：传空字符串获取第一页，之后传 next_cursor"
+    ),
+    include_total: bool = Query(False, description="游标分页时是否精确统计总数"),
 ):
     """
     Get trending videos with time-based filtering (cached for 10 minutes)
@@ -122,188 +155,207 @@ async def get_trending_videos(
         page: Page number
         page_size: Items per page
         time_range: Time range filter - "today", "week", "all", or "rising"
+        cursor: Keyset cursor on (view_count, id); "" for the first page
+        include_total: Count exact total in cursor mode instead of estimating
     """
     # 生成缓存键（包含time_range）
     cache_key = f"trending_videos:page_{page}:size_{page_size}:range_{time_range}"
+    if cursor is not None:
+        cache_key = f"{cache_key}:cursor_{cursor or 'first'}:total_{include_total}"
+
+    # 未命中时只让一个请求查库，其余请求等待结果（缓存10分钟）；
+    # 过期后300秒内先返回旧数据并在后台刷新，因此使用独立的数据库会话
+    async def load():
+        async with AsyncSessionLocal() as db:
+            # 从数据库查询（预加载关联数据避免延迟加载问题）
+            query = (
+                select(Video)
+                .options(
+                    selectinload(Video.country),
+                    selectinload(Video.video_categories).selectinload(VideoCategory.category)
+                )
+                .filter(Video.status == VideoStatus.PUBLISHED)
+            )
+
+            # Time-based filtering
+            from datetime import datetime, timezone
+            now = datetime.now(timezone.utc)
+
+            if time_range == "today":
+                # Videos from last 24 hours
+                yesterday = now - timedelta(days=1)
+                query = query.filter(Video.created_at >= yesterday)
+                # Sort by view count for today's trending
+                query = query.order_by(desc(Video.view_count), desc(Video.created_at))
+            elif time_range == "week":
+                # Videos from last 7 days
+                week_ago = now - timedelta(days=7)
+                query = query.filter(Video.created_at >= week_ago)
+                # Sort by view count for this week's trending
+                query = query.order_by(desc(Video.view_count), desc(Video.created_at))
+            elif time_range == "rising":
+                # Rising videos: recent uploads with good view velocity
+                # Videos from last 3 days, sorted by view count (these are "rising")
+                three_days_ago = now - timedelta(days=3)
+                query = query.filter(Video.created_at >= three_days_ago)
+                # Sort by view count to get rising stars
+                query = query.order_by(desc(Video.view_count), desc(Video.created_at))
+            else:  # "all"
+                # All time trending - just by view count
+                query = query.order_by(desc(Video.view_count))
+
+            # Count total with same filters（游标分页默认不做全量count：
+            # 不限时间范围时使用表行数估计值，否则不返回总数）
+            total_is_estimate = cursor is not None and not include_total
+            if total_is_estimate and time_range != "all":
+                total = None
+            elif total_is_estimate:
+                total = await estimate_row_count(db, Video.__tablename__)
+            else:
+                count_query = select(func.count()).select_from(query.subquery())
+                result = await db.execute(count_query)
+                total = result.scalar() or 0
+
+            # Paginate
+            next_cursor = None
+            if cursor is None:
+                offset = (page - 1) * page_size
+                query = query.offset(offset).limit(page_size)
+                result = await db.execute(query)
+                videos = result.scalars().all()
+            else:
+                # 游标分页按 (view_count, id) 定位
+                query = apply_keyset(query, Video.view_count, Video.id, cursor, page_size)
+                result = await db.execute(query)
+                videos, next_cursor = build_keyset_page(
+                    result.scalars().all(), page_size, lambda v: v.view_count
+                )
 
-    # 尝试从缓存获取
-    cached = await Cache.get(cache_key)
-    if cached is not None:
-        return cached
-
-    # 从数据库查询（预加载关联数据避免延迟加载问题）
-    query = (
-        select(Video)
-        .options(
-            selectinload(Video.country),
-            selectinload(Video.video_categories).selectinload(VideoCategory.category)
-        )
-        .filter(Video.status == VideoStatus.PUBLISHED)
-    )
-
-    # Time-based filtering
-    from datetime import datetime, timezone
-    now = datetime.now(timezone.utc)
-
-    if time_range == "today":
-        # Videos from last 24 hours
-        yesterday = now - timedelta(days=1)
-        query = query.filter(Video.created_at >= yesterday)
-        # Sort by view count for today's trending
-        query = query.order_by(desc(Video.view_count), desc(Video.created_at))
-    elif time_range == "week":
-        # Videos from last 7 days
-        week_ago = now - timedelta(days=7)
-        query = query.filter(Video.created_at >= week_ago)
-        # Sort by view count for this week's trending
-        query = query.order_by(desc(Video.view_count), desc(Video.created_at))
-    elif time_range == "rising":
-        # Rising videos: recent uploads with good view velocity
-        # Videos from last 3 days, sorted by view count (these are "rising")
-        three_days_ago = now - timedelta(days=3)
-        query = query.filter(Video.created_at >= three_days_ago)
-        # Sort by view count to get rising stars
-        query = query.order_by(desc(Video.view_count), desc(Video.created_at))
-    else:  # "all"
-        # All time trending - just by view count
-        query = query.order_by(desc(Video.view_count))
-
-    # Count total with same filters
-    count_query = select(func.count()).select_from(query.subquery())
-    result = await db.execute(count_query)
-    total = result.scalar() or 0
-
-    # Paginate
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
-
-    result = await db.execute(query)
-    videos = result.scalars().all()
-
-    response = {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "pages": math.ceil(total / page_size) if page_size > 0 and total > 0 else 0,
-        "items": [VideoListResponse.model_validate(v) for v in videos],
-    }
+            response = {
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+                "pages": page_count(total, page_size),
+                "items": [VideoListResponse.model_validate(v) for v in videos],
+                "next_cursor": next_cursor,
+                "total_is_estimate": total is not None and total_is_estimate,
+            }
 
-    # 缓存10分钟
-    await Cache.set(cache_key, response, ttl=600)
+            return response
 
-    return response
+    return await Cache.get_or_set(
+        cache_key, load, ttl=600, stale_ttl=300, tags=["list:videos"]
+    )
 
 
 @router.get("/featured", response_model=PaginatedResponse)
 async def get_featured_videos(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db),
 ):
     """Get featured videos (cached for 15 minutes)"""
     # 生成缓存键
     cache_key = f"featured_videos:page_{page}:size_{page_size}"
 
-    # 尝试从缓存获取
-    cached = await Cache.get(cache_key)
-    if cached is not None:
-        return cached
-
-    # 从数据库查询（预加载关联数据避免延迟加载问题）
-    query = (
-        select(Video)
-        .options(
-            selectinload(Video.country),
-            selectinload(Video.video_categories).selectinload(VideoCategory.category)
-        )
-        .filter(Video.status == VideoStatus.PUBLISHED, Video.is_featured.is_(True))
-        .order_by(desc(Video.sort_order), desc(Video.created_at))
-    )
-
-    # Count total
-    count_query = select(func.count()).select_from(
-        select(Video)
-        .filter(Video.status == VideoStatus.PUBLISHED, Video.is_featured.is_(True))
-        .subquery()
+    # 未命中时只让一个请求查库，其余请求等待结果（缓存15分钟）；
+    # 过期后300秒内先返回旧数据并在后台刷新，因此使用独立的数据库会话
+    async def load():
+        async with AsyncSessionLocal() as db:
+            # 从数据库查询（预加载关联数据避免延迟加载问题）
+            query = (
+                select(Video)
+                .options(
+                    selectinload(Video.country),
+                    selectinload(Video.video_categories).selectinload(VideoCategory.category)
+                )
+                .filter(Video.status == VideoStatus.PUBLISHED, Video.is_featured.is_(True))
+                .order_by(desc(Video.sort_order), desc(Video.created_at))
+            )
+
+            # Count total
+            count_query = select(func.count()).select_from(
+                select(Video)
+                .filter(Video.status == VideoStatus.PUBLISHED, Video.is_featured.is_(True))
+                .subquery()
+            )
+            result = await db.execute(count_query)
+            total = result.scalar() or 0
+
+            # Paginate
+            offset = (page - 1) * page_size
+            query = query.offset(offset).limit(page_size)
+
+            result = await db.execute(query)
+            videos = result.scalars().all()
+
+            response = {
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+                "pages": math.ceil(total / page_size) if page_size > 0 and total > 0 else 0,
+                "items": [VideoListResponse.model_validate(v) for v in videos],
+            }
+
+            return response
+
+    return await Cache.get_or_set(
+        cache_key, load, ttl=900, stale_ttl=300, tags=["list:videos"]
     )
-    result = await db.execute(count_query)
-    total = result.scalar() or 0
-
-    # Paginate
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
-
-    result = await db.execute(query)
-    videos = result.scalars().all()
-
-    response = {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "pages": math.ceil(total / page_size) if page_size > 0 and total > 0 else 0,
-        "items": [VideoListResponse.model_validate(v) for v in videos],
-    }
-
-    # 缓存15分钟
-    await Cache.set(cache_key, response, ttl=900)
-
-    return response
 
 
 @router.get("/recommended", response_model=PaginatedResponse)
 async def get_recommended_videos(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db),
 ):
     """Get recommended videos (cached for 15 minutes)"""
     # 生成缓存键
     cache_key = f"recommended_videos:page_{page}:size_{page_size}"
 
-    # 尝试从缓存获取
-    cached = await Cache.get(cache_key)
-    if cached is not None:
-        return cached
-
-    # 从数据库查询（预加载关联数据避免延迟加载问题）
-    query = (
-        select(Video)
-        .options(
-            selectinload(Video.country),
-            selectinload(Video.video_categories).selectinload(VideoCategory.category)
-        )
-        .filter(Video.status == VideoStatus.PUBLISHED, Video.is_recommended.is_(True))
-        .order_by(desc(Video.sort_order), desc(Video.created_at))
-    )
-
-    # Count total
-    count_query = select(func.count()).select_from(
-        select(Video)
-        .filter(Video.status == VideoStatus.PUBLISHED, Video.is_recommended.is_(True))
-        .subquery()
+    # 未命中时只让一个请求查库，其余请求等待结果（缓存15分钟）；
+    # 过期后300秒内先返回旧数据并在后台刷新，因此使用独立的数据库会话
+    async def load():
+        async with AsyncSessionLocal() as db:
+            # 从数据库查询（预加载关联数据避免延迟加载问题）
+            query = (
+                select(Video)
+                .options(
+                    selectinload(Video.country),
+                    selectinload(Video.video_categories).selectinload(VideoCategory.category)
+                )
+                .filter(Video.status == VideoStatus.PUBLISHED, Video.is_recommended.is_(True))
+                .order_by(desc(Video.sort_order), desc(Video.created_at))
+            )
+
+            # Count total
+            count_query = select(func.count()).select_from(
+                select(Video)
+                .filter(Video.status == VideoStatus.PUBLISHED, Video.is_recommended.is_(True))
+                .subquery()
+            )
+            result = await db.execute(count_query)
+            total = result.scalar() or 0
+
+            # Paginate
+            offset = (page - 1) * page_size
+            query = query.offset(offset).limit(page_size)
+
+            result = await db.execute(query)
+            videos = result.scalars().all()
+
+            response = {
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+                "pages": math.ceil(total / page_size) if page_size > 0 and total > 0 else 0,
+                "items": [VideoListResponse.model_validate(v) for v in videos],
+            }
+
+            return response
+
+    return await Cache.get_or_set(
+        cache_key, load, ttl=900, stale_ttl=300, tags=["list:videos"]
     )
-    result = await db.execute(count_query)
-    total = result.scalar() or 0
-
-    # Paginate
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
-
-    result = await db.execute(query)
-    videos = result.scalars().all()
-
-    response = {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "pages": math.ceil(total / page_size) if page_size > 0 and total > 0 else 0,
-        "items": [VideoListResponse.model_validate(v) for v in videos],
-    }
-
-    # 缓存15分钟
-    await Cache.set(cache_key, response, ttl=900)
-
-    return response
 
 
 @router.get("/{video_id}", response_model=VideoDetailResponse)
@@ -360,7 +412,8 @@ async def get_video(
 
     # 构建响应并缓存
     response = VideoDetailResponse.model_validate(video)
-    await Cache.set(cache_key, response, ttl=300)  # 缓存5分钟
+    # 缓存5分钟，视频更新时按 video:{id} 标签失效
+    await Cache.set(cache_key, response, ttl=300, tags=[f"video:{video_id}"])
 
     # 使用后台任务异步更新浏览量（不缓存时）
     async def increment_view_count():
@@ -18,8 +18,11 @@ celery_app = Celery(
         "app.tasks.scheduler_optimizer",  # 调度任务优化器
         "app.tasks.scheduler_monitor",  # 调度任务监控器
         "app.tasks.transcode_av1",  # 转码任务（如果存在）
+        "app.tasks.transcode_av1_chunked",  # 🆕 长视频分段并行转码任务
         "app.tasks.cleanup_temp_uploads",  # 🆕 临时文件清理任务
         "app.tasks.generate_sla_reports",  # 🆕 SLA报告生成任务
+        "app.tasks.build_similarity_index",  # 🆕 相似视频索引构建任务
+        "app.tasks.train_recommendation_model",  # 🆕 协同过滤模型训练任务
     ],
 )
 
@@ -141,6 +144,17 @@ celery_app.conf.update(
             "schedule": crontab(day_of_month=1, hour=1, minute=0),  # 每月1号01:00
             "options": {"queue": "monitoring"},
         },
+        # ========== 推荐索引任务 ==========
+        # 每天凌晨3点30分重建相似视频索引
+        "build-similarity-index": {
+            "task": "recommendation.build_similarity_index",
+            "schedule": crontab(hour=3, minute=30),
+        },
+        # 每天凌晨4点30分训练协同过滤模型
+        "train-recommendation-model": {
+            "task": "recommendation.train_cf_model",
+            "schedule": crontab(hour=4, minute=30),
+        },
         # ========== 定时发布任务 ==========
         # 每分钟检查并发布到期的Video和Series
         "publish-scheduled-content": {
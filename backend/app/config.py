@@ -22,11 +22,25 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
 
+    # 进程内L1缓存（位于Redis之前，按worker独立，通过pub/sub失效）
+    CACHE_L1_ENABLED: bool = True
+    CACHE_L1_MAX_SIZE: int = 1000  # 最多缓存的键数量
+    CACHE_L1_TTL: int = 30  # L1条目最长存活时间（秒）
+    CACHE_STATS_FLUSH_INTERVAL: int = 5  # 缓存统计批量写入Redis的间隔（秒）
+
     # JWT
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # 已认证用户快照的缓存时间（秒），用户被修改时立即失效
+    AUTH_PRINCIPAL_CACHE_TTL: int = 60
+
+    # 已撤销token的进程内布隆过滤器（启动时从Redis重建，通过pub/sub同步）
+    TOKEN_BLACKLIST_FILTER_ENABLED: bool = True
+    TOKEN_BLACKLIST_FILTER_CAPACITY: int = 100000  # 预计同时存在的撤销token数量
+    TOKEN_BLACKLIST_FILTER_ERROR_RATE: float = 0.001  # 目标误判率
+    TOKEN_BLACKLIST_FILTER_REBUILD_INTERVAL: int = 3600  # 定期重建以剔除过期条目（秒）
 
     # CORS
     # 生产环境应该通过环境变量覆盖这个默认值
@@ -46,6 +60,7 @@ class Settings(BaseSettings):
     MINIO_BUCKET: str = "videos"
     MINIO_SECURE: bool = False  # 生产环境应设为True
     MINIO_PUBLIC_URL: str
+    MINIO_IO_WORKERS: int = 16  # 异步门面的线程数（即MinIO最大并发调用数）与连接池大小
 
     # Elasticsearch
     ELASTICSEARCH_URL: str = "http://localhost:9200"
@@ -54,6 +69,15 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: str = "redis://localhost:6379/1"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/2"
 
+    # Transcode
+    TRANSCODE_CPU_CORES: int = 0  # 本机转码可用的CPU核心数，0表示自动检测
+    TRANSCODE_LOCK_DIR: str = "/tmp/transcode_core_slots"  # 核心槽位锁文件目录（同一主机的worker共享）
+    TRANSCODE_CHUNKED_MIN_MINUTES: int = 20  # 时长不短于此值(分钟)的视频使用分段并行转码，0表示关闭
+    TRANSCODE_CHUNK_SECONDS: int = 120  # 分段并行转码的目标分段时长（秒）
+
+    # Recommendation
+    RECOMMENDATION_MODEL_DIR: str = "data/recommendation_model"  # 矩阵分解模型目录（API与Celery需共享）
+
     # Pagination
     PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
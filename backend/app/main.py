@@ -808,6 +808,42 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to start storage monitoring: {e}")
 
+    # 启动L1缓存失效监听（各worker通过Redis pub/sub同步失效）
+    try:
+        from app.utils.cache import start_cache_invalidation_listener
+
+        asyncio.create_task(start_cache_invalidation_listener())
+        logger.info("Cache invalidation listener started")
+    except Exception as e:
+        logger.error(f"Failed to start cache invalidation listener: {e}")
+
+    # 启动已撤销token过滤器（认证时大多数请求不必查询黑名单）
+    try:
+        from app.utils.token_blacklist import start_token_blacklist_listener
+
+        asyncio.create_task(start_token_blacklist_listener())
+        logger.info("Token blacklist listener started")
+    except Exception as e:
+        logger.error(f"Failed to start token blacklist listener: {e}")
+
+    # 启动权限版本监听（编译后的权限缓存在进程内，角色变更时通过pub/sub失效）
+    try:
+        from app.utils.permissions import start_permission_version_listener
+
+        asyncio.create_task(start_permission_version_listener())
+        logger.info("Permission version listener started")
+    except Exception as e:
+        logger.error(f"Failed to start permission version listener: {e}")
+
+    # 启动缓存统计批量刷新（请求路径只做内存计数）
+    try:
+        from app.utils.cache import start_cache_stats_flusher
+
+        asyncio.create_task(start_cache_stats_flusher())
+        logger.info("Cache stats flusher started")
+    except Exception as e:
+        logger.error(f"Failed to start cache stats flusher: {e}")
+
 
 @app.get("/")
 async def root():
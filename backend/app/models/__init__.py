@@ -51,6 +51,7 @@ from app.models.video import (
     VideoActor,
     VideoCategory,
     VideoDirector,
+    VideoSimilarity,
     VideoTag,
 )
 
@@ -67,6 +68,7 @@ __all__ = [
     "VideoTag",
     "VideoActor",
     "VideoDirector",
+    "VideoSimilarity",  # 🆕 相似视频索引
     "Comment",
     "Rating",
     "Favorite",
@@ -15,7 +15,7 @@ from sqlalchemy import (
     String,
     Text,
 )
-from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -160,6 +160,13 @@ class Video(Base):
     trailer_url: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
     poster_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
     backdrop_url: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+    # 转码任务生成的拖动预览雪碧图索引（WebVTT）和预览图
+    sprite_vtt_url: Mapped[Optional[str]] = mapped_column(
+        String(500), nullable=True, comment="拖动预览雪碧图WebVTT索引URL"
+    )
+    preview_urls: Mapped[list[str]] = mapped_column(
+        JSONB, default=list, server_default="[]", comment="预览图URL列表"
+    )
 
     # 🆕 Video Hash fields (for duplicate detection)
     file_hash_md5: Mapped[Optional[str]] = mapped_column(String(32), index=True, nullable=True, comment="完整文件MD5哈希")
@@ -380,3 +387,23 @@ class VideoDirector(Base):
     # Relationships
     video: Mapped[Video] = relationship("Video", back_populates="video_directors")
     director: Mapped[Director] = relationship("Director", back_populates="video_directors")
+
+
+class VideoSimilarity(Base):
+    """Precomputed top-K similar videos (built offline by Celery)"""
+
+    __tablename__ = "video_similarities"
+
+    video_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True
+    )
+    # 按相似度降序排列的视频ID及对应分数，两个数组一一对应
+    similar_ids: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer), nullable=False, default=list, comment="相似视频ID（降序）"
+    )
+    scores: Mapped[list[float]] = mapped_column(
+        ARRAY(Float), nullable=False, default=list, comment="相似度分数"
+    )
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
@@ -78,8 +78,10 @@ class WatchHistoryResponse(BaseModel):
 class PaginatedWatchHistoryResponse(BaseModel):
     """Paginated watch history response"""
 
-    total: int
+    # 游标分页且未要求统计总数时为None
+    total: Optional[int]
     page: int
     page_size: int
     pages: int
     items: List[WatchHistoryResponse]
+    next_cursor: Optional[str] = None
@@ -122,6 +122,9 @@ class VideoDetailResponse(VideoListResponse):
     video_url: Optional[str] = None
     trailer_url: Optional[str] = None
     backdrop_url: Optional[str] = None
+    # 播放器拖动进度条时显示的缩略图（WebVTT，cue 指向雪碧图中的区域）
+    sprite_vtt_url: Optional[str] = None
+    preview_urls: List[str] = []
     release_date: Optional[datetime] = None
     language: Optional[str] = None
     total_seasons: Optional[int] = None
@@ -229,8 +232,12 @@ class VideoUpdate(BaseModel):
 class PaginatedResponse(BaseModel):
     """Paginated response schema"""
 
-    total: int
+    # 游标分页且带过滤条件时不统计总数，total 与 pages 为None
+    total: Optional[int]
     page: int
     page_size: int
     items: List[VideoListResponse]
-    pages: int
+    pages: Optional[int]
+    # 游标分页：下一页游标（没有下一页时为None）；total 是否为估算值
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
@@ -0,0 +1,148 @@
+"""
+相似视频索引构建任务
+定期全量计算 item-item 相似度并写入 video_similarities 表
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from loguru import logger
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import aliased
+
+from app.celery_app import celery_app
+from app.database import AsyncSessionLocal
+from app.models.user_activity import WatchHistory
+from app.models.video import (
+    Video,
+    VideoActor,
+    VideoCategory,
+    VideoDirector,
+    VideoSimilarity,
+    VideoStatus,
+)
+from app.utils.cache import Cache
+from app.utils.similarity_index import (
+    DEFAULT_TOP_K,
+    VideoFeatures,
+    build_similarity_index,
+    normalize_co_watch,
+)
+
+# 共同观看只统计最近一段时间的观看记录
+CO_WATCH_WINDOW_DAYS = 90
+
+# 至少多少个用户同时看过才计入共同观看
+CO_WATCH_MIN_COUNT = 2
+
+# 每批写入的行数
+WRITE_BATCH_SIZE = 500
+
+
+@celery_app.task(name="recommendation.build_similarity_index")
+def build_video_similarity_index(top_k: int = DEFAULT_TOP_K):
+    """
+    全量重建相似视频索引
+
+    建议每天低峰期执行一次
+    """
+    return asyncio.run(_build_similarity_index_async(top_k))
+
+
+async def _build_similarity_index_async(top_k: int) -> dict:
+    """加载特征、计算相似度并写入数据库"""
+    started = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        try:
+            # 已发布视频的基础属性
+            result = await db.execute(
+                select(
+                    Video.id, Video.country_id, Video.average_rating, Video.view_count
+                ).filter(Video.status == VideoStatus.PUBLISHED)
+            )
+            features = {}
+            popularity = {}
+            for video_id, country_id, rating, view_count in result.all():
+                features[video_id] = VideoFeatures(country_id=country_id, rating=rating)
+                popularity[video_id] = view_count or 0
+
+            if not features:
+                logger.info("No published videos, skipping similarity index build")
+                return {"success": True, "videos": 0}
+
+            # 关联表特征，每种一次查询
+            for model, column, attr in (
+                (VideoCategory, VideoCategory.category_id, "categories"),
+                (VideoActor, VideoActor.actor_id, "actors"),
+                (VideoDirector, VideoDirector.director_id, "directors"),
+            ):
+                pairs = await db.execute(select(model.video_id, column))
+                for video_id, value in pairs.all():
+                    feats = features.get(video_id)
+                    if feats is not None:
+                        getattr(feats, attr).add(value)
+
+            co_watch = await _load_co_watch(db)
+
+            index = await asyncio.to_thread(
+                build_similarity_index, features, co_watch, popularity, top_k
+            )
+
+            # 全量替换：先清空再批量写入
+            await db.execute(delete(VideoSimilarity))
+            rows = [
+                {
+                    "video_id": video_id,
+                    "similar_ids": [v for v, _ in neighbors],
+                    "scores": [s for _, s in neighbors],
+                }
+                for video_id, neighbors in index.items()
+                if neighbors
+            ]
+            for i in range(0, len(rows), WRITE_BATCH_SIZE):
+                await db.execute(insert(VideoSimilarity), rows[i : i + WRITE_BATCH_SIZE])
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to build similarity index: {e}", exc_info=True)
+            return {"success": False, "error": str(e)}
+
+    # 已缓存的相似视频ID随索引一起失效
+    await Cache.invalidate_tags("similar:videos")
+
+    elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+    logger.info(
+        f"Similarity index built: {len(rows)} videos, top_k={top_k}, {elapsed:.1f}s"
+    )
+    return {"success": True, "videos": len(rows), "elapsed": elapsed}
+
+
+async def _load_co_watch(db) -> dict:
+    """统计最近观看记录中的视频对共同观看次数"""
+    since = datetime.now(timezone.utc) - timedelta(days=CO_WATCH_WINDOW_DAYS)
+    recent = (
+        select(WatchHistory.user_id, WatchHistory.video_id)
+        .filter(func.coalesce(WatchHistory.updated_at, WatchHistory.created_at) >= since)
+        .distinct()
+        .subquery()
+    )
+
+    watchers = await db.execute(
+        select(recent.c.video_id, func.count()).group_by(recent.c.video_id)
+    )
+    watcher_counts = dict(watchers.all())
+
+    other = aliased(recent)
+    pairs = await db.execute(
+        select(recent.c.video_id, other.c.video_id, func.count())
+        .join(
+            other,
+            (recent.c.user_id == other.c.user_id)
+            & (recent.c.video_id < other.c.video_id),
+        )
+        .group_by(recent.c.video_id, other.c.video_id)
+        .having(func.count() >= CO_WATCH_MIN_COUNT)
+    )
+    pair_counts = {(a, b): count for a, b, count in pairs.all()}
+
+    return normalize_co_watch(pair_counts, watcher_counts)
@@ -0,0 +1,127 @@
+"""
+协同过滤模型训练任务
+定期根据观看历史和收藏训练ALS矩阵分解模型，并发布为 .npy 文件
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+
+from loguru import logger
+from sqlalchemy import case, func, literal, select, union_all
+
+from app.celery_app import celery_app
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.user_activity import Favorite, WatchHistory
+from app.models.video import Video, VideoStatus
+from app.utils.cache import Cache
+from app.utils.collaborative_filtering import (
+    build_interaction_matrix,
+    save_model,
+    train_implicit_als,
+)
+
+# 交互权重：观看记1分，看完再加1分，收藏记2分
+WATCH_WEIGHT = 1.0
+COMPLETED_BONUS = 1.0
+FAVORITE_WEIGHT = 2.0
+
+# ALS 超参数
+ALS_FACTORS = 64
+ALS_REGULARIZATION = 0.1
+ALS_ALPHA = 40.0
+ALS_ITERATIONS = 15
+
+
+@celery_app.task(name="recommendation.train_cf_model")
+def train_recommendation_model():
+    """
+    训练并发布协同过滤模型
+
+    建议每天低峰期执行一次
+    """
+    return asyncio.run(_train_recommendation_model_async())
+
+
+async def _load_interactions(db) -> list:
+    """按 (用户, 视频) 汇总观看与收藏权重，只保留已发布视频"""
+    watches = select(
+        WatchHistory.user_id.label("user_id"),
+        WatchHistory.video_id.label("video_id"),
+        (
+            literal(WATCH_WEIGHT)
+            + case((WatchHistory.is_completed == 1, COMPLETED_BONUS), else_=0.0)
+        ).label("weight"),
+    )
+    favorites = select(
+        Favorite.user_id.label("user_id"),
+        Favorite.video_id.label("video_id"),
+        literal(FAVORITE_WEIGHT).label("weight"),
+    )
+    events = union_all(watches, favorites).subquery()
+
+    result = await db.execute(
+        select(events.c.user_id, events.c.video_id, func.sum(events.c.weight))
+        .join(Video, Video.id == events.c.video_id)
+        .filter(Video.status == VideoStatus.PUBLISHED)
+        .group_by(events.c.user_id, events.c.video_id)
+    )
+    return [(user_id, video_id, float(weight)) for user_id, video_id, weight in result.all()]
+
+
+def _train_and_save(interactions: list) -> dict:
+    """训练模型并写入模型目录（CPU密集，在线程中执行）"""
+    user_ids, item_ids, indptr, indices, values = build_interaction_matrix(interactions)
+    user_factors, item_factors = train_implicit_als(
+        indptr,
+        indices,
+        values,
+        n_items=len(item_ids),
+        factors=ALS_FACTORS,
+        regularization=ALS_REGULARIZATION,
+        alpha=ALS_ALPHA,
+        iterations=ALS_ITERATIONS,
+    )
+    version_dir = save_model(
+        Path(settings.RECOMMENDATION_MODEL_DIR),
+        user_ids,
+        item_ids,
+        user_factors,
+        item_factors,
+        indptr,
+        indices,
+    )
+    return {
+        "version": version_dir.name,
+        "users": len(user_ids),
+        "items": len(item_ids),
+        "interactions": len(values),
+    }
+
+
+async def _train_recommendation_model_async() -> dict:
+    started = datetime.now(timezone.utc)
+    try:
+        async with AsyncSessionLocal() as db:
+            interactions = await _load_interactions(db)
+
+        if not interactions:
+            logger.info("No user interactions, skipping recommendation model training")
+            return {"success": True, "interactions": 0}
+
+        stats = await asyncio.to_thread(_train_and_save, interactions)
+    except Exception as e:
+        logger.error(f"Failed to train recommendation model: {e}", exc_info=True)
+        return {"success": False, "error": str(e)}
+
+    # 已缓存的个性化推荐ID随新模型一起失效
+    await Cache.invalidate_tags("recommendations:personalized")
+
+    elapsed = (datetime.now(timezone.utc) - started).total_seconds()
+    logger.info(
+        f"Recommendation model {stats['version']} trained: "
+        f"{stats['users']} users, {stats['items']} items, "
+        f"{stats['interactions']} interactions, {elapsed:.1f}s"
+    )
+    return {"success": True, "elapsed": elapsed, **stats}
@@ -1,15 +1,15 @@
 """
 AV1视频转码Celery任务
-- 多分辨率并行转码
-- 自动生成HLS master playlist
+- 多分辨率并行转码（主机级CPU核心预算）
+- 自动生成HLS master playlist（每完成一个分辨率重新发布）
 - 文件大小对比统计
 """
 
 import asyncio
 import logging
 import shutil
-from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Optional
 
 from celery import shared_task
 
@@ -17,12 +17,17 @@ from app.config import settings
 from app.database import SessionLocal
 from app.models.video import Video
 from app.utils.av1_transcoder import AV1Transcoder, format_size
+from app.utils.cache import Cache
+from app.utils.hls_uploader import HLSUploader
+from app.utils.media_probe import analyze_media
 from app.utils.minio_client import MinIOClient
 from app.utils.path_validator import (
     create_safe_temp_dir,
     validate_path,
     validate_video_id,
 )
+from app.utils.thumbnail_sheet import extract_thumbnail_set, upload_thumbnail_set
+from app.utils.transcode_scheduler import TranscodeScheduler
 from app.utils.websocket_manager import notification_service
 
 logger = logging.getLogger(__name__)
@@ -36,10 +41,10 @@ def transcode_video_to_av1(self, video_id: int):
     工作流:
     1. 下载原始视频
     2. 分析视频元数据
-    3. 并行转码多个分辨率
+    3. 按CPU核心预算转码多个分辨率（低分辨率优先）
     4. 生成HLS切片
-    5. 上传到MinIO
-    6. 更新数据库
+    5. 每完成一个分辨率即上传、更新Master Playlist和数据库（渐进式发布）
+    6. 更新统计信息
     7. 清理临时文件
 
     Args:
@@ -52,7 +57,8 @@ def transcode_video_to_av1(self, video_id: int):
             'resolutions': ['1080p', '720p', '480p'],
             'av1_size': 990000000,
             'h264_size': 2250000000,
-            'savings_percent': 56.0
+            'savings_percent': 56.0,
+            'rendition_stats': [{'resolution': '360p', 'threads': 2, 'wall_seconds': 95.3, 'fps': 120.4}, ...]
         }
     """
     db = SessionLocal()
@@ -92,34 +98,14 @@ def transcode_video_to_av1(self, video_id: int):
         original_path = temp_dir / "original.mp4"
         minio_client = MinIOClient()
 
-        logger.info(f"下载原始视频: {video.source_url}")
-        # 假设source_url是MinIO路径
-        if not video.source_url.startswith("http"):
-            # 验证源路径安全性，防止路径遍历攻击
-            try:
-                safe_source_path = validate_path(video.source_url)
-                shutil.copy(safe_source_path, original_path)
-            except ValueError as e:
-                raise ValueError(f"不安全的源路径: {e}")
-        else:
-            # 从MinIO下载
-            # source_url格式: http://minio-url/bucket/videos/123/original.mp4
-            # 提取对象名称（去掉URL前缀和bucket名称）
-            url_parts = video.source_url.replace(
-                f"{settings.MINIO_PUBLIC_URL}/{minio_client.bucket_name}/", ""
-            )
-            object_name = url_parts
-
-            logger.info(f"从MinIO下载: {object_name}")
-            minio_client.download_file(object_name, str(original_path))
-            logger.info(f"下载完成: {original_path}")
-
-            if not original_path.exists() or original_path.stat().st_size == 0:
-                raise ValueError(f"下载的文件无效: {original_path}")
+        fetch_source_video(video, minio_client, original_path)
 
         # 4. 分析源视频
         logger.info("分析视频元数据...")
-        metadata = AV1Transcoder.get_video_info(original_path)
+        probe = asyncio.run(analyze_media(original_path))
+        metadata = AV1Transcoder.parse_video_info(probe)
+        # 任务重试时同一源文件的输出复用已上传清单
+        resume_key = probe["content_hash"]
         source_height = metadata["height"]
         source_duration = metadata["duration"]
 
@@ -128,41 +114,13 @@ def transcode_video_to_av1(self, video_id: int):
             f"时长={source_duration:.1f}s, 编码={metadata['codec']}"
         )
 
-        # 🆕 4.5 生成缩略图 (如果视频没有poster_url)
-        thumbnail_url = None
-        if not video.poster_url or video.poster_url == "":
-            try:
-                logger.info("生成视频缩略图...")
-                thumbnail_path = temp_dir / "thumbnail.jpg"
-
-                # 从视频第5秒提取 (或10%位置,取较小值)
-                timestamp = min(5.0, source_duration * 0.1)
-
-                AV1Transcoder.extract_thumbnail(
-                    original_path, thumbnail_path, timestamp=timestamp, size="1280x720"
-                )
-
-                # 🆕 上传缩略图到MinIO
-                from app.utils.minio_client import minio_client
-
-                with open(thumbnail_path, "rb") as thumb_file:
-                    thumbnail_url = minio_client.upload_thumbnail(
-                        thumb_file, video_id=video_id, thumbnail_type="poster"
-                    )
-
-                logger.info(f"✅ 缩略图已生成并上传到MinIO: {thumbnail_url}")
-
-            except Exception as e:
-                logger.error(f"生成缩略图失败: {str(e)}")
-                # 缩略图失败不影响转码流程
+        # 🆕 4.5 一次解码生成封面（如果视频没有poster_url）、预览图和拖动预览雪碧图
+        thumbnail_urls = generate_thumbnails(
+            video, minio_client, original_path, temp_dir, source_duration
+        )
 
         # 5. 决定目标分辨率 (不超过源分辨率)
-        all_resolutions = ["1080p", "720p", "480p", "360p"]
-        resolution_heights = {"1080p": 1080, "720p": 720, "480p": 480, "360p": 360}
-
-        target_resolutions = [
-            res for res in all_resolutions if resolution_heights[res] <= source_height
-        ]
+        target_resolutions = select_target_resolutions(source_height)
 
         logger.info(f"源分辨率: {source_height}p")
         logger.info(f"目标分辨率: {target_resolutions}")
@@ -181,86 +139,89 @@ def transcode_video_to_av1(self, video_id: int):
             )
         )
 
-        # 6. 并行转码所有分辨率
+        # 6. 按主机核心预算转码所有分辨率（低分辨率优先）
+        #    每完成一个分辨率就上传并重新发布 master.m3u8，最低分辨率完成即可播放
         hls_urls = {}
-        local_paths = {}
-        completed_count = [0]  # 使用列表以便在闭包中修改
-
-        def transcode_resolution(resolution: str):
-            """转码单个分辨率"""
-            logger.info(f"开始转码 {resolution}...")
+        results = []
+        rendition_stats = []
+        master_path = temp_dir / "master.m3u8"
+        master_object_name = f"videos/{video_id}/av1/master.m3u8"
+        master_url = minio_client.get_file_url(master_object_name)
 
+        def transcode_resolution(resolution: str, threads: int) -> Path:
+            """转码单个分辨率，转码过程中同时上传已完成的分片"""
             output_dir = temp_dir / "av1" / resolution
-            output_dir.mkdir(parents=True, exist_ok=True)
+            log_path = temp_dir / "av1" / f"{resolution}.log"
 
             # 转码为AV1 HLS
-            AV1Transcoder.transcode_to_hls_av1(
-                original_path, output_dir, resolution, segment_time=6
+            process = AV1Transcoder.start_hls_av1(
+                original_path,
+                output_dir,
+                log_path,
+                resolution,
+                segment_time=6,
+                threads=threads,
+            )
+            uploader = HLSUploader(
+                output_dir,
+                hls_object_prefix(video_id, resolution),
+                resume_key=resume_key,
             )
+            try:
+                returncode = asyncio.run(uploader.watch(process))
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+
+            if returncode != 0:
+                error = log_path.read_text(errors="replace")[-2000:]
+                logger.error(f"HLS生成失败 ({resolution}): {error}")
+                raise Exception(f"HLS生成失败 ({resolution}): {error}")
+            return output_dir
+
+        logger.info(f"调度转码 {len(target_resolutions)} 个分辨率...")
+        scheduler = TranscodeScheduler()
+        source_frames = source_duration * metadata.get("fps", 0)
+        for result in scheduler.run(
+            target_resolutions, transcode_resolution, frames=source_frames
+        ):
+            # 7. 确认该分辨率已全部上传（转码期间已边转边传，这里只补传遗漏的文件）
+            hls_urls[result.resolution] = upload_hls_directory(
+                video_id,
+                result.resolution,
+                result.output,
+                format_type="av1",
+                resume_key=resume_key,
+            )
+            results.append((result.resolution, result.output))
+            rendition_stats.append(result.to_dict())
 
-            logger.info(f"完成转码 {resolution}")
+            # 8. 重新生成并上传Master Playlist（包含已完成的全部分辨率）
+            publish_master_playlist(
+                minio_client, video_id, hls_urls, master_path, master_object_name
+            )
 
-            # 🆕 更新进度 (10% - 80% 分配给转码)
-            completed_count[0] += 1
-            progress = 10 + int((completed_count[0] / len(target_resolutions)) * 70)
+            # 🆕 更新数据库: 立即可播放 (10% - 95% 分配给转码和上传)
+            progress = 10 + int((len(results) / len(target_resolutions)) * 85)
+            video.av1_master_url = master_url
+            video.av1_resolutions = dict(hls_urls)
+            video.is_av1_available = True
             video.transcode_progress = progress
             db.commit()
-            logger.info(f"转码进度: {progress}%")
+            logger.info(
+                f"已发布 {result.resolution}，可播放分辨率: {list(hls_urls)}，转码进度: {progress}%"
+            )
 
-            # 🆕 WebSocket通知: 转码进度
+            # 🆕 WebSocket通知: 转码进度（并让视频详情缓存失效）
             asyncio.run(
-                notification_service.notify_transcode_progress(
-                    video_id=video_id,
-                    status="processing",
-                    progress=progress,
-                    message=f"已完成 {resolution} 转码 ({completed_count[0]}/{len(target_resolutions)})",
+                _notify_rendition_published(
+                    video_id,
+                    progress,
+                    f"已发布 {result.resolution} ({len(results)}/{len(target_resolutions)})",
                 )
             )
 
-            return resolution, output_dir
-
-        # 并行转码
-        logger.info(f"并行转码 {len(target_resolutions)} 个分辨率...")
-        with ThreadPoolExecutor(
-            max_workers=min(4, len(target_resolutions))
-        ) as executor:
-            results = list(executor.map(transcode_resolution, target_resolutions))
-
-        # 7. 上传到MinIO
-        logger.info("上传文件到MinIO...")
-        # 🆕 更新进度: 上传阶段
-        video.transcode_progress = 80
-        db.commit()
-
-        for resolution, output_dir in results:
-            minio_url = upload_hls_directory(
-                video_id, resolution, output_dir, format_type="av1"
-            )
-            hls_urls[resolution] = minio_url
-            local_paths[resolution] = output_dir
-
-        # 8. 生成Master Playlist
-        logger.info("生成Master Playlist...")
-        master_content = AV1Transcoder.create_master_playlist(
-            video_id, hls_urls, format_type="av1"
-        )
-
-        # 保存并上传Master Playlist
-        master_path = temp_dir / "master.m3u8"
-        master_path.write_text(master_content)
-
-        # 上传master.m3u8到MinIO
-        master_object_name = f"videos/{video_id}/av1/master.m3u8"
-        minio_client.upload_file_from_path(
-            str(master_path),
-            master_object_name,
-            content_type="application/vnd.apple.mpegurl",
-        )
-        logger.info(f"已上传Master Playlist到MinIO: {master_object_name}")
-
-        # 生成公开访问URL
-        master_url = minio_client.get_file_url(master_object_name)
-
         # 9. 计算文件大小 (统计节省空间)
         av1_total_size = sum(
             sum(f.stat().st_size for f in output_dir.rglob("*") if f.is_file())
@@ -296,15 +257,10 @@ def transcode_video_to_av1(self, video_id: int):
 
         # 10. 更新数据库
         logger.info("更新数据库...")
-        video.av1_master_url = master_url
-        video.av1_resolutions = hls_urls
-        video.is_av1_available = True
         video.av1_file_size = av1_total_size
 
         # 🆕 更新缩略图URL (如果生成了)
-        if thumbnail_url:
-            video.poster_url = thumbnail_url
-            logger.info(f"封面已更新: {thumbnail_url}")
+        apply_thumbnail_urls(video, thumbnail_urls)
 
         # 🆕 更新转码状态为completed
         from datetime import datetime as dt
@@ -357,6 +313,7 @@ def transcode_video_to_av1(self, video_id: int):
             "av1_size": av1_total_size,
             "h264_size": savings["h264_size"],
             "savings_percent": round(savings["savings_percent"], 2),
+            "rendition_stats": rendition_stats,
         }
 
     except Exception as e:
@@ -367,7 +324,8 @@ def transcode_video_to_av1(self, video_id: int):
         try:
             video = db.query(Video).filter(Video.id == video_id).first()
             if video:
-                video.is_av1_available = False
+                # 已发布的分辨率仍然可以播放
+                video.is_av1_available = bool(video.av1_master_url and video.av1_resolutions)
                 video.transcode_status = "failed"
                 video.transcode_error = str(e)[:500]  # 限制错误信息长度
                 db.commit()
@@ -401,49 +359,171 @@ def transcode_video_to_av1(self, video_id: int):
                 logger.error(f"清理临时目录失败: {e}")
 
 
+def fetch_source_video(video: Video, minio_client: MinIOClient, original_path: Path):
+    """
+    将原始视频复制/下载到本地
+
+    Args:
+        video: 视频记录
+        minio_client: MinIO客户端
+        original_path: 本地保存路径
+    """
+    logger.info(f"下载原始视频: {video.source_url}")
+    # 假设source_url是MinIO路径
+    if not video.source_url.startswith("http"):
+        # 验证源路径安全性，防止路径遍历攻击
+        try:
+            safe_source_path = validate_path(video.source_url)
+            shutil.copy(safe_source_path, original_path)
+        except ValueError as e:
+            raise ValueError(f"不安全的源路径: {e}")
+    else:
+        # 从MinIO下载
+        # source_url格式: http://minio-url/bucket/videos/123/original.mp4
+        # 提取对象名称（去掉URL前缀和bucket名称）
+        url_parts = video.source_url.replace(
+            f"{settings.MINIO_PUBLIC_URL}/{minio_client.bucket_name}/", ""
+        )
+        object_name = url_parts
+
+        logger.info(f"从MinIO下载: {object_name}")
+        minio_client.download_file(object_name, str(original_path))
+        logger.info(f"下载完成: {original_path}")
+
+        if not original_path.exists() or original_path.stat().st_size == 0:
+            raise ValueError(f"下载的文件无效: {original_path}")
+
+
+def generate_thumbnails(
+    video: Video,
+    minio_client: MinIOClient,
+    original_path: Path,
+    temp_dir: Path,
+    duration: float,
+) -> Optional[Dict]:
+    """
+    生成并上传封面、预览图和拖动预览雪碧图（失败不影响转码流程）
+
+    Returns:
+        upload_thumbnail_set 的结果（视频已有封面时 poster_url 为None）；
+        生成失败时返回None
+    """
+    try:
+        logger.info("生成视频缩略图...")
+        thumbnails = extract_thumbnail_set(
+            original_path, temp_dir / "thumbnails", duration
+        )
+        urls = upload_thumbnail_set(
+            minio_client, video.id, thumbnails, duration, poster=not video.poster_url
+        )
+        if urls["poster_url"]:
+            logger.info(f"✅ 缩略图已生成并上传到MinIO: {urls['poster_url']}")
+        return urls
+    except Exception as e:
+        logger.error(f"生成缩略图失败: {str(e)}")
+        return None
+
+
+def apply_thumbnail_urls(video: Video, urls: Optional[Dict]):
+    """
+    把 generate_thumbnails 的结果写入视频记录
+
+    sprite_vtt_url 和 preview_urls 随视频详情接口返回，播放器用 VTT 显示拖动预览
+    """
+    if not urls:
+        return
+    if urls["poster_url"]:
+        video.poster_url = urls["poster_url"]
+        logger.info(f"封面已更新: {urls['poster_url']}")
+    video.sprite_vtt_url = urls["sprite_vtt_url"]
+    video.preview_urls = urls["preview_urls"]
+
+
+def select_target_resolutions(source_height: int) -> list:
+    """目标分辨率 (不超过源分辨率)，从高到低"""
+    all_resolutions = ["1080p", "720p", "480p", "360p"]
+    resolution_heights = {"1080p": 1080, "720p": 720, "480p": 480, "360p": 360}
+
+    return [res for res in all_resolutions if resolution_heights[res] <= source_height]
+
+
+async def _notify_rendition_published(video_id: int, progress: int, message: str):
+    """通知转码进度，并让已缓存的视频详情失效以便播放端拿到新的分辨率"""
+    await notification_service.notify_transcode_progress(
+        video_id=video_id,
+        status="processing",
+        progress=progress,
+        message=message,
+    )
+    await Cache.invalidate_tags(f"video:{video_id}")
+
+
+def publish_master_playlist(
+    minio_client: MinIOClient,
+    video_id: int,
+    hls_urls: dict,
+    master_path: Path,
+    master_object_name: str,
+) -> None:
+    """
+    生成并上传Master Playlist
+
+    每完成一个分辨率调用一次，覆盖上一版本
+
+    Args:
+        minio_client: MinIO客户端
+        video_id: 视频ID
+        hls_urls: 已发布的 {分辨率: index.m3u8 URL}
+        master_path: 本地临时文件路径
+        master_object_name: MinIO对象名称
+    """
+    master_content = AV1Transcoder.create_master_playlist(
+        video_id, hls_urls, format_type="av1"
+    )
+    master_path.write_text(master_content)
+    minio_client.upload_file_from_path(
+        str(master_path),
+        master_object_name,
+        content_type="application/vnd.apple.mpegurl",
+    )
+    logger.info(f"已上传Master Playlist到MinIO: {master_object_name} ({len(hls_urls)} 个分辨率)")
+
+
+def hls_object_prefix(video_id: int, resolution: str, format_type: str = "av1") -> str:
+    """分辨率HLS文件在MinIO中的目录"""
+    return f"videos/{video_id}/{format_type}/{resolution}"
+
+
 def upload_hls_directory(
-    video_id: int, resolution: str, hls_dir: Path, format_type: str = "av1"
+    video_id: int,
+    resolution: str,
+    hls_dir: Path,
+    format_type: str = "av1",
+    resume_key: Optional[str] = None,
 ) -> str:
     """
     上传HLS目录到MinIO
 
+    并发上传、失败重试；已上传的文件记录在Redis清单中（按对象前缀 + resume_key），
+    任务重试后重新生成的输出只上传新的或大小变化的文件
+
     Args:
         video_id: 视频ID
         resolution: 分辨率
         hls_dir: HLS文件目录
         format_type: 'av1' or 'h264'
+        resume_key: 输出来源标识（源文件内容哈希或分段作业ID），None表示不续传
 
     Returns:
         index.m3u8的完整URL
     """
-    minio = MinIOClient()
-
-    # 上传所有文件
-    uploaded_count = 0
-    for file_path in hls_dir.glob("*"):
-        if file_path.is_file():
-            object_name = (
-                f"videos/{video_id}/{format_type}/{resolution}/{file_path.name}"
-            )
-
-            # 根据文件类型设置Content-Type
-            if file_path.suffix == ".m3u8":
-                content_type = "application/vnd.apple.mpegurl"
-            elif file_path.suffix == ".ts":
-                content_type = "video/mp2t"
-            else:
-                content_type = "application/octet-stream"
-
-            # 实际上传到MinIO
-            minio.upload_file_from_path(str(file_path), object_name, content_type)
-            uploaded_count += 1
-            logger.info(f"已上传 ({uploaded_count}): {object_name}")
-
+    prefix = hls_object_prefix(video_id, resolution, format_type)
+    uploader = HLSUploader(hls_dir, prefix, resume_key=resume_key)
+    uploaded_count = asyncio.run(uploader.finish())
     logger.info(f"成功上传 {uploaded_count} 个文件到 {format_type}/{resolution}")
 
     # 返回index.m3u8的完整URL
-    index_object_name = f"videos/{video_id}/{format_type}/{resolution}/index.m3u8"
-    return minio.get_file_url(index_object_name)
+    return MinIOClient().get_file_url(f"{prefix}/index.m3u8")
 
 
 @shared_task(name="transcode_video_dual_format")
@@ -451,16 +531,31 @@ def transcode_video_dual_format(video_id: int):
     """
     双格式转码: H.264 + AV1
 
-    先转码H.264 (快速上线),再转码AV1 (节省带宽)
+    先转码H.264 (快速上线),再转码AV1 (节省带宽)；
+    长视频的AV1使用分段并行转码，分布到多个worker
     """
     from app.tasks.transcode import transcode_video_task  # H.264转码任务
+    from app.tasks.transcode_av1_chunked import (
+        transcode_video_to_av1_chunked,
+        use_chunked_mode,
+    )
 
     # 1. H.264转码 (优先,用户可快速观看)
     logger.info(f"开始H.264转码: video_id={video_id}")
     h264_result = transcode_video_task(video_id)
 
     # 2. AV1转码 (后台进行,用户无感知)
-    logger.info(f"开始AV1转码: video_id={video_id}")
-    av1_result = transcode_video_to_av1(video_id)
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        chunked = video is not None and use_chunked_mode(video)
+    finally:
+        db.close()
+
+    logger.info(f"开始AV1转码: video_id={video_id}, 分段并行={chunked}")
+    if chunked:
+        av1_result = transcode_video_to_av1_chunked(video_id)
+    else:
+        av1_result = transcode_video_to_av1(video_id)
 
     return {"video_id": video_id, "h264": h264_result, "av1": av1_result}
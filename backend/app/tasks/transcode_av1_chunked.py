@@ -0,0 +1,460 @@
+"""
+AV1分段并行转码Celery任务（长视频）
+- 源视频在关键帧处切分为GOP对齐的分段，上传到MinIO作业目录
+- 每个 分辨率×分段 是一个独立的子任务，可以分布到多个worker并行编码
+- 全部分段完成后（chord回调）按分辨率拼接为HLS，低分辨率先发布
+- 任一子任务最终失败时标记视频转码失败并清理作业目录
+"""
+
+import asyncio
+import logging
+import shutil
+import time
+import uuid
+from datetime import datetime
+
+from celery import chord, shared_task
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.video import Video
+from app.tasks.transcode_av1 import (
+    _notify_rendition_published,
+    apply_thumbnail_urls,
+    fetch_source_video,
+    generate_thumbnails,
+    publish_master_playlist,
+    select_target_resolutions,
+    upload_hls_directory,
+)
+from app.utils.av1_transcoder import AV1Transcoder, format_size
+from app.utils.chunked_transcode import (
+    AUDIO_NAME,
+    CHUNK_NAME,
+    build_chunk_encode_command,
+    build_concat_hls_command,
+    build_extract_audio_command,
+    plan_chunk_boundaries,
+    run_ffmpeg,
+    split_source,
+    write_concat_list,
+)
+from app.utils.media_probe import analyze_media
+from app.utils.minio_client import MinIOClient, async_minio_client
+from app.utils.path_validator import create_safe_temp_dir, validate_video_id
+from app.utils.transcode_scheduler import RENDITION_ORDER, RENDITION_THREADS, CoreBudget
+from app.utils.websocket_manager import notification_service
+
+logger = logging.getLogger(__name__)
+
+
+def use_chunked_mode(video: Video) -> bool:
+    """视频是否足够长，需要使用分段并行转码"""
+    threshold = settings.TRANSCODE_CHUNKED_MIN_MINUTES
+    return threshold > 0 and (video.duration or 0) >= threshold
+
+
+def job_object_prefix(video_id: int, job_id: str) -> str:
+    """分段转码作业的中间文件在MinIO中的目录"""
+    return f"transcode-jobs/{video_id}/{job_id}"
+
+
+def _ordered(resolutions) -> list:
+    """分辨率从低到高排序"""
+
+    def order(resolution: str) -> int:
+        if resolution in RENDITION_ORDER:
+            return RENDITION_ORDER.index(resolution)
+        return len(RENDITION_ORDER)
+
+    return sorted(resolutions, key=order)
+
+
+async def _upload_files(files: dict):
+    """并发上传 {本地路径: 对象名称}"""
+    await asyncio.gather(
+        *(
+            async_minio_client.upload_file_from_path(
+                str(path), object_name, "video/x-matroska"
+            )
+            for path, object_name in files.items()
+        )
+    )
+
+
+async def _download_files(files: dict):
+    """并发下载 {对象名称: 本地路径}"""
+    await asyncio.gather(
+        *(
+            async_minio_client.download_file(object_name, str(path))
+            for object_name, path in files.items()
+        )
+    )
+
+
+def cleanup_job_objects(job_prefix: str):
+    """删除作业目录下的中间文件"""
+    minio_client = MinIOClient()
+    objects = minio_client.list_files(f"{job_prefix}/")
+    for object_name in objects:
+        minio_client.delete_file(object_name)
+    logger.info(f"已清理分段转码中间文件: {job_prefix} ({len(objects)} 个)")
+
+
+@shared_task(bind=True, name="transcode_video_to_av1_chunked")
+def transcode_video_to_av1_chunked(self, video_id: int):
+    """
+    分段并行转码视频为AV1格式 (多分辨率HLS)
+
+    本任务只负责切分和派发，编码由 encode_av1_chunk 子任务完成，
+    拼接和发布由 finalize_av1_chunked 完成
+
+    Args:
+        video_id: 视频ID
+
+    Returns:
+        {
+            'status': 'dispatched',
+            'video_id': 123,
+            'job_id': '...',
+            'chunks': 30,
+            'resolutions': ['360p', '480p', '720p', '1080p'],
+        }
+    """
+    db = SessionLocal()
+    temp_dir = None
+
+    try:
+        video_id = validate_video_id(video_id)
+
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if not video:
+            raise ValueError(f"Video {video_id} not found")
+
+        logger.info(f"开始AV1分段转码: video_id={video_id}, title={video.title}")
+
+        video.transcode_status = "processing"
+        video.transcode_progress = 0
+        video.transcode_error = None
+        db.commit()
+
+        asyncio.run(
+            notification_service.notify_transcode_progress(
+                video_id=video_id,
+                status="processing",
+                progress=0,
+                message=f"开始转码: {video.title}",
+            )
+        )
+
+        temp_dir = create_safe_temp_dir(prefix=f"av1_chunked_{video_id}_")
+        original_path = temp_dir / "original.mp4"
+        fetch_source_video(video, MinIOClient(), original_path)
+
+        probe = asyncio.run(analyze_media(original_path))
+        metadata = AV1Transcoder.parse_video_info(probe)
+
+        # 缩略图、预览图和雪碧图在派发前生成（源视频只在本任务中下载）
+        apply_thumbnail_urls(
+            video,
+            generate_thumbnails(
+                video, MinIOClient(), original_path, temp_dir, metadata["duration"]
+            ),
+        )
+        target_resolutions = _ordered(select_target_resolutions(metadata["height"]))
+
+        # 在关键帧处切分视频，音轨单独抽取
+        cut_times = plan_chunk_boundaries(
+            probe["keyframes"], metadata["duration"], settings.TRANSCODE_CHUNK_SECONDS
+        )
+        chunks = split_source(original_path, temp_dir / "chunks", cut_times)
+
+        job_id = self.request.id or uuid.uuid4().hex
+        job_prefix = job_object_prefix(video_id, job_id)
+        uploads = {path: f"{job_prefix}/source/{path.name}" for path in chunks}
+        has_audio = metadata.get("has_audio", False)
+        if has_audio:
+            audio_path = temp_dir / AUDIO_NAME
+            run_ffmpeg(build_extract_audio_command(original_path, audio_path), "音轨抽取")
+            uploads[audio_path] = f"{job_prefix}/{AUDIO_NAME}"
+        asyncio.run(_upload_files(uploads))
+
+        video.transcode_progress = 10
+        db.commit()
+
+        asyncio.run(
+            notification_service.notify_transcode_progress(
+                video_id=video_id,
+                status="processing",
+                progress=10,
+                message=f"准备转码 {len(target_resolutions)} 个分辨率，共 {len(chunks)} 个分段",
+            )
+        )
+
+        # 低分辨率的分段先入队，尽早可以播放
+        header = [
+            encode_av1_chunk.s(video_id, job_prefix, index, resolution)
+            for resolution in target_resolutions
+            for index in range(len(chunks))
+        ]
+        callback = finalize_av1_chunked.s(
+            video_id, job_prefix, target_resolutions, len(chunks), has_audio
+        ).on_error(fail_av1_chunked.s(video_id, job_prefix))
+        chord(header)(callback)
+
+        logger.info(
+            f"已派发 {len(header)} 个分段编码任务: video_id={video_id}, "
+            f"{len(chunks)} 个分段 × {len(target_resolutions)} 个分辨率"
+        )
+        return {
+            "status": "dispatched",
+            "video_id": video_id,
+            "job_id": job_id,
+            "chunks": len(chunks),
+            "resolutions": target_resolutions,
+        }
+
+    except Exception as e:
+        logger.error(f"AV1分段转码派发失败: {str(e)}", exc_info=True)
+        db.rollback()
+        _mark_failed(db, video_id, e)
+        raise
+
+    finally:
+        try:
+            db.close()
+        except Exception as e:
+            logger.error(f"关闭数据库连接失败: {e}")
+
+        if temp_dir and temp_dir.exists():
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@shared_task(
+    bind=True,
+    name="encode_av1_chunk",
+    max_retries=2,
+    default_retry_delay=30,
+)
+def encode_av1_chunk(self, video_id: int, job_prefix: str, index: int, resolution: str):
+    """
+    编码单个分段的单个分辨率
+
+    编码前按主机核心预算占用核心，多个worker在同一主机上也不会超额占用CPU
+
+    Returns:
+        {'resolution': '720p', 'index': 3, 'threads': 4, 'wall_seconds': 41.2}
+    """
+    temp_dir = create_safe_temp_dir(
+        prefix=f"av1_chunk_{video_id}_{index}_{resolution}_"
+    )
+    name = CHUNK_NAME.format(index)
+
+    try:
+        source_path = temp_dir / "source.mkv"
+        output_path = temp_dir / name
+        MinIOClient().download_file(f"{job_prefix}/source/{name}", str(source_path))
+
+        budget = CoreBudget()
+        threads = min(RENDITION_THREADS.get(resolution, 2), budget.total_cores)
+        with budget.acquire(threads) as lease:
+            started = time.monotonic()
+            run_ffmpeg(
+                build_chunk_encode_command(
+                    source_path, output_path, resolution, lease.cores
+                ),
+                f"分段编码 ({resolution} #{index})",
+            )
+            wall_seconds = time.monotonic() - started
+
+        MinIOClient().upload_file_from_path(
+            str(output_path), f"{job_prefix}/{resolution}/{name}", "video/x-matroska"
+        )
+        logger.info(
+            f"分段编码完成: video_id={video_id}, {resolution} #{index}, "
+            f"{wall_seconds:.1f}s"
+        )
+        return {
+            "resolution": resolution,
+            "index": index,
+            "threads": threads,
+            "wall_seconds": round(wall_seconds, 2),
+        }
+
+    except Exception as exc:
+        logger.error(f"分段编码失败: video_id={video_id}, {resolution} #{index}: {exc}")
+        raise self.retry(exc=exc)
+
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@shared_task(name="finalize_av1_chunked")
+def finalize_av1_chunked(
+    chunk_results: list,
+    video_id: int,
+    job_prefix: str,
+    resolutions: list,
+    chunk_count: int,
+    has_audio: bool,
+):
+    """
+    拼接已编码的分段并发布HLS（chord回调）
+
+    分辨率从低到高依次拼接、上传并重新发布 master.m3u8
+
+    Args:
+        chunk_results: 各 encode_av1_chunk 的返回值
+        video_id: 视频ID
+        job_prefix: 作业目录
+        resolutions: 目标分辨率
+        chunk_count: 分段数
+        has_audio: 源视频是否有音轨
+    """
+    db = SessionLocal()
+    temp_dir = create_safe_temp_dir(prefix=f"av1_concat_{video_id}_")
+    minio_client = MinIOClient()
+
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if not video:
+            raise ValueError(f"Video {video_id} not found")
+
+        audio_path = None
+        if has_audio:
+            audio_path = temp_dir / AUDIO_NAME
+            minio_client.download_file(f"{job_prefix}/{AUDIO_NAME}", str(audio_path))
+
+        hls_urls = {}
+        av1_total_size = 0
+        master_path = temp_dir / "master.m3u8"
+        master_object_name = f"videos/{video_id}/av1/master.m3u8"
+        master_url = minio_client.get_file_url(master_object_name)
+
+        for resolution in _ordered(resolutions):
+            chunk_dir = temp_dir / "chunks" / resolution
+            chunk_dir.mkdir(parents=True)
+            chunk_paths = [chunk_dir / CHUNK_NAME.format(i) for i in range(chunk_count)]
+            asyncio.run(
+                _download_files(
+                    {
+                        f"{job_prefix}/{resolution}/{path.name}": path
+                        for path in chunk_paths
+                    }
+                )
+            )
+
+            output_dir = temp_dir / "av1" / resolution
+            output_dir.mkdir(parents=True)
+            list_path = write_concat_list(chunk_paths, chunk_dir / "concat.txt")
+            run_ffmpeg(
+                build_concat_hls_command(list_path, output_dir, resolution, audio_path),
+                f"HLS拼接 ({resolution})",
+            )
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+
+            # 同一作业重试时拼接结果相同，复用已上传清单
+            hls_urls[resolution] = upload_hls_directory(
+                video_id,
+                resolution,
+                output_dir,
+                format_type="av1",
+                resume_key=job_prefix,
+            )
+            av1_total_size += sum(
+                f.stat().st_size for f in output_dir.rglob("*") if f.is_file()
+            )
+            publish_master_playlist(
+                minio_client, video_id, hls_urls, master_path, master_object_name
+            )
+
+            progress = 10 + int((len(hls_urls) / len(resolutions)) * 85)
+            video.av1_master_url = master_url
+            video.av1_resolutions = dict(hls_urls)
+            video.is_av1_available = True
+            video.transcode_progress = progress
+            db.commit()
+
+            asyncio.run(
+                _notify_rendition_published(
+                    video_id,
+                    progress,
+                    f"已发布 {resolution} ({len(hls_urls)}/{len(resolutions)})",
+                )
+            )
+
+        video.av1_file_size = av1_total_size
+        video.transcode_status = "completed"
+        video.transcode_progress = 100
+        video.av1_transcode_at = datetime.now()
+        db.commit()
+        logger.info(
+            f"AV1分段转码完成: video_id={video_id}, 大小={format_size(av1_total_size)}"
+        )
+
+        asyncio.run(
+            notification_service.notify_transcode_complete(
+                video_id=video_id,
+                title=video.title,
+                format_type="av1",
+                file_size=av1_total_size,
+            )
+        )
+
+        cleanup_job_objects(job_prefix)
+
+        return {
+            "status": "success",
+            "video_id": video_id,
+            "resolutions": list(hls_urls),
+            "master_url": master_url,
+            "av1_size": av1_total_size,
+            "chunks": chunk_count,
+            "chunk_stats": chunk_results,
+        }
+
+    except Exception as e:
+        # 由 on_error 回调 fail_av1_chunked 统一标记失败，避免重复通知
+        logger.error(f"AV1分段拼接失败: {str(e)}", exc_info=True)
+        db.rollback()
+        raise
+
+    finally:
+        try:
+            db.close()
+        except Exception as e:
+            logger.error(f"关闭数据库连接失败: {e}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@shared_task(name="fail_av1_chunked")
+def fail_av1_chunked(request, exc, traceback, video_id: int, job_prefix: str):
+    """分段编码子任务或拼接最终失败时的回调：标记失败并清理中间文件"""
+    logger.error(f"AV1分段转码失败: video_id={video_id}, task={request.id}: {exc}")
+    db = SessionLocal()
+    try:
+        _mark_failed(db, video_id, exc)
+    finally:
+        db.close()
+    cleanup_job_objects(job_prefix)
+
+
+def _mark_failed(db, video_id: int, error: BaseException):
+    """标记视频转码失败（已发布的分辨率仍然可以播放）"""
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if video:
+            video.is_av1_available = bool(
+                video.av1_master_url and video.av1_resolutions
+            )
+            video.transcode_status = "failed"
+            video.transcode_error = str(error)[:500]
+            db.commit()
+
+            asyncio.run(
+                notification_service.notify_transcode_failed(
+                    video_id=video_id, title=video.title, error=str(error)[:500]
+                )
+            )
+    except Exception:
+        pass
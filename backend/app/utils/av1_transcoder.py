@@ -7,7 +7,9 @@ import json
 import logging
 import subprocess
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from app.utils.thumbnail_sheet import extract_thumbnail_set
 
 logger = logging.getLogger(__name__)
 
@@ -58,7 +60,9 @@ class AV1Transcoder:
                 'height': 1080,
                 'duration': 3600.0,
                 'codec': 'h264',
-                'bitrate': 5000000
+                'bitrate': 5000000,
+                'fps': 29.97,
+                'has_audio': True
             }
         """
         cmd = [
@@ -76,8 +80,19 @@ class AV1Transcoder:
         if result.returncode != 0:
             raise Exception(f"FFprobe failed: {result.stderr}")
 
-        data = json.loads(result.stdout)
+        return AV1Transcoder.parse_video_info(json.loads(result.stdout))
+
+    @staticmethod
+    def parse_video_info(data: Dict) -> Dict:
+        """
+        从 ffprobe 的 format/streams 输出中提取视频元数据
+
+        Args:
+            data: ffprobe JSON 输出，或 media_probe.analyze_media 的分析结果
 
+        Returns:
+            同 get_video_info
+        """
         # 获取视频流
         video_stream = next(
             (s for s in data["streams"] if s["codec_type"] == "video"), None
@@ -92,6 +107,10 @@ class AV1Transcoder:
             "duration": float(data["format"].get("duration", 0)),
             "codec": video_stream.get("codec_name", "unknown"),
             "bitrate": int(data["format"].get("bit_rate", 0)),
+            "fps": parse_frame_rate(
+                video_stream.get("avg_frame_rate") or video_stream.get("r_frame_rate")
+            ),
+            "has_audio": any(s["codec_type"] == "audio" for s in data["streams"]),
         }
 
     @staticmethod
@@ -189,25 +208,26 @@ class AV1Transcoder:
         return output_path
 
     @staticmethod
-    def transcode_to_hls_av1(
+    def build_hls_av1_command(
         input_path: Path,
         output_dir: Path,
         resolution: str = "1080p",
         segment_time: int = 6,
-    ) -> Path:
+        threads: Optional[int] = None,
+    ) -> List[str]:
         """
-        转码为AV1 HLS流 (用于Web播放)
+        生成AV1 HLS转码的ffmpeg命令
 
         Args:
             input_path: 输入视频
             output_dir: 输出目录
             resolution: 分辨率
             segment_time: 分片时长 (秒)
+            threads: SVT-AV1 并行度 (lp)，None表示由编码器按全部核心决定
 
         Returns:
-            index.m3u8路径
+            命令参数列表
         """
-        output_dir.mkdir(parents=True, exist_ok=True)
         profile = AV1Transcoder.PROFILES[resolution]
 
         cmd = [
@@ -226,6 +246,7 @@ class AV1Transcoder:
             "240",
             "-pix_fmt",
             "yuv420p",
+            *(["-svtav1-params", f"lp={threads}"] if threads else []),
             "-vf",
             f"scale={profile['resolution']}:flags=lanczos",
             # 音频编码
@@ -244,9 +265,40 @@ class AV1Transcoder:
             str(output_dir / "segment_%03d.ts"),
             "-hls_segment_type",
             "mpegts",
+            # 分片先写入 .tmp，写完再重命名，上传方看到的 .ts 文件总是完整的
+            "-hls_flags",
+            "temp_file",
             str(output_dir / "index.m3u8"),
         ]
 
+        return cmd
+
+    @staticmethod
+    def transcode_to_hls_av1(
+        input_path: Path,
+        output_dir: Path,
+        resolution: str = "1080p",
+        segment_time: int = 6,
+        threads: Optional[int] = None,
+    ) -> Path:
+        """
+        转码为AV1 HLS流 (用于Web播放)
+
+        Args:
+            input_path: 输入视频
+            output_dir: 输出目录
+            resolution: 分辨率
+            segment_time: 分片时长 (秒)
+            threads: SVT-AV1 并行度 (lp)，None表示由编码器按全部核心决定
+
+        Returns:
+            index.m3u8路径
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        cmd = AV1Transcoder.build_hls_av1_command(
+            input_path, output_dir, resolution, segment_time, threads
+        )
+
         logger.info(f"生成HLS: {output_dir}")
         result = subprocess.run(cmd, capture_output=True, text=True)
 
@@ -256,6 +308,34 @@ class AV1Transcoder:
 
         return output_dir / "index.m3u8"
 
+    @staticmethod
+    def start_hls_av1(
+        input_path: Path,
+        output_dir: Path,
+        log_path: Path,
+        resolution: str = "1080p",
+        segment_time: int = 6,
+        threads: Optional[int] = None,
+    ) -> subprocess.Popen:
+        """
+        在后台启动AV1 HLS转码，调用方可以边转码边上传已完成的分片
+
+        ffmpeg 的输出写入 log_path（不用管道，避免输出过多时阻塞进程）
+
+        Returns:
+            ffmpeg 进程
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        cmd = AV1Transcoder.build_hls_av1_command(
+            input_path, output_dir, resolution, segment_time, threads
+        )
+
+        logger.info(f"生成HLS: {output_dir}")
+        with open(log_path, "wb") as log_file:
+            return subprocess.Popen(
+                cmd, stdout=subprocess.DEVNULL, stderr=log_file
+            )
+
     @staticmethod
     def create_master_playlist(
         video_id: int, resolutions: Dict[str, str], format_type: str = "av1"
@@ -405,47 +485,36 @@ class AV1Transcoder:
 
     @staticmethod
     def extract_multiple_thumbnails(
-        input_path: Path, output_dir: Path, count: int = 5, size: str = "1280x720"
+        input_path: Path,
+        output_dir: Path,
+        count: int = 5,
+        size: str = "1280x720",
+        duration: Optional[float] = None,
     ) -> List[Path]:
         """
         提取多个缩略图 (用于悬停预览/GIF等)
 
+        同时会在 output_dir 中生成封面和雪碧图，见 thumbnail_sheet.extract_thumbnail_set
+
         Args:
             input_path: 输入视频
             output_dir: 输出目录
             count: 提取数量
             size: 缩略图尺寸
+            duration: 视频时长（秒），已分析过时传入可以省去一次 ffprobe
 
         Returns:
             缩略图路径列表
         """
         # 获取视频时长
-        info = AV1Transcoder.get_video_info(input_path)
-        duration = info["duration"]
-
-        if duration < 10:
-            # 视频太短,只提取1张
-            count = 1
-
-        # 均匀分布时间点
-        timestamps = []
-        interval = duration / (count + 1)
-        for i in range(1, count + 1):
-            timestamps.append(interval * i)
-
-        # 提取缩略图
-        thumbnails = []
-        for i, timestamp in enumerate(timestamps):
-            output_path = output_dir / f"thumbnail_{i+1}.jpg"
-            try:
-                thumb = AV1Transcoder.extract_thumbnail(
-                    input_path, output_path, timestamp=timestamp, size=size
-                )
-                thumbnails.append(thumb)
-            except Exception as e:
-                logger.error(f"提取第{i+1}张缩略图失败: {str(e)}")
-
-        return thumbnails
+        if duration is None:
+            duration = AV1Transcoder.get_video_info(input_path)["duration"]
+
+        # 一次解码取出全部预览图，不再逐张 seek
+        thumbnails = extract_thumbnail_set(
+            input_path, output_dir, duration, preview_count=count, poster_size=size
+        )
+        return thumbnails["previews"]
 
 
 def format_size(size_bytes: int) -> str:
@@ -455,3 +524,15 @@ def format_size(size_bytes: int) -> str:
             return f"{size_bytes:.2f} {unit}"
         size_bytes /= 1024.0
     return f"{size_bytes:.2f} PB"
+
+
+def parse_frame_rate(rate: Optional[str]) -> float:
+    """解析ffprobe的帧率 (如 "30000/1001")，无法解析时返回0"""
+    if not rate:
+        return 0.0
+    try:
+        num, _, den = rate.partition("/")
+        value = float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+    return round(value, 3)
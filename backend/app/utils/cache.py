@@ -5,14 +5,30 @@ Redis缓存工具类
 注意：使用JSON序列化而非pickle，避免远程代码执行风险
 """
 
+import asyncio
+import fnmatch
+import hashlib
+import inspect
 import json
-from datetime import datetime
+import math
+import random
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+from enum import Enum
 from functools import wraps
-from typing import Any, Callable
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional, Sequence
 
 import redis.asyncio as redis
+from fastapi import BackgroundTasks, Request
 from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
 from app.config import settings
 
@@ -79,39 +95,284 @@ redis_pool = redis.ConnectionPool(
 )
 
 
+# 每个事件循环独立的连接池（连接只能在创建它的事件循环中使用）
+_loop_pools: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_loop_pools_lock = threading.Lock()
+
+
 async def get_redis() -> redis.Redis:
-    """获取Redis客户端"""
-    return redis.Redis(connection_pool=redis_pool)
+    """
+    获取Redis客户端
 
+    连接绑定在创建它的事件循环上。Celery 任务每次 asyncio.run 都会新建循环，
+    转码线程池中的每个线程也各自运行事件循环，因此每个循环使用独立的连接池
+    （按 redis_pool 的配置创建），循环被回收后连接池随之释放。
+    """
+    loop = asyncio.get_running_loop()
+    with _loop_pools_lock:
+        pool = _loop_pools.get(loop)
+        if pool is None:
+            pool = redis_pool.__class__(
+                max_connections=redis_pool.max_connections,
+                **redis_pool.connection_kwargs,
+            )
+            _loop_pools[loop] = pool
+    return redis.Redis(connection_pool=pool)
 
-class CacheStats:
-    """缓存统计类"""
 
-    @staticmethod
-    async def record_hit():
-        """记录缓存命中"""
+# 允许进入L1缓存的键前缀（热点目录页）
+L1_CACHE_PREFIXES = (
+    "videos_list:",
+    "search_results:",
+    "trending_videos:",
+    "featured_videos:",
+)
+
+# L1缓存失效广播频道
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+# 标签集合键前缀：cache_tag:{tag} 中保存打了该标签的缓存键
+CACHE_TAG_PREFIX = "cache_tag:"
+
+# 当前worker的实例ID，用于忽略自己发出的失效消息
+_INSTANCE_ID = uuid.uuid4().hex
+
+
+class LocalCache:
+    """
+    进程内LRU缓存（L1）
+
+    位于Redis（L2）之前，每个worker独立一份，带容量上限和TTL。
+    存储的是序列化后的JSON字符串，每次命中重新反序列化，
+    避免调用方修改返回对象后污染缓存。
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: int = 30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """获取缓存值，不存在或已过期返回None"""
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None):
+        """设置缓存值，超出容量时淘汰最久未使用的条目"""
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        """删除单个键"""
+        self._data.pop(key, None)
+
+    def delete_pattern(self, pattern: str) -> int:
+        """删除匹配glob模式的键"""
+        keys = [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        """清空缓存"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+local_cache = LocalCache(
+    max_size=settings.CACHE_L1_MAX_SIZE, ttl=settings.CACHE_L1_TTL
+)
+
+# 当前worker的L2（Redis）命中计数，用于计算分层命中率
+_l2_counters = {"hits": 0, "misses": 0}
+
+
+def _use_local_cache(key: str) -> bool:
+    """判断键是否走L1缓存"""
+    return settings.CACHE_L1_ENABLED and key.startswith(L1_CACHE_PREFIXES)
+
+
+async def _publish_invalidation(kind: str, target: Any):
+    """
+    广播L1缓存失效消息
+
+    Args:
+        kind: "key"、"keys" 或 "pattern"
+        target: 缓存键、缓存键列表或键模式
+    """
+    try:
+        client = await get_redis()
+        await client.publish(
+            CACHE_INVALIDATION_CHANNEL,
+            json.dumps({"origin": _INSTANCE_ID, "kind": kind, "target": target}),
+        )
+    except Exception as e:
+        logger.warning(f"Cache invalidation publish error for {target}: {e}")
+
+
+def _handle_invalidation(data: str):
+    """处理其他worker发来的失效消息"""
+    try:
+        message = json.loads(data)
+    except (TypeError, ValueError):
+        return
+
+    if message.get("origin") == _INSTANCE_ID:
+        return
+
+    if message.get("kind") == "pattern":
+        local_cache.delete_pattern(message.get("target", ""))
+    elif message.get("kind") == "keys":
+        for key in message.get("target") or []:
+            local_cache.delete(key)
+    else:
+        local_cache.delete(message.get("target", ""))
+
+
+async def start_cache_invalidation_listener():
+    """
+    订阅L1缓存失效广播（应用启动时作为后台任务运行）
+
+    连接断开期间可能错过失效消息，因此重连前清空L1缓存。
+    """
+    if not settings.CACHE_L1_ENABLED:
+        return
+
+    while True:
+        pubsub = None
         try:
             client = await get_redis()
-            today = datetime.now().strftime("%Y-%m-%d")
-            await client.incr(f"cache_stats:hits:{today}")
-            await client.expire(f"cache_stats:hits:{today}", 86400 * 7)  # 保留7天
+            pubsub = client.pubsub()
+            await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            logger.info("Cache invalidation listener subscribed")
+
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    _handle_invalidation(message["data"])
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"Cache stats record hit error: {e}", exc_info=True)
+            logger.warning(f"Cache invalidation listener error: {e}")
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+        local_cache.clear()
+        await asyncio.sleep(5)
+
+
+class CacheStats:
+    """
+    缓存统计类
+
+    命中/未命中先累加在进程内存中，由后台任务按固定间隔
+    通过一次pipeline批量写入Redis，不在请求路径上产生网络开销。
+    """
+
+    # 待写入Redis的计数：总量 + 按键前缀细分
+    _pending_hits = 0
+    _pending_misses = 0
+    _pending_prefix_hits: dict[str, int] = {}
+    _pending_prefix_misses: dict[str, int] = {}
+
+    @staticmethod
+    def _key_prefix(key: Optional[str]) -> Optional[str]:
+        """提取缓存键前缀，如 videos_list:1:20 -> videos_list"""
+        if not key:
+            return None
+        return key.split(":", 1)[0]
 
     @staticmethod
-    async def record_miss():
-        """记录缓存未命中"""
+    async def record_hit(key: Optional[str] = None):
+        """记录缓存命中（仅内存累加）"""
+        CacheStats._pending_hits += 1
+        prefix = CacheStats._key_prefix(key)
+        if prefix:
+            counts = CacheStats._pending_prefix_hits
+            counts[prefix] = counts.get(prefix, 0) + 1
+
+    @staticmethod
+    async def record_miss(key: Optional[str] = None):
+        """记录缓存未命中（仅内存累加）"""
+        CacheStats._pending_misses += 1
+        prefix = CacheStats._key_prefix(key)
+        if prefix:
+            counts = CacheStats._pending_prefix_misses
+            counts[prefix] = counts.get(prefix, 0) + 1
+
+    @staticmethod
+    async def flush():
+        """将内存中累计的统计一次性写入Redis"""
+        # 先取出并清零，再做网络I/O，避免刷新期间的新计数丢失
+        hits, misses = CacheStats._pending_hits, CacheStats._pending_misses
+        prefix_hits = CacheStats._pending_prefix_hits
+        prefix_misses = CacheStats._pending_prefix_misses
+        if not (hits or misses):
+            return
+
+        CacheStats._pending_hits = 0
+        CacheStats._pending_misses = 0
+        CacheStats._pending_prefix_hits = {}
+        CacheStats._pending_prefix_misses = {}
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        ttl = 86400 * 7  # 保留7天
         try:
             client = await get_redis()
-            today = datetime.now().strftime("%Y-%m-%d")
-            await client.incr(f"cache_stats:misses:{today}")
-            await client.expire(f"cache_stats:misses:{today}", 86400 * 7)  # 保留7天
+            pipe = client.pipeline(transaction=False)
+            if hits:
+                pipe.incrby(f"cache_stats:hits:{today}", hits)
+                pipe.expire(f"cache_stats:hits:{today}", ttl)
+            if misses:
+                pipe.incrby(f"cache_stats:misses:{today}", misses)
+                pipe.expire(f"cache_stats:misses:{today}", ttl)
+            for prefix, count in prefix_hits.items():
+                pipe.hincrby(f"cache_stats:prefix_hits:{today}", prefix, count)
+            for prefix, count in prefix_misses.items():
+                pipe.hincrby(f"cache_stats:prefix_misses:{today}", prefix, count)
+            if prefix_hits:
+                pipe.expire(f"cache_stats:prefix_hits:{today}", ttl)
+            if prefix_misses:
+                pipe.expire(f"cache_stats:prefix_misses:{today}", ttl)
+            await pipe.execute()
         except Exception as e:
-            logger.error(f"Cache stats record miss error: {e}", exc_info=True)
+            # 写入失败时放回内存，下次再试
+            CacheStats._pending_hits += hits
+            CacheStats._pending_misses += misses
+            for prefix, count in prefix_hits.items():
+                counts = CacheStats._pending_prefix_hits
+                counts[prefix] = counts.get(prefix, 0) + count
+            for prefix, count in prefix_misses.items():
+                counts = CacheStats._pending_prefix_misses
+                counts[prefix] = counts.get(prefix, 0) + count
+            logger.error(f"Cache stats flush error: {e}", exc_info=True)
 
     @staticmethod
     async def get_stats(days: int = 7) -> dict:
         """获取缓存统计信息"""
+        await CacheStats.flush()
         try:
             client = await get_redis()
             stats = []
@@ -165,6 +426,154 @@ class CacheStats:
             logger.error(f"Cache stats get error: {e}", exc_info=True)
             return {"stats": [], "summary": {}}
 
+    @staticmethod
+    async def get_prefix_stats(days: int = 1) -> dict:
+        """
+        按缓存键前缀获取命中统计
+
+        Returns:
+            {prefix: {"hits", "misses", "total", "hit_rate"}}，按请求量倒序
+        """
+        await CacheStats.flush()
+        try:
+            client = await get_redis()
+            pipe = client.pipeline(transaction=False)
+            for i in range(days):
+                date_str = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
+                pipe.hgetall(f"cache_stats:prefix_hits:{date_str}")
+                pipe.hgetall(f"cache_stats:prefix_misses:{date_str}")
+            results = await pipe.execute()
+
+            totals: dict[str, dict] = {}
+            for i, counts in enumerate(results):
+                field = "hits" if i % 2 == 0 else "misses"
+                for prefix, count in counts.items():
+                    entry = totals.setdefault(prefix, {"hits": 0, "misses": 0})
+                    entry[field] += int(count)
+
+            for entry in totals.values():
+                entry["total"] = entry["hits"] + entry["misses"]
+                entry["hit_rate"] = round(entry["hits"] / entry["total"] * 100, 2)
+
+            return dict(
+                sorted(totals.items(), key=lambda item: item[1]["total"], reverse=True)
+            )
+        except Exception as e:
+            logger.error(f"Cache prefix stats get error: {e}", exc_info=True)
+            return {}
+
+    @staticmethod
+    def get_tier_stats() -> dict:
+        """
+        获取当前worker的L1/L2分层命中统计
+
+        L1命中率按L1可缓存键的全部查询计算；
+        L2命中率按落到Redis的查询（L1未命中或不走L1）计算。
+        """
+
+        def ratio(hits: int, misses: int) -> float:
+            total = hits + misses
+            return round(hits / total * 100, 2) if total > 0 else 0
+
+        l2_hits = _l2_counters["hits"]
+        l2_misses = _l2_counters["misses"]
+
+        return {
+            "l1": {
+                "enabled": settings.CACHE_L1_ENABLED,
+                "hits": local_cache.hits,
+                "misses": local_cache.misses,
+                "hit_rate": ratio(local_cache.hits, local_cache.misses),
+                "size": len(local_cache),
+                "max_size": local_cache.max_size,
+                "ttl": local_cache.ttl,
+            },
+            "l2": {
+                "hits": l2_hits,
+                "misses": l2_misses,
+                "hit_rate": ratio(l2_hits, l2_misses),
+            },
+        }
+
+
+# 单飞（single-flight）：同一worker内正在计算中的键
+_inflight: dict[str, asyncio.Future] = {}
+
+# 后台刷新任务（保留引用，防止任务被垃圾回收）
+_background_tasks: set[asyncio.Task] = set()
+
+# 带软过期信息的缓存条目中的元数据字段
+_SWR_META_FIELD = "__swr__"
+
+# 仅当锁仍属于自己时才释放，避免误删其他worker续上的锁
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+async def _acquire_compute_lock(key: str, timeout: int) -> Optional[str]:
+    """
+    获取跨worker的重算锁
+
+    Returns:
+        锁令牌；未获取到返回None。Redis不可用时返回空字符串（视为获取成功）
+    """
+    token = uuid.uuid4().hex
+    try:
+        client = await get_redis()
+        acquired = await client.set(f"lock:{key}", token, nx=True, ex=timeout)
+        return token if acquired else None
+    except Exception as e:
+        logger.warning(f"Cache lock acquire error for key {key}: {e}")
+        return ""
+
+
+async def _release_compute_lock(key: str, token: str):
+    """释放跨worker的重算锁"""
+    if not token:
+        return
+    try:
+        client = await get_redis()
+        await client.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+    except Exception as e:
+        logger.warning(f"Cache lock release error for key {key}: {e}")
+
+
+def _register_inflight(key: str) -> asyncio.Future:
+    """登记正在计算的键，返回供其他调用方等待的Future"""
+    future = asyncio.get_running_loop().create_future()
+    # 没有其他等待者时也要消费异常，避免 "exception was never retrieved"
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _inflight[key] = future
+    return future
+
+
+async def _timed(loader: Callable[[], Awaitable[Any]]) -> tuple[Any, float]:
+    """执行loader并返回 (结果, 耗时秒数)"""
+    start = time.monotonic()
+    result = await loader()
+    return result, time.monotonic() - start
+
+
+def _should_refresh(meta: dict, beta: float) -> bool:
+    """
+    判断是否需要刷新软过期条目（XFetch概率提前过期）
+
+    now - compute_time * beta * ln(rand) >= soft_expires_at 时刷新。
+    重算越慢、离软过期越近，越可能提前刷新；软过期之后必定刷新。
+    """
+    soft_expires_at = meta.get("soft_expires_at", 0)
+    compute_time = meta.get("compute_time", 0) or 0
+    now = time.time()
+    if now >= soft_expires_at:
+        return True
+    if beta <= 0 or compute_time <= 0:
+        return False
+    return now - compute_time * beta * math.log(1.0 - random.random()) >= soft_expires_at
+
 
 class Cache:
     """缓存管理类"""
@@ -174,6 +583,9 @@ class Cache:
         """
         从缓存获取数据
 
+        带软过期信息的条目（见 set 的 stale_ttl）在软过期后、
+        硬过期前仍会返回旧值。
+
         Args:
             key: 缓存键
             default: 默认值
@@ -181,23 +593,122 @@ class Cache:
         Returns:
             缓存的数据或默认值
         """
+        found, value, _ = await Cache._get_entry(key)
+        return value if found else default
+
+    @staticmethod
+    async def _get_entry(key: str) -> tuple[bool, Any, Optional[dict]]:
+        """
+        读取缓存条目
+
+        Returns:
+            (是否命中, 缓存值, 软过期元数据)；普通条目的元数据为None
+        """
         try:
-            client = await get_redis()
-            value = await client.get(key)
-            if value is None:
-                # 记录缓存未命中
-                await CacheStats.record_miss()
-                return default
-            # 记录缓存命中
-            await CacheStats.record_hit()
+            use_local = _use_local_cache(key)
+            value = local_cache.get(key) if use_local else None
+            if value is not None:
+                await CacheStats.record_hit(key)
+            else:
+                client = await get_redis()
+                value = await client.get(key)
+                if value is None:
+                    # 记录缓存未命中
+                    _l2_counters["misses"] += 1
+                    await CacheStats.record_miss(key)
+                    return False, None, None
+                # 记录缓存命中
+                _l2_counters["hits"] += 1
+                await CacheStats.record_hit(key)
+                if use_local:
+                    local_cache.set(key, value)
+
             # 使用JSON反序列化
-            return json_deserializer(value)
+            data = json_deserializer(value)
+            if isinstance(data, dict) and _SWR_META_FIELD in data:
+                return True, data.get("value"), data[_SWR_META_FIELD]
+            return True, data, None
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}", exc_info=True)
-            return default
+            return False, None, None
+
+    @staticmethod
+    async def get_many(keys: Sequence[str]) -> dict[str, Any]:
+        """
+        批量获取缓存（一次MGET，不经过进程内L1缓存）
+
+        Args:
+            keys: 缓存键列表
+
+        Returns:
+            {缓存键: 缓存值}，只包含命中的键
+        """
+        if not keys:
+            return {}
+        found: dict[str, Any] = {}
+        try:
+            client = await get_redis()
+            values = await client.mget(keys)
+            for key, value in zip(keys, values):
+                if value is None:
+                    _l2_counters["misses"] += 1
+                    await CacheStats.record_miss(key)
+                    continue
+                _l2_counters["hits"] += 1
+                await CacheStats.record_hit(key)
+                data = json_deserializer(value)
+                if isinstance(data, dict) and _SWR_META_FIELD in data:
+                    data = data.get("value")
+                found[key] = data
+        except Exception as e:
+            logger.error(f"Cache get_many error: {e}", exc_info=True)
+        return found
 
     @staticmethod
-    async def set(key: str, value: Any, ttl: int = 3600) -> bool:
+    async def set_many(
+        items: dict[str, Any],
+        ttl: int = 3600,
+        tags: Optional[dict[str, Sequence[str]]] = None,
+    ) -> bool:
+        """
+        批量设置缓存（一次pipeline往返）
+
+        Args:
+            items: {缓存键: 缓存值}
+            ttl: 过期时间（秒）
+            tags: {缓存键: 该键的标签}
+
+        Returns:
+            是否成功
+        """
+        if not items:
+            return True
+        tags = tags or {}
+        try:
+            client = await get_redis()
+            pipe = client.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.setex(key, ttl, json_serializer(value))
+                for tag in tags.get(key, ()):
+                    tag_key = f"{CACHE_TAG_PREFIX}{tag}"
+                    pipe.sadd(tag_key, key)
+                    pipe.expire(tag_key, ttl, nx=True)
+                    pipe.expire(tag_key, ttl, gt=True)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache set_many error: {e}", exc_info=True)
+            return False
+
+    @staticmethod
+    async def set(
+        key: str,
+        value: Any,
+        ttl: int = 3600,
+        stale_ttl: int = 0,
+        compute_time: float = 0.0,
+        tags: Sequence[str] = (),
+    ) -> bool:
         """
         设置缓存
 
@@ -205,15 +716,44 @@ class Cache:
             key: 缓存键
             value: 缓存值
             ttl: 过期时间（秒），默认1小时
+            stale_ttl: 软过期后仍可返回旧值的时间（秒）。大于0时条目会
+                记录软过期时间戳，Redis中的实际过期时间为 ttl + stale_ttl
+            compute_time: 重新计算该值的耗时（秒），用于提前重算（XFetch）
+            tags: 标签，如 "video:1"、"list:videos"，可通过 invalidate_tags 批量失效
 
         Returns:
             是否成功
         """
         try:
             client = await get_redis()
+            if stale_ttl > 0:
+                value = {
+                    _SWR_META_FIELD: {
+                        "soft_expires_at": time.time() + ttl,
+                        "compute_time": compute_time,
+                    },
+                    "value": value,
+                }
+                ttl += stale_ttl
             # 使用JSON序列化，安全且高效
             serialized = json_serializer(value)
-            await client.setex(key, ttl, serialized)
+            if tags:
+                # 写入条目和登记标签在同一次往返中完成；
+                # 标签集合的过期时间只延长不缩短，保证不早于其中的条目
+                pipe = client.pipeline(transaction=False)
+                pipe.setex(key, ttl, serialized)
+                for tag in tags:
+                    tag_key = f"{CACHE_TAG_PREFIX}{tag}"
+                    pipe.sadd(tag_key, key)
+                    pipe.expire(tag_key, ttl, nx=True)
+                    pipe.expire(tag_key, ttl, gt=True)
+                await pipe.execute()
+            else:
+                await client.setex(key, ttl, serialized)
+            if _use_local_cache(key):
+                local_cache.set(key, serialized, ttl)
+                # 通知其他worker丢弃旧的L1副本
+                await _publish_invalidation("key", key)
             return True
         except Exception as e:
             logger.error(f"Cache set error for key {key}: {e}", exc_info=True)
@@ -233,6 +773,9 @@ class Cache:
         try:
             client = await get_redis()
             await client.delete(key)
+            if _use_local_cache(key):
+                local_cache.delete(key)
+                await _publish_invalidation("key", key)
             return True
         except Exception as e:
             logger.error(f"Cache delete error for key {key}: {e}", exc_info=True)
@@ -250,6 +793,10 @@ class Cache:
             删除的键数量
         """
         try:
+            if settings.CACHE_L1_ENABLED:
+                local_cache.delete_pattern(pattern)
+                await _publish_invalidation("pattern", pattern)
+
             client = await get_redis()
             keys = []
             async for key in client.scan_iter(match=pattern):
@@ -261,6 +808,200 @@ class Cache:
             logger.error(f"Cache delete pattern error for {pattern}: {e}", exc_info=True)
             return 0
 
+    @staticmethod
+    async def invalidate_tags(*tags: str) -> int:
+        """
+        按标签清除缓存
+
+        原子地取出并删除标签集合，再批量删除其中的键，
+        代价只与标签下的键数量有关，不扫描整个键空间。
+
+        Args:
+            tags: 标签名
+
+        Returns:
+            删除的键数量
+        """
+        if not tags:
+            return 0
+        try:
+            client = await get_redis()
+            pipe = client.pipeline(transaction=True)
+            for tag in tags:
+                pipe.smembers(f"{CACHE_TAG_PREFIX}{tag}")
+                pipe.delete(f"{CACHE_TAG_PREFIX}{tag}")
+            results = await pipe.execute()
+
+            keys = set()
+            for members in results[::2]:
+                keys.update(members)
+            if not keys:
+                return 0
+
+            keys = list(keys)
+            pipe = client.pipeline(transaction=False)
+            for i in range(0, len(keys), 500):
+                pipe.unlink(*keys[i : i + 500])
+            deleted = sum(await pipe.execute())
+
+            local_keys = [key for key in keys if _use_local_cache(key)]
+            if local_keys:
+                for key in local_keys:
+                    local_cache.delete(key)
+                await _publish_invalidation("keys", local_keys)
+            return deleted
+        except Exception as e:
+            logger.error(f"Cache invalidate tags error for {tags}: {e}", exc_info=True)
+            return 0
+
+    @staticmethod
+    async def get_or_set(
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int = 3600,
+        lock_timeout: int = 10,
+        stale_ttl: int = 0,
+        beta: float = 1.0,
+        tags: Sequence[str] = (),
+    ) -> Any:
+        """
+        读取缓存，未命中时只让一个调用方重算（请求合并）
+
+        同一worker内的并发调用共享同一个asyncio Future；
+        跨worker通过Redis锁协调，未抢到锁的一方轮询等待缓存写入，
+        等待超过lock_timeout后自行重算兜底。
+
+        stale_ttl大于0时启用stale-while-revalidate：条目软过期后直接返回旧值，
+        并在后台刷新；软过期前按XFetch算法以一定概率提前刷新，
+        避免大量键在同一时刻过期。此时loader会在请求结束后被调用，
+        不能依赖请求级资源（如依赖注入的数据库会话）。
+
+        Args:
+            key: 缓存键
+            loader: 无参异步函数，返回要缓存的数据（None不缓存）
+            ttl: 过期时间（秒），启用stale_ttl时为软过期时间
+            lock_timeout: 重算锁的超时时间（秒）
+            stale_ttl: 软过期后仍可返回旧值的时间（秒），0表示不启用
+            beta: XFetch提前刷新系数，越大越早刷新，0表示只在软过期后刷新
+            tags: 写入缓存时登记的标签
+
+        Returns:
+            缓存的数据或loader的返回值
+
+        Example:
+            async def load():
+                async with AsyncSessionLocal() as db:
+                    return await query_videos(db)
+
+            return await Cache.get_or_set(
+                "videos_list:1", load, ttl=300, stale_ttl=120
+            )
+        """
+        found, cached, meta = await Cache._get_entry(key)
+        if found and cached is not None:
+            if meta is not None and _should_refresh(meta, beta):
+                Cache._schedule_refresh(
+                    key, loader, ttl, lock_timeout, stale_ttl, tags
+                )
+            return cached
+
+        inflight = _inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = _register_inflight(key)
+        try:
+            result = await Cache._load_with_lock(
+                key, loader, ttl, lock_timeout, stale_ttl, tags
+            )
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            _inflight.pop(key, None)
+
+    @staticmethod
+    def _schedule_refresh(
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        lock_timeout: int,
+        stale_ttl: int,
+        tags: Sequence[str] = (),
+    ):
+        """在后台刷新缓存条目，同一键同时只有一个刷新任务"""
+        if key in _inflight:
+            return
+
+        future = _register_inflight(key)
+
+        async def refresh():
+            try:
+                token = await _acquire_compute_lock(key, lock_timeout)
+                if token is None:
+                    # 其他worker正在刷新
+                    future.set_result(None)
+                    return
+                try:
+                    result, elapsed = await _timed(loader)
+                    if result is not None:
+                        await Cache.set(
+                            key, result, ttl, stale_ttl, elapsed, tags
+                        )
+                    future.set_result(result)
+                finally:
+                    await _release_compute_lock(key, token)
+            except Exception as e:
+                logger.error(f"Cache background refresh error for key {key}: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                _inflight.pop(key, None)
+
+        task = asyncio.create_task(refresh())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    @staticmethod
+    async def _load_with_lock(
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        lock_timeout: int,
+        stale_ttl: int = 0,
+        tags: Sequence[str] = (),
+    ) -> Any:
+        """持有跨worker锁时重算，否则等待持锁方写入缓存"""
+        token = await _acquire_compute_lock(key, lock_timeout)
+        if token is None:
+            # 直接轮询Redis，不计入命中统计
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                try:
+                    client = await get_redis()
+                    value = await client.get(key)
+                    if value is not None:
+                        data = json_deserializer(value)
+                        if isinstance(data, dict) and _SWR_META_FIELD in data:
+                            return data.get("value")
+                        return data
+                except Exception as e:
+                    logger.warning(f"Cache lock wait error for key {key}: {e}")
+                    break
+            logger.warning(f"Cache lock wait gave up for key {key}, recomputing")
+
+        try:
+            result, elapsed = await _timed(loader)
+            if result is not None:
+                await Cache.set(key, result, ttl, stale_ttl, elapsed, tags)
+            return result
+        finally:
+            if token:
+                await _release_compute_lock(key, token)
+
     @staticmethod
     async def exists(key: str) -> bool:
         """
@@ -280,57 +1021,266 @@ class Cache:
             return False
 
 
-def cache_result(key_prefix: str, ttl: int = 3600):
+async def start_cache_stats_flusher():
+    """定期将缓存统计批量写入Redis（应用启动时作为后台任务运行）"""
+    while True:
+        await asyncio.sleep(settings.CACHE_STATS_FLUSH_INTERVAL)
+        await CacheStats.flush()
+
+
+# 依赖注入的对象（数据库会话、请求等）每次调用都不同，不参与缓存键
+_EXCLUDED_ARG_TYPES = (AsyncSession, Session, Request, BackgroundTasks)
+
+# 已注册的缓存函数：key_prefix -> 元信息与命中计数
+_cached_functions: dict[str, dict] = {}
+
+
+def _key_default(o: Any) -> Any:
+    """生成缓存键时的确定性序列化（不依赖对象内存地址）"""
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return str(o)
+    if isinstance(o, Enum):
+        return o.value
+    if isinstance(o, (set, frozenset)):
+        return sorted(o, key=repr)
+    if hasattr(o, "model_dump"):
+        return o.model_dump(mode="json")
+    return str(o)
+
+
+def make_cache_key(
+    key_prefix: str, func: Callable, args: tuple, kwargs: dict, exclude: tuple = ()
+) -> str:
+    """
+    根据函数参数生成确定性的缓存键
+
+    参数先按函数签名绑定为 {参数名: 值}，排除依赖注入的对象和exclude中的参数，
+    再用排序后的JSON计算SHA256摘要。与内置hash()不同，摘要在不同进程间一致，
+    所有worker共享同一份缓存。
+
+    Args:
+        key_prefix: 缓存键前缀
+        func: 被缓存的函数
+        args: 位置参数
+        kwargs: 关键字参数
+        exclude: 不参与缓存键的参数名
+
+    Returns:
+        缓存键；没有有效参数时为key_prefix本身
+    """
+    try:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+    except (TypeError, ValueError):
+        params = {"args": list(args), **kwargs}
+
+    params = {
+        name: value
+        for name, value in params.items()
+        if name not in exclude
+        and name not in ("self", "cls")
+        and not isinstance(value, _EXCLUDED_ARG_TYPES)
+    }
+    if not params:
+        return key_prefix
+
+    payload = json.dumps(
+        params, sort_keys=True, separators=(",", ":"), default=_key_default
+    )
+    digest = hashlib.sha256(payload.encode()).hexdigest()[:32]
+    return f"{key_prefix}:{digest}"
+
+
+async def invalidate_cache_tags(*tags: str) -> int:
+    """按标签清除缓存，见 Cache.invalidate_tags"""
+    return await Cache.invalidate_tags(*tags)
+
+
+def _function_tag(key_prefix: str) -> str:
+    """缓存函数自身的隐式标签"""
+    return f"fn:{key_prefix}"
+
+
+def cache_result(
+    key_prefix: str,
+    ttl: int = 3600,
+    stale_ttl: int = 0,
+    tags: tuple[str, ...] = (),
+    exclude: tuple[str, ...] = (),
+):
     """
     装饰器：缓存函数结果
 
+    缓存键由函数参数的SHA256摘要生成，数据库会话、请求等依赖注入对象不参与缓存键。
+    被装饰的函数会登记到注册表中，记录命中/未命中次数，
+    并可通过 invalidate_cached(key_prefix) 或 invalidate_cache_tags(tag) 清除。
+
     Args:
         key_prefix: 缓存键前缀
         ttl: 过期时间（秒）
+        stale_ttl: 软过期后仍返回旧值并后台刷新的时间（秒），
+            大于0时被装饰函数的参数不能是请求级资源
+        tags: 缓存条目的标签，用于按业务维度批量失效
+        exclude: 不参与缓存键的参数名
 
     Example:
-        @cache_result("categories:all", ttl=1800)
-        async def get_all_categories():
+        @cache_result("categories:all", ttl=1800, tags=("categories",))
+        async def get_all_categories(db: AsyncSession):
             # 数据库查询
             return categories
+
+        await invalidate_cache_tags("categories")
     """
 
     def decorator(func: Callable):
+        entry = _cached_functions.setdefault(
+            key_prefix,
+            {"name": f"{func.__module__}.{func.__qualname__}", "hits": 0, "misses": 0},
+        )
+        entry.update(ttl=ttl, stale_ttl=stale_ttl, tags=list(tags))
+        all_tags = (_function_tag(key_prefix), *tags)
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
             # 生成缓存键（包含函数参数）
-            cache_key = f"{key_prefix}"
-            if args or kwargs:
-                # 将参数序列化为字符串作为键的一部分
-                args_str = json.dumps(
-                    {"args": args, "kwargs": kwargs}, sort_keys=True, default=str
-                )
-                cache_key = f"{key_prefix}:{hash(args_str)}"
-
-            # 尝试从缓存获取
-            cached = await Cache.get(cache_key)
-            if cached is not None:
-                return cached
+            cache_key = make_cache_key(key_prefix, func, args, kwargs, exclude)
+            computed = False
 
-            # 执行函数获取结果
-            result = await func(*args, **kwargs)
-
-            # 缓存结果
-            if result is not None:
-                await Cache.set(cache_key, result, ttl)
+            async def loader():
+                nonlocal computed
+                computed = True
+                return await func(*args, **kwargs)
 
+            # 读取缓存，未命中时合并并发重算
+            result = await Cache.get_or_set(
+                cache_key, loader, ttl, stale_ttl=stale_ttl, tags=all_tags
+            )
+            entry["misses" if computed else "hits"] += 1
             return result
 
+        wrapper.cache_key_prefix = key_prefix
         return wrapper
 
     return decorator
 
 
+async def invalidate_cached(target: Any) -> int:
+    """
+    清除某个缓存函数的全部结果
+
+    Args:
+        target: 被 cache_result 装饰的函数或其 key_prefix
+
+    Returns:
+        删除的键数量
+    """
+    key_prefix = getattr(target, "cache_key_prefix", target)
+    return await invalidate_cache_tags(_function_tag(key_prefix))
+
+
+def get_cached_function_stats() -> list[dict]:
+    """获取当前worker中各缓存函数的命中统计"""
+    stats = []
+    for key_prefix, entry in _cached_functions.items():
+        total = entry["hits"] + entry["misses"]
+        stats.append(
+            {
+                "key_prefix": key_prefix,
+                **entry,
+                "total": total,
+                "hit_rate": round(entry["hits"] / total * 100, 2) if total > 0 else 0,
+            }
+        )
+    return sorted(stats, key=lambda item: item["total"], reverse=True)
+
+
 async def clear_cache_by_prefix(prefix: str):
     """
     清除指定前缀的所有缓存
 
+    已注册的缓存函数按标签集合清除，其余前缀回退到SCAN匹配删除。
+
     Args:
         prefix: 缓存键前缀
     """
+    if prefix in _cached_functions:
+        await invalidate_cached(prefix)
+        return
     await Cache.delete_pattern(f"{prefix}:*")
+
+
+# ========== 事务提交后失效 ==========
+
+# 已注册的提交后失效：名称 -> (收集函数, 失效函数)
+_commit_invalidations: dict[
+    str,
+    tuple[Callable[[Session], Iterable[Hashable]], Callable[[set], Awaitable[Any]]],
+] = {}
+
+# 会话 info 中待失效项的键前缀
+_COMMIT_PENDING_PREFIX = "commit_invalidation:"
+
+
+def register_commit_invalidation(
+    name: str,
+    collect: Callable[[Session], Iterable[Hashable]],
+    invalidate: Callable[[set], Awaitable[Any]],
+):
+    """
+    注册在事务提交后执行的缓存失效
+
+    每次flush后用 collect 收集待失效项（如缓存键、标签）；提交后对本事务
+    收集到的全部项调用一次 invalidate，回滚时丢弃。有事件循环时在后台执行，
+    同步上下文（如Celery任务）中直接运行。
+
+    Args:
+        name: 名称，同一名称重复注册时覆盖
+        collect: 从flush后的会话（new/dirty/deleted）中收集待失效项，没有时返回空
+        invalidate: 接收待失效项集合的异步函数
+    """
+    _commit_invalidations[name] = (collect, invalidate)
+
+
+def mark_commit_invalidation(session: Session, name: str, *items: Hashable):
+    """
+    手动登记待失效项（用于ORM事件捕获不到的批量UPDATE/DELETE）
+
+    Args:
+        session: 同步会话（AsyncSession 传 db.sync_session）
+        name: register_commit_invalidation 注册的名称
+        items: 待失效项
+    """
+    session.info.setdefault(f"{_COMMIT_PENDING_PREFIX}{name}", set()).update(items)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_commit_invalidations(session: Session, flush_context):
+    for name, (collect, _) in _commit_invalidations.items():
+        items = collect(session)
+        if items:
+            mark_commit_invalidation(session, name, *items)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_commit_invalidations(session: Session):
+    for name, (_, invalidate) in _commit_invalidations.items():
+        items = session.info.pop(f"{_COMMIT_PENDING_PREFIX}{name}", None)
+        if not items:
+            continue
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(invalidate(items))
+            continue
+        task = loop.create_task(invalidate(items))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_commit_invalidations(session: Session):
+    for name in _commit_invalidations:
+        session.info.pop(f"{_COMMIT_PENDING_PREFIX}{name}", None)
@@ -89,7 +89,8 @@ class CacheWarmer:
                 }
 
                 cache_key = f"trending_videos:page_{page}:size_{page_size}"
-                await Cache.set(cache_key, response, ttl=600)
+                # 与接口写入的条目一样带 list:videos 标签，视频变更时一并失效
+                await Cache.set(cache_key, response, ttl=600, tags=["list:videos"])
                 logger.info(f"Cached trending videos page {page}")
 
     @staticmethod
@@ -124,7 +125,7 @@ class CacheWarmer:
                 }
 
                 cache_key = f"featured_videos:page_{page}:size_{page_size}"
-                await Cache.set(cache_key, response, ttl=900)
+                await Cache.set(cache_key, response, ttl=900, tags=["list:videos"])
                 logger.info(f"Cached featured videos page {page}")
 
     @staticmethod
@@ -159,7 +160,7 @@ class CacheWarmer:
                 }
 
                 cache_key = f"recommended_videos:page_{page}:size_{page_size}"
-                await Cache.set(cache_key, response, ttl=900)
+                await Cache.set(cache_key, response, ttl=900, tags=["list:videos"])
                 logger.info(f"Cached recommended videos page {page}")
 
     @staticmethod
@@ -0,0 +1,239 @@
+"""
+分段并行转码 (长视频)
+- 在关键帧处把源视频切成按GOP对齐的分段（流复制，不重新编码）
+- 各分段独立编码为AV1，可以分布到多个worker并行执行
+- 编码完成后用 concat 分离器按顺序拼接，再与单独抽取的音轨一起封装为HLS
+
+时间戳：切分时 -reset_timestamps 1 让每个分段从0开始，
+concat 分离器按前一个分段的时长累加偏移，拼接后的时间轴与源视频一致。
+音频不切分，整条音轨在拼接时一次性编码，分段边界处不会有爆音或缺口。
+"""
+
+import logging
+import subprocess
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from app.utils.av1_transcoder import AV1Transcoder
+
+logger = logging.getLogger(__name__)
+
+CHUNK_NAME = "chunk_{:04d}.mkv"
+AUDIO_NAME = "audio.mka"
+
+# 切分点写入命令前减去的余量（秒），避免浮点误差让切分落到下一个关键帧
+_CUT_EPSILON = 0.001
+
+
+def run_ffmpeg(cmd: List[str], description: str) -> None:
+    """执行ffmpeg/ffprobe命令，失败时抛出异常（附带错误输出末尾）"""
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = result.stderr[-2000:]
+        logger.error(f"{description}失败: {error}")
+        raise Exception(f"{description}失败: {error}")
+
+
+def plan_chunk_boundaries(
+    keyframes: Sequence[float], duration: float, target_seconds: float
+) -> List[float]:
+    """
+    选择切分点
+
+    从上一个切分点起，取第一个距离不少于 target_seconds 的关键帧作为下一个切分点；
+    剩余部分不足半个目标时长时并入最后一个分段，避免产生过短的尾段。
+
+    Args:
+        keyframes: 升序的关键帧时间（秒）
+        duration: 视频总时长（秒）
+        target_seconds: 目标分段时长（秒）
+
+    Returns:
+        切分点（不含0），分段数 = len(切分点) + 1
+    """
+    cuts: List[float] = []
+    last = 0.0
+    for keyframe in keyframes:
+        if keyframe - last < target_seconds:
+            continue
+        if duration - keyframe < target_seconds / 2:
+            break
+        cuts.append(keyframe)
+        last = keyframe
+    return cuts
+
+
+def build_split_command(
+    input_path: Path, output_dir: Path, cut_times: Sequence[float]
+) -> List[str]:
+    """
+    生成按切分点拆分视频流的ffmpeg命令（流复制，仅视频）
+
+    Returns:
+        命令参数列表，输出为 output_dir/chunk_0000.mkv ...
+    """
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-i",
+        str(input_path),
+        "-map",
+        "0:v:0",
+        "-c",
+        "copy",
+        "-f",
+        "segment",
+        "-reset_timestamps",
+        "1",
+    ]
+    if cut_times:
+        cmd.extend(
+            [
+                "-segment_times",
+                ",".join(f"{max(t - _CUT_EPSILON, 0):.6f}" for t in cut_times),
+            ]
+        )
+    else:
+        # 不切分时分段时长设为无穷大，只输出一个分段
+        cmd.extend(["-segment_time", "1e9"])
+    cmd.append(str(output_dir / "chunk_%04d.mkv"))
+    return cmd
+
+
+def split_source(
+    input_path: Path, output_dir: Path, cut_times: Sequence[float]
+) -> List[Path]:
+    """
+    在关键帧处切分源视频
+
+    Returns:
+        按顺序排列的分段文件
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    run_ffmpeg(build_split_command(input_path, output_dir, cut_times), "视频切分")
+    chunks = sorted(output_dir.glob("chunk_*.mkv"))
+    logger.info(f"视频已切分为 {len(chunks)} 个分段")
+    return chunks
+
+
+def build_extract_audio_command(input_path: Path, output_path: Path) -> List[str]:
+    """生成抽取第一条音轨的ffmpeg命令（流复制）"""
+    return [
+        "ffmpeg",
+        "-y",
+        "-i",
+        str(input_path),
+        "-map",
+        "0:a:0",
+        "-vn",
+        "-c",
+        "copy",
+        str(output_path),
+    ]
+
+
+def build_chunk_encode_command(
+    chunk_path: Path,
+    output_path: Path,
+    resolution: str,
+    threads: Optional[int] = None,
+) -> List[str]:
+    """
+    生成单个分段的AV1编码命令（仅视频）
+
+    编码参数与整段转码 (AV1Transcoder.build_hls_av1_command) 一致
+
+    Args:
+        chunk_path: 分段文件
+        output_path: 输出文件 (.mkv)
+        resolution: 分辨率
+        threads: SVT-AV1 并行度 (lp)
+
+    Returns:
+        命令参数列表
+    """
+    profile = AV1Transcoder.PROFILES[resolution]
+    return [
+        "ffmpeg",
+        "-y",
+        "-i",
+        str(chunk_path),
+        "-an",
+        "-c:v",
+        "libsvtav1",
+        "-preset",
+        str(profile["preset"]),
+        "-crf",
+        str(profile["crf"]),
+        "-g",
+        "240",
+        "-pix_fmt",
+        "yuv420p",
+        *(["-svtav1-params", f"lp={threads}"] if threads else []),
+        "-vf",
+        f"scale={profile['resolution']}:flags=lanczos",
+        "-f",
+        "matroska",
+        str(output_path),
+    ]
+
+
+def write_concat_list(chunk_paths: Sequence[Path], list_path: Path) -> Path:
+    """写入 concat 分离器的文件列表"""
+    lines = []
+    for path in chunk_paths:
+        escaped = str(Path(path).resolve()).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+    list_path.write_text("\n".join(lines) + "\n")
+    return list_path
+
+
+def build_concat_hls_command(
+    list_path: Path,
+    output_dir: Path,
+    resolution: str,
+    audio_path: Optional[Path] = None,
+    segment_time: int = 6,
+) -> List[str]:
+    """
+    生成拼接已编码分段并封装为HLS的ffmpeg命令
+
+    视频流复制，音轨（如有）按分辨率配置编码为Opus
+
+    Args:
+        list_path: concat 文件列表
+        output_dir: HLS输出目录
+        resolution: 分辨率
+        audio_path: 音轨文件，None表示无音频
+        segment_time: HLS分片时长 (秒)
+
+    Returns:
+        命令参数列表
+    """
+    profile = AV1Transcoder.PROFILES[resolution]
+    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_path)]
+    if audio_path is not None:
+        cmd.extend(["-i", str(audio_path)])
+    cmd.extend(["-map", "0:v:0", "-c:v", "copy"])
+    if audio_path is not None:
+        cmd.extend(
+            ["-map", "1:a:0", "-c:a", "libopus", "-b:a", profile["audio_bitrate"]]
+        )
+    cmd.extend(
+        [
+            "-f",
+            "hls",
+            "-hls_time",
+            str(segment_time),
+            "-hls_playlist_type",
+            "vod",
+            "-hls_segment_filename",
+            str(output_dir / "segment_%03d.ts"),
+            "-hls_segment_type",
+            "mpegts",
+            "-hls_flags",
+            "temp_file",
+            str(output_dir / "index.m3u8"),
+        ]
+    )
+    return cmd
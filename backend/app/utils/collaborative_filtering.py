@@ -0,0 +1,308 @@
+"""
+隐式反馈矩阵分解（ALS）协同过滤
+
+离线任务根据观看历史和收藏构建稀疏的用户-视频交互矩阵，
+用交替最小二乘（Hu, Koren & Volinsky 2008）训练用户/视频隐向量，
+保存为可内存映射的 .npy 文件；在线请求只做一次向量点积加 top-k，不访问数据库。
+
+模型目录结构：
+    {RECOMMENDATION_MODEL_DIR}/current -> 指向最新版本目录的符号链接
+    {RECOMMENDATION_MODEL_DIR}/{版本号}/
+        user_ids.npy / item_ids.npy           升序的用户ID / 视频ID
+        user_factors.npy / item_factors.npy   隐向量矩阵
+        seen_indptr.npy / seen_indices.npy    每个用户交互过的视频（CSR）
+"""
+
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.config import settings
+
+# 新模型发布后，各worker最迟多久发现并加载（秒）
+MODEL_RELOAD_INTERVAL = 60
+
+# 保留的历史版本数量
+MODEL_KEEP_VERSIONS = 2
+
+_MODEL_FILES = (
+    "user_ids",
+    "item_ids",
+    "user_factors",
+    "item_factors",
+    "seen_indptr",
+    "seen_indices",
+)
+
+
+def build_interaction_matrix(
+    interactions: Sequence[Tuple[int, int, float]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    将 (用户ID, 视频ID, 权重) 三元组转为按用户分组的 CSR 结构
+
+    Returns:
+        (user_ids, item_ids, indptr, indices, values)，
+        其中 indices 为视频在 item_ids 中的下标
+    """
+    if not interactions:
+        empty_int = np.zeros(0, dtype=np.int64)
+        return (
+            empty_int,
+            empty_int,
+            np.zeros(1, dtype=np.int64),
+            empty_int,
+            np.zeros(0, dtype=np.float32),
+        )
+
+    data = np.asarray(interactions, dtype=np.float64)
+    users = data[:, 0].astype(np.int64)
+    items = data[:, 1].astype(np.int64)
+    values = data[:, 2].astype(np.float32)
+
+    user_ids, user_idx = np.unique(users, return_inverse=True)
+    item_ids, item_idx = np.unique(items, return_inverse=True)
+
+    order = np.lexsort((item_idx, user_idx))
+    user_idx = user_idx[order]
+    indices = item_idx[order].astype(np.int64)
+    values = values[order]
+
+    indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(user_idx, minlength=len(user_ids)), out=indptr[1:])
+    return user_ids, item_ids, indptr, indices, values
+
+
+def _transpose_csr(
+    indptr: np.ndarray, indices: np.ndarray, values: np.ndarray, n_cols: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CSR 转置（用户×视频 -> 视频×用户）"""
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    order = np.argsort(indices, kind="stable")
+    t_indptr = np.zeros(n_cols + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=n_cols), out=t_indptr[1:])
+    return t_indptr, rows[order], values[order]
+
+
+def _als_step(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    confidence: np.ndarray,
+    fixed: np.ndarray,
+    regularization: float,
+) -> np.ndarray:
+    """固定一侧隐向量，逐行求解另一侧的最小二乘"""
+    n_factors = fixed.shape[1]
+    gram = fixed.T @ fixed
+    reg = regularization * np.eye(n_factors, dtype=fixed.dtype)
+    solved = np.zeros((len(indptr) - 1, n_factors), dtype=fixed.dtype)
+
+    for row in range(len(indptr) - 1):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        y = fixed[indices[start:end]]
+        c = confidence[start:end]
+        # (YᵀY + Yᵀ(Cu - I)Y + λI) x = YᵀCu p(u)，其中 p(u) 全为1
+        a = gram + (y.T * (c - 1)) @ y + reg
+        b = y.T @ c
+        solved[row] = np.linalg.solve(a, b)
+    return solved
+
+
+def train_implicit_als(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    values: np.ndarray,
+    n_items: int,
+    factors: int = 64,
+    regularization: float = 0.1,
+    alpha: float = 40.0,
+    iterations: int = 15,
+    seed: int = 42,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    训练隐式反馈 ALS 模型
+
+    Args:
+        indptr/indices/values: build_interaction_matrix 返回的用户×视频 CSR
+        n_items: 视频数量
+        factors: 隐向量维度
+        regularization: L2 正则系数
+        alpha: 置信度系数，confidence = 1 + alpha * value
+        iterations: 迭代轮数
+        seed: 随机种子
+
+    Returns:
+        (user_factors, item_factors)
+    """
+    n_users = len(indptr) - 1
+    rng = np.random.default_rng(seed)
+    user_factors = (rng.standard_normal((n_users, factors)) * 0.01).astype(np.float32)
+    item_factors = (rng.standard_normal((n_items, factors)) * 0.01).astype(np.float32)
+
+    confidence = 1 + alpha * values.astype(np.float32)
+    t_indptr, t_indices, t_confidence = _transpose_csr(
+        indptr, indices, confidence, n_items
+    )
+
+    for _ in range(iterations):
+        user_factors = _als_step(indptr, indices, confidence, item_factors, regularization)
+        item_factors = _als_step(
+            t_indptr, t_indices, t_confidence, user_factors, regularization
+        )
+
+    return user_factors, item_factors
+
+
+def save_model(
+    model_dir: Path,
+    user_ids: np.ndarray,
+    item_ids: np.ndarray,
+    user_factors: np.ndarray,
+    item_factors: np.ndarray,
+    seen_indptr: np.ndarray,
+    seen_indices: np.ndarray,
+) -> Path:
+    """
+    写入新版本模型并原子地切换 current 链接
+
+    Returns:
+        新版本目录
+    """
+    model_dir.mkdir(parents=True, exist_ok=True)
+    version = int(time.time() * 1000)
+    while (model_dir / str(version)).exists():
+        version += 1
+    version_dir = model_dir / str(version)
+    version_dir.mkdir()
+
+    arrays = {
+        "user_ids": user_ids,
+        "item_ids": item_ids,
+        "user_factors": user_factors,
+        "item_factors": item_factors,
+        "seen_indptr": seen_indptr,
+        "seen_indices": seen_indices,
+    }
+    for name, array in arrays.items():
+        np.save(version_dir / f"{name}.npy", np.ascontiguousarray(array))
+
+    # 先建临时链接再 rename，读取方不会看到半写入的模型
+    tmp_link = model_dir / f".current-{version_dir.name}"
+    os.symlink(version_dir.name, tmp_link)
+    os.replace(tmp_link, model_dir / "current")
+
+    # 清理旧版本
+    versions = sorted(
+        (p for p in model_dir.iterdir() if p.is_dir() and not p.is_symlink() and p.name.isdigit()),
+        key=lambda p: int(p.name),
+    )
+    for old in versions[:-MODEL_KEEP_VERSIONS]:
+        shutil.rmtree(old, ignore_errors=True)
+
+    return version_dir
+
+
+class CFModel:
+    """只读的矩阵分解模型（内存映射加载）"""
+
+    def __init__(self, version_dir: Path):
+        arrays = {
+            name: np.load(version_dir / f"{name}.npy", mmap_mode="r")
+            for name in _MODEL_FILES
+        }
+        self.version = version_dir.name
+        self.user_ids = arrays["user_ids"]
+        self.item_ids = arrays["item_ids"]
+        self.user_factors = arrays["user_factors"]
+        self.item_factors = arrays["item_factors"]
+        self.seen_indptr = arrays["seen_indptr"]
+        self.seen_indices = arrays["seen_indices"]
+
+    def _user_row(self, user_id: int) -> Optional[int]:
+        row = int(np.searchsorted(self.user_ids, user_id))
+        if row < len(self.user_ids) and self.user_ids[row] == user_id:
+            return row
+        return None
+
+    def has_user(self, user_id: int) -> bool:
+        return self._user_row(user_id) is not None
+
+    def recommend(
+        self, user_id: int, limit: int, exclude_ids: Sequence[int] = ()
+    ) -> List[int]:
+        """
+        为用户推荐视频
+
+        Args:
+            user_id: 用户ID
+            limit: 推荐数量
+            exclude_ids: 额外排除的视频ID（用户交互过的视频总会被排除）
+
+        Returns:
+            按预测分数降序的视频ID，用户不在模型中时返回空列表
+        """
+        row = self._user_row(user_id)
+        if row is None or limit <= 0:
+            return []
+
+        scores = self.item_factors @ self.user_factors[row]
+
+        seen = self.seen_indices[self.seen_indptr[row] : self.seen_indptr[row + 1]]
+        scores[seen] = -np.inf
+        if exclude_ids:
+            exclude = np.asarray(list(exclude_ids), dtype=self.item_ids.dtype)
+            positions = np.searchsorted(self.item_ids, exclude)
+            positions = positions[positions < len(self.item_ids)]
+            positions = positions[np.isin(self.item_ids[positions], exclude)]
+            scores[positions] = -np.inf
+
+        k = min(limit, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [int(self.item_ids[i]) for i in top if np.isfinite(scores[i])]
+
+
+_model: Optional[CFModel] = None
+_model_checked_at = float("-inf")
+_model_lock = threading.Lock()
+
+
+def get_cf_model() -> Optional[CFModel]:
+    """
+    获取当前模型
+
+    每隔 MODEL_RELOAD_INTERVAL 秒检查一次 current 链接，
+    指向新版本时重新加载；尚未训练过模型时返回None。
+    """
+    global _model, _model_checked_at
+
+    now = time.monotonic()
+    if now - _model_checked_at < MODEL_RELOAD_INTERVAL:
+        return _model
+
+    with _model_lock:
+        if now - _model_checked_at < MODEL_RELOAD_INTERVAL:
+            return _model
+        _model_checked_at = now
+        current = Path(settings.RECOMMENDATION_MODEL_DIR) / "current"
+        try:
+            version_dir = current.resolve(strict=True)
+        except (FileNotFoundError, OSError):
+            return _model
+        if _model is None or _model.version != version_dir.name:
+            try:
+                _model = CFModel(version_dir)
+                logger.info(f"Loaded recommendation model {version_dir.name}")
+            except Exception as e:
+                logger.error(f"Failed to load recommendation model: {e}", exc_info=True)
+    return _model
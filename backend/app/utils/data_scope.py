@@ -3,15 +3,114 @@
 
 提供数据范围权限检查和过滤功能
 Provides data scope permission checking and filtering
+
+部门树一次查询加载为进程内的祖先/后代索引，可访问部门集合按
+(角色, 资源类型, 管理员) 缓存；二者都以RBAC版本号为版本戳。
+部门、数据范围配置或管理员部门关联变更并提交后，RBAC版本号加一，
+各worker通过pub/sub丢弃旧结果。
+The department tree is loaded once into an in-process ancestor/descendant
+index and accessible-department sets are cached per (role, resource type,
+admin), both stamped with the RBAC version and dropped when it changes.
 """
 
 import json
-from typing import List, Optional, Set
+import time
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
 from app.models.user import AdminUser
 from app.models.data_scope import Department, DataScope, AdminUserDepartment
+from app.utils.cache import mark_commit_invalidation, register_commit_invalidation
+from app.utils.permissions import (
+    PERMISSION_CACHE_TTL,
+    PERMISSION_VERSION_KEY,
+    bump_permissions_version,
+    get_permissions_version,
+)
+
+
+class DepartmentIndex:
+    """
+    部门树的祖先/后代索引 / Ancestor/descendant index of the department tree
+
+    按 parent_id 构建，后代集合首次查询时计算并缓存。
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, Optional[int]]]):
+        self.parents: Dict[int, Optional[int]] = {}
+        self.children: Dict[int, List[int]] = defaultdict(list)
+        for department_id, parent_id in rows:
+            self.parents[department_id] = parent_id
+            if parent_id is not None:
+                self.children[parent_id].append(department_id)
+        self._descendants: Dict[int, FrozenSet[int]] = {}
+
+    def __contains__(self, department_id: int) -> bool:
+        return department_id in self.parents
+
+    def descendants(self, department_id: int) -> FrozenSet[int]:
+        """所有下级部门ID(不含自身) / All descendant department IDs (excluding self)"""
+        cached = self._descendants.get(department_id)
+        if cached is not None:
+            return cached
+
+        found: Set[int] = set()
+        stack = list(self.children.get(department_id, ()))
+        while stack:
+            child = stack.pop()
+            if child in found or child == department_id:
+                continue
+            found.add(child)
+            stack.extend(self.children.get(child, ()))
+
+        result = frozenset(found)
+        self._descendants[department_id] = result
+        return result
+
+    def ancestors(self, department_id: int) -> List[int]:
+        """从直接上级到顶级的部门ID / Ancestor IDs from parent up to the root"""
+        result: List[int] = []
+        parent = self.parents.get(department_id)
+        while parent is not None and parent not in result and parent != department_id:
+            result.append(parent)
+            parent = self.parents.get(parent)
+        return result
+
+
+# (版本号, 加载时间, 部门索引)
+_department_index: Optional[Tuple[int, float, DepartmentIndex]] = None
+
+# (角色ID, 资源类型, 管理员ID) -> 可访问部门集合(None表示无限制)
+_accessible_cache: Dict[Tuple[int, str, int], Tuple[float, Optional[FrozenSet[int]]]] = {}
+_accessible_cache_version: Optional[int] = None
+
+
+async def get_department_index(db: AsyncSession) -> DepartmentIndex:
+    """
+    获取部门树索引(一次查询加载全部部门)
+    Get the department tree index (all departments loaded in one query)
+    """
+    global _department_index
+    version = get_permissions_version()
+    if (
+        version is not None
+        and _department_index is not None
+        and _department_index[0] == version
+        and time.monotonic() - _department_index[1] < PERMISSION_CACHE_TTL
+    ):
+        return _department_index[2]
+
+    result = await db.execute(select(Department.id, Department.parent_id))
+    index = DepartmentIndex(result.all())
+
+    # 加载期间版本发生变化时不缓存
+    if version is not None and get_permissions_version() == version:
+        _department_index = (version, time.monotonic(), index)
+    return index
 
 
 async def get_admin_departments(
@@ -80,22 +179,12 @@ async def get_department_children(
     Returns:
         List[int]: 部门ID列表 / List of department IDs
     """
-    # 获取部门路径
-    result = await db.execute(
-        select(Department).where(Department.id == department_id)
-    )
-    department = result.scalar_one_or_none()
+    index = await get_department_index(db)
 
-    if not department:
+    if department_id not in index:
         return []
 
-    # 查找所有以该部门路径开头的部门(即子部门)
-    path_prefix = f"{department.path}/{department.id}" if department.path else str(department.id)
-
-    result = await db.execute(
-        select(Department.id).where(Department.path.startswith(path_prefix))
-    )
-    children_ids = [row[0] for row in result.all()]
+    children_ids = sorted(index.descendants(department_id))
 
     if include_self:
         children_ids.insert(0, department_id)
@@ -133,28 +222,62 @@ async def get_admin_accessible_department_ids(
     admin: AdminUser,
     resource_type: str,
     db: AsyncSession
-) -> Optional[Set[int]]:
+) -> Optional[FrozenSet[int]]:
     """
     获取管理员可访问的部门ID集合
     Get the set of department IDs accessible to the admin
 
+    结果按 (角色, 资源类型, 管理员) 缓存在进程内，RBAC版本号变化时失效
+    Cached in-process per (role, resource type, admin) until the RBAC version changes
+
     Args:
         admin: 管理员对象 / Admin user object
         resource_type: 资源类型 / Resource type
         db: 数据库会话 / Database session
 
     Returns:
-        Optional[Set[int]]: 部门ID集合。None表示无限制(全部数据)
+        Optional[FrozenSet[int]]: 部门ID集合。None表示无限制(全部数据)
                            / Set of department IDs. None means no restriction (all data)
     """
+    global _accessible_cache_version
+
     # 超级管理员无限制
     if admin.is_superadmin:
         return None
 
     # 无角色则无权限
     if not admin.role_id:
-        return set()
+        return frozenset()
+
+    version = get_permissions_version()
+    if version != _accessible_cache_version:
+        _accessible_cache.clear()
+        _accessible_cache_version = version
 
+    key = (admin.role_id, resource_type, admin.id)
+    cached = _accessible_cache.get(key)
+    if (
+        version is not None
+        and cached is not None
+        and time.monotonic() - cached[0] < PERMISSION_CACHE_TTL
+    ):
+        return cached[1]
+
+    accessible = await _load_accessible_department_ids(admin, resource_type, db)
+    accessible = frozenset(accessible) if accessible is not None else None
+
+    # 加载期间版本发生变化时不缓存
+    if version is not None and get_permissions_version() == version:
+        _accessible_cache[key] = (time.monotonic(), accessible)
+    return accessible
+
+
+async def _load_accessible_department_ids(
+    admin: AdminUser,
+    resource_type: str,
+    db: AsyncSession
+) -> Optional[Set[int]]:
+    """从数据库计算可访问部门集合 / Compute accessible departments from database"""
     # 获取角色的数据范围配置
     data_scope = await get_role_data_scope(admin.role_id, resource_type, db)
 
@@ -180,11 +303,13 @@ async def get_admin_accessible_department_ids(
         return set(admin_departments)
 
     elif scope_type == "department_and_children":
-        # 本部门及所有子部门
+        # 本部门及所有子部门(部门树索引只加载一次)
+        index = await get_department_index(db)
         accessible_ids = set()
         for dept_id in admin_departments:
-            children = await get_department_children(dept_id, db, include_self=True)
-            accessible_ids.update(children)
+            if dept_id in index:
+                accessible_ids.add(dept_id)
+                accessible_ids.update(index.descendants(dept_id))
         return accessible_ids
 
     elif scope_type == "custom":
@@ -233,7 +358,7 @@ async def check_data_scope_permission(
 def build_data_scope_filter(
     admin: AdminUser,
     resource_type: str,
-    accessible_dept_ids: Optional[Set[int]],
+    accessible_dept_ids: Optional[FrozenSet[int]],
     department_field_name: str = "department_id"
 ):
     """
@@ -328,6 +453,7 @@ async def assign_admin_to_department(
             .values(is_primary=False)
         )
 
+    mark_data_scope_changed(db)
     await db.flush()
 
 
@@ -351,4 +477,39 @@ async def remove_admin_from_department(
             AdminUserDepartment.department_id == department_id
         )
     )
+    mark_data_scope_changed(db)
     await db.flush()
+
+
+# ========== 变更失效 / Invalidation on writes ==========
+
+_DATA_SCOPE_MODELS = (Department, DataScope, AdminUserDepartment)
+
+# 提交后失效的注册名称
+_INVALIDATION_NAME = "data_scope"
+
+
+def mark_data_scope_changed(db: AsyncSession):
+    """
+    标记本事务修改了数据范围(用于ORM事件捕获不到的批量UPDATE/DELETE)
+    Mark the transaction as changing data scope (for bulk statements ORM events miss)
+    """
+    mark_commit_invalidation(
+        db.sync_session, _INVALIDATION_NAME, PERMISSION_VERSION_KEY
+    )
+
+
+def _collect_data_scope_changes(session: Session):
+    """本次flush涉及部门、数据范围或部门关联时登记RBAC版本号"""
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _DATA_SCOPE_MODELS):
+            return [PERMISSION_VERSION_KEY]
+    return []
+
+
+# 提交后增加RBAC版本号，各worker丢弃部门索引和可访问部门缓存
+register_commit_invalidation(
+    _INVALIDATION_NAME,
+    _collect_data_scope_changes,
+    lambda keys: bump_permissions_version(),
+)
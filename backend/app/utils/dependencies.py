@@ -2,17 +2,24 @@ from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.user import AdminUser, User
+from app.utils.principal_cache import resolve_principal
 from app.utils.security import decode_token
-from app.utils.token_blacklist import is_blacklisted
 
 security = HTTPBearer()
 
 
+def revoked_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token has been revoked",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
@@ -25,15 +32,6 @@ async def get_current_user(
     )
 
     token = credentials.credentials
-
-    # 检查token是否在黑名单中
-    if await is_blacklisted(token):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has been revoked",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
     payload = decode_token(token)
 
     if payload is None or payload.get("type") != "access":
@@ -48,8 +46,10 @@ async def get_current_user(
     except (ValueError, TypeError):
         raise credentials_exception
 
-    result = await db.execute(select(User).filter(User.id == user_id))
-    user = result.scalar_one_or_none()
+    # 黑名单检查和用户快照在一次Redis往返中完成，快照命中时不查询数据库
+    revoked, user = await resolve_principal(db, User, user_id, token)
+    if revoked:
+        raise revoked_exception()
 
     if user is None or not user.is_active:  # type: ignore
         raise credentials_exception
@@ -78,15 +78,6 @@ async def get_current_admin_user(
     )
 
     token = credentials.credentials
-
-    # 检查token是否在黑名单中
-    if await is_blacklisted(token):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token has been revoked",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
     payload = decode_token(token)
 
     if (
@@ -105,8 +96,9 @@ async def get_current_admin_user(
     except (ValueError, TypeError):
         raise credentials_exception
 
-    result = await db.execute(select(AdminUser).filter(AdminUser.id == admin_id))
-    admin_user = result.scalar_one_or_none()
+    revoked, admin_user = await resolve_principal(db, AdminUser, admin_id, token)
+    if revoked:
+        raise revoked_exception()
 
     if admin_user is None or not admin_user.is_active:  # type: ignore
         raise credentials_exception
@@ -151,7 +143,8 @@ async def get_current_user_optional(
     except (ValueError, TypeError):
         return None
 
-    result = await db.execute(select(User).filter(User.id == user_id))
-    user = result.scalar_one_or_none()
+    revoked, user = await resolve_principal(db, User, user_id, token)
+    if revoked:
+        return None
 
     return user if user and user.is_active else None  # type: ignore
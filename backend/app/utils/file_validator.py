@@ -3,9 +3,10 @@
 防止恶意文件上传、文件类型伪造等攻击
 """
 
+import base64
 import hashlib
 import re
-from typing import List, Tuple
+from typing import BinaryIO, List, Tuple
 
 from fastapi import HTTPException, UploadFile, status
 
@@ -16,6 +17,29 @@ class FileValidationError(Exception):
     pass
 
 
+class HashingReader:
+    """
+    边读边计算哈希的只读流包装
+
+    作为上传请求体传给 HTTP 客户端时，数据只经过一次：
+    发送完成即得到哈希值，无需先把整个分片读进内存再单独计算。
+    """
+
+    def __init__(self, raw: BinaryIO, algorithm: str = "md5"):
+        self._raw = raw
+        self._hash = hashlib.new(algorithm)
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._raw.read(size)
+        self._hash.update(data)
+        self.bytes_read += len(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
 def sanitize_filename(filename: str) -> str:
     """
     清理文件名，移除危险字符
@@ -333,3 +357,22 @@ class FileValidator:
         """
         actual_hash = hashlib.md5(chunk_data).hexdigest()
         return actual_hash == expected_hash
+
+    @staticmethod
+    def md5_hex_to_base64(md5_hex: str) -> str:
+        """
+        将十六进制 MD5 转为 Content-MD5 请求头使用的 Base64 格式
+
+        Args:
+            md5_hex: 十六进制 MD5（32位）
+
+        Returns:
+            Base64 编码的 MD5
+
+        Raises:
+            ValueError: 不是合法的 MD5 十六进制串
+        """
+        digest = bytes.fromhex(md5_hex)
+        if len(digest) != 16:
+            raise ValueError("MD5 必须为16字节")
+        return base64.b64encode(digest).decode()
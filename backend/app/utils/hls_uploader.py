@@ -0,0 +1,206 @@
+"""
+HLS 分片并发上传
+- 有界并发上传分片，失败按指数退避重试
+- 已上传清单：同一实例重复调用只上传新的或变化的文件；传入 resume_key 时
+  清单保存在 Redis（按对象前缀 + resume_key），任务失败重试后重新生成的
+  同名、同大小文件不再上传
+- 可以边转码边上传：监视输出目录，ffmpeg 每写完一个分片就上传
+- 播放列表 (.m3u8) 最后上传，保证其引用的分片都已存在
+"""
+
+import asyncio
+import subprocess
+from pathlib import Path
+from typing import Dict, Optional
+
+from loguru import logger
+from minio.error import ServerError
+from urllib3.exceptions import HTTPError
+
+from app.utils.cache import get_redis
+from app.utils.minio_client import AsyncMinIOClient, async_minio_client
+from app.utils.retry import retry
+
+# 已上传清单（Redis Hash：文件名 -> 大小），覆盖Celery任务的重试窗口
+UPLOAD_MANIFEST_PREFIX = "hls_upload_manifest:"
+UPLOAD_MANIFEST_TTL = 24 * 3600
+
+CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".m4s": "video/iso.segment",
+    ".mp4": "video/mp4",
+}
+SEGMENT_SUFFIXES = {".ts", ".m4s", ".mp4"}
+
+# 可重试的上传异常：网络错误和 MinIO 5xx
+UPLOAD_RETRYABLE_EXCEPTIONS = (ConnectionError, TimeoutError, HTTPError, ServerError)
+
+
+class HLSUploader:
+    """将一个 HLS 输出目录上传到 MinIO"""
+
+    def __init__(
+        self,
+        local_dir: Path,
+        object_prefix: str,
+        concurrency: int = 8,
+        max_attempts: int = 4,
+        retry_delay: float = 0.5,
+        client: Optional[AsyncMinIOClient] = None,
+        resume_key: Optional[str] = None,
+    ):
+        """
+        Args:
+            local_dir: 本地 HLS 目录
+            object_prefix: MinIO 对象前缀，如 videos/123/av1/720p
+            concurrency: 同时上传的文件数
+            max_attempts: 单个文件最多尝试次数
+            retry_delay: 首次重试等待时间（秒），之后按2倍递增
+            client: MinIO 异步客户端，默认使用全局实例
+            resume_key: 标识本次输出的来源（如源文件内容哈希），相同时复用
+                Redis 中的已上传清单；None 表示不跨实例续传
+        """
+        self.local_dir = Path(local_dir)
+        self.object_prefix = object_prefix.rstrip("/")
+        self.client = client or async_minio_client
+        self.manifest_key = (
+            f"{UPLOAD_MANIFEST_PREFIX}{self.object_prefix}:{resume_key}"
+            if resume_key
+            else None
+        )
+        self.manifest: Dict[str, int] = {}
+        self._manifest_loaded = self.manifest_key is None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._in_progress: set = set()
+        self._put = retry(
+            max_attempts=max_attempts,
+            delay=retry_delay,
+            backoff=2.0,
+            exceptions=UPLOAD_RETRYABLE_EXCEPTIONS,
+        )(self._put_once)
+
+    async def _load_manifest(self):
+        """首次上传前读取 Redis 中的已上传清单；Redis 不可用时全部重新上传"""
+        if self._manifest_loaded:
+            return
+        self._manifest_loaded = True
+        try:
+            client = await get_redis()
+            saved = await client.hgetall(self.manifest_key)
+        except Exception as e:
+            logger.warning(f"读取HLS上传清单失败，将重新上传全部文件: {e}")
+            return
+        self.manifest.update({name: int(size) for name, size in saved.items()})
+        if saved:
+            logger.info(f"续传 {self.object_prefix}：{len(saved)} 个文件已上传")
+
+    async def _record_uploaded(self, name: str, size: int):
+        self.manifest[name] = size
+        if self.manifest_key is None:
+            return
+        try:
+            client = await get_redis()
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(self.manifest_key, name, size)
+            pipe.expire(self.manifest_key, UPLOAD_MANIFEST_TTL)
+            await pipe.execute()
+        except Exception as e:
+            # 清单只用于跳过重复上传，写入失败不影响本次结果
+            logger.warning(f"记录HLS上传清单失败: {e}")
+
+    def _pending(self, suffixes) -> list:
+        """目录中尚未上传（或上传后又发生变化）的文件"""
+        pending = []
+        for path in sorted(self.local_dir.iterdir()):
+            if not path.is_file() or path.suffix not in suffixes:
+                continue
+            if path.name in self._in_progress:
+                continue
+            if self.manifest.get(path.name) == path.stat().st_size:
+                continue
+            pending.append(path)
+        return pending
+
+    async def _put_once(self, path: Path):
+        await self.client.upload_file_from_path(
+            str(path),
+            f"{self.object_prefix}/{path.name}",
+            CONTENT_TYPES.get(path.suffix, "application/octet-stream"),
+        )
+
+    async def _upload(self, path: Path):
+        self._in_progress.add(path.name)
+        try:
+            async with self._semaphore:
+                size = path.stat().st_size
+                await self._put(path)
+            await self._record_uploaded(path.name, size)
+        finally:
+            self._in_progress.discard(path.name)
+
+    async def upload_segments(self) -> int:
+        """
+        上传目录中所有已完成且未上传的分片
+
+        Returns:
+            本次上传的分片数
+        """
+        await self._load_manifest()
+        pending = self._pending(SEGMENT_SUFFIXES)
+        await asyncio.gather(*(self._upload(path) for path in pending))
+        return len(pending)
+
+    async def finish(self) -> int:
+        """
+        上传剩余分片，然后上传播放列表
+
+        Returns:
+            本次上传的文件数
+        """
+        uploaded = await self.upload_segments()
+        playlists = self._pending({".m3u8"})
+        await asyncio.gather(*(self._upload(path) for path in playlists))
+        uploaded += len(playlists)
+        logger.info(
+            f"HLS上传完成: {self.object_prefix}，本次上传 {uploaded} 个文件，"
+            f"累计 {len(self.manifest)} 个"
+        )
+        return uploaded
+
+    async def watch(self, process: subprocess.Popen, poll_interval: float = 0.5) -> int:
+        """
+        在转码进行中持续上传已完成的分片，转码结束后上传剩余文件
+
+        ffmpeg 需使用 -hls_flags temp_file，未写完的分片带 .tmp 后缀不会被上传
+
+        Args:
+            process: ffmpeg 进程
+            poll_interval: 检查新分片的间隔（秒）
+
+        Returns:
+            ffmpeg 退出码；非0时不上传播放列表
+        """
+        await self._load_manifest()
+        uploads = set()
+        try:
+            while process.poll() is None:
+                for path in self._pending(SEGMENT_SUFFIXES):
+                    self._in_progress.add(path.name)
+                    uploads.add(asyncio.create_task(self._upload(path)))
+                # 已失败的上传尽早抛出
+                for task in [t for t in uploads if t.done()]:
+                    uploads.discard(task)
+                    task.result()
+                await asyncio.sleep(poll_interval)
+
+            if uploads:
+                await asyncio.gather(*uploads)
+        except BaseException:
+            for task in uploads:
+                task.cancel()
+            raise
+
+        if process.returncode == 0:
+            await self.finish()
+        return process.returncode
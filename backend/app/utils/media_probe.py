@@ -0,0 +1,146 @@
+"""
+媒体分析（ffprobe 结果缓存）
+
+每个源文件只分析一次：流/格式信息和视频关键帧索引一并取出，
+按文件内容的 SHA-256 缓存到 Redis。转码、切分和缩略图
+都从同一份分析结果读取，同一内容任务重试时不再重复探测。
+
+关键帧来自数据包的 K 标志（只解复用，不解码），比逐帧解码探测快得多；
+数据包只取第一条视频流，音频和字幕的数据包不输出。
+"""
+
+import asyncio
+import json
+import logging
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.utils.cache import Cache
+from app.utils.video_hash import calculate_streaming_hash
+
+logger = logging.getLogger(__name__)
+
+MEDIA_PROBE_CACHE_PREFIX = "media_probe:"
+
+# 分析结果按内容寻址，内容不变结果就不变，可以缓存较长时间
+MEDIA_PROBE_TTL = 30 * 24 * 3600
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_content_hash(path: Path) -> str:
+    """流式计算文件的 SHA-256"""
+    with open(path, "rb") as f:
+        return calculate_streaming_hash(f, "sha256", _HASH_CHUNK_SIZE)
+
+
+def build_probe_command(path: Path) -> List[str]:
+    """生成 ffprobe 命令：格式和全部流"""
+    return [
+        "ffprobe",
+        "-v",
+        "error",
+        "-print_format",
+        "json",
+        "-show_format",
+        "-show_streams",
+        str(path),
+    ]
+
+
+def build_keyframe_command(path: Path) -> List[str]:
+    """生成 ffprobe 命令：只输出第一条视频流的数据包（只取时间戳与标志）"""
+    return [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-print_format",
+        "json",
+        "-show_entries",
+        "packet=stream_index,pts_time,flags",
+        str(path),
+    ]
+
+
+def parse_probe_output(data: Dict) -> Dict:
+    """
+    整理 ffprobe 的JSON输出
+
+    Returns:
+        {
+            'format': {...},       # ffprobe format 原样保留
+            'streams': [...],      # ffprobe streams 原样保留
+            'keyframes': [0.0, 2.0, ...],  # 第一条视频流的关键帧时间（秒，升序）
+        }
+    """
+    streams = data.get("streams", [])
+    video_index = next(
+        (s["index"] for s in streams if s.get("codec_type") == "video"), None
+    )
+
+    keyframes = set()
+    for packet in data.get("packets", []):
+        if packet.get("stream_index") != video_index:
+            continue
+        if "K" not in packet.get("flags", "") or "pts_time" not in packet:
+            continue
+        try:
+            keyframes.add(float(packet["pts_time"]))
+        except (TypeError, ValueError):
+            continue
+
+    return {
+        "format": data.get("format", {}),
+        "streams": streams,
+        "keyframes": sorted(keyframes),
+    }
+
+
+def _run_ffprobe(command: List[str]) -> Dict:
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"FFprobe failed: {result.stderr}")
+    return json.loads(result.stdout)
+
+
+def run_probe(path: Path) -> Dict:
+    """分析文件（不读缓存）：先取格式和流信息，再单独读取视频流的数据包"""
+    data = _run_ffprobe(build_probe_command(path))
+    if any(s.get("codec_type") == "video" for s in data.get("streams", [])):
+        packets = _run_ffprobe(build_keyframe_command(path))
+        data["packets"] = packets.get("packets", [])
+    return parse_probe_output(data)
+
+
+async def analyze_media(path: Path, content_hash: Optional[str] = None) -> Dict:
+    """
+    获取文件的媒体分析结果，同一内容只探测一次
+
+    多个worker同时分析同一内容时只有一个会运行 ffprobe，其余等待缓存写入
+
+    Args:
+        path: 本地媒体文件
+        content_hash: 文件内容的 SHA-256，调用方已计算过时传入可以省去一次读文件
+
+    Returns:
+        parse_probe_output 的结果，另含 'content_hash'
+    """
+    path = Path(path)
+    if content_hash is None:
+        content_hash = await asyncio.to_thread(file_content_hash, path)
+
+    async def load():
+        logger.info(f"分析媒体文件: {path} ({content_hash[:12]})")
+        probe = await asyncio.to_thread(run_probe, path)
+        probe["content_hash"] = content_hash
+        return probe
+
+    return await Cache.get_or_set(
+        f"{MEDIA_PROBE_CACHE_PREFIX}{content_hash}",
+        load,
+        ttl=MEDIA_PROBE_TTL,
+        lock_timeout=120,
+    )
@@ -0,0 +1,177 @@
+"""
+媒体库文件夹树
+- 一条 WITH RECURSIVE 查询取出整棵子树，同时统计每个文件夹的子项数量
+- 结果按根文件夹和深度缓存，带 media:tree 标签
+- 文件夹或文件的创建、移动、重命名、删除、恢复提交后按标签失效
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import func, inspect, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from app.models.media import Media
+from app.utils.cache import Cache, register_commit_invalidation
+
+MEDIA_TREE_CACHE_TAG = "media:tree"
+MEDIA_TREE_CACHE_TTL = 600
+
+# 递归深度上限，防止异常数据（父子成环）导致查询无法结束
+MEDIA_TREE_MAX_DEPTH = 64
+
+# 影响文件夹树结构或子项数量的字段
+_TREE_ATTRIBUTES = ("parent_id", "title", "path", "is_folder", "is_deleted")
+
+
+def build_folder_tree_query(
+    parent_id: Optional[int], max_depth: Optional[int] = None
+):
+    """
+    生成获取文件夹子树的递归查询
+
+    Args:
+        parent_id: 根文件夹ID，None表示根目录
+        max_depth: 最大层数（1表示只取直接子文件夹），None表示不限
+
+    Returns:
+        查询语句，每行为 id, title, parent_id, path, created_at, depth, children_count
+    """
+    depth_limit = min(max_depth or MEDIA_TREE_MAX_DEPTH, MEDIA_TREE_MAX_DEPTH)
+
+    tree = (
+        select(
+            Media.id,
+            Media.title,
+            Media.parent_id,
+            Media.path,
+            Media.created_at,
+            # 直接写入SQL，避免绑定参数在递归CTE中被推断为text类型
+            literal_column("1").label("depth"),
+        )
+        .where(
+            Media.parent_id == parent_id,
+            Media.is_folder == True,
+            Media.is_deleted == False,
+        )
+        .cte("folder_tree", recursive=True)
+    )
+    child = aliased(Media)
+    tree = tree.union_all(
+        select(
+            child.id,
+            child.title,
+            child.parent_id,
+            child.path,
+            child.created_at,
+            tree.c.depth + 1,
+        ).where(
+            child.parent_id == tree.c.id,
+            child.is_folder == True,
+            child.is_deleted == False,
+            tree.c.depth < depth_limit,
+        )
+    )
+
+    # 子项数量（文件夹 + 文件），按 parent_id 索引逐个统计
+    item = aliased(Media)
+    children_count = (
+        select(func.count())
+        .where(item.parent_id == tree.c.id, item.is_deleted == False)
+        .scalar_subquery()
+    )
+    return select(tree, children_count.label("children_count")).order_by(
+        tree.c.depth, tree.c.title
+    )
+
+
+def assemble_folder_tree(rows: Sequence[Any]) -> List[Dict[str, Any]]:
+    """
+    把递归查询的扁平结果组装成嵌套树
+
+    行按 (depth, title) 排序，父节点总在子节点之前，同级按标题排列。
+
+    Returns:
+        [{id, title, parent_id, path, children_count, children, created_at}, ...]
+    """
+    nodes: Dict[int, Dict[str, Any]] = {}
+    tree: List[Dict[str, Any]] = []
+    for row in rows:
+        parent = nodes.get(row.parent_id)
+        if parent is not None:
+            path = row.path or f"{parent['path']}/{row.title}"
+        else:
+            path = row.path or f"/{row.title}"
+
+        node = {
+            "id": row.id,
+            "title": row.title,
+            "parent_id": row.parent_id,
+            "path": path,
+            "children_count": row.children_count,
+            "children": [],
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }
+        nodes[row.id] = node
+        if parent is None:
+            tree.append(node)
+        else:
+            parent["children"].append(node)
+    return tree
+
+
+async def get_folder_tree(
+    db: AsyncSession,
+    parent_id: Optional[int] = None,
+    max_depth: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    获取文件夹树（带缓存）
+
+    Args:
+        db: 数据库会话
+        parent_id: 根文件夹ID，None表示根目录
+        max_depth: 最大层数，None表示不限
+
+    Returns:
+        嵌套的文件夹树
+    """
+
+    async def load():
+        result = await db.execute(build_folder_tree_query(parent_id, max_depth))
+        return assemble_folder_tree(result.all())
+
+    root = parent_id if parent_id is not None else "root"
+    key = f"media_tree:{root}:{max_depth or 'all'}"
+    return await Cache.get_or_set(
+        key, load, ttl=MEDIA_TREE_CACHE_TTL, tags=[MEDIA_TREE_CACHE_TAG]
+    )
+
+
+async def invalidate_media_tree() -> int:
+    """清除所有文件夹树缓存"""
+    return await Cache.invalidate_tags(MEDIA_TREE_CACHE_TAG)
+
+
+# ========== 提交后自动失效 ==========
+
+
+def _affects_tree(obj: Media) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in _TREE_ATTRIBUTES)
+
+
+def _collect_media_tree_changes(session: Session):
+    """新增/删除任意项，或修改了树相关字段时，登记文件夹树缓存标签"""
+    if any(isinstance(obj, Media) for obj in (*session.new, *session.deleted)):
+        return [MEDIA_TREE_CACHE_TAG]
+    if any(isinstance(obj, Media) and _affects_tree(obj) for obj in session.dirty):
+        return [MEDIA_TREE_CACHE_TAG]
+    return []
+
+
+register_commit_invalidation(
+    "media_tree",
+    _collect_media_tree_changes,
+    lambda tags: invalidate_media_tree(),
+)
@@ -3,14 +3,26 @@ MinIO 客户端工具
 用于上传、下载和管理视频文件
 
 使用单例模式和延迟初始化，避免应用启动时阻塞
+
+MinIOClient 的方法都是同步阻塞的，async 接口中应使用 async_minio_client，
+它在独立的有界线程池中执行这些调用，并记录每种操作的耗时。
 """
 
+import asyncio
+import os
 import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from typing import BinaryIO, Optional
+from functools import partial
+from typing import Any, BinaryIO, Callable, Optional
 
+import certifi
+import urllib3
 from loguru import logger
 from minio import Minio
+from minio.datatypes import Part
 from minio.error import S3Error
 
 from app.config import settings
@@ -52,6 +64,19 @@ class MinIOClient:
                         access_key=settings.MINIO_ACCESS_KEY,
                         secret_key=settings.MINIO_SECRET_KEY,
                         secure=settings.MINIO_SECURE,
+                        # 连接池与 async_minio_client 的线程数一致，避免并发时反复建连
+                        # 其余参数与SDK默认值一致
+                        http_client=urllib3.PoolManager(
+                            maxsize=settings.MINIO_IO_WORKERS,
+                            timeout=urllib3.Timeout(connect=300, read=300),
+                            cert_reqs="CERT_REQUIRED",
+                            ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+                            retries=urllib3.Retry(
+                                total=5,
+                                backoff_factor=0.2,
+                                status_forcelist=[500, 502, 503, 504],
+                            ),
+                        ),
                     )
                     self._ensure_bucket()
         return self._client
@@ -553,16 +578,14 @@ class MinIOClient:
             S3Error: 如果上传失败
         """
         try:
-            from io import BytesIO
-
             # 上传分片
             etag = self.client._upload_part(
                 self.bucket_name,
                 object_name,
+                data,
+                None,
                 upload_id,
                 part_number,
-                BytesIO(data),
-                len(data),
             )
             logger.debug(
                 f"Uploaded part {part_number} for {object_name}, ETag: {etag}"
@@ -574,6 +597,121 @@ class MinIOClient:
             )
             raise
 
+    def get_presigned_part_url(
+        self,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        expires: timedelta = timedelta(hours=1),
+    ) -> str:
+        """
+        获取上传单个分片的预签名 URL
+
+        持有 URL 的客户端可以直接 PUT 分片内容到对象存储，
+        响应头中的 ETag 即分片 ETag
+
+        Args:
+            object_name: 对象名称
+            upload_id: Multipart Upload ID
+            part_number: 分片编号（从 1 开始）
+            expires: 过期时间
+
+        Returns:
+            str: 预签名 URL
+        """
+        return self.client.get_presigned_url(
+            "PUT",
+            self.bucket_name,
+            object_name,
+            expires=expires,
+            extra_query_params={
+                "partNumber": str(part_number),
+                "uploadId": upload_id,
+            },
+        )
+
+    def list_parts(self, object_name: str, upload_id: str) -> list:
+        """
+        列出 Multipart Upload 中已上传的分片
+
+        Args:
+            object_name: 对象名称
+            upload_id: Multipart Upload ID
+
+        Returns:
+            list: [(part_number, etag), ...]，按分片编号升序
+
+        Raises:
+            S3Error: 如果查询失败
+        """
+        parts = []
+        marker = None
+        try:
+            while True:
+                result = self.client._list_parts(
+                    self.bucket_name,
+                    object_name,
+                    upload_id,
+                    max_parts=1000,
+                    part_number_marker=marker,
+                )
+                parts.extend((part.part_number, part.etag) for part in result.parts)
+                if not result.is_truncated:
+                    break
+                marker = result.next_part_number_marker
+            return parts
+        except S3Error as e:
+            logger.error(f"Error listing parts for {object_name}: {e}", exc_info=True)
+            raise
+
+    def upload_part_stream(
+        self,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        stream: BinaryIO,
+        length: int,
+        content_md5: Optional[str] = None,
+    ) -> str:
+        """
+        以流的方式上传一个分片
+
+        SDK 的 _upload_part 需要完整的 bytes 来计算请求签名，
+        这里改用分片的预签名 URL（UNSIGNED-PAYLOAD），
+        请求体由 urllib3 每次从 stream 读取一小块发送，内存占用与分片大小无关。
+
+        Args:
+            object_name: 对象名称
+            upload_id: Multipart Upload ID
+            part_number: 分片编号（从 1 开始）
+            stream: 可读的文件对象，从当前位置读取 length 字节
+            length: 分片字节数
+            content_md5: Base64 编码的 MD5，服务端据此校验分片内容
+
+        Returns:
+            str: ETag
+
+        Raises:
+            S3Error: 如果上传失败（MD5 不匹配时 code 为 BadDigest）
+        """
+        url = self.get_presigned_part_url(object_name, upload_id, part_number)
+        headers = {"Content-Length": str(length)}
+        if content_md5:
+            headers["Content-MD5"] = content_md5
+
+        # 流只能读一次，不能自动重试
+        response = self.client._http.urlopen(
+            "PUT", url, body=stream, headers=headers, retries=False
+        )
+        if response.status != 200:
+            error = S3Error.fromxml(response)
+            logger.error(f"Error uploading part {part_number}: {error}")
+            raise error
+
+        etag = response.headers.get("etag", "").replace('"', "")
+        logger.debug(f"Uploaded part {part_number} for {object_name}, ETag: {etag}")
+        return etag
+
     def complete_multipart_upload(
         self,
         object_name: str,
@@ -597,7 +735,10 @@ class MinIOClient:
         try:
             # 完成上传
             self.client._complete_multipart_upload(
-                self.bucket_name, object_name, upload_id, parts
+                self.bucket_name,
+                object_name,
+                upload_id,
+                [Part(part_number, etag) for part_number, etag in parts],
             )
             logger.info(
                 f"Completed multipart upload for {object_name}, total parts: {len(parts)}"
@@ -635,5 +776,289 @@ class MinIOClient:
             raise
 
 
+class MinIOOperationStats:
+    """单种MinIO操作的耗时统计（进程内）"""
+
+    # 计算分位数时保留的最近样本数
+    SAMPLE_SIZE = 1000
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.in_flight = 0
+        self._samples: deque = deque(maxlen=self.SAMPLE_SIZE)
+
+    def record(self, elapsed: float, error: bool):
+        self.count += 1
+        self.total_seconds += elapsed
+        self.max_seconds = max(self.max_seconds, elapsed)
+        self._samples.append(elapsed)
+        if error:
+            self.errors += 1
+
+    def to_dict(self) -> dict:
+        samples = sorted(self._samples)
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "avg_ms": round(self.total_seconds / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": round(percentile(0.5) * 1000, 2),
+            "p95_ms": round(percentile(0.95) * 1000, 2),
+            "p99_ms": round(percentile(0.99) * 1000, 2),
+            "max_ms": round(self.max_seconds * 1000, 2),
+        }
+
+
+class AsyncMinIOClient:
+    """
+    MinIOClient 的异步门面
+
+    所有阻塞调用在专用的有界线程池中执行，线程数即最大并发数，
+    超出的调用在线程池队列中等待，不会占用事件循环或默认线程池。
+    """
+
+    def __init__(self, sync_client: MinIOClient, max_workers: int):
+        self._sync = sync_client
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._stats: dict[str, MinIOOperationStats] = {}
+
+    @property
+    def bucket_name(self) -> str:
+        return self._sync.bucket_name
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers, thread_name_prefix="minio-io"
+                    )
+        return self._executor
+
+    async def run(self, operation: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在线程池中执行阻塞调用并记录耗时
+
+        Args:
+            operation: 操作名称（用于统计）
+            func: 要执行的同步函数
+        """
+        stats = self._stats.get(operation)
+        if stats is None:
+            stats = self._stats.setdefault(operation, MinIOOperationStats())
+
+        loop = asyncio.get_running_loop()
+        stats.in_flight += 1
+        start = time.perf_counter()
+        error = False
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(), partial(func, *args, **kwargs)
+            )
+        except Exception:
+            error = True
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.record(time.perf_counter() - start, error)
+
+    def get_stats(self) -> dict:
+        """获取各操作的调用次数、错误数和耗时分位数"""
+        return {
+            "max_workers": self._max_workers,
+            "operations": {
+                name: stats.to_dict() for name, stats in sorted(self._stats.items())
+            },
+        }
+
+    def get_file_url(self, object_name: str) -> str:
+        """获取文件的公共访问 URL（纯字符串拼接，无需线程池）"""
+        return self._sync.get_file_url(object_name)
+
+    async def upload_video(
+        self,
+        file: BinaryIO,
+        object_name: str,
+        content_type: str = "video/mp4",
+        metadata: Optional[dict] = None,
+    ) -> str:
+        return await self.run(
+            "upload_video", self._sync.upload_video, file, object_name, content_type, metadata
+        )
+
+    async def upload_image(
+        self, file: BinaryIO, object_name: str, content_type: str = "image/jpeg"
+    ) -> str:
+        return await self.run(
+            "upload_image", self._sync.upload_image, file, object_name, content_type
+        )
+
+    async def upload_file(
+        self,
+        file_content: bytes,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        return await self.run(
+            "upload_file", self._sync.upload_file, file_content, object_name, content_type
+        )
+
+    async def upload_file_from_path(
+        self,
+        local_path: str,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+    ) -> str:
+        return await self.run(
+            "upload_file_from_path",
+            self._sync.upload_file_from_path,
+            local_path,
+            object_name,
+            content_type,
+        )
+
+    async def upload_subtitle(
+        self, file: BinaryIO, video_id: int, language: str, format: str = "vtt"
+    ) -> str:
+        return await self.run(
+            "upload_subtitle", self._sync.upload_subtitle, file, video_id, language, format
+        )
+
+    async def delete_subtitle(
+        self, video_id: int, language: str, format: str = "vtt"
+    ) -> bool:
+        return await self.run(
+            "delete_subtitle", self._sync.delete_subtitle, video_id, language, format
+        )
+
+    async def get_presigned_url(
+        self, object_name: str, expires: timedelta = timedelta(hours=1)
+    ) -> str:
+        return await self.run(
+            "get_presigned_url", self._sync.get_presigned_url, object_name, expires
+        )
+
+    async def get_object_size(self, object_name: str) -> int:
+        return await self.run("get_object_size", self._sync.get_object_size, object_name)
+
+    async def get_file(self, object_name: str) -> bytes:
+        return await self.run("get_file", self._sync.get_file, object_name)
+
+    async def delete_file(self, object_name: str) -> bool:
+        return await self.run("delete_file", self._sync.delete_file, object_name)
+
+    async def file_exists(self, object_name: str) -> bool:
+        return await self.run("file_exists", self._sync.file_exists, object_name)
+
+    async def download_file(self, object_name: str, local_path: str) -> bool:
+        return await self.run(
+            "download_file", self._sync.download_file, object_name, local_path
+        )
+
+    async def create_multipart_upload(
+        self,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        metadata: Optional[dict] = None,
+    ) -> str:
+        return await self.run(
+            "create_multipart_upload",
+            self._sync.create_multipart_upload,
+            object_name,
+            content_type,
+            metadata,
+        )
+
+    async def upload_part(
+        self, object_name: str, upload_id: str, part_number: int, data: bytes
+    ) -> str:
+        return await self.run(
+            "upload_part", self._sync.upload_part, object_name, upload_id, part_number, data
+        )
+
+    async def upload_part_stream(
+        self,
+        object_name: str,
+        upload_id: str,
+        part_number: int,
+        stream: BinaryIO,
+        length: int,
+        content_md5: Optional[str] = None,
+    ) -> str:
+        return await self.run(
+            "upload_part_stream",
+            self._sync.upload_part_stream,
+            object_name,
+            upload_id,
+            part_number,
+            stream,
+            length,
+            content_md5,
+        )
+
+    async def get_presigned_part_urls(
+        self,
+        object_name: str,
+        upload_id: str,
+        part_numbers: list,
+        expires: timedelta = timedelta(hours=1),
+    ) -> dict:
+        def sign_all() -> dict:
+            return {
+                part_number: self._sync.get_presigned_part_url(
+                    object_name, upload_id, part_number, expires
+                )
+                for part_number in part_numbers
+            }
+
+        # 签名本身是本地计算，但首次调用需要查询 bucket 所在区域
+        return await self.run("get_presigned_part_urls", sign_all)
+
+    async def list_parts(self, object_name: str, upload_id: str) -> list:
+        return await self.run(
+            "list_parts", self._sync.list_parts, object_name, upload_id
+        )
+
+    async def complete_multipart_upload(
+        self, object_name: str, upload_id: str, parts: list
+    ) -> str:
+        return await self.run(
+            "complete_multipart_upload",
+            self._sync.complete_multipart_upload,
+            object_name,
+            upload_id,
+            parts,
+        )
+
+    async def abort_multipart_upload(self, object_name: str, upload_id: str) -> None:
+        return await self.run(
+            "abort_multipart_upload",
+            self._sync.abort_multipart_upload,
+            object_name,
+            upload_id,
+        )
+
+    async def remove_object(self, object_name: str) -> None:
+        """直接删除对象（失败时抛出 S3Error）"""
+        return await self.run(
+            "remove_object",
+            lambda: self._sync.client.remove_object(self.bucket_name, object_name),
+        )
+
+
 # 创建全局实例
 minio_client = MinIOClient()
+
+# 异步门面（async 接口中使用）
+async_minio_client = AsyncMinIOClient(minio_client, settings.MINIO_IO_WORKERS)
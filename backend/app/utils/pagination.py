@@ -0,0 +1,139 @@
+"""
+游标（keyset）分页工具
+按 (排序键, id) 定位下一页，避免 OFFSET 在深分页时扫描并丢弃前面所有行
+
+用法：
+    cursor 参数为 None 时使用原有的页码分页；
+    传空字符串表示游标分页的第一页，之后传上一页返回的 next_cursor。
+"""
+
+import base64
+import binascii
+import math
+from typing import Any, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.selectable import Select
+
+from app.utils.cache import json_deserializer, json_serializer
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """
+    编码游标
+
+    Args:
+        sort_value: 最后一行的排序键值（支持datetime/Decimal）
+        row_id: 最后一行的id
+
+    Returns:
+        URL安全的游标字符串
+    """
+    raw = json_serializer([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Any, int]:
+    """
+    解码游标
+
+    Raises:
+        HTTPException: 游标格式无效
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json_deserializer(base64.urlsafe_b64decode(padded))
+        return sort_value, int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def apply_keyset(
+    query: Select,
+    sort_column: ColumnElement,
+    id_column: ColumnElement,
+    cursor: Optional[str],
+    page_size: int,
+) -> Select:
+    """
+    为查询添加降序keyset条件、排序和limit
+
+    会替换查询上已有的排序；多取一行用于判断是否还有下一页。
+
+    Args:
+        query: SQLAlchemy查询对象
+        sort_column: 排序键（不可为NULL的列或表达式）
+        id_column: 主键列，作为排序键相同时的决胜条件
+        cursor: 上一页返回的游标，空字符串表示第一页
+        page_size: 每页数量
+
+    Returns:
+        添加了keyset条件的查询对象
+    """
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                sort_column < sort_value,
+                and_(sort_column == sort_value, id_column < last_id),
+            )
+        )
+
+    return (
+        query.order_by(None)
+        .order_by(sort_column.desc(), id_column.desc())
+        .limit(page_size + 1)
+    )
+
+
+def build_keyset_page(
+    rows: Sequence[Any], page_size: int, sort_key: Any
+) -> tuple[Sequence[Any], Optional[str]]:
+    """
+    截取当前页并生成下一页游标
+
+    Args:
+        rows: apply_keyset 查询返回的行（最多 page_size + 1 行）
+        page_size: 每页数量
+        sort_key: 从行对象取排序键值的函数
+
+    Returns:
+        (当前页的行, 下一页游标)；没有下一页时游标为None
+    """
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(sort_key(last), last.id)
+
+
+async def estimate_row_count(db: AsyncSession, table_name: str) -> int:
+    """
+    从 pg_class.reltuples 读取表行数估计值（由 ANALYZE/autovacuum 维护）
+
+    代价为常数，适合无限滚动场景下展示大致总数。
+    """
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": table_name},
+    )
+    estimate = result.scalar()
+    return max(int(estimate or 0), 0)
+
+
+def page_count(total: Optional[int], page_size: int) -> Optional[int]:
+    """
+    根据总数计算页数
+
+    Returns:
+        页数；total 为None（游标分页未统计总数）时返回None
+    """
+    if total is None:
+        return None
+    return math.ceil(total / page_size) if page_size > 0 and total > 0 else 0
@@ -1,24 +1,200 @@
 """
 权限验证工具模块
 提供便捷的权限检查装饰器和工具函数
+
+权限解析分两级缓存：
+- Redis: admin_permissions:{id} 保存管理员的原始权限代码（30分钟）
+- 进程内: 编译后的权限集合（通配符已按权限表展开，检查结果逐条缓存），
+  带全局版本号。角色/权限变更时版本号加一并通过pub/sub广播，
+  各worker收到后丢弃旧的编译结果；稳定状态下权限检查不产生任何I/O。
+  订阅未就绪（如Celery进程、连接断开）时每次都回到Redis读取。
 """
 
-from typing import List, Set
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
 from fastapi import Depends, HTTPException, status
+from loguru import logger
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.database import get_db
 from app.models.user import AdminUser
-from app.models.admin import Role, RolePermission
+from app.models.admin import Permission, Role, RolePermission
 from app.utils.dependencies import get_current_admin_user
 from app.utils.cache import get_redis
-import json
 
 
 # ========== 权限缓存 ==========
 
+# Redis中权限缓存的时间，也是进程内编译结果的最长存活时间（秒）
+PERMISSION_CACHE_TTL = 1800
+
+# 全局权限版本号及其变更广播频道
+PERMISSION_VERSION_KEY = "rbac:permissions_version"
+PERMISSION_VERSION_CHANNEL = "rbac:permissions_changed"
+
+
+class CompiledPermissions:
+    """
+    编译后的管理员权限
+
+    通配符模式（video.*、*.read）按权限表展开为具体代码；
+    权限表中不存在的代码仍按模块级通配符匹配。每个代码的检查结果只计算一次。
+    """
+
+    def __init__(self, codes: Set[str], all_permissions: List[str], version: int):
+        self.codes = frozenset(codes)
+        self.is_all = "*" in codes
+        granted: Set[str] = set()
+        for code in codes:
+            granted.update(parse_permission_pattern(code, all_permissions))
+        self.granted = frozenset(granted)
+        self.modules = frozenset(c[:-2] for c in codes if c.endswith(".*"))
+        self.version = version
+        self.compiled_at = time.monotonic()
+        self._results: Dict[str, bool] = {}
+
+    def allows(self, permission_code: str) -> bool:
+        """是否拥有指定权限"""
+        allowed = self._results.get(permission_code)
+        if allowed is None:
+            allowed = (
+                self.is_all
+                or permission_code in self.granted
+                or permission_code.split(".")[0] in self.modules
+            )
+            self._results[permission_code] = allowed
+        return allowed
+
+
+# 当前worker已知的权限版本号，None 表示订阅未就绪
+_permission_version: Optional[int] = None
+# 管理员ID -> 编译后的权限
+_compiled_permissions: Dict[int, CompiledPermissions] = {}
+# (版本号, 权限表中的全部代码)，用于展开通配符
+_permission_codes: Optional[Tuple[int, List[str]]] = None
+
+
+def get_permissions_version() -> Optional[int]:
+    """
+    当前worker已知的RBAC版本号
+
+    其他基于角色配置的进程内缓存（如数据范围）以此为版本戳；
+    返回None表示订阅未就绪，此时不应在进程内缓存。
+    """
+    return _permission_version
+
+
+def _apply_permission_version(version: int):
+    """切换到新的权限版本，丢弃旧版本的编译结果"""
+    global _permission_version, _permission_codes
+    if _permission_version is not None and version <= _permission_version:
+        return
+    _permission_version = version
+    _permission_codes = None
+    _compiled_permissions.clear()
+
+
+async def _get_permission_codes(db: AsyncSession, version: int) -> List[str]:
+    """权限表中的全部代码（按版本号缓存在进程内）"""
+    global _permission_codes
+    if _permission_codes is not None and _permission_codes[0] == version:
+        return _permission_codes[1]
+
+    result = await db.execute(select(Permission.code))
+    codes = [row[0] for row in result.all()]
+    if _permission_version == version:
+        _permission_codes = (version, codes)
+    return codes
+
+
+async def get_admin_compiled_permissions(
+    admin_id: int, db: AsyncSession
+) -> CompiledPermissions:
+    """
+    获取管理员编译后的权限
+
+    进程内结果的版本号与当前版本一致且未超过 PERMISSION_CACHE_TTL 时直接返回；
+    否则从 get_admin_permissions_cached 重新加载并编译。
+    """
+    version = _permission_version
+    if version is not None:
+        compiled = _compiled_permissions.get(admin_id)
+        if (
+            compiled is not None
+            and compiled.version == version
+            and time.monotonic() - compiled.compiled_at < PERMISSION_CACHE_TTL
+        ):
+            return compiled
+
+    codes = await get_admin_permissions_cached(admin_id, db)
+    all_permissions: List[str] = []
+    if any("*" in code for code in codes) and "*" not in codes:
+        all_permissions = await _get_permission_codes(db, version or 0)
+    compiled = CompiledPermissions(codes, all_permissions, version or 0)
+
+    # 加载期间版本发生变化时，结果可能已过期，不放入缓存
+    if version is not None and _permission_version == version:
+        _compiled_permissions[admin_id] = compiled
+    return compiled
+
+
+async def bump_permissions_version():
+    """权限版本号加一并广播，各worker丢弃编译后的权限"""
+    try:
+        redis = await get_redis()
+        version = await redis.incr(PERMISSION_VERSION_KEY)
+        await redis.publish(PERMISSION_VERSION_CHANNEL, version)
+        # 本worker立即生效，不等待广播回环
+        if _permission_version is not None:
+            _apply_permission_version(version)
+    except Exception as e:
+        logger.warning(f"Permission version bump error: {e}")
+
+
+async def start_permission_version_listener():
+    """
+    订阅权限版本变更（应用启动时作为后台任务运行）
+
+    先订阅再读取当前版本号，期间发生的变更不会遗漏。
+    连接断开时回到不缓存编译结果的状态，重连后重新读取版本号。
+    """
+    global _permission_version
+
+    while True:
+        pubsub = None
+        try:
+            redis = await get_redis()
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(PERMISSION_VERSION_CHANNEL)
+            _apply_permission_version(int(await redis.get(PERMISSION_VERSION_KEY) or 0))
+            logger.info("Permission version listener subscribed")
+
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    try:
+                        _apply_permission_version(int(message["data"]))
+                    except (TypeError, ValueError):
+                        continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Permission version listener error: {e}")
+        finally:
+            _permission_version = None
+            _compiled_permissions.clear()
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+        await asyncio.sleep(5)
+
 
 async def get_admin_permissions_cached(admin_id: int, db: AsyncSession) -> Set[str]:
     """
@@ -63,7 +239,9 @@ async def get_admin_permissions_cached(admin_id: int, db: AsyncSession) -> Set[s
     # 缓存30分钟
     try:
         redis = await get_redis()
-        await redis.setex(cache_key, 1800, json.dumps(list(permissions)))
+        await redis.setex(
+            cache_key, PERMISSION_CACHE_TTL, json.dumps(list(permissions))
+        )
     except Exception:
         pass
 
@@ -77,6 +255,7 @@ async def invalidate_admin_permissions_cache(admin_id: int):
         await redis.delete(f"admin_permissions:{admin_id}")
     except Exception:
         pass
+    await bump_permissions_version()
 
 
 async def invalidate_role_permissions_cache(role_id: int, db: AsyncSession):
@@ -95,6 +274,7 @@ async def invalidate_role_permissions_cache(role_id: int, db: AsyncSession):
             await redis.delete(*cache_keys)
     except Exception:
         pass
+    await bump_permissions_version()
 
 
 # ========== 权限检查函数 ==========
@@ -120,23 +300,9 @@ async def check_admin_has_permission(
     if admin.is_superadmin:
         return True
 
-    # 获取管理员权限(带缓存)
-    permissions = await get_admin_permissions_cached(admin.id, db)
-
-    # 通配符权限
-    if "*" in permissions:
-        return True
-
-    # 精确匹配
-    if permission_code in permissions:
-        return True
-
-    # 模块级通配符 (如 video.* 匹配 video.create)
-    module = permission_code.split(".")[0]
-    if f"{module}.*" in permissions:
-        return True
-
-    return False
+    # 获取编译后的权限(带缓存)，精确匹配与通配符均已展开
+    permissions = await get_admin_compiled_permissions(admin.id, db)
+    return permissions.allows(permission_code)
 
 
 async def check_admin_has_any_permission(
@@ -190,35 +356,20 @@ def require_permission(*permission_codes: str):
             return current_admin
 
         # 获取管理员权限
-        permissions = await get_admin_permissions_cached(current_admin.id, db)
+        permissions = await get_admin_compiled_permissions(current_admin.id, db)
 
         # 检查是否有角色
-        if not permissions:
+        if not permissions.codes:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="您没有任何角色权限，无法执行此操作"
             )
 
-        # 检查所需权限
-        required_permissions = set(permission_codes)
-
-        # 通配符权限
-        if "*" in permissions:
-            return current_admin
-
         # 检查每个所需权限
-        missing_permissions = []
-        for required in required_permissions:
-            # 精确匹配
-            if required in permissions:
-                continue
-
-            # 模块级通配符
-            module = required.split(".")[0]
-            if f"{module}.*" in permissions:
-                continue
-
-            missing_permissions.append(required)
+        missing_permissions = [
+            required for required in set(permission_codes)
+            if not permissions.allows(required)
+        ]
 
         if missing_permissions:
             raise HTTPException(
@@ -245,26 +396,17 @@ def require_any_permission(*permission_codes: str):
         if current_admin.is_superadmin:
             return current_admin
 
-        permissions = await get_admin_permissions_cached(current_admin.id, db)
+        permissions = await get_admin_compiled_permissions(current_admin.id, db)
 
-        if not permissions:
+        if not permissions.codes:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="您没有任何角色权限"
             )
 
-        # 通配符
-        if "*" in permissions:
-            return current_admin
-
         # 检查是否有任一权限
-        for required in permission_codes:
-            if required in permissions:
-                return current_admin
-
-            module = required.split(".")[0]
-            if f"{module}.*" in permissions:
-                return current_admin
+        if any(permissions.allows(required) for required in permission_codes):
+            return current_admin
 
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
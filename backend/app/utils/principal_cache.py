@@ -0,0 +1,166 @@
+"""
+已认证用户（principal）缓存
+
+认证依赖每次请求都要检查token黑名单并按ID查询用户。这里把用户行的
+列快照缓存在Redis中（短TTL），命中时不访问数据库：
+- 黑名单检查、token版本号和缓存快照在一次pipeline往返中取回；
+  本地撤销过滤器判定token未撤销时，pipeline中省去黑名单查询
+- 快照记录写入时的token版本号，revoke_all_user_tokens 增加版本号后旧快照自动失效
+- User/AdminUser 被修改或删除并提交后（封禁、停用、角色变更、改密码等）删除对应快照
+- 命中时用 session.merge(load=False) 把快照挂到当前会话，
+  返回的仍是ORM对象，端点可以照常修改并提交，不会产生额外的SELECT
+- 快照不含凭据列（密码哈希、TOTP密钥、备用码、OAuth ID），这些属性在命中时
+  处于未加载状态；需要读取它们的端点（改密码、2FA验证等）应显式加载：
+  await db.refresh(current_user, ["hashed_password"])
+"""
+
+from typing import Any, Dict, Optional, Tuple, Type
+
+from loguru import logger
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.config import settings
+from app.models.user import AdminUser, User
+from app.utils.cache import (
+    get_redis,
+    json_deserializer,
+    json_serializer,
+    register_commit_invalidation,
+)
+from app.utils.token_blacklist import (
+    get_token_hash,
+    might_be_blacklisted,
+    record_filter_confirmation,
+)
+
+PRINCIPAL_CACHE_PREFIX = "auth_principal:"
+
+_PRINCIPAL_MODELS = (User, AdminUser)
+
+# 不写入Redis快照的凭据列
+CREDENTIAL_COLUMNS = frozenset(
+    {"hashed_password", "totp_secret", "backup_codes", "oauth_id"}
+)
+
+
+def principal_cache_key(model: Type, principal_id: int) -> str:
+    """快照缓存键，如 auth_principal:users:1"""
+    return f"{PRINCIPAL_CACHE_PREFIX}{model.__tablename__}:{principal_id}"
+
+
+def snapshot_principal(principal: Any) -> Dict[str, Any]:
+    """提取ORM对象已加载的列属性（不含关系和凭据列，不触发加载）"""
+    state = inspect(principal)
+    return {
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict and attr.key not in CREDENTIAL_COLUMNS
+    }
+
+
+def restore_principal(model: Type, data: Dict[str, Any]) -> Any:
+    """由快照重建游离（detached）状态的ORM对象，属性视为已从数据库加载"""
+    principal = model(**data)
+    make_transient_to_detached(principal)
+    return principal
+
+
+async def resolve_principal(
+    db: AsyncSession, model: Type, principal_id: int, token: str
+) -> Tuple[bool, Optional[Any]]:
+    """
+    检查token并获取对应的用户
+
+    Args:
+        db: 数据库会话（只在缓存未命中时查询）
+        model: User 或 AdminUser
+        principal_id: token中的用户ID
+        token: JWT token
+
+    Returns:
+        (token是否已撤销, 用户对象或None)；Redis出错时按已撤销处理
+    """
+    key = principal_cache_key(model, principal_id)
+    token_hash = get_token_hash(token)
+    check_blacklist = might_be_blacklisted(token_hash)
+    try:
+        client = await get_redis()
+        pipe = client.pipeline(transaction=False)
+        pipe.get(f"user_token_version:{principal_id}")
+        pipe.get(key)
+        if check_blacklist:
+            pipe.exists(f"token_blacklist:{token_hash}")
+        version, cached, *blacklisted = await pipe.execute()
+    except Exception as e:
+        logger.error(f"Check token blacklist error: {e}", exc_info=True)
+        # 安全起见，如果Redis出错，拒绝token
+        return True, None
+
+    if check_blacklist:
+        record_filter_confirmation(token_hash, bool(blacklisted[0]))
+        if blacklisted[0]:
+            return True, None
+
+    version = int(version) if version else 0
+    if cached:
+        try:
+            entry = json_deserializer(cached)
+            if entry.get("version") == version:
+                principal = restore_principal(model, entry["data"])
+                return False, await db.merge(principal, load=False)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable principal snapshot {key}: {e}")
+
+    result = await db.execute(select(model).filter(model.id == principal_id))
+    principal = result.scalar_one_or_none()
+    if principal is not None:
+        try:
+            await client.setex(
+                key,
+                settings.AUTH_PRINCIPAL_CACHE_TTL,
+                json_serializer(
+                    {"version": version, "data": snapshot_principal(principal)}
+                ),
+            )
+        except Exception as e:
+            logger.error(f"Principal cache set error for key {key}: {e}")
+    return False, principal
+
+
+async def invalidate_principals(*keys: str) -> int:
+    """
+    删除用户快照
+
+    Args:
+        keys: principal_cache_key 生成的缓存键
+
+    Returns:
+        删除的数量
+    """
+    if not keys:
+        return 0
+    try:
+        client = await get_redis()
+        return await client.delete(*keys)
+    except Exception as e:
+        logger.error(f"Principal cache invalidation error: {e}", exc_info=True)
+        return 0
+
+
+def _collect_principal_changes(session: Session):
+    """本次flush中被修改或删除的用户的快照键"""
+    return [
+        principal_cache_key(type(obj), obj.id)
+        for obj in (*session.dirty, *session.deleted)
+        if isinstance(obj, _PRINCIPAL_MODELS) and obj.id is not None
+    ]
+
+
+# 提交后删除被修改用户的快照
+register_commit_invalidation(
+    "principal_cache",
+    _collect_principal_changes,
+    lambda keys: invalidate_principals(*keys),
+)
@@ -16,8 +16,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.user_activity import Favorite, WatchHistory
-from app.models.video import Video, VideoStatus
+from app.models.video import Video, VideoSimilarity, VideoStatus
+from app.schemas.video import VideoListResponse
 from app.utils.cache import Cache
+from app.utils.collaborative_filtering import get_cf_model
+from app.utils.video_summary import get_video_summaries
+
+# 索引未覆盖时在线计算的相似视频数量
+SIMILAR_FALLBACK_SIZE = 20
+
+# 推荐ID列表比请求数量多缓存的条数，用于过滤 exclude_video_ids 和已下架视频
+RECOMMENDATION_POOL_PADDING = 20
 
 
 class RecommendationEngine:
@@ -31,87 +40,140 @@ class RecommendationEngine:
         user_id: Optional[int],
         limit: int = 20,
         exclude_video_ids: Optional[List[int]] = None,
-    ) -> List[Video]:
+    ) -> List[VideoListResponse]:
         """
         获取个性化推荐
 
         策略：
         - 如果用户已登录：60% 协同过滤 + 40% 内容推荐
         - 如果用户未登录：100% 热门推荐
+
+        缓存中只保存有序的视频ID列表（多算一些以便按 exclude_video_ids 过滤），
+        返回前通过视频摘要缓存批量补全。
         """
-        exclude_ids = exclude_video_ids or []
+        exclude_ids = set(exclude_video_ids or [])
+        pool_size = limit + RECOMMENDATION_POOL_PADDING
 
         if user_id:
             # 已登录用户：个性化推荐
-            cache_key = f"personalized_recommendations:user_{user_id}:limit_{limit}"
-            cached = await Cache.get(cache_key)
-            if cached:
-                # 检查缓存数据类型,确保是Video对象而非字典
-                if len(cached) > 0 and isinstance(cached[0], Video):
-                    return cached
-                # 如果缓存数据类型不对或为空,清空缓存重新查询
-                cached = None
-
-            # 获取协同过滤推荐（基于相似用户）
-            collaborative_videos = (
-                await self._get_collaborative_filtering_recommendations(
-                    user_id, limit=int(limit * 0.6), exclude_ids=exclude_ids
-                )
+            async def load_ids() -> List[int]:
+                return await self._compute_personalized_ids(user_id, pool_size)
+
+            video_ids = await Cache.get_or_set(
+                f"personalized_video_ids:user_{user_id}:limit_{limit}",
+                load_ids,
+                ttl=600,
+                tags=["recommendations:personalized"],
             )
-            collaborative_ids = [v.id for v in collaborative_videos]
+        else:
+            # 未登录用户：热门推荐
+            async def load_ids() -> List[int]:
+                popular_videos = await self._get_popular_videos(
+                    limit=pool_size, exclude_ids=[]
+                )
+                return [v.id for v in popular_videos]
 
-            # 获取内容推荐（基于用户历史）
-            content_videos = await self._get_content_based_recommendations(
-                user_id,
-                limit=int(limit * 0.4),
-                exclude_ids=exclude_ids + collaborative_ids,
+            video_ids = await Cache.get_or_set(
+                f"popular_video_ids:limit_{limit}",
+                load_ids,
+                ttl=900,
+                tags=["list:videos"],
             )
 
-            # 合并结果
-            recommended_videos = collaborative_videos + content_videos
+        video_ids = [v for v in video_ids if v not in exclude_ids]
+        summaries = await get_video_summaries(self.db, video_ids)
+        return summaries[:limit]
 
-            # 如果推荐不足，用热门视频补充
-            if len(recommended_videos) < limit:
-                popular_videos = await self._get_popular_videos(
-                    limit=limit - len(recommended_videos),
-                    exclude_ids=exclude_ids + [v.id for v in recommended_videos],
-                )
-                recommended_videos.extend(popular_videos)
+    async def _compute_personalized_ids(self, user_id: int, limit: int) -> List[int]:
+        """计算个性化推荐的视频ID（有序）"""
+        # 获取协同过滤推荐（基于相似用户）
+        recommended_ids = await self._get_collaborative_filtering_recommendations(
+            user_id, limit=int(limit * 0.6), exclude_ids=[]
+        )
 
-            # 注意：不缓存ORM对象
-            # await Cache.set(cache_key, recommended_videos[:limit], ttl=600)
-            return recommended_videos[:limit]
+        # 获取内容推荐（基于用户历史）
+        content_videos = await self._get_content_based_recommendations(
+            user_id, limit=int(limit * 0.4), exclude_ids=list(recommended_ids)
+        )
+        recommended_ids.extend(v.id for v in content_videos)
 
-        else:
-            # 未登录用户：热门推荐
-            return await self._get_popular_videos(limit=limit, exclude_ids=exclude_ids)
+        # 如果推荐不足，用热门视频补充
+        if len(recommended_ids) < limit:
+            popular_videos = await self._get_popular_videos(
+                limit=limit - len(recommended_ids), exclude_ids=list(recommended_ids)
+            )
+            recommended_ids.extend(v.id for v in popular_videos)
+
+        return recommended_ids[:limit]
 
     async def get_similar_videos(
         self,
         video_id: int,
         limit: int = 10,
         exclude_video_ids: Optional[List[int]] = None,
-    ) -> List[Video]:
+    ) -> List[VideoListResponse]:
         """
         获取相似视频推荐
 
+        优先读取离线构建的相似视频索引（按主键查询一行），
+        索引中还没有该视频时（如刚发布的视频）回退到在线打分。
+        缓存中只保存ID列表，返回前通过视频摘要缓存批量补全。
+        """
+
+        async def load_ids() -> List[int]:
+            result = await self.db.execute(
+                select(VideoSimilarity.similar_ids).filter(
+                    VideoSimilarity.video_id == video_id
+                )
+            )
+            similar_ids = result.scalar_one_or_none()
+            if similar_ids is None:
+                similar_ids = await self._compute_similar_video_ids(
+                    video_id, SIMILAR_FALLBACK_SIZE
+                )
+            return list(similar_ids)
+
+        similar_ids = await Cache.get_or_set(
+            f"similar_video_ids:video_{video_id}",
+            load_ids,
+            ttl=1800,
+            tags=["similar:videos", f"video:{video_id}"],
+        )
+
+        exclude_ids = set(exclude_video_ids or [])
+        exclude_ids.add(video_id)
+        candidate_ids = [v for v in similar_ids if v not in exclude_ids]
+        summaries = await get_video_summaries(self.db, candidate_ids[: limit * 2])
+        return summaries[:limit]
+
+    async def _filter_published_ids(
+        self, video_ids: List[int], limit: int
+    ) -> List[int]:
+        """保持给定顺序，只保留已发布视频的ID（只查询主键）"""
+        # 多取一些，以防部分视频已下架
+        video_ids = video_ids[: limit * 2]
+        if not video_ids:
+            return []
+
+        result = await self.db.execute(
+            select(Video.id).filter(
+                Video.id.in_(video_ids), Video.status == VideoStatus.PUBLISHED
+            )
+        )
+        published = set(result.scalars().all())
+        return [v for v in video_ids if v in published][:limit]
+
+    async def _compute_similar_video_ids(self, video_id: int, limit: int) -> List[int]:
+        """
+        在线计算相似视频（索引未覆盖时的回退路径）
+
         基于：
         - 相同分类
         - 相同演员/导演
         - 相同国家
         - 相似评分
         """
-        cache_key = f"similar_videos:video_{video_id}:limit_{limit}"
-        cached = await Cache.get(cache_key)
-        if cached:
-            # 检查缓存数据类型,确保是Video对象而非字典
-            if len(cached) > 0 and isinstance(cached[0], Video):
-                return cached
-            # 如果缓存数据类型不对或为空,清空缓存重新查询
-            cached = None
-
-        exclude_ids = exclude_video_ids or []
-        exclude_ids.append(video_id)
+        exclude_ids = [video_id]
 
         # 获取目标视频信息
         result = await self.db.execute(
@@ -182,22 +244,24 @@ class RecommendationEngine:
 
         # 按相似度排序
         scored_videos.sort(key=lambda x: x[1], reverse=True)
-        similar_videos = [v for v, _ in scored_videos[:limit]]
-
-        # 注意：不缓存ORM对象
-        # await Cache.set(cache_key, similar_videos, ttl=1800)
-        return similar_videos
+        return [v.id for v, _ in scored_videos[:limit]]
 
     async def _get_collaborative_filtering_recommendations(
         self, user_id: int, limit: int, exclude_ids: List[int]
-    ) -> List[Video]:
+    ) -> List[int]:
         """
-        协同过滤推荐
+        协同过滤推荐（返回有序的视频ID，详情由调用方通过视频摘要缓存补全）
 
-        步骤：
+        优先使用离线训练的矩阵分解模型（内存中点积打分，不访问数据库）；
+        模型未训练或用户不在模型中（如新用户）时回退到SQL相似用户查询：
         1. 找到相似用户（有相似观看/评分/收藏行为的用户）
         2. 推荐这些用户喜欢但当前用户未看过的视频
         """
+        model = get_cf_model()
+        if model is not None and model.has_user(user_id):
+            video_ids = model.recommend(user_id, limit * 2, exclude_ids)
+            return await self._filter_published_ids(video_ids, limit)
+
         # 获取当前用户的行为数据
         user_watched_result = await self.db.execute(
             select(WatchHistory.video_id).filter(WatchHistory.user_id == user_id)
@@ -250,24 +314,7 @@ class RecommendationEngine:
             row[0] for row in recommended_video_ids_result.fetchall()
         ]
 
-        # 获取视频详情
-        if not recommended_video_ids:
-            return []
-
-        from app.models.video import VideoCategory
-
-        result = await self.db.execute(
-            select(Video)
-            .options(
-                selectinload(Video.country),
-                selectinload(Video.video_categories).selectinload(VideoCategory.category)
-            )
-            .filter(
-                Video.id.in_(recommended_video_ids),
-                Video.status == VideoStatus.PUBLISHED,
-            )
-        )
-        return list(result.scalars().all())
+        return await self._filter_published_ids(recommended_video_ids, limit)
 
     async def _get_content_based_recommendations(
         self, user_id: int, limit: int, exclude_ids: List[int]
@@ -0,0 +1,180 @@
+"""
+相似视频索引（item-item）离线计算
+
+由 Celery 任务定期全量构建，结果按视频存为 top-K 的 (ID, 分数) 数组，
+在线请求只需按主键读取一行，不再逐次加载候选视频并在 Python 中打分。
+
+相似度由以下部分加权组成：
+- 分类/演员/导演的 Jaccard 重叠
+- 国家相同
+- 评分相近
+- 共同观看（同一用户看过两部视频）的余弦归一化计数
+"""
+
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# 各特征权重
+SIMILARITY_WEIGHTS = {
+    "category": 0.3,
+    "actor": 0.2,
+    "director": 0.15,
+    "country": 0.05,
+    "rating": 0.05,
+    "co_watch": 0.25,
+}
+
+# 每个视频保存的相似视频数量
+DEFAULT_TOP_K = 50
+
+# 倒排表单个特征最多保留的视频数（按热度），避免大分类产生 O(N²) 候选
+MAX_POSTING_SIZE = 500
+
+
+class VideoFeatures:
+    """参与相似度计算的视频特征"""
+
+    __slots__ = ("categories", "actors", "directors", "country_id", "rating")
+
+    def __init__(
+        self,
+        categories: Iterable[int] = (),
+        actors: Iterable[int] = (),
+        directors: Iterable[int] = (),
+        country_id: Optional[int] = None,
+        rating: Optional[float] = None,
+    ):
+        self.categories: Set[int] = set(categories)
+        self.actors: Set[int] = set(actors)
+        self.directors: Set[int] = set(directors)
+        self.country_id = country_id
+        self.rating = rating
+
+
+def _jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def similarity_score(
+    a: VideoFeatures, b: VideoFeatures, co_watch: float = 0.0
+) -> float:
+    """
+    计算两个视频的相似度
+
+    Args:
+        a: 视频A的特征
+        b: 视频B的特征
+        co_watch: 归一化后的共同观看强度（0~1）
+
+    Returns:
+        相似度分数（0~1）
+    """
+    score = _jaccard(a.categories, b.categories) * SIMILARITY_WEIGHTS["category"]
+    score += _jaccard(a.actors, b.actors) * SIMILARITY_WEIGHTS["actor"]
+    score += _jaccard(a.directors, b.directors) * SIMILARITY_WEIGHTS["director"]
+
+    if a.country_id and a.country_id == b.country_id:
+        score += SIMILARITY_WEIGHTS["country"]
+
+    if a.rating and b.rating:
+        # 评分满分为10分
+        rating_similarity = max(0.0, 1 - abs(a.rating - b.rating) / 10)
+        score += rating_similarity * SIMILARITY_WEIGHTS["rating"]
+
+    score += min(co_watch, 1.0) * SIMILARITY_WEIGHTS["co_watch"]
+    return score
+
+
+def normalize_co_watch(
+    pair_counts: Dict[Tuple[int, int], int], watcher_counts: Dict[int, int]
+) -> Dict[int, Dict[int, float]]:
+    """
+    将共同观看计数转为对称的余弦相似度邻接表
+
+    Args:
+        pair_counts: {(视频A, 视频B): 同时看过两者的用户数}
+        watcher_counts: {视频ID: 观看用户数}
+
+    Returns:
+        {视频ID: {相邻视频ID: 相似度}}
+    """
+    neighbors: Dict[int, Dict[int, float]] = defaultdict(dict)
+    for (a, b), count in pair_counts.items():
+        denom = math.sqrt(watcher_counts.get(a, 0) * watcher_counts.get(b, 0))
+        if not denom:
+            continue
+        value = count / denom
+        neighbors[a][b] = value
+        neighbors[b][a] = value
+    return neighbors
+
+
+def build_similarity_index(
+    features: Dict[int, VideoFeatures],
+    co_watch: Optional[Dict[int, Dict[int, float]]] = None,
+    popularity: Optional[Dict[int, int]] = None,
+    top_k: int = DEFAULT_TOP_K,
+    max_posting_size: int = MAX_POSTING_SIZE,
+) -> Dict[int, List[Tuple[int, float]]]:
+    """
+    为每个视频计算 top-K 相似视频
+
+    候选集来自分类/演员/导演倒排表和共同观看邻居的并集，
+    只对共享至少一个特征的视频对打分。
+
+    Args:
+        features: {视频ID: 特征}
+        co_watch: normalize_co_watch 的结果
+        popularity: {视频ID: 热度}，用于截断过长的倒排表
+        top_k: 每个视频保留的相似视频数
+        max_posting_size: 单个特征倒排表的最大长度
+
+    Returns:
+        {视频ID: [(相似视频ID, 分数), ...]}，按分数降序
+    """
+    co_watch = co_watch or {}
+    popularity = popularity or {}
+
+    # 构建倒排表，过长时只保留最热门的视频
+    postings: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+    for video_id, feats in features.items():
+        for value in feats.categories:
+            postings[("category", value)].append(video_id)
+        for value in feats.actors:
+            postings[("actor", value)].append(video_id)
+        for value in feats.directors:
+            postings[("director", value)].append(video_id)
+    for key, video_ids in postings.items():
+        if len(video_ids) > max_posting_size:
+            video_ids.sort(key=lambda v: popularity.get(v, 0), reverse=True)
+            postings[key] = video_ids[:max_posting_size]
+
+    index: Dict[int, List[Tuple[int, float]]] = {}
+    for video_id, feats in features.items():
+        candidates: Set[int] = set(co_watch.get(video_id, ()))
+        for value in feats.categories:
+            candidates.update(postings[("category", value)])
+        for value in feats.actors:
+            candidates.update(postings[("actor", value)])
+        for value in feats.directors:
+            candidates.update(postings[("director", value)])
+        candidates.discard(video_id)
+
+        neighbors = co_watch.get(video_id, {})
+        scored = []
+        for candidate_id in candidates:
+            candidate = features.get(candidate_id)
+            if candidate is None:
+                continue
+            score = similarity_score(feats, candidate, neighbors.get(candidate_id, 0.0))
+            if score > 0:
+                scored.append((candidate_id, round(score, 6)))
+
+        # 分数相同时热门视频优先
+        scored.sort(key=lambda x: (x[1], popularity.get(x[0], 0)), reverse=True)
+        index[video_id] = scored[:top_k]
+
+    return index
@@ -0,0 +1,272 @@
+"""
+单次解码批量生成缩略图
+- 一个 ffmpeg 进程同时输出：封面、N 张预览图、拖动预览雪碧图（sprite sheet）
+- 默认只解码关键帧 (-skip_frame nokey)，解码量与关键帧数量成正比，不必逐张 seek
+- 雪碧图配套 WebVTT 索引（#xywh= 片段），播放器据此显示进度条悬停预览
+
+上传后的对象（与 MinIOClient.upload_thumbnail 的命名一致）：
+    thumbnails/video_{id}_poster.jpg
+    thumbnails/video_{id}_preview_{n}.jpg
+    thumbnails/video_{id}_sprite_{n}.jpg
+    thumbnails/video_{id}_sprite.vtt       引用同目录下的雪碧图
+"""
+
+import logging
+import math
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 雪碧图单格尺寸与排列
+SPRITE_TILE_WIDTH = 160
+SPRITE_TILE_HEIGHT = 90
+SPRITE_COLUMNS = 10
+SPRITE_ROWS = 10
+
+# 雪碧图采样间隔下限（秒）与总格数上限，长视频自动加大间隔
+SPRITE_MIN_INTERVAL = 5
+SPRITE_MAX_TILES = 600
+
+
+def sprite_interval(
+    duration: float,
+    min_interval: float = SPRITE_MIN_INTERVAL,
+    max_tiles: int = SPRITE_MAX_TILES,
+) -> int:
+    """雪碧图采样间隔（整秒）：不小于 min_interval，且总格数不超过 max_tiles"""
+    return max(int(min_interval), math.ceil(duration / max_tiles))
+
+
+def preview_timestamps(duration: float, count: int) -> List[float]:
+    """预览图时间点：均匀分布，不取首尾；视频短于10秒时只取1张"""
+    if duration < 10:
+        count = 1
+    step = duration / (count + 1)
+    return [step * i for i in range(1, count + 1)]
+
+
+def _format_vtt_time(seconds: float) -> str:
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def build_sprite_vtt(
+    duration: float,
+    interval: float,
+    sheet_names: List[str],
+    tile_width: int = SPRITE_TILE_WIDTH,
+    tile_height: int = SPRITE_TILE_HEIGHT,
+    columns: int = SPRITE_COLUMNS,
+    rows: int = SPRITE_ROWS,
+) -> str:
+    """
+    生成雪碧图的 WebVTT 索引
+
+    第 k 格覆盖 [k*interval, (k+1)*interval)，按行优先排列在第 k // (columns*rows) 张图中
+
+    Args:
+        duration: 视频时长（秒）
+        interval: 采样间隔（秒）
+        sheet_names: 各张雪碧图的URL（可以是相对VTT文件的路径）
+
+    Returns:
+        WebVTT 文本
+    """
+    per_sheet = columns * rows
+    tiles = min(math.ceil(duration / interval), len(sheet_names) * per_sheet)
+    lines = ["WEBVTT", ""]
+    for k in range(tiles):
+        start = k * interval
+        end = min((k + 1) * interval, duration)
+        position = k % per_sheet
+        x = (position % columns) * tile_width
+        y = (position // columns) * tile_height
+        lines.append(f"{_format_vtt_time(start)} --> {_format_vtt_time(end)}")
+        lines.append(
+            f"{sheet_names[k // per_sheet]}#xywh={x},{y},{tile_width},{tile_height}"
+        )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _fit(width: int, height: int) -> str:
+    """缩放到指定尺寸内并补边居中"""
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
+    )
+
+
+def build_thumbnail_command(
+    input_path: Path,
+    output_dir: Path,
+    duration: float,
+    poster_time: float,
+    preview_count: int = 5,
+    poster_size: str = "1280x720",
+    keyframes_only: bool = True,
+) -> List[str]:
+    """
+    生成单次解码输出封面、预览图和雪碧图的ffmpeg命令
+
+    Args:
+        input_path: 输入视频
+        output_dir: 输出目录（poster.jpg / preview_01.jpg... / sprite_000.jpg...）
+        duration: 视频时长（秒）
+        poster_time: 封面时间点（秒），取该时间点之后的第一帧
+        preview_count: 预览图数量
+        poster_size: 封面和预览图尺寸
+        keyframes_only: 只解码关键帧（各图取时间点附近的关键帧）
+
+    Returns:
+        命令参数列表
+    """
+    width, height = (int(v) for v in poster_size.split("x"))
+    previews = preview_timestamps(duration, preview_count)
+    step = previews[0]
+    interval = sprite_interval(duration)
+
+    filter_graph = ";".join(
+        [
+            "[0:v]split=3[p][v][s]",
+            f"[p]select='gte(t\\,{poster_time:.3f})',{_fit(width, height)}[poster]",
+            # 从第一个时间点起，每隔 step 秒取一帧
+            f"[v]select='gte(t\\,{step:.3f})*(isnan(prev_selected_t)"
+            f"+gte(t-prev_selected_t\\,{step:.3f}))',{_fit(width, height)}[previews]",
+            f"[s]fps=1/{interval},{_fit(SPRITE_TILE_WIDTH, SPRITE_TILE_HEIGHT)},"
+            f"tile={SPRITE_COLUMNS}x{SPRITE_ROWS}[sprite]",
+        ]
+    )
+
+    cmd = ["ffmpeg", "-y"]
+    if keyframes_only:
+        cmd.extend(["-skip_frame", "nokey"])
+    cmd.extend(["-i", str(input_path), "-an", "-sn", "-filter_complex", filter_graph])
+    cmd.extend(
+        ["-map", "[poster]", "-frames:v", "1", "-q:v", "2"]
+        + [str(output_dir / "poster.jpg")]
+    )
+    cmd.extend(
+        ["-map", "[previews]", "-frames:v", str(len(previews))]
+        + ["-fps_mode", "passthrough", "-q:v", "2", "-start_number", "1"]
+        + [str(output_dir / "preview_%02d.jpg")]
+    )
+    cmd.extend(
+        ["-map", "[sprite]", "-fps_mode", "passthrough", "-q:v", "4"]
+        + ["-start_number", "0", str(output_dir / "sprite_%03d.jpg")]
+    )
+    return cmd
+
+
+def extract_thumbnail_set(
+    input_path: Path,
+    output_dir: Path,
+    duration: float,
+    poster_time: Optional[float] = None,
+    preview_count: int = 5,
+    poster_size: str = "1280x720",
+    keyframes_only: bool = True,
+) -> Dict:
+    """
+    一次解码生成封面、预览图和雪碧图
+
+    Args:
+        poster_time: 封面时间点，默认第5秒或10%位置（取较小值）
+        其余参数同 build_thumbnail_command
+
+    Returns:
+        {
+            'poster': Path,
+            'previews': [Path, ...],
+            'sprites': [Path, ...],
+            'interval': 10,   # 雪碧图采样间隔（秒）
+        }
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if poster_time is None:
+        poster_time = min(5.0, duration * 0.1)
+
+    cmd = build_thumbnail_command(
+        input_path,
+        output_dir,
+        duration,
+        poster_time,
+        preview_count,
+        poster_size,
+        keyframes_only,
+    )
+    logger.info(f"生成缩略图与雪碧图: {output_dir}")
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        logger.error(f"缩略图生成失败: {result.stderr[-2000:]}")
+        raise Exception(f"缩略图生成失败: {result.stderr[-2000:]}")
+
+    poster = output_dir / "poster.jpg"
+    if not poster.exists():
+        raise Exception(f"缩略图文件未生成: {poster}")
+
+    return {
+        "poster": poster,
+        "previews": sorted(output_dir.glob("preview_*.jpg")),
+        "sprites": sorted(output_dir.glob("sprite_*.jpg")),
+        "interval": sprite_interval(duration),
+    }
+
+
+def upload_thumbnail_set(
+    minio_client, video_id: int, thumbnails: Dict, duration: float, poster: bool = True
+) -> Dict:
+    """
+    上传缩略图和雪碧图索引
+
+    Args:
+        minio_client: MinIO客户端 (MinIOClient)
+        video_id: 视频ID
+        thumbnails: extract_thumbnail_set 的返回值
+        duration: 视频时长（秒）
+        poster: 是否上传封面
+
+    Returns:
+        {'poster_url': str 或 None, 'preview_urls': [...], 'sprite_vtt_url': str 或 None}
+    """
+    poster_url = None
+    if poster:
+        with open(thumbnails["poster"], "rb") as f:
+            poster_url = minio_client.upload_thumbnail(f, video_id, "poster")
+
+    preview_urls = []
+    for i, path in enumerate(thumbnails["previews"], start=1):
+        with open(path, "rb") as f:
+            url = minio_client.upload_thumbnail(f, video_id, f"preview_{i}")
+        preview_urls.append(url)
+
+    sprite_vtt_url = None
+    if thumbnails["sprites"]:
+        sheet_names = []
+        for i, path in enumerate(thumbnails["sprites"]):
+            with open(path, "rb") as f:
+                minio_client.upload_thumbnail(f, video_id, f"sprite_{i}")
+            # VTT与雪碧图在同一目录，使用相对路径
+            sheet_names.append(f"video_{video_id}_sprite_{i}.jpg")
+
+        vtt = build_sprite_vtt(duration, thumbnails["interval"], sheet_names)
+        # upload_file 返回对象名，转换为与图片一致的公开URL
+        vtt_object = minio_client.upload_file(
+            vtt.encode("utf-8"), f"thumbnails/video_{video_id}_sprite.vtt", "text/vtt"
+        )
+        sprite_vtt_url = minio_client.get_file_url(vtt_object)
+
+    logger.info(
+        f"缩略图已上传: video_id={video_id}, {len(preview_urls)} 张预览图, "
+        f"{len(thumbnails['sprites'])} 张雪碧图"
+    )
+    return {
+        "poster_url": poster_url,
+        "preview_urls": preview_urls,
+        "sprite_vtt_url": sprite_vtt_url,
+    }
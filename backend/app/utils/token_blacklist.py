@@ -1,10 +1,20 @@
 """
 JWT Token黑名单管理
 用于实现Token撤销功能（登出、密码修改、权限变更等场景）
+
+每个worker在内存中维护一个已撤销token哈希的布隆过滤器：
+- 启动时先订阅撤销广播，再扫描Redis中的黑名单重建过滤器
+- add_to_blacklist 写入Redis的同时广播，各worker收到后加入本地过滤器
+- 过滤器判定"一定不在黑名单"时直接放行，不访问Redis；
+  判定"可能在"时再由Redis确认（误判只多一次查询，不会误拒）
+- 订阅断开期间过滤器不可用，检查全部回退到Redis
 """
 
+import asyncio
 import hashlib
 import json
+import math
+import time
 from datetime import datetime
 from typing import Optional
 
@@ -38,6 +48,218 @@ def get_token_hash(token: str) -> str:
     return hashlib.sha256(token.encode()).hexdigest()
 
 
+# 撤销广播频道
+TOKEN_REVOCATION_CHANNEL = "token_blacklist:revoked"
+
+
+class RevocationBloomFilter:
+    """
+    已撤销token哈希的布隆过滤器
+
+    按容量和目标误判率计算位数组大小与哈希函数个数；token哈希本身
+    就是SHA-256，直接取其中两段做双重哈希，不再额外计算哈希。
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.num_bits = max(
+            8,
+            math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)),
+        )
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, token_hash: str):
+        h1 = int(token_hash[:16], 16)
+        h2 = int(token_hash[16:32], 16) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, token_hash: str):
+        """加入一个token哈希"""
+        for pos in self._positions(token_hash):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, token_hash: str) -> bool:
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7))
+            for pos in self._positions(token_hash)
+        )
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+    def estimated_error_rate(self) -> float:
+        """按当前条目数估算的误判率"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** (
+            self.num_hashes
+        )
+
+
+revocation_filter = RevocationBloomFilter(
+    settings.TOKEN_BLACKLIST_FILTER_CAPACITY,
+    settings.TOKEN_BLACKLIST_FILTER_ERROR_RATE,
+)
+
+# 过滤器是否与Redis同步（重建完成且订阅正常）
+_filter_ready = False
+_filter_rebuilt_at: Optional[float] = None
+
+# 当前worker的过滤器统计
+_filter_counters = {
+    "checks": 0,  # 经过过滤器的检查次数
+    "skipped": 0,  # 判定不在黑名单、省去Redis查询的次数
+    "positives": 0,  # 判定可能在黑名单、交给Redis确认的次数
+    "false_positives": 0,  # Redis确认不在黑名单的次数
+}
+
+
+def might_be_blacklisted(token_hash: str) -> bool:
+    """
+    本地判断token是否可能已被撤销
+
+    Args:
+        token_hash: get_token_hash 的结果
+
+    Returns:
+        False 表示一定未撤销；True 表示需要查询Redis确认
+        （过滤器未就绪时总是返回True）
+    """
+    if not _filter_ready:
+        return True
+    _filter_counters["checks"] += 1
+    if token_hash in revocation_filter:
+        _filter_counters["positives"] += 1
+        return True
+    _filter_counters["skipped"] += 1
+    return False
+
+
+def record_filter_confirmation(token_hash: str, blacklisted: bool):
+    """记录Redis对过滤器阳性结果的确认，用于统计实际误判率"""
+    if _filter_ready and not blacklisted and token_hash in revocation_filter:
+        _filter_counters["false_positives"] += 1
+
+
+async def rebuild_revocation_filter(client: redis.Redis) -> int:
+    """
+    扫描Redis中的黑名单重建过滤器
+
+    黑名单条目超过配置容量时按实际数量的两倍扩容，保持误判率。
+
+    Returns:
+        过滤器中的条目数
+    """
+    global revocation_filter, _filter_rebuilt_at
+    prefix = "token_blacklist:"
+    hashes = [
+        key[len(prefix) :]
+        async for key in client.scan_iter(match=f"{prefix}*", count=1000)
+        if len(key) == len(prefix) + 64
+    ]
+    capacity = max(settings.TOKEN_BLACKLIST_FILTER_CAPACITY, len(hashes) * 2)
+    new_filter = RevocationBloomFilter(
+        capacity, settings.TOKEN_BLACKLIST_FILTER_ERROR_RATE
+    )
+    for token_hash in hashes:
+        new_filter.add(token_hash)
+
+    revocation_filter = new_filter
+    _filter_rebuilt_at = time.time()
+    logger.info(
+        f"Token revocation filter rebuilt: {len(hashes)} entries, "
+        f"{new_filter.size_bytes} bytes"
+    )
+    return len(hashes)
+
+
+def _handle_revocation(data: str):
+    """处理撤销广播"""
+    if isinstance(data, str) and len(data) == 64:
+        revocation_filter.add(data)
+
+
+async def start_token_blacklist_listener():
+    """
+    维护已撤销token过滤器（应用启动时作为后台任务运行）
+
+    先订阅再重建，重建期间到达的广播缓存在订阅连接中，重建后依次应用，
+    不会遗漏。连接断开时过滤器标记为不可用，重连后重新扫描。
+    """
+    global _filter_ready
+    if not settings.TOKEN_BLACKLIST_FILTER_ENABLED:
+        return
+
+    from app.utils.cache import get_redis
+
+    while True:
+        pubsub = None
+        try:
+            client = await get_redis()
+            pubsub = client.pubsub()
+            await pubsub.subscribe(TOKEN_REVOCATION_CHANNEL)
+            await rebuild_revocation_filter(client)
+            _filter_ready = True
+
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                _handle_revocation(message["data"])
+                # 过滤器不支持删除，定期或超出容量时重建以剔除过期条目
+                if (
+                    time.time() - _filter_rebuilt_at
+                    >= settings.TOKEN_BLACKLIST_FILTER_REBUILD_INTERVAL
+                    or revocation_filter.count > revocation_filter.capacity
+                ):
+                    await rebuild_revocation_filter(client)
+        except asyncio.CancelledError:
+            _filter_ready = False
+            raise
+        except Exception as e:
+            logger.warning(f"Token blacklist listener error: {e}")
+        finally:
+            _filter_ready = False
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+        await asyncio.sleep(5)
+
+
+def get_revocation_filter_stats() -> dict:
+    """获取当前worker的撤销过滤器大小与误判统计"""
+    checks = _filter_counters["checks"]
+    return {
+        "enabled": settings.TOKEN_BLACKLIST_FILTER_ENABLED,
+        "ready": _filter_ready,
+        "entries": revocation_filter.count,
+        "capacity": revocation_filter.capacity,
+        "size_bytes": revocation_filter.size_bytes,
+        "num_hashes": revocation_filter.num_hashes,
+        "target_error_rate": revocation_filter.error_rate,
+        "estimated_error_rate": round(revocation_filter.estimated_error_rate(), 6),
+        "rebuilt_at": (
+            datetime.fromtimestamp(_filter_rebuilt_at).isoformat()
+            if _filter_rebuilt_at
+            else None
+        ),
+        **_filter_counters,
+        # 实际误判率：Redis确认未撤销的阳性次数 / 全部检查次数
+        "observed_error_rate": (
+            round(_filter_counters["false_positives"] / checks, 6) if checks else 0
+        ),
+        "skip_rate": (
+            round(_filter_counters["skipped"] / checks * 100, 2) if checks else 0
+        ),
+    }
+
+
 async def add_to_blacklist(
     token: str, reason: str = "logout", expires_in: Optional[int] = None
 ) -> bool:
@@ -60,16 +282,21 @@ async def add_to_blacklist(
         if expires_in is None:
             expires_in = settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600
 
-        # 存储到Redis，带过期时间
+        # 存储到Redis（带过期时间）并广播给各worker的过滤器，一次往返
         key = f"token_blacklist:{token_hash}"
-        await client.setex(
+        pipe = client.pipeline(transaction=True)
+        pipe.setex(
             key,
             expires_in,
             json.dumps(
                 {"reason": reason, "blacklisted_at": datetime.now().isoformat()}
             ),
         )
+        pipe.publish(TOKEN_REVOCATION_CHANNEL, token_hash)
+        await pipe.execute()
 
+        # 本worker立即生效，不等待广播回环
+        revocation_filter.add(token_hash)
         return True
     except Exception as e:
         logger.error(f"Add to token blacklist error: {e}", exc_info=True)
@@ -86,13 +313,17 @@ async def is_blacklisted(token: str) -> bool:
     Returns:
         是否在黑名单中
     """
+    token_hash = get_token_hash(token)
+    if not might_be_blacklisted(token_hash):
+        return False
+
     try:
         client = await get_redis_client()
-        token_hash = get_token_hash(token)
         key = f"token_blacklist:{token_hash}"
 
-        exists = await client.exists(key)
-        return exists > 0
+        exists = await client.exists(key) > 0
+        record_filter_confirmation(token_hash, exists)
+        return exists
     except Exception as e:
         logger.error(f"Check token blacklist error: {e}", exc_info=True)
         # 安全起见，如果Redis出错，拒绝token
@@ -0,0 +1,258 @@
+"""
+转码调度器
+- 主机级CPU核心预算：同一台机器上所有转码任务共享
+- 按分辨率分配编码线程数 (SVT-AV1 lp)
+- 低分辨率优先，尽早可以播放
+- 记录每个分辨率的耗时和编码帧率，用于容量规划
+
+核心预算通过锁文件实现：每个核心对应一个槽位文件，
+转码前用 flock 占住所需数量的槽位，进程退出（包括崩溃）时由内核自动释放。
+"""
+
+import fcntl
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 各分辨率的编码线程数（超过核心预算时按预算截断）
+RENDITION_THREADS = {
+    "360p": 2,
+    "480p": 2,
+    "720p": 4,
+    "1080p": 8,
+}
+
+# 调度顺序：分辨率从低到高
+RENDITION_ORDER = ["360p", "480p", "720p", "1080p"]
+
+
+def available_cores() -> int:
+    """当前进程可用的CPU核心数（考虑CPU亲和性）"""
+    if settings.TRANSCODE_CPU_CORES > 0:
+        return settings.TRANSCODE_CPU_CORES
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class CoreLease:
+    """已占用的核心槽位"""
+
+    def __init__(self, fds: List[int]):
+        self._fds = fds
+
+    @property
+    def cores(self) -> int:
+        return len(self._fds)
+
+    def release(self):
+        """释放槽位（可重复调用）"""
+        fds, self._fds = self._fds, []
+        for fd in fds:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class CoreBudget:
+    """主机级CPU核心预算"""
+
+    def __init__(self, total_cores: Optional[int] = None, lock_dir: Optional[str] = None):
+        self.total_cores = total_cores or available_cores()
+        self.lock_dir = Path(lock_dir or settings.TRANSCODE_LOCK_DIR)
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+
+    def try_acquire(self, cores: int) -> Optional[CoreLease]:
+        """
+        尝试占用指定数量的核心（不阻塞）
+
+        Args:
+            cores: 需要的核心数，超过预算时按预算截断
+
+        Returns:
+            成功返回 CoreLease，空闲核心不足返回 None
+        """
+        cores = max(1, min(cores, self.total_cores))
+        held: List[int] = []
+        for slot in range(self.total_cores):
+            fd = os.open(self.lock_dir / f"core_{slot}.lock", os.O_CREAT | os.O_RDWR, 0o666)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            held.append(fd)
+            if len(held) == cores:
+                return CoreLease(held)
+
+        # 不足时全部退还，避免占着部分槽位等待造成死锁
+        CoreLease(held).release()
+        return None
+
+    def acquire(
+        self,
+        cores: int,
+        cancelled: Optional[threading.Event] = None,
+        poll_interval: float = 1.0,
+    ) -> Optional[CoreLease]:
+        """
+        占用指定数量的核心，不足时等待
+
+        Args:
+            cores: 需要的核心数
+            cancelled: 置位后停止等待
+            poll_interval: 重试间隔（秒）
+
+        Returns:
+            CoreLease；等待被取消时返回 None
+        """
+        while True:
+            lease = self.try_acquire(cores)
+            if lease is not None:
+                return lease
+            if cancelled is not None:
+                if cancelled.wait(poll_interval):
+                    return None
+            else:
+                time.sleep(poll_interval)
+
+
+class RenditionResult:
+    """单个分辨率的转码结果与耗时统计"""
+
+    def __init__(
+        self,
+        resolution: str,
+        output,
+        threads: int,
+        wall_seconds: float,
+        frames: float = 0,
+    ):
+        self.resolution = resolution
+        self.output = output
+        self.threads = threads
+        self.wall_seconds = wall_seconds
+        self.fps = frames / wall_seconds if frames and wall_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "resolution": self.resolution,
+            "threads": self.threads,
+            "wall_seconds": round(self.wall_seconds, 2),
+            "fps": round(self.fps, 2),
+        }
+
+
+class TranscodeScheduler:
+    """按核心预算调度多个分辨率的转码"""
+
+    def __init__(self, budget: Optional[CoreBudget] = None):
+        self.budget = budget or CoreBudget()
+
+    def plan(self, resolutions: Sequence[str]) -> List[Tuple[str, int]]:
+        """
+        生成调度计划
+
+        Returns:
+            [(分辨率, 线程数), ...]，按分辨率从低到高
+        """
+
+        def order(resolution: str) -> int:
+            if resolution in RENDITION_ORDER:
+                return RENDITION_ORDER.index(resolution)
+            return len(RENDITION_ORDER)
+
+        return [
+            (res, min(RENDITION_THREADS.get(res, 2), self.budget.total_cores))
+            for res in sorted(resolutions, key=order)
+        ]
+
+    def run(
+        self,
+        resolutions: Sequence[str],
+        transcode: Callable[[str, int], object],
+        frames: float = 0,
+    ) -> Iterator[RenditionResult]:
+        """
+        按计划转码，每完成一个分辨率产出一个结果
+
+        按计划顺序依次申请核心，申请到才开始，因此低分辨率总是先开始；
+        结果在调用方线程中按完成顺序产出，调用方可以安全地更新数据库和进度。
+        任一分辨率失败时停止启动新的转码并抛出异常。
+
+        Args:
+            resolutions: 目标分辨率
+            transcode: transcode(分辨率, 线程数) -> 输出，在工作线程中执行
+            frames: 源视频总帧数，用于计算编码帧率
+
+        Yields:
+            RenditionResult
+        """
+        plan = self.plan(resolutions)
+        if not plan:
+            return
+
+        results: "queue.Queue" = queue.Queue()
+        cancelled = threading.Event()
+
+        def work(resolution: str, threads: int, lease: CoreLease):
+            started = time.monotonic()
+            try:
+                output = transcode(resolution, threads)
+                results.put(
+                    RenditionResult(
+                        resolution, output, threads, time.monotonic() - started, frames
+                    )
+                )
+            except BaseException as e:
+                results.put(e)
+            finally:
+                lease.release()
+
+        def dispatch(executor: ThreadPoolExecutor):
+            try:
+                for resolution, threads in plan:
+                    lease = self.budget.acquire(threads, cancelled)
+                    if lease is None:
+                        return
+                    if cancelled.is_set():
+                        lease.release()
+                        return
+                    logger.info(f"开始转码 {resolution} (lp={threads})")
+                    executor.submit(work, resolution, threads, lease)
+            except BaseException as e:
+                results.put(e)
+
+        with ThreadPoolExecutor(
+            max_workers=len(plan) + 1, thread_name_prefix="transcode"
+        ) as executor:
+            executor.submit(dispatch, executor)
+            try:
+                for _ in plan:
+                    item = results.get()
+                    if isinstance(item, BaseException):
+                        raise item
+                    logger.info(
+                        f"完成转码 {item.resolution}: 耗时 {item.wall_seconds:.1f}s, "
+                        f"{item.fps:.1f} fps, lp={item.threads}"
+                    )
+                    yield item
+            finally:
+                cancelled.set()
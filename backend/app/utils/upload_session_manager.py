@@ -1,6 +1,11 @@
 """
 上传会话管理器 - 使用 Redis 存储上传会话
 支持分布式部署和断点续传
+
+每个会话由三个键组成，分片上传只做 O(1) 的原子写入，多个分片可以并发上传：
+    upload_session:{id}  Hash，会话字段（值为 JSON 编码）
+    upload_chunks:{id}   Bitmap，第 i 位表示第 i 个分片已上传
+    upload_parts:{id}    Hash，分片索引 -> MinIO ETag
 """
 
 import json
@@ -11,15 +16,75 @@ from loguru import logger
 
 from app.utils.cache import get_redis
 
+# 会话存在时才更新字段，避免为已过期的会话创建没有TTL的键
+_UPDATE_SESSION_SCRIPT = """
+if redis.call("exists", KEYS[1]) == 0 then
+    return 0
+end
+redis.call("hset", KEYS[1], unpack(ARGV))
+return 1
+"""
+
+# 标记分片并记录ETag，位图/ETag键与会话保持相同的过期时间；返回已上传分片数
+_MARK_CHUNK_SCRIPT = """
+local ttl = redis.call("pttl", KEYS[1])
+if ttl == -2 then
+    return -1
+end
+redis.call("setbit", KEYS[2], ARGV[1], 1)
+if ARGV[2] ~= "" then
+    redis.call("hset", KEYS[3], ARGV[1], ARGV[2])
+end
+if ttl > 0 then
+    redis.call("pexpire", KEYS[2], ttl)
+    redis.call("pexpire", KEYS[3], ttl)
+end
+return redis.call("bitcount", KEYS[2])
+"""
+
+# 按顺序找出未上传的分片，最多返回 ARGV[2] 个
+_MISSING_CHUNKS_SCRIPT = """
+local missing = {}
+local limit = tonumber(ARGV[2])
+for i = 0, tonumber(ARGV[1]) - 1 do
+    if redis.call("getbit", KEYS[1], i) == 0 then
+        missing[#missing + 1] = i
+        if #missing >= limit then
+            break
+        end
+    end
+end
+return missing
+"""
+
 
 class UploadSessionManager:
     """上传会话管理器 - 基于 Redis"""
 
     # Redis key 前缀
     SESSION_PREFIX = "upload_session:"
+    CHUNKS_PREFIX = "upload_chunks:"
+    PARTS_PREFIX = "upload_parts:"
     # 会话过期时间（2小时）
     SESSION_TTL = 7200
 
+    @staticmethod
+    def _keys(upload_id: str) -> List[str]:
+        """会话、分片位图、ETag 三个键"""
+        return [
+            f"{UploadSessionManager.SESSION_PREFIX}{upload_id}",
+            f"{UploadSessionManager.CHUNKS_PREFIX}{upload_id}",
+            f"{UploadSessionManager.PARTS_PREFIX}{upload_id}",
+        ]
+
+    @staticmethod
+    def _encode(data: Dict) -> Dict[str, str]:
+        return {field: json.dumps(value) for field, value in data.items()}
+
+    @staticmethod
+    def _decode(data: Dict[str, str]) -> Dict:
+        return {field: json.loads(value) for field, value in data.items()}
+
     @staticmethod
     async def create_session(
         upload_id: str,
@@ -45,7 +110,7 @@ class UploadSessionManager:
         """
         try:
             client = await get_redis()
-            key = f"{UploadSessionManager.SESSION_PREFIX}{upload_id}"
+            key, chunks_key, parts_key = UploadSessionManager._keys(upload_id)
 
             session_data = {
                 "upload_id": upload_id,
@@ -53,17 +118,18 @@ class UploadSessionManager:
                 "file_size": file_size,
                 "file_type": file_type,
                 "total_chunks": total_chunks,
-                "uploaded_chunks": [],
                 "admin_id": admin_id,
                 "created_at": datetime.now(timezone.utc).isoformat(),
                 "minio_upload_id": None,  # MinIO multipart upload ID
                 "object_name": None,  # MinIO object name
             }
 
-            # 存储到 Redis（使用 JSON 序列化）
-            await client.setex(
-                key, UploadSessionManager.SESSION_TTL, json.dumps(session_data)
-            )
+            # 重建同ID会话时清掉旧的分片记录
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.delete(key, chunks_key, parts_key)
+                pipe.hset(key, mapping=UploadSessionManager._encode(session_data))
+                pipe.expire(key, UploadSessionManager.SESSION_TTL)
+                await pipe.execute()
 
             logger.info(
                 f"Created upload session: {upload_id} for file {filename} ({file_size} bytes)"
@@ -79,6 +145,9 @@ class UploadSessionManager:
         """
         获取上传会话
 
+        只返回会话字段，分片状态通过 get_uploaded_count / get_missing_chunks /
+        get_parts 单独读取
+
         Args:
             upload_id: 上传会话ID
 
@@ -89,11 +158,11 @@ class UploadSessionManager:
             client = await get_redis()
             key = f"{UploadSessionManager.SESSION_PREFIX}{upload_id}"
 
-            data = await client.get(key)
+            data = await client.hgetall(key)
             if not data:
                 return None
 
-            return json.loads(data)
+            return UploadSessionManager._decode(data)
 
         except Exception as e:
             logger.error(f"Failed to get upload session: {e}", exc_info=True)
@@ -104,6 +173,8 @@ class UploadSessionManager:
         """
         更新上传会话
 
+        只写入给定的字段，不影响其他字段和过期时间
+
         Args:
             upload_id: 上传会话ID
             updates: 要更新的字段
@@ -111,29 +182,22 @@ class UploadSessionManager:
         Returns:
             是否成功
         """
+        if not updates:
+            return True
+
         try:
             client = await get_redis()
             key = f"{UploadSessionManager.SESSION_PREFIX}{upload_id}"
 
-            # 获取现有会话
-            session = await UploadSessionManager.get_session(upload_id)
-            if not session:
+            args = []
+            for field, value in UploadSessionManager._encode(updates).items():
+                args.extend((field, value))
+
+            updated = await client.eval(_UPDATE_SESSION_SCRIPT, 1, key, *args)
+            if not updated:
                 logger.warning(f"Upload session not found: {upload_id}")
                 return False
 
-            # 更新字段
-            session.update(updates)
-
-            # 保存回 Redis（保持原有 TTL）
-            ttl = await client.ttl(key)
-            if ttl > 0:
-                await client.setex(key, ttl, json.dumps(session))
-            else:
-                # 如果原 TTL 已过期，使用默认 TTL
-                await client.setex(
-                    key, UploadSessionManager.SESSION_TTL, json.dumps(session)
-                )
-
             return True
 
         except Exception as e:
@@ -141,34 +205,125 @@ class UploadSessionManager:
             return False
 
     @staticmethod
-    async def mark_chunk_uploaded(upload_id: str, chunk_index: int) -> bool:
+    async def mark_chunk_uploaded(
+        upload_id: str, chunk_index: int, etag: Optional[str] = None
+    ) -> Optional[int]:
         """
         标记分片为已上传
 
+        设置位图并记录 ETag 在一个 Lua 脚本中完成，并发上传的分片互不覆盖
+
         Args:
             upload_id: 上传会话ID
             chunk_index: 分片索引
+            etag: MinIO 返回的分片 ETag
 
         Returns:
-            是否成功
+            已上传的分片数，会话不存在或失败时返回 None
         """
         try:
-            session = await UploadSessionManager.get_session(upload_id)
-            if not session:
-                return False
+            client = await get_redis()
+            uploaded = await client.eval(
+                _MARK_CHUNK_SCRIPT,
+                3,
+                *UploadSessionManager._keys(upload_id),
+                chunk_index,
+                etag or "",
+            )
+            if uploaded < 0:
+                logger.warning(f"Upload session not found: {upload_id}")
+                return None
 
-            uploaded_chunks: List[int] = session.get("uploaded_chunks", [])
-            if chunk_index not in uploaded_chunks:
-                uploaded_chunks.append(chunk_index)
-                uploaded_chunks.sort()
+            return uploaded
 
-            return await UploadSessionManager.update_session(
-                upload_id, {"uploaded_chunks": uploaded_chunks}
+        except Exception as e:
+            logger.error(f"Failed to mark chunk uploaded: {e}", exc_info=True)
+            return None
+
+    @staticmethod
+    async def get_uploaded_count(upload_id: str) -> int:
+        """
+        获取已上传的分片数
+
+        Args:
+            upload_id: 上传会话ID
+
+        Returns:
+            已上传分片数
+        """
+        try:
+            client = await get_redis()
+            return await client.bitcount(
+                f"{UploadSessionManager.CHUNKS_PREFIX}{upload_id}"
             )
 
         except Exception as e:
-            logger.error(f"Failed to mark chunk uploaded: {e}", exc_info=True)
-            return False
+            logger.error(f"Failed to get uploaded chunk count: {e}", exc_info=True)
+            return 0
+
+    @staticmethod
+    async def get_missing_chunks(
+        upload_id: str, total_chunks: int, limit: int = 10
+    ) -> List[int]:
+        """
+        获取尚未上传的分片索引
+
+        Args:
+            upload_id: 上传会话ID
+            total_chunks: 总分片数
+            limit: 最多返回的数量
+
+        Returns:
+            升序的分片索引
+        """
+        try:
+            client = await get_redis()
+            return await client.eval(
+                _MISSING_CHUNKS_SCRIPT,
+                1,
+                f"{UploadSessionManager.CHUNKS_PREFIX}{upload_id}",
+                total_chunks,
+                limit,
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to get missing chunks: {e}", exc_info=True)
+            return []
+
+    @staticmethod
+    async def get_parts(upload_id: str) -> Dict[int, str]:
+        """
+        获取已上传分片的 ETag
+
+        Args:
+            upload_id: 上传会话ID
+
+        Returns:
+            分片索引 -> ETag
+        """
+        try:
+            client = await get_redis()
+            parts = await client.hgetall(
+                f"{UploadSessionManager.PARTS_PREFIX}{upload_id}"
+            )
+            return {int(index): etag for index, etag in parts.items()}
+
+        except Exception as e:
+            logger.error(f"Failed to get upload parts: {e}", exc_info=True)
+            return {}
+
+    @staticmethod
+    async def _get_counts(upload_id: str) -> Optional[tuple]:
+        """读取 (已上传分片数, 总分片数)，会话不存在返回 None"""
+        client = await get_redis()
+        key, chunks_key, _ = UploadSessionManager._keys(upload_id)
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.hget(key, "total_chunks")
+            pipe.bitcount(chunks_key)
+            total, uploaded = await pipe.execute()
+        if total is None:
+            return None
+        return uploaded, json.loads(total)
 
     @staticmethod
     async def is_upload_complete(upload_id: str) -> bool:
@@ -182,14 +337,12 @@ class UploadSessionManager:
             是否完成
         """
         try:
-            session = await UploadSessionManager.get_session(upload_id)
-            if not session:
+            counts = await UploadSessionManager._get_counts(upload_id)
+            if counts is None:
                 return False
 
-            uploaded_chunks = session.get("uploaded_chunks", [])
-            total_chunks = session.get("total_chunks", 0)
-
-            return len(uploaded_chunks) == total_chunks
+            uploaded, total_chunks = counts
+            return uploaded == total_chunks
 
         except Exception as e:
             logger.error(f"Failed to check upload complete: {e}", exc_info=True)
@@ -207,14 +360,12 @@ class UploadSessionManager:
             进度百分比（0-100）
         """
         try:
-            session = await UploadSessionManager.get_session(upload_id)
-            if not session:
+            counts = await UploadSessionManager._get_counts(upload_id)
+            if counts is None:
                 return 0.0
 
-            uploaded_chunks = session.get("uploaded_chunks", [])
-            total_chunks = session.get("total_chunks", 1)  # 避免除以0
-
-            return (len(uploaded_chunks) / total_chunks) * 100
+            uploaded, total_chunks = counts
+            return (uploaded / (total_chunks or 1)) * 100  # 避免除以0
 
         except Exception as e:
             logger.error(f"Failed to get upload progress: {e}", exc_info=True)
@@ -233,9 +384,8 @@ class UploadSessionManager:
         """
         try:
             client = await get_redis()
-            key = f"{UploadSessionManager.SESSION_PREFIX}{upload_id}"
 
-            await client.delete(key)
+            await client.delete(*UploadSessionManager._keys(upload_id))
             logger.info(f"Deleted upload session: {upload_id}")
             return True
 
@@ -257,12 +407,14 @@ class UploadSessionManager:
         """
         try:
             client = await get_redis()
-            key = f"{UploadSessionManager.SESSION_PREFIX}{upload_id}"
 
             if seconds is None:
                 seconds = UploadSessionManager.SESSION_TTL
 
-            await client.expire(key, seconds)
+            async with client.pipeline(transaction=True) as pipe:
+                for key in UploadSessionManager._keys(upload_id):
+                    pipe.expire(key, seconds)
+                await pipe.execute()
             return True
 
         except Exception as e:
@@ -285,10 +437,10 @@ class UploadSessionManager:
             pattern = f"{UploadSessionManager.SESSION_PREFIX}*"
 
             sessions = []
-            async for key in client.scan_iter(match=pattern):
-                data = await client.get(key)
+            async for key in client.scan_iter(match=pattern, _type="hash"):
+                data = await client.hgetall(key)
                 if data:
-                    session = json.loads(data)
+                    session = UploadSessionManager._decode(data)
                     # 如果指定了 admin_id，过滤
                     if admin_id is None or session.get("admin_id") == admin_id:
                         sessions.append(session)
@@ -308,7 +460,7 @@ class UploadSessionManager:
             清理的会话数量
         """
         try:
-            # Redis 的 SETEX 会自动处理过期，这里只是记录日志
+            # Redis 的过期时间会自动清理，这里只是记录日志
             sessions = await UploadSessionManager.list_active_sessions()
             logger.info(
                 f"Current active upload sessions: {len(sessions)}"
@@ -0,0 +1,71 @@
+"""
+视频摘要缓存
+按视频ID缓存列表卡片所需的字段（VideoListResponse），
+推荐等只缓存ID列表的接口通过这里批量补全视频信息
+"""
+
+from typing import Dict, List, Sequence
+
+from sqlalchemy import Integer, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.video import Video, VideoStatus
+from app.schemas.video import VideoListResponse
+from app.utils.cache import Cache
+
+# 摘要缓存时间（秒），视频更新时按 video:{id} 标签失效
+VIDEO_SUMMARY_TTL = 1800
+
+
+def video_summary_key(video_id: int) -> str:
+    return f"video_summary:{video_id}"
+
+
+async def get_video_summaries(
+    db: AsyncSession, video_ids: Sequence[int]
+) -> List[VideoListResponse]:
+    """
+    按给定顺序批量获取已发布视频的摘要
+
+    先一次MGET读取摘要缓存，未命中的视频用一条
+    SELECT ... WHERE id = ANY(:ids) 查询并回填缓存。
+
+    Args:
+        db: 数据库会话
+        video_ids: 视频ID列表（决定返回顺序）
+
+    Returns:
+        视频摘要列表，已下架或不存在的视频会被跳过
+    """
+    if not video_ids:
+        return []
+
+    keys = [video_summary_key(v) for v in video_ids]
+    cached = await Cache.get_many(keys)
+    summaries: Dict[int, VideoListResponse] = {
+        v: VideoListResponse.model_validate(cached[key])
+        for v, key in zip(video_ids, keys)
+        if key in cached
+    }
+
+    missing = [v for v in video_ids if v not in summaries]
+    if missing:
+        result = await db.execute(
+            select(Video).filter(
+                Video.id == any_(bindparam("ids", missing, type_=ARRAY(Integer))),
+                Video.status == VideoStatus.PUBLISHED,
+            )
+        )
+        loaded = {
+            video.id: VideoListResponse.model_validate(video)
+            for video in result.scalars().all()
+        }
+        await Cache.set_many(
+            {video_summary_key(v): s for v, s in loaded.items()},
+            ttl=VIDEO_SUMMARY_TTL,
+            tags={video_summary_key(v): [f"video:{v}"] for v in loaded},
+        )
+        summaries.update(loaded)
+
+    return [summaries[v] for v in video_ids if v in summaries]
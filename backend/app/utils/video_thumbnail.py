@@ -103,7 +103,7 @@ async def generate_and_upload_thumbnail(
     Args:
         video_local_path: 本地视频文件路径
         video_object_name: MinIO 中视频的对象名称 (如: media/xxx.mp4)
-        minio_client: MinIO 客户端实例
+        minio_client: MinIO 异步客户端（AsyncMinIOClient）
         timestamp: 提取帧的时间戳
         width: 缩略图宽度
 
@@ -131,7 +131,7 @@ async def generate_and_upload_thumbnail(
         thumbnail_object_name = f"thumbnails/{base_name}.jpg"
 
         # 3. 上传到 MinIO
-        minio_client.upload_file(
+        await minio_client.upload_file(
             file_content=thumbnail_bytes,
             object_name=thumbnail_object_name,
             content_type="image/jpeg"
@@ -5,6 +5,7 @@ import pytest
 import asyncio
 from httpx import AsyncClient, ASGITransport
 from sqlalchemy import select
+from sqlalchemy.orm import Session
 from typing import AsyncGenerator
 
 from app.main import app
@@ -14,6 +15,40 @@ from app.models.video import Video, Category, Country, Tag
 from app.utils.security import get_password_hash
 
 
+class FakeResult:
+    """execute 返回结果的替身"""
+
+    def __init__(self, value):
+        self._value = value
+
+    def scalar_one_or_none(self):
+        return self._value
+
+    def all(self):
+        return list(self._value)
+
+
+class FakeAsyncSession:
+    """
+    不连接数据库的会话：execute 按顺序返回预设结果（最后一个重复使用）并记录查询次数，
+    sync_session 为真实的同步 Session，用于 merge 和提交事件
+    """
+
+    def __init__(self, *results):
+        self.results = list(results) or [None]
+        self.queries = 0
+        self.sync_session = Session()
+
+    async def execute(self, statement):
+        self.queries += 1
+        if len(self.results) > 1:
+            return FakeResult(self.results.pop(0))
+        return FakeResult(self.results[0])
+
+    async def merge(self, instance, load=True):
+        return self.sync_session.merge(instance, load=load)
+
+
 @pytest.fixture(scope="session")
 def event_loop():
     """创建事件循环"""
@@ -190,3 +225,23 @@ async def test_category() -> Category:
         
         return category
 
+
+@pytest.fixture
+def fake_db():
+    """假会话工厂：fake_db(结果1, 结果2, ...)"""
+    return FakeAsyncSession
+
+
+@pytest.fixture
+def permissions_version(monkeypatch):
+    """
+    固定当前worker已知的RBAC版本号（默认为1），返回修改版本号的函数；
+    设为 None 表示未订阅版本变更
+    """
+    from app.utils import permissions
+
+    def set_version(version):
+        monkeypatch.setattr(permissions, "_permission_version", version)
+
+    set_version(1)
+    return set_version
@@ -14,7 +14,16 @@ from app.utils.cache import (
     json_deserializer,
     cache_result,
     clear_cache_by_prefix,
+    LocalCache,
+    local_cache,
+    make_cache_key,
+    invalidate_cached,
+    invalidate_cache_tags,
+    get_cached_function_stats,
+    register_commit_invalidation,
+    mark_commit_invalidation,
 )
+from app.utils import cache as cache_module
 
 
 @pytest.mark.unit
@@ -248,6 +257,99 @@ class TestCacheComplexTypes:
         await Cache.delete(key)
 
 
+@pytest.mark.unit
+class TestLocalCache:
+    """进程内 L1 缓存测试"""
+
+    def test_set_and_get(self):
+        """测试设置和获取"""
+        cache = LocalCache(max_size=10, ttl=30)
+        cache.set("videos_list:1", '"value"')
+        assert cache.get("videos_list:1") == '"value"'
+        assert cache.hits == 1
+
+    def test_miss(self):
+        """测试未命中计数"""
+        cache = LocalCache(max_size=10, ttl=30)
+        assert cache.get("missing") is None
+        assert cache.misses == 1
+
+    def test_lru_eviction(self):
+        """测试超出容量时淘汰最久未使用的键"""
+        cache = LocalCache(max_size=2, ttl=30)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")  # a 变为最近使用
+        cache.set("c", "3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+        assert cache.get("c") == "3"
+        assert len(cache) == 2
+
+    def test_ttl_expiration(self, monkeypatch):
+        """测试 TTL 过期"""
+        import app.utils.cache as cache_module
+
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+
+        cache = LocalCache(max_size=10, ttl=30)
+        cache.set("a", "1", ttl=5)  # 取 min(5, 30)
+        now[0] += 6
+        assert cache.get("a") is None
+
+    def test_delete_pattern(self):
+        """测试按模式删除"""
+        cache = LocalCache(max_size=10, ttl=30)
+        cache.set("videos_list:1", "1")
+        cache.set("videos_list:2", "2")
+        cache.set("search_results:1", "3")
+
+        assert cache.delete_pattern("videos_list:*") == 2
+        assert cache.get("search_results:1") == "3"
+
+
+@pytest.mark.unit
+@pytest.mark.requires_redis
+@pytest.mark.asyncio
+class TestTwoTierCache:
+    """L1/L2 两级缓存测试"""
+
+    async def test_l1_serves_repeated_reads(self):
+        """测试热点键第二次读取由 L1 提供"""
+        key = "videos_list:test:l1"
+        await Cache.set(key, {"items": [1, 2]}, ttl=60)
+        await Cache.get(key)  # 确保 L1 已写入
+
+        hits_before = local_cache.hits
+        assert await Cache.get(key) == {"items": [1, 2]}
+        assert local_cache.hits == hits_before + 1
+
+        await Cache.delete(key)
+        assert await Cache.get(key) is None
+
+    async def test_non_catalog_keys_skip_l1(self):
+        """测试非目录键不进入 L1"""
+        key = "test:not_l1"
+        await Cache.set(key, "value", ttl=60)
+        assert local_cache.get(key) is None
+        await Cache.delete(key)
+
+    async def test_delete_pattern_clears_l1(self):
+        """测试 delete_pattern 同时清除 L1"""
+        await Cache.set("search_results:l1test", "value", ttl=60)
+        await Cache.delete_pattern("search_results:l1test*")
+        assert await Cache.get("search_results:l1test") is None
+
+    async def test_tier_stats(self):
+        """测试分层命中率统计"""
+        stats = CacheStats.get_tier_stats()
+        assert "l1" in stats and "l2" in stats
+        assert "hit_rate" in stats["l1"]
+        assert "hit_rate" in stats["l2"]
+
+
 @pytest.mark.unit
 @pytest.mark.requires_redis
 @pytest.mark.asyncio
@@ -325,6 +427,31 @@ class TestCacheStats:
         assert "total_hits" in stats["summary"]
         assert "total_misses" in stats["summary"]
 
+    async def test_record_is_buffered_in_memory(self, monkeypatch):
+        """测试命中记录先累加在内存中并按前缀细分"""
+        monkeypatch.setattr(CacheStats, "_pending_hits", 0)
+        monkeypatch.setattr(CacheStats, "_pending_misses", 0)
+        monkeypatch.setattr(CacheStats, "_pending_prefix_hits", {})
+        monkeypatch.setattr(CacheStats, "_pending_prefix_misses", {})
+
+        await CacheStats.record_hit("videos_list:1:20")
+        await CacheStats.record_miss("videos_list:2:20")
+        await CacheStats.record_hit("trending_videos:page_1")
+
+        assert CacheStats._pending_hits == 2
+        assert CacheStats._pending_misses == 1
+        assert CacheStats._pending_prefix_hits["videos_list"] == 1
+        assert CacheStats._pending_prefix_misses["videos_list"] == 1
+
+    async def test_flush_writes_prefix_breakdown(self):
+        """测试 flush 后可按前缀获取统计"""
+        await CacheStats.record_hit("search_results:abc")
+        await CacheStats.flush()
+
+        assert CacheStats._pending_hits == 0
+        prefix_stats = await CacheStats.get_prefix_stats(days=1)
+        assert prefix_stats["search_results"]["hits"] >= 1
+
     async def test_get_stats_empty(self):
         """测试获取空统计"""
         client = await get_redis()
@@ -339,6 +466,128 @@ class TestCacheStats:
         assert stats["summary"]["total_misses"] == 0
 
 
+@pytest.mark.unit
+@pytest.mark.requires_redis
+@pytest.mark.asyncio
+class TestSingleFlight:
+    """请求合并（single-flight）测试"""
+
+    async def test_concurrent_misses_compute_once(self):
+        """测试并发未命中只执行一次 loader"""
+        key = "test:single_flight"
+        await Cache.delete(key)
+        call_count = 0
+
+        async def loader():
+            nonlocal call_count
+            call_count += 1
+            await asyncio.sleep(0.1)
+            return {"value": 42}
+
+        results = await asyncio.gather(
+            *[Cache.get_or_set(key, loader, ttl=60) for _ in range(10)]
+        )
+
+        assert call_count == 1
+        assert all(r == {"value": 42} for r in results)
+        await Cache.delete(key)
+
+    async def test_loader_error_propagates_to_waiters(self):
+        """测试 loader 异常传递给所有等待者且不写入缓存"""
+        key = "test:single_flight_error"
+        await Cache.delete(key)
+
+        async def loader():
+            await asyncio.sleep(0.05)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *[Cache.get_or_set(key, loader, ttl=60) for _ in range(3)],
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, ValueError) for r in results)
+        assert await Cache.exists(key) is False
+
+    async def test_waits_for_other_worker_lock(self):
+        """测试锁被其他 worker 持有时等待其写入的缓存"""
+        key = "test:single_flight_lock"
+        await Cache.delete(key)
+        client = await get_redis()
+        await client.set(f"lock:{key}", "other-worker", ex=5)
+
+        async def other_worker():
+            await asyncio.sleep(0.1)
+            await Cache.set(key, "from-other", ttl=60)
+
+        async def loader():
+            return "from-self"
+
+        result, _ = await asyncio.gather(
+            Cache.get_or_set(key, loader, ttl=60), other_worker()
+        )
+
+        assert result == "from-other"
+        await client.delete(f"lock:{key}")
+        await Cache.delete(key)
+
+
+@pytest.mark.unit
+@pytest.mark.requires_redis
+@pytest.mark.asyncio
+class TestStaleWhileRevalidate:
+    """软过期与后台刷新测试"""
+
+    async def test_get_unwraps_soft_expiry_entry(self):
+        """测试 Cache.get 对带软过期信息的条目返回原始值"""
+        key = "test:swr_unwrap"
+        await Cache.set(key, {"a": 1}, ttl=60, stale_ttl=60)
+        assert await Cache.get(key) == {"a": 1}
+        await Cache.delete(key)
+
+    async def test_stale_value_served_and_refreshed(self):
+        """测试软过期后返回旧值并在后台刷新"""
+        import app.utils.cache as cache_module
+
+        key = "test:swr_refresh"
+        await Cache.set(key, "old", ttl=1, stale_ttl=60)
+        await asyncio.sleep(1.1)
+
+        async def loader():
+            return "new"
+
+        assert await Cache.get_or_set(key, loader, ttl=60, stale_ttl=60) == "old"
+        await asyncio.gather(*cache_module._background_tasks)
+        assert await Cache.get(key) == "new"
+        await Cache.delete(key)
+
+    async def test_fresh_value_not_refreshed(self):
+        """测试未过期条目不会触发刷新"""
+        key = "test:swr_fresh"
+        await Cache.set(key, "value", ttl=60, stale_ttl=60)
+
+        async def loader():
+            raise AssertionError("should not be called")
+
+        assert await Cache.get_or_set(key, loader, ttl=60, stale_ttl=60, beta=0) == "value"
+        await Cache.delete(key)
+
+    def test_should_refresh_xfetch(self, monkeypatch):
+        """测试 XFetch 提前过期判定"""
+        import app.utils.cache as cache_module
+
+        monkeypatch.setattr(cache_module.time, "time", lambda: 1000.0)
+        meta = {"soft_expires_at": 1001.0, "compute_time": 2.0}
+
+        # ln(1 - 0.9) ≈ -2.3，提前量 ≈ 4.6 秒 > 1 秒
+        monkeypatch.setattr(cache_module.random, "random", lambda: 0.9)
+        assert cache_module._should_refresh(meta, beta=1.0) is True
+        # beta=0 时只在软过期后刷新
+        assert cache_module._should_refresh(meta, beta=0) is False
+        # 已软过期时必定刷新
+        assert cache_module._should_refresh({"soft_expires_at": 999.0}, beta=0) is True
+
+
 @pytest.mark.unit
 @pytest.mark.requires_redis
 @pytest.mark.asyncio
@@ -413,6 +662,204 @@ class TestCacheDecorator:
         await clear_cache_by_prefix("test:ttl")
 
 
+@pytest.mark.unit
+class TestCacheKeyDerivation:
+    """缓存键生成测试"""
+
+    def test_key_is_stable_digest(self):
+        """测试缓存键是确定性摘要，与进程无关"""
+        async def func(video_id: int, page: int = 1):
+            pass
+
+        key = make_cache_key("videos", func, (5,), {})
+        assert key == make_cache_key("videos", func, (), {"video_id": 5, "page": 1})
+        assert key.startswith("videos:")
+        assert len(key.split(":")[1]) == 32
+
+    def test_different_args_different_keys(self):
+        """测试不同参数生成不同键"""
+        async def func(video_id: int):
+            pass
+
+        assert make_cache_key("v", func, (1,), {}) != make_cache_key("v", func, (2,), {})
+
+    def test_injected_session_excluded(self):
+        """测试数据库会话不参与缓存键"""
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        async def func(db, video_id: int):
+            pass
+
+        session_a = AsyncSession()
+        session_b = AsyncSession()
+        assert make_cache_key("v", func, (session_a, 1), {}) == make_cache_key(
+            "v", func, (session_b, 1), {}
+        )
+
+    def test_excluded_param_names(self):
+        """测试 exclude 指定的参数不参与缓存键"""
+        async def func(video_id: int, trace_id: str):
+            pass
+
+        assert make_cache_key("v", func, (1, "a"), {}, exclude=("trace_id",)) == (
+            make_cache_key("v", func, (1, "b"), {}, exclude=("trace_id",))
+        )
+
+    def test_no_args_uses_prefix(self):
+        """测试无参数时使用前缀本身"""
+        async def func():
+            pass
+
+        assert make_cache_key("config", func, (), {}) == "config"
+
+
+@pytest.mark.unit
+@pytest.mark.requires_redis
+@pytest.mark.asyncio
+class TestCachedFunctionRegistry:
+    """缓存函数注册表与标签失效测试"""
+
+    async def test_hit_miss_counters(self):
+        """测试每个缓存函数的命中/未命中计数"""
+        @cache_result("test:registry", ttl=60)
+        async def get_value(x: int) -> int:
+            return x
+
+        await invalidate_cached(get_value)
+        await get_value(1)
+        await get_value(1)
+
+        stats = {s["key_prefix"]: s for s in get_cached_function_stats()}
+        assert stats["test:registry"]["misses"] >= 1
+        assert stats["test:registry"]["hits"] >= 1
+        await invalidate_cached(get_value)
+
+    async def test_invalidate_by_tag(self):
+        """测试按标签清除缓存函数结果"""
+        call_count = 0
+
+        @cache_result("test:tagged", ttl=60, tags=("test-tag",))
+        async def get_value(x: int) -> int:
+            nonlocal call_count
+            call_count += 1
+            return x
+
+        await invalidate_cached(get_value)
+        await get_value(1)
+        await get_value(2)
+        assert call_count == 2
+
+        deleted = await invalidate_cache_tags("test-tag")
+        assert deleted == 2
+
+        await get_value(1)
+        assert call_count == 3
+        await invalidate_cached(get_value)
+
+
+@pytest.mark.unit
+@pytest.mark.requires_redis
+@pytest.mark.asyncio
+class TestTagInvalidation:
+    """标签失效索引测试"""
+
+    async def test_set_registers_tags(self):
+        """测试带标签写入时登记到标签集合"""
+        client = await get_redis()
+        await Cache.set("test:tag:a", 1, ttl=60, tags=["test:video:1", "test:list"])
+
+        assert await client.sismember("cache_tag:test:video:1", "test:tag:a")
+        assert await client.sismember("cache_tag:test:list", "test:tag:a")
+        assert 0 < await client.ttl("cache_tag:test:list") <= 60
+        await Cache.invalidate_tags("test:video:1", "test:list")
+
+    async def test_tag_ttl_only_extends(self):
+        """测试标签集合过期时间不会被较短TTL的条目缩短"""
+        client = await get_redis()
+        await Cache.set("test:tag:long", 1, ttl=600, tags=["test:ttl"])
+        await Cache.set("test:tag:short", 1, ttl=10, tags=["test:ttl"])
+
+        assert await client.ttl("cache_tag:test:ttl") > 10
+        await Cache.invalidate_tags("test:ttl")
+
+    async def test_invalidate_tags(self):
+        """测试按标签只清除登记的键"""
+        await Cache.set("test:tag:v1", 1, ttl=60, tags=["test:video:1", "test:list"])
+        await Cache.set("test:tag:v2", 2, ttl=60, tags=["test:video:2", "test:list"])
+        await Cache.set("test:tag:other", 3, ttl=60)
+
+        deleted = await Cache.invalidate_tags("test:video:1")
+        assert deleted == 1
+        assert await Cache.get("test:tag:v1") is None
+        assert await Cache.get("test:tag:v2") == 2
+
+        deleted = await Cache.invalidate_tags("test:list")
+        assert deleted == 1
+        assert await Cache.get("test:tag:v2") is None
+        assert await Cache.get("test:tag:other") == 3
+
+        client = await get_redis()
+        assert not await client.exists("cache_tag:test:list")
+        await Cache.delete("test:tag:other")
+
+    async def test_invalidate_unknown_tag(self):
+        """测试不存在的标签返回0"""
+        assert await Cache.invalidate_tags("test:missing") == 0
+        assert await Cache.invalidate_tags() == 0
+
+    async def test_invalidate_clears_local_cache(self):
+        """测试按标签失效同时清除本地L1缓存"""
+        key = "videos_list:test:tagged"
+        await Cache.set(key, {"items": []}, ttl=60, tags=["test:l1"])
+        assert local_cache.get(key) is not None
+
+        await Cache.invalidate_tags("test:l1")
+        assert local_cache.get(key) is None
+
+    async def test_get_or_set_registers_tags(self):
+        """测试 get_or_set 写入时登记标签"""
+        async def loader():
+            return {"v": 1}
+
+        await Cache.delete("test:tag:gos")
+        await Cache.get_or_set("test:tag:gos", loader, ttl=60, tags=["test:gos"])
+
+        assert await Cache.invalidate_tags("test:gos") == 1
+        assert await Cache.get("test:tag:gos") is None
+
+
+@pytest.mark.unit
+@pytest.mark.requires_redis
+@pytest.mark.asyncio
+class TestBatchOperations:
+    """批量读写测试"""
+
+    async def test_set_many_and_get_many(self):
+        """测试批量写入后批量读取，只返回命中的键"""
+        now = datetime(2024, 1, 1, 12, 0)
+        assert await Cache.set_many({"test:many:1": {"t": now}, "test:many:2": [1, 2]}, ttl=60)
+
+        result = await Cache.get_many(["test:many:1", "test:many:missing", "test:many:2"])
+        assert result == {"test:many:1": {"t": now}, "test:many:2": [1, 2]}
+        await Cache.delete("test:many:1")
+        await Cache.delete("test:many:2")
+
+    async def test_set_many_registers_tags(self):
+        """测试批量写入时按键登记标签"""
+        await Cache.set_many(
+            {"test:many:a": 1, "test:many:b": 2},
+            ttl=60,
+            tags={"test:many:a": ["test:many-tag"]},
+        )
+        assert await Cache.invalidate_tags("test:many-tag") == 1
+        assert await Cache.get_many(["test:many:a", "test:many:b"]) == {"test:many:b": 2}
+        await Cache.delete("test:many:b")
+
+    async def test_get_many_empty(self):
+        """测试空键列表"""
+        assert await Cache.get_many([]) == {}
+
+
 @pytest.mark.unit
 @pytest.mark.requires_redis
 @pytest.mark.asyncio
@@ -440,6 +887,71 @@ class TestCacheErrorHandling:
         assert isinstance(result, bool)
 
 
+@pytest.mark.unit
+@pytest.mark.requires_redis
+class TestRedisPoolAcrossEventLoops:
+    """连接池跨事件循环测试（Celery 任务中多次 asyncio.run）"""
+
+    def test_sequential_asyncio_run(self):
+        """测试上一个事件循环关闭后仍可正常读写"""
+
+        async def roundtrip(i):
+            client = await get_redis()
+            await client.set("loop_test_key", i, ex=60)
+            return int(await client.get("loop_test_key"))
+
+        assert [asyncio.run(roundtrip(i)) for i in range(3)] == [0, 1, 2]
+
+
+@pytest.mark.unit
+class TestCommitInvalidation:
+    """事务提交后失效测试"""
+
+    @pytest.fixture
+    def session(self):
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.orm import Session
+
+        session = Session(create_engine("sqlite://"))
+        session.execute(text("SELECT 1"))
+        yield session
+        session.close()
+
+    @pytest.fixture
+    def calls(self):
+        calls = []
+
+        async def invalidate(items):
+            calls.append(items)
+
+        register_commit_invalidation("test", lambda session: [], invalidate)
+        yield calls
+        cache_module._commit_invalidations.pop("test")
+
+    def test_commit_runs_once_with_all_items(self, session, calls):
+        """测试提交后合并调用一次失效函数（无事件循环时同步执行）"""
+        mark_commit_invalidation(session, "test", "a", "b")
+        mark_commit_invalidation(session, "test", "b", "c")
+        session.commit()
+        assert calls == [{"a", "b", "c"}]
+
+    def test_rollback_discards(self, session, calls):
+        """测试回滚丢弃待失效项"""
+        mark_commit_invalidation(session, "test", "a")
+        session.rollback()
+        session.commit()
+        assert calls == []
+        assert not session.info
+
+    @pytest.mark.asyncio
+    async def test_commit_in_event_loop_runs_in_background(self, session, calls):
+        """测试事件循环中提交时在后台执行"""
+        mark_commit_invalidation(session, "test", "a")
+        session.commit()
+        await asyncio.gather(*cache_module._background_tasks)
+        assert calls == [{"a"}]
+
+
 @pytest.mark.integration
 @pytest.mark.requires_redis
 @pytest.mark.asyncio
@@ -252,6 +252,8 @@ class TestWarmFeaturedAndRecommended:
 
                 # 验证TTL为15分钟
                 assert mock_cache_set.call_args_list[0][1]["ttl"] == 900
+                # 带 list:videos 标签，视频变更时失效
+                assert mock_cache_set.call_args_list[0][1]["tags"] == ["list:videos"]
 
     @pytest.mark.asyncio
     async def test_warm_recommended_videos_success(self):
@@ -268,6 +270,7 @@ class TestWarmFeaturedAndRecommended:
 
                 # 应该预热2页
                 assert mock_cache_set.call_count == 2
+                assert mock_cache_set.call_args_list[0][1]["tags"] == ["list:videos"]
 
     @pytest.mark.asyncio
     async def test_warm_featured_videos_cache_keys(self):
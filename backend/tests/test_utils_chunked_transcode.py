@@ -0,0 +1,98 @@
+"""
+测试 app/utils/chunked_transcode.py - 分段并行转码的切分规划与命令生成
+"""
+import pytest
+
+from app.utils.chunked_transcode import (
+    build_chunk_encode_command,
+    build_concat_hls_command,
+    build_split_command,
+    plan_chunk_boundaries,
+    write_concat_list,
+)
+
+# 每2秒一个关键帧，共100秒
+KEYFRAMES = [float(t) for t in range(0, 100, 2)]
+
+
+@pytest.mark.unit
+class TestPlanChunkBoundaries:
+    """切分点规划测试"""
+
+    def test_cuts_on_keyframes(self):
+        """测试切分点都是关键帧且间隔不少于目标时长"""
+        cuts = plan_chunk_boundaries(KEYFRAMES, 100.0, 30)
+        assert cuts == [30.0, 60.0]
+        assert set(cuts) <= set(KEYFRAMES)
+
+    def test_sparse_keyframes(self):
+        """测试关键帧稀疏时取目标时长之后的第一个关键帧"""
+        cuts = plan_chunk_boundaries([0.0, 25.0, 41.0, 70.0, 95.0], 130.0, 30)
+        assert cuts == [41.0, 95.0]
+
+    def test_short_tail_merged(self):
+        """测试过短的尾段并入前一个分段"""
+        # 90秒处切分会留下10秒的尾段（不足目标的一半）
+        cuts = plan_chunk_boundaries(KEYFRAMES, 100.0, 45)
+        assert cuts == [46.0]
+
+    def test_short_video_single_chunk(self):
+        """测试比目标时长短的视频不切分"""
+        assert plan_chunk_boundaries(KEYFRAMES[:10], 20.0, 30) == []
+        assert plan_chunk_boundaries([], 20.0, 30) == []
+
+
+@pytest.mark.unit
+class TestCommands:
+    """ffmpeg命令生成测试"""
+
+    def test_split_command(self, tmp_path):
+        """测试切分命令流复制视频并重置时间戳"""
+        cmd = build_split_command(tmp_path / "in.mp4", tmp_path, [30.0, 60.0])
+        assert cmd[cmd.index("-c") + 1] == "copy"
+        assert cmd[cmd.index("-map") + 1] == "0:v:0"
+        assert cmd[cmd.index("-reset_timestamps") + 1] == "1"
+        times = [float(t) for t in cmd[cmd.index("-segment_times") + 1].split(",")]
+        assert times == pytest.approx([30.0, 60.0], abs=0.01)
+        assert all(t < cut for t, cut in zip(times, [30.0, 60.0]))
+
+    def test_split_command_without_cuts(self, tmp_path):
+        """测试没有切分点时只输出一个分段"""
+        cmd = build_split_command(tmp_path / "in.mp4", tmp_path, [])
+        assert "-segment_times" not in cmd
+        assert "-segment_time" in cmd
+
+    def test_chunk_encode_command(self, tmp_path):
+        """测试分段编码只编码视频并使用分辨率配置"""
+        cmd = build_chunk_encode_command(
+            tmp_path / "chunk.mkv", tmp_path / "out.mkv", "720p", threads=4
+        )
+        assert "-an" in cmd
+        assert cmd[cmd.index("-c:v") + 1] == "libsvtav1"
+        assert cmd[cmd.index("-svtav1-params") + 1] == "lp=4"
+        assert "scale=1280:720:flags=lanczos" in cmd
+
+    def test_concat_hls_command(self, tmp_path):
+        """测试拼接命令复制视频流并编码音轨"""
+        cmd = build_concat_hls_command(
+            tmp_path / "concat.txt", tmp_path, "480p", audio_path=tmp_path / "a.mka"
+        )
+        assert cmd[cmd.index("-f") + 1] == "concat"
+        assert cmd[cmd.index("-c:v") + 1] == "copy"
+        assert cmd[cmd.index("-c:a") + 1] == "libopus"
+        assert cmd[cmd.index("-b:a") + 1] == "96k"
+        assert cmd[-1] == str(tmp_path / "index.m3u8")
+
+    def test_concat_hls_command_without_audio(self, tmp_path):
+        """测试无音轨时不映射音频"""
+        cmd = build_concat_hls_command(tmp_path / "concat.txt", tmp_path, "480p")
+        assert "-c:a" not in cmd
+        assert cmd.count("-i") == 1
+
+    def test_concat_list(self, tmp_path):
+        """测试concat列表按顺序写入绝对路径并转义引号"""
+        paths = [tmp_path / "chunk_0000.mkv", tmp_path / "it's.mkv"]
+        list_path = write_concat_list(paths, tmp_path / "concat.txt")
+        lines = list_path.read_text().splitlines()
+        assert lines[0] == f"file '{tmp_path / 'chunk_0000.mkv'}'"
+        assert lines[1] == f"file '{tmp_path}/it'\\''s.mkv'"
@@ -0,0 +1,122 @@
+"""
+测试 app/utils/collaborative_filtering.py - ALS矩阵分解协同过滤
+"""
+import numpy as np
+import pytest
+
+from app.utils import collaborative_filtering as cf
+from app.utils.collaborative_filtering import (
+    CFModel,
+    build_interaction_matrix,
+    save_model,
+    train_implicit_als,
+)
+
+# 两组口味不同的用户：1~3 看 101~103，4~6 看 201~203
+INTERACTIONS = [
+    (1, 101, 1.0), (1, 102, 1.0),
+    (2, 101, 1.0), (2, 102, 1.0), (2, 103, 1.0),
+    (3, 102, 1.0), (3, 103, 1.0),
+    (4, 201, 1.0), (4, 202, 1.0),
+    (5, 201, 1.0), (5, 202, 1.0), (5, 203, 1.0),
+    (6, 202, 1.0), (6, 203, 1.0),
+]
+
+
+def _train(tmp_path):
+    user_ids, item_ids, indptr, indices, values = build_interaction_matrix(INTERACTIONS)
+    user_factors, item_factors = train_implicit_als(
+        indptr, indices, values, len(item_ids), factors=2, iterations=10
+    )
+    version_dir = save_model(
+        tmp_path, user_ids, item_ids, user_factors, item_factors, indptr, indices
+    )
+    return CFModel(version_dir)
+
+
+@pytest.mark.unit
+class TestInteractionMatrix:
+    """交互矩阵构建测试"""
+
+    def test_csr_layout(self):
+        """测试按用户分组的CSR结构"""
+        user_ids, item_ids, indptr, indices, values = build_interaction_matrix(
+            [(2, 20, 1.0), (1, 30, 2.0), (1, 10, 3.0)]
+        )
+        assert user_ids.tolist() == [1, 2]
+        assert item_ids.tolist() == [10, 20, 30]
+        assert indptr.tolist() == [0, 2, 3]
+        assert item_ids[indices].tolist() == [10, 30, 20]
+        assert values.tolist() == [3.0, 2.0, 1.0]
+
+    def test_empty(self):
+        """测试没有交互时返回空结构"""
+        user_ids, item_ids, indptr, indices, values = build_interaction_matrix([])
+        assert len(user_ids) == 0
+        assert indptr.tolist() == [0]
+
+
+@pytest.mark.unit
+class TestCFModel:
+    """模型训练与推荐测试"""
+
+    def test_recommends_within_taste_group(self, tmp_path):
+        """测试推荐同组用户看过、自己没看过的视频"""
+        model = _train(tmp_path)
+        assert model.recommend(1, 1) == [103]
+        assert model.recommend(3, 1) == [101]
+        assert model.recommend(4, 1) == [203]
+        assert model.recommend(6, 1) == [201]
+
+    def test_excludes_seen_and_excluded(self, tmp_path):
+        """测试排除看过的视频和指定的视频"""
+        model = _train(tmp_path)
+        result = model.recommend(1, 10, exclude_ids=[103, 999])
+        assert not {101, 102, 103} & set(result)
+        assert len(result) == 3
+
+    def test_unknown_user(self, tmp_path):
+        """测试模型中没有的用户返回空列表"""
+        model = _train(tmp_path)
+        assert not model.has_user(99)
+        assert model.recommend(99, 5) == []
+
+    def test_factors_are_memory_mapped(self, tmp_path):
+        """测试隐向量以内存映射方式加载"""
+        model = _train(tmp_path)
+        assert isinstance(model.item_factors, np.memmap)
+
+
+@pytest.mark.unit
+class TestModelPublishing:
+    """模型发布与加载测试"""
+
+    def test_get_cf_model_follows_current_link(self, tmp_path, monkeypatch):
+        """测试 get_cf_model 加载 current 指向的版本"""
+        monkeypatch.setattr(cf.settings, "RECOMMENDATION_MODEL_DIR", str(tmp_path))
+        monkeypatch.setattr(cf, "_model", None)
+        monkeypatch.setattr(cf, "_model_checked_at", float("-inf"))
+
+        first = _train(tmp_path)
+        assert cf.get_cf_model().version == first.version
+
+        # 在重新检查间隔内不会切换版本
+        second = _train(tmp_path)
+        assert cf.get_cf_model().version == first.version
+
+        monkeypatch.setattr(cf, "_model_checked_at", float("-inf"))
+        assert cf.get_cf_model().version == second.version
+
+    def test_no_model(self, tmp_path, monkeypatch):
+        """测试尚未训练模型时返回None"""
+        monkeypatch.setattr(cf.settings, "RECOMMENDATION_MODEL_DIR", str(tmp_path))
+        monkeypatch.setattr(cf, "_model", None)
+        monkeypatch.setattr(cf, "_model_checked_at", float("-inf"))
+        assert cf.get_cf_model() is None
+
+    def test_old_versions_pruned(self, tmp_path):
+        """测试只保留最近的版本"""
+        for _ in range(cf.MODEL_KEEP_VERSIONS + 2):
+            _train(tmp_path)
+        versions = [p for p in tmp_path.iterdir() if p.name.isdigit()]
+        assert len(versions) == cf.MODEL_KEEP_VERSIONS
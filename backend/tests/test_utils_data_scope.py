@@ -0,0 +1,156 @@
+"""
+测试 app/utils/data_scope.py - 部门树索引与可访问部门缓存
+"""
+import asyncio
+
+import pytest
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.models.data_scope import DataScope, Department
+from app.models.user import AdminUser
+from app.utils import cache, data_scope
+from app.utils.data_scope import (
+    DepartmentIndex,
+    get_admin_accessible_department_ids,
+    get_department_children,
+    mark_data_scope_changed,
+)
+
+# 1 ─┬─ 2 ── 4
+#    └─ 3
+# 5 (独立的顶级部门)
+DEPARTMENT_ROWS = [(1, None), (2, 1), (3, 1), (4, 2), (5, None)]
+
+
+@pytest.mark.unit
+class TestDepartmentIndex:
+    """部门树索引测试"""
+
+    def test_descendants(self):
+        """测试后代集合包含所有层级的下级部门"""
+        index = DepartmentIndex(DEPARTMENT_ROWS)
+        assert index.descendants(1) == {2, 3, 4}
+        assert index.descendants(2) == {4}
+        assert index.descendants(4) == frozenset()
+        assert index.descendants(5) == frozenset()
+
+    def test_ancestors(self):
+        """测试祖先按从近到远排列"""
+        index = DepartmentIndex(DEPARTMENT_ROWS)
+        assert index.ancestors(4) == [2, 1]
+        assert index.ancestors(1) == []
+
+    def test_cycle_does_not_loop(self):
+        """测试数据中存在环时不会死循环"""
+        index = DepartmentIndex([(1, 2), (2, 1)])
+        assert index.descendants(1) == {2}
+        assert index.ancestors(1) == [2]
+
+    def test_membership(self):
+        """测试不存在的部门"""
+        index = DepartmentIndex(DEPARTMENT_ROWS)
+        assert 4 in index
+        assert 99 not in index
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestAccessibleDepartments:
+    """可访问部门与部门树索引缓存测试"""
+
+    @pytest.fixture(autouse=True)
+    def empty_caches(self, monkeypatch, permissions_version):
+        monkeypatch.setattr(data_scope, "_department_index", None)
+        monkeypatch.setattr(data_scope, "_accessible_cache", {})
+
+    async def test_department_and_children_through_index(self, fake_db):
+        """测试本部门及子部门经部门树索引展开"""
+        admin = AdminUser(id=1, role_id=3, is_superadmin=False)
+        db = fake_db(
+            DataScope(scope_type="department_and_children"),
+            [(2,), (5,), (99,)],
+            DEPARTMENT_ROWS,
+        )
+
+        accessible = await get_admin_accessible_department_ids(admin, "video", db)
+        # 已删除的部门(99)不在索引中，被忽略
+        assert accessible == {2, 4, 5}
+        assert db.queries == 3
+
+        # 结果已缓存
+        await get_admin_accessible_department_ids(admin, "video", db)
+        assert db.queries == 3
+
+    async def test_index_shared_across_admins(self, fake_db):
+        """测试部门树只加载一次，其他管理员复用索引"""
+        scope = DataScope(scope_type="department_and_children")
+        first = AdminUser(id=1, role_id=3, is_superadmin=False)
+        await get_admin_accessible_department_ids(
+            first, "video", fake_db(scope, [(2,)], DEPARTMENT_ROWS)
+        )
+
+        second = AdminUser(id=2, role_id=3, is_superadmin=False)
+        db = fake_db(scope, [(1,)])
+        accessible = await get_admin_accessible_department_ids(second, "video", db)
+        assert accessible == {1, 2, 3, 4}
+        assert db.queries == 2
+
+    async def test_department_move_rebuilds_index(
+        self, monkeypatch, permissions_version, fake_db
+    ):
+        """测试部门移动并提交后RBAC版本号增加，部门树索引重建"""
+
+        async def fake_bump():
+            permissions_version(2)
+
+        monkeypatch.setattr(data_scope, "bump_permissions_version", fake_bump)
+        moved_rows = [(1, None), (2, 1), (3, 1), (4, 3), (5, None)]
+
+        assert await get_department_children(3, fake_db(DEPARTMENT_ROWS)) == [3]
+        # 提交前仍使用旧索引
+        assert await get_department_children(3, fake_db(moved_rows)) == [3]
+
+        # 部门4从2移到3
+        db = fake_db(moved_rows)
+        department = Department(id=4, parent_id=2)
+        make_transient_to_detached(department)
+        db.sync_session.add(department)
+        department.parent_id = 3
+        cache._collect_commit_invalidations(db.sync_session, None)
+        cache._run_commit_invalidations(db.sync_session)
+        await asyncio.gather(*cache._background_tasks)
+
+        assert await get_department_children(3, db) == [3, 4]
+        assert await get_department_children(2, db) == [2]
+        assert db.queries == 1
+
+    async def test_superadmin_and_no_role(self, fake_db):
+        """测试超级管理员无限制、无角色无权限，均不访问数据库"""
+        db = fake_db()
+        superadmin = AdminUser(id=1, is_superadmin=True)
+        no_role = AdminUser(id=2, role_id=None, is_superadmin=False)
+        assert await get_admin_accessible_department_ids(superadmin, "video", db) is None
+        assert not await get_admin_accessible_department_ids(no_role, "video", db)
+        assert db.queries == 0
+
+
+@pytest.mark.unit
+class TestInvalidation:
+    """提交后的版本号失效测试"""
+
+    def test_bulk_statement_marked(self, fake_db):
+        """测试手动标记的批量修改登记RBAC版本号，回滚后丢弃"""
+        db = fake_db()
+        mark_data_scope_changed(db)
+        assert db.sync_session.info
+        cache._discard_commit_invalidations(db.sync_session)
+        assert not db.sync_session.info
+
+    def test_unrelated_flush_ignored(self):
+        """测试与数据范围无关的修改不增加版本号"""
+        session = Session()
+        admin = AdminUser(id=1, username="a")
+        make_transient_to_detached(admin)
+        session.add(admin)
+        admin.username = "b"
+        assert data_scope._collect_data_scope_changes(session) == []
@@ -13,6 +13,8 @@ from app.utils.file_validator import (
     validate_upload_file,
     FileValidationPresets,
     FILE_MAGIC_NUMBERS,
+    FileValidator,
+    HashingReader,
 )
 
 
@@ -636,6 +638,38 @@ class TestPresetConstants:
         assert FileValidationPresets.SUBTITLE_MAX_SIZE <= 10 * 1024 * 1024
 
 
+# ===========================================
+# 8. 分片哈希测试
+# ===========================================
+
+class TestChunkHashing:
+    """测试分片流式哈希"""
+
+    def test_hashing_reader_matches_md5(self):
+        """测试分块读取后的哈希与整体计算一致"""
+        data = b"x" * 100_000
+        reader = HashingReader(BytesIO(data))
+        while reader.read(16384):
+            pass
+        assert reader.bytes_read == len(data)
+        assert FileValidator.validate_chunk_hash(data, reader.hexdigest())
+
+    def test_md5_hex_to_base64(self):
+        """测试转换为 Content-MD5 格式"""
+        # md5("") = d41d8cd98f00b204e9800998ecf8427e
+        assert (
+            FileValidator.md5_hex_to_base64("d41d8cd98f00b204e9800998ecf8427e")
+            == "1B2M2Y8AsgTpgAmY7PhCfg=="
+        )
+
+    def test_md5_hex_invalid(self):
+        """测试非法的MD5字符串"""
+        with pytest.raises(ValueError):
+            FileValidator.md5_hex_to_base64("not-hex")
+        with pytest.raises(ValueError):
+            FileValidator.md5_hex_to_base64("abcd")
+
+
 # ===========================================
 # 测试总结
 # ===========================================
@@ -0,0 +1,188 @@
+"""
+测试 app/utils/hls_uploader.py - HLS 分片并发上传
+"""
+import asyncio
+import subprocess
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils import hls_uploader
+from app.utils.cache import get_redis
+from app.utils.hls_uploader import UPLOAD_MANIFEST_PREFIX, HLSUploader
+
+
+class FakeAsyncClient:
+    """记录上传顺序和并发数，可以让前几次上传失败"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.uploaded = []
+        self.active = 0
+        self.max_active = 0
+        self.process = None
+        self.uploaded_while_running = []
+
+    async def upload_file_from_path(self, file_path, object_name, content_type):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if self.failures > 0:
+                self.failures -= 1
+                raise ConnectionError("connection reset")
+            self.uploaded.append((object_name, content_type))
+            if self.process is not None and self.process.poll() is None:
+                self.uploaded_while_running.append(object_name)
+        finally:
+            self.active -= 1
+
+
+def _make_hls_dir(path, segments: int = 5):
+    for i in range(segments):
+        (path / f"segment_{i:03d}.ts").write_bytes(b"x" * (i + 1))
+    (path / "index.m3u8").write_text("#EXTM3U\n")
+    return path
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestHLSUploader:
+    """HLS上传测试"""
+
+    async def test_bounded_concurrency_and_playlist_last(self, tmp_path):
+        """测试并发数受限，播放列表最后上传"""
+        client = FakeAsyncClient()
+        uploader = HLSUploader(_make_hls_dir(tmp_path, 10), "videos/1/av1/720p", concurrency=3, client=client)
+
+        assert await uploader.finish() == 11
+        assert client.max_active <= 3
+        assert client.uploaded[-1] == ("videos/1/av1/720p/index.m3u8", "application/vnd.apple.mpegurl")
+        assert ("videos/1/av1/720p/segment_000.ts", "video/mp2t") in client.uploaded
+
+    @pytest.mark.requires_redis
+    async def test_resume_skips_uploaded_files(self, tmp_path):
+        """测试任务重试时（新目录、新实例）跳过Redis清单中已上传的文件"""
+        resume_key = uuid.uuid4().hex
+        first_dir = tmp_path / "first"
+        first_dir.mkdir()
+        uploader = HLSUploader(
+            _make_hls_dir(first_dir), "p", client=FakeAsyncClient(), resume_key=resume_key
+        )
+        await uploader.finish()
+        client = await get_redis()
+        assert await client.hlen(f"{UPLOAD_MANIFEST_PREFIX}p:{resume_key}") == 6
+
+        # 重试生成的输出：同名同大小的文件跳过，新的分片上传
+        retry_dir = tmp_path / "retry"
+        retry_dir.mkdir()
+        _make_hls_dir(retry_dir)
+        (retry_dir / "segment_005.ts").write_bytes(b"new")
+        client = FakeAsyncClient()
+        uploader = HLSUploader(retry_dir, "p", client=client, resume_key=resume_key)
+        assert await uploader.finish() == 1
+        assert client.uploaded == [("p/segment_005.ts", "video/mp2t")]
+
+    async def test_without_resume_key_skips_redis(self, tmp_path, monkeypatch):
+        """测试未指定 resume_key 时不读写Redis，重复调用仍只上传变化的文件"""
+
+        async def unavailable():
+            raise AssertionError("redis should not be used")
+
+        monkeypatch.setattr(hls_uploader, "get_redis", unavailable)
+        hls_dir = _make_hls_dir(tmp_path)
+        uploader = HLSUploader(hls_dir, "p", client=FakeAsyncClient())
+        assert await uploader.finish() == 6
+        (hls_dir / "segment_005.ts").write_bytes(b"new")
+        assert await uploader.finish() == 1
+
+    async def test_retries_transient_errors(self, tmp_path):
+        """测试网络错误按退避重试"""
+        client = FakeAsyncClient(failures=2)
+        uploader = HLSUploader(_make_hls_dir(tmp_path, 1), "p", concurrency=1, retry_delay=0.01, client=client)
+        assert await uploader.finish() == 2
+        assert len(client.uploaded) == 2
+
+    async def test_gives_up_after_max_attempts(self, tmp_path):
+        """测试超过最大尝试次数后抛出异常，且不记入清单"""
+        client = FakeAsyncClient(failures=100)
+        uploader = HLSUploader(_make_hls_dir(tmp_path, 1), "p", max_attempts=2, retry_delay=0.01, client=client)
+        with pytest.raises(ConnectionError):
+            await uploader.finish()
+        assert uploader.manifest == {}
+
+    async def test_watch_uploads_while_process_runs(self, tmp_path):
+        """测试在进程运行期间上传已完成的分片，忽略 .tmp 文件"""
+        script = (
+            "import os, sys, time\n"
+            "d = sys.argv[1]\n"
+            "for i in range(3):\n"
+            "    tmp = os.path.join(d, f'segment_{i:03d}.ts.tmp')\n"
+            "    open(tmp, 'wb').write(b'x' * 10)\n"
+            "    time.sleep(0.2)\n"
+            "    os.rename(tmp, tmp[:-4])\n"
+            "time.sleep(0.3)\n"
+            "open(os.path.join(d, 'index.m3u8'), 'w').write('#EXTM3U')\n"
+        )
+        process = subprocess.Popen([sys.executable, "-c", script, str(tmp_path)])
+        client = FakeAsyncClient()
+        client.process = process
+        uploader = HLSUploader(tmp_path, "p", client=client)
+
+        returncode = await uploader.watch(process, poll_interval=0.05)
+
+        assert returncode == 0
+        names = [name for name, _ in client.uploaded]
+        # 分片在进程退出前已上传，播放列表最后上传
+        assert names[:3] == ["p/segment_000.ts", "p/segment_001.ts", "p/segment_002.ts"]
+        assert names[-1] == "p/index.m3u8"
+        assert not any(name.endswith(".tmp") for name in names)
+        assert "p/segment_000.ts" in client.uploaded_while_running
+
+    async def test_watch_failed_process_skips_playlist(self, tmp_path):
+        """测试进程失败时不上传播放列表"""
+        (tmp_path / "index.m3u8").write_text("#EXTM3U")
+        process = subprocess.Popen([sys.executable, "-c", "raise SystemExit(1)"])
+        client = FakeAsyncClient()
+
+        assert await HLSUploader(tmp_path, "p", client=client).watch(process, 0.05) == 1
+        assert client.uploaded == []
+
+
+@pytest.mark.unit
+@pytest.mark.requires_redis
+class TestConcurrentRenditions:
+    """多个分辨率在不同线程中各自运行事件循环"""
+
+    def test_uploaders_in_separate_threads(self, tmp_path):
+        """测试多个线程同时上传并写入Redis清单时不会互相阻塞"""
+        resume_key = uuid.uuid4().hex
+
+        def upload(resolution):
+            hls_dir = tmp_path / resolution
+            hls_dir.mkdir()
+            uploader = HLSUploader(
+                _make_hls_dir(hls_dir),
+                f"videos/1/av1/{resolution}",
+                client=FakeAsyncClient(),
+                resume_key=resume_key,
+            )
+            return asyncio.run(uploader.finish())
+
+        resolutions = ["1080p", "720p", "480p", "360p"]
+        with ThreadPoolExecutor(max_workers=len(resolutions)) as pool:
+            futures = [pool.submit(upload, r) for r in resolutions]
+            assert [f.result(timeout=30) for f in futures] == [6] * len(resolutions)
+
+        async def manifest_sizes():
+            client = await get_redis()
+            return [
+                await client.hlen(
+                    f"{UPLOAD_MANIFEST_PREFIX}videos/1/av1/{r}:{resume_key}"
+                )
+                for r in resolutions
+            ]
+
+        assert asyncio.run(manifest_sizes()) == [6] * len(resolutions)
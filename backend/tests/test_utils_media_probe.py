@@ -0,0 +1,137 @@
+"""
+测试 app/utils/media_probe.py - ffprobe 结果解析与按内容缓存
+"""
+import hashlib
+import uuid
+
+import pytest
+
+from app.utils import media_probe
+from app.utils.av1_transcoder import AV1Transcoder
+from app.utils.media_probe import analyze_media, file_content_hash, parse_probe_output
+
+PROBE_OUTPUT = {
+    "streams": [
+        {
+            "index": 0,
+            "codec_type": "audio",
+            "codec_name": "aac",
+        },
+        {
+            "index": 1,
+            "codec_type": "video",
+            "codec_name": "h264",
+            "width": 1920,
+            "height": 1080,
+            "avg_frame_rate": "30000/1001",
+        },
+    ],
+    "format": {"duration": "12.5", "bit_rate": "4000000"},
+    "packets": [
+        {"stream_index": 1, "pts_time": "4.000000", "flags": "K__"},
+        {"stream_index": 1, "pts_time": "0.000000", "flags": "K__"},
+        {"stream_index": 1, "pts_time": "0.033367", "flags": "___"},
+        {"stream_index": 0, "pts_time": "0.000000", "flags": "K__"},
+        {"stream_index": 0, "pts_time": "1.000000", "flags": "K__"},
+        {"stream_index": 1, "pts_time": "8.000000", "flags": "K_D"},
+        {"stream_index": 1, "flags": "K__"},
+    ],
+}
+
+
+@pytest.mark.unit
+class TestParseProbeOutput:
+    """ffprobe 输出解析测试"""
+
+    def test_keyframes_from_video_packets(self):
+        """测试只取视频流的关键帧并升序排列"""
+        probe = parse_probe_output(PROBE_OUTPUT)
+        assert probe["keyframes"] == [0.0, 4.0, 8.0]
+        assert "packets" not in probe
+
+    def test_video_info_from_probe(self):
+        """测试视频元数据可以直接从分析结果中提取"""
+        info = AV1Transcoder.parse_video_info(parse_probe_output(PROBE_OUTPUT))
+        assert (info["width"], info["height"]) == (1920, 1080)
+        assert info["duration"] == 12.5
+        assert info["fps"] == pytest.approx(29.97, abs=0.01)
+        assert info["has_audio"] is True
+
+    def test_no_video_stream(self):
+        """测试纯音频文件没有关键帧"""
+        audio_only = {
+            "streams": [PROBE_OUTPUT["streams"][0]],
+            "packets": PROBE_OUTPUT["packets"],
+        }
+        probe = parse_probe_output(audio_only)
+        assert probe["keyframes"] == []
+
+    def test_packets_only_for_video_stream(self, monkeypatch):
+        """测试数据包单独读取且只选第一条视频流"""
+        commands = []
+
+        def fake_run_ffprobe(command):
+            commands.append(command)
+            if "-select_streams" in command:
+                return {"packets": PROBE_OUTPUT["packets"][:3]}
+            return {"streams": PROBE_OUTPUT["streams"], "format": {}}
+
+        monkeypatch.setattr(media_probe, "_run_ffprobe", fake_run_ffprobe)
+        probe = media_probe.run_probe("video.mp4")
+
+        assert probe["keyframes"] == [0.0, 4.0]
+        assert "-show_entries" not in commands[0]
+        assert commands[1][commands[1].index("-select_streams") + 1] == "v:0"
+
+    def test_file_content_hash(self, tmp_path):
+        """测试内容哈希为完整文件的 SHA-256"""
+        path = tmp_path / "video.mp4"
+        data = b"x" * (3 * 1024 * 1024 + 7)
+        path.write_bytes(data)
+        assert file_content_hash(path) == hashlib.sha256(data).hexdigest()
+
+
+@pytest.mark.unit
+@pytest.mark.requires_redis
+@pytest.mark.asyncio
+class TestAnalyzeMedia:
+    """分析结果缓存测试"""
+
+    async def test_probes_once_per_content(self, tmp_path, monkeypatch):
+        """测试相同内容只运行一次 ffprobe，即使文件路径不同"""
+        calls = []
+
+        def fake_run_probe(path):
+            calls.append(path)
+            return parse_probe_output(PROBE_OUTPUT)
+
+        monkeypatch.setattr(media_probe, "run_probe", fake_run_probe)
+
+        content = uuid.uuid4().bytes
+        first = tmp_path / "a.mp4"
+        second = tmp_path / "b.mp4"
+        first.write_bytes(content)
+        second.write_bytes(content)
+
+        probe = await analyze_media(first)
+        assert probe["content_hash"] == hashlib.sha256(content).hexdigest()
+        assert probe["keyframes"] == [0.0, 4.0, 8.0]
+
+        assert await analyze_media(second) == probe
+        assert len(calls) == 1
+
+    async def test_different_content_probed_separately(self, tmp_path, monkeypatch):
+        """测试不同内容分别分析"""
+        calls = []
+
+        def fake_run_probe(path):
+            calls.append(path)
+            return parse_probe_output(PROBE_OUTPUT)
+
+        monkeypatch.setattr(media_probe, "run_probe", fake_run_probe)
+
+        for name in ("a.mp4", "b.mp4"):
+            path = tmp_path / name
+            path.write_bytes(uuid.uuid4().bytes)
+            await analyze_media(path)
+        assert len(calls) == 2
@@ -0,0 +1,137 @@
+"""
+测试 app/utils/media_tree.py - 递归CTE文件夹树与提交后失效
+"""
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models.media import Media, MediaStatus, MediaType
+from app.utils import cache, media_tree
+from app.utils.media_tree import assemble_folder_tree, build_folder_tree_query
+
+
+def _media(
+    media_id, title, parent_id=None, is_folder=True, is_deleted=False, path=None
+):
+    return Media(
+        id=media_id,
+        title=title,
+        filename=title,
+        file_path=f"folders/{uuid.uuid4()}",
+        file_size=0,
+        media_type=MediaType.IMAGE,
+        status=MediaStatus.READY,
+        is_folder=is_folder,
+        is_deleted=is_deleted,
+        parent_id=parent_id,
+        path=path,
+        uploader_id=1,
+    )
+
+
+@pytest.fixture
+def library():
+    """
+    /b
+    /a ─┬─ /a/y ── /a/y/deep
+        ├─ /a/x
+        ├─ file.jpg
+        └─ (已删除的文件夹)
+    """
+    engine = create_engine("sqlite://")
+    Media.__table__.create(engine)
+    with Session(engine) as session:
+        session.add_all(
+            [
+                _media(1, "a", path="/a"),
+                _media(2, "b", path="/b"),
+                _media(3, "y", parent_id=1, path="/a/y"),
+                _media(4, "x", parent_id=1, path="/a/x"),
+                _media(5, "file.jpg", parent_id=1, is_folder=False),
+                _media(6, "trash", parent_id=1, is_deleted=True),
+                _media(7, "deep", parent_id=3),
+            ]
+        )
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+@pytest.mark.unit
+class TestFolderTreeQuery:
+    """递归查询测试"""
+
+    def test_whole_tree_in_one_query(self, library):
+        """测试一次查询得到整棵树和子项数量"""
+        rows = library.execute(build_folder_tree_query(None)).all()
+        tree = assemble_folder_tree(rows)
+
+        assert [node["title"] for node in tree] == ["a", "b"]
+        a = tree[0]
+        # 子项包含文件，不含已删除项
+        assert a["children_count"] == 3
+        assert [child["title"] for child in a["children"]] == ["x", "y"]
+        y = a["children"][1]
+        assert y["children"][0]["title"] == "deep"
+        # 没有保存路径时由父文件夹路径推导
+        assert y["children"][0]["path"] == "/a/y/deep"
+
+    def test_subtree(self, library):
+        """测试从指定文件夹开始"""
+        rows = library.execute(build_folder_tree_query(1)).all()
+        tree = assemble_folder_tree(rows)
+        assert [node["id"] for node in tree] == [4, 3]
+        assert tree[1]["children"][0]["id"] == 7
+
+    def test_depth_limit(self, library):
+        """测试深度限制"""
+        rows = library.execute(build_folder_tree_query(None, max_depth=2)).all()
+        tree = assemble_folder_tree(rows)
+        y = tree[0]["children"][1]
+        assert y["children"] == []
+        # 截断处仍返回子项数量，前端可据此显示展开按钮
+        assert y["children_count"] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestInvalidation:
+    """提交后失效测试"""
+
+    @pytest.fixture
+    def invalidations(self, monkeypatch):
+        calls = []
+
+        async def fake_invalidate():
+            calls.append(True)
+            return 0
+
+        monkeypatch.setattr(media_tree, "invalidate_media_tree", fake_invalidate)
+        return calls
+
+    async def _drain(self):
+        for task in list(cache._background_tasks):
+            await task
+
+    async def test_rename_invalidates(self, library, invalidations):
+        """测试重命名文件夹提交后清除缓存"""
+        library.get(Media, 4).title = "renamed"
+        library.commit()
+        await self._drain()
+        assert invalidations == [True]
+
+    async def test_unrelated_update_keeps_cache(self, library, invalidations):
+        """测试只修改查看次数不清除缓存"""
+        library.get(Media, 5).view_count = 10
+        library.commit()
+        await self._drain()
+        assert invalidations == []
+
+    async def test_new_item_invalidates(self, library, invalidations):
+        """测试上传新文件提交后清除缓存（父文件夹子项数量变化）"""
+        library.add(_media(8, "new.jpg", parent_id=2, is_folder=False))
+        library.commit()
+        await self._drain()
+        assert invalidations == [True]
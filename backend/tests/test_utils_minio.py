@@ -4,6 +4,11 @@
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from io import BytesIO
+import asyncio
+import threading
+import time
+
+from app.utils.minio_client import AsyncMinIOClient, MinIOOperationStats
 
 
 @pytest.mark.unit
@@ -138,3 +143,147 @@ class TestMinIOErrorHandling:
         with pytest.raises(Exception):
             mock_client.put_object("bucket", "file", BytesIO(b"data"), 4)
 
+
+
+class FakeSyncClient:
+    """模拟阻塞的同步客户端，记录并发数"""
+
+    bucket_name = "videos"
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def get_file(self, object_name: str) -> bytes:
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        self.threads.add(threading.current_thread().name)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        if object_name == "missing":
+            raise FileNotFoundError(object_name)
+        return object_name.encode()
+
+    def get_file_url(self, object_name: str) -> str:
+        return f"http://cdn/{self.bucket_name}/{object_name}"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestAsyncMinIOClient:
+    """异步门面测试"""
+
+    async def test_runs_off_event_loop(self):
+        """测试阻塞调用不占用事件循环"""
+        client = AsyncMinIOClient(FakeSyncClient(delay=0.2), max_workers=2)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        assert await client.get_file("a") == b"a"
+        task.cancel()
+        assert ticks >= 5
+
+    async def test_concurrency_is_bounded(self):
+        """测试并发调用数不超过线程数"""
+        fake = FakeSyncClient()
+        client = AsyncMinIOClient(fake, max_workers=3)
+
+        results = await asyncio.gather(*(client.get_file(str(i)) for i in range(9)))
+        assert results == [str(i).encode() for i in range(9)]
+        assert fake.max_active == 3
+        assert all(name.startswith("minio-io") for name in fake.threads)
+
+    async def test_latency_metrics(self):
+        """测试按操作记录次数、错误数和耗时"""
+        client = AsyncMinIOClient(FakeSyncClient(delay=0.01), max_workers=2)
+        await client.get_file("a")
+        with pytest.raises(FileNotFoundError):
+            await client.get_file("missing")
+
+        stats = client.get_stats()["operations"]["get_file"]
+        assert stats["count"] == 2
+        assert stats["errors"] == 1
+        assert stats["in_flight"] == 0
+        assert stats["p50_ms"] >= 10
+
+    async def test_get_file_url_is_sync(self):
+        """测试纯字符串操作不经过线程池"""
+        client = AsyncMinIOClient(FakeSyncClient(), max_workers=1)
+        assert client.get_file_url("a.jpg") == "http://cdn/videos/a.jpg"
+        assert client.get_stats()["operations"] == {}
+
+
+@pytest.mark.unit
+class TestMinIOOperationStats:
+    """耗时统计测试"""
+
+    def test_percentiles(self):
+        """测试分位数计算"""
+        stats = MinIOOperationStats()
+        for ms in range(1, 101):
+            stats.record(ms / 1000, error=False)
+        result = stats.to_dict()
+        assert result["count"] == 100
+        assert result["p50_ms"] == 51.0
+        assert result["p99_ms"] == 100.0
+        assert result["max_ms"] == 100.0
+
+    def test_empty(self):
+        """测试没有样本时返回0"""
+        assert MinIOOperationStats().to_dict()["p95_ms"] == 0.0
+
+
+@pytest.mark.unit
+class TestMultipartHelpers:
+    """分片上传辅助方法测试"""
+
+    def test_presigned_part_url(self, monkeypatch):
+        """测试分片预签名 URL 携带分片编号和上传ID"""
+        from minio import Minio
+
+        from app.utils.minio_client import minio_client
+
+        offline = Minio("localhost:9000", "key", "secret", secure=False, region="us-east-1")
+        monkeypatch.setattr(minio_client, "_client", offline)
+
+        url = minio_client.get_presigned_part_url("videos/a.mp4", "up-1", 3)
+        assert "partNumber=3" in url
+        assert "uploadId=up-1" in url
+        assert "X-Amz-Signature=" in url
+
+    def test_list_parts_follows_pages(self, monkeypatch):
+        """测试分页读取全部分片"""
+        from types import SimpleNamespace
+
+        from app.utils.minio_client import minio_client
+
+        pages = {
+            None: SimpleNamespace(
+                parts=[SimpleNamespace(part_number=1, etag="a")],
+                is_truncated=True,
+                next_part_number_marker="1",
+            ),
+            "1": SimpleNamespace(
+                parts=[SimpleNamespace(part_number=2, etag="b")],
+                is_truncated=False,
+                next_part_number_marker=None,
+            ),
+        }
+        fake = Mock()
+        fake._list_parts.side_effect = lambda *a, part_number_marker=None, **kw: pages[
+            part_number_marker
+        ]
+        monkeypatch.setattr(minio_client, "_client", fake)
+
+        assert minio_client.list_parts("videos/a.mp4", "up-1") == [(1, "a"), (2, "b")]
@@ -0,0 +1,108 @@
+"""
+测试 app/utils/pagination.py - 游标（keyset）分页工具
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models.video import Video
+from app.utils.pagination import (
+    apply_keyset,
+    build_keyset_page,
+    decode_cursor,
+    encode_cursor,
+    page_count,
+)
+
+
+@pytest.mark.unit
+class TestCursorEncoding:
+    """游标编解码测试"""
+
+    def test_roundtrip_int(self):
+        """测试整数排序键往返"""
+        cursor = encode_cursor(1500, 42)
+        assert decode_cursor(cursor) == (1500, 42)
+
+    def test_roundtrip_datetime(self):
+        """测试 datetime 排序键往返"""
+        dt = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+        sort_value, row_id = decode_cursor(encode_cursor(dt, 7))
+        assert sort_value == dt
+        assert row_id == 7
+
+    def test_cursor_is_url_safe(self):
+        """测试游标不含需要转义的字符"""
+        cursor = encode_cursor("a/b+c?", 1)
+        assert all(c.isalnum() or c in "-_" for c in cursor)
+
+    def test_invalid_cursor(self):
+        """测试无效游标返回 400"""
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor("not-a-cursor")
+        assert exc_info.value.status_code == 400
+
+
+@pytest.mark.unit
+class TestKeysetQuery:
+    """keyset 查询构建测试"""
+
+    def _compile(self, query) -> str:
+        return str(query.compile(dialect=postgresql.dialect()))
+
+    def test_first_page_has_no_seek_condition(self):
+        """测试第一页只排序和限制数量"""
+        query = apply_keyset(select(Video), Video.view_count, Video.id, "", 20)
+        sql = self._compile(query)
+        assert "WHERE" not in sql
+        assert "ORDER BY videos.view_count DESC, videos.id DESC" in sql
+        assert "LIMIT" in sql
+
+    def test_seek_condition_and_existing_order_replaced(self):
+        """测试游标条件生成且原有排序被替换"""
+        query = select(Video).order_by(Video.created_at)
+        query = apply_keyset(
+            query, Video.view_count, Video.id, encode_cursor(100, 5), 20
+        )
+        sql = self._compile(query)
+        assert "videos.view_count <" in sql
+        assert "videos.id <" in sql
+        assert "ORDER BY videos.view_count DESC, videos.id DESC" in sql
+        assert "ORDER BY videos.created_at" not in sql
+
+
+@pytest.mark.unit
+class TestBuildKeysetPage:
+    """分页结果截取测试"""
+
+    def test_last_page_has_no_cursor(self):
+        """测试最后一页没有 next_cursor"""
+        rows = [SimpleNamespace(id=i, score=10 - i) for i in range(3)]
+        page, next_cursor = build_keyset_page(rows, 5, lambda r: r.score)
+        assert len(page) == 3
+        assert next_cursor is None
+
+    def test_extra_row_produces_cursor(self):
+        """测试多取的一行生成指向当前页最后一行的游标"""
+        rows = [SimpleNamespace(id=i, score=10 - i) for i in range(3)]
+        page, next_cursor = build_keyset_page(rows, 2, lambda r: r.score)
+        assert [r.id for r in page] == [0, 1]
+        assert decode_cursor(next_cursor) == (9, 1)
+
+
+@pytest.mark.unit
+class TestPageCount:
+    """页数计算测试"""
+
+    def test_page_count(self):
+        """测试按总数向上取整"""
+        assert page_count(41, 20) == 3
+        assert page_count(0, 20) == 0
+
+    def test_unknown_total(self):
+        """测试未统计总数时页数也为None"""
+        assert page_count(None, 20) is None
@@ -8,7 +8,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import AdminUser
 from app.models.admin import Role, Permission, RolePermission
+from app.utils import permissions as permissions_module
 from app.utils.permissions import (
+    PERMISSION_VERSION_KEY,
+    CompiledPermissions,
+    bump_permissions_version,
+    get_admin_compiled_permissions,
     get_admin_permissions_cached,
     invalidate_admin_permissions_cache,
     invalidate_role_permissions_cache,
@@ -476,6 +481,86 @@ class TestPermissionUtils:
         assert summary["permission_count"] == 0
 
 
+# ===========================================
+# 5. 编译权限与版本失效测试
+# ===========================================
+
+class TestCompiledPermissions:
+    """测试编译后的权限集合"""
+
+    def test_wildcards_expanded(self):
+        """测试通配符按权限表展开，未登记的代码按模块通配符匹配"""
+        all_perms = ["video.read", "comment.read", "video.create", "user.delete"]
+        compiled = CompiledPermissions({"*.read", "user.*"}, all_perms, version=1)
+
+        assert compiled.allows("video.read")
+        assert compiled.allows("comment.read")
+        assert not compiled.allows("video.create")
+        assert compiled.allows("user.delete")
+        assert compiled.allows("user.export")  # 权限表中不存在
+
+    def test_global_wildcard(self):
+        """测试全局通配符"""
+        assert CompiledPermissions({"*"}, [], version=1).allows("any.permission")
+
+    def test_no_permissions(self):
+        """测试空权限集合"""
+        compiled = CompiledPermissions(set(), [], version=1)
+        assert not compiled.codes
+        assert not compiled.allows("video.read")
+
+
+@pytest.mark.requires_redis
+class TestPermissionVersioning:
+    """测试进程内编译结果的版本失效"""
+
+    @pytest.fixture
+    def loader_calls(self, monkeypatch):
+        """替换Redis/数据库加载，记录加载次数"""
+        calls = []
+
+        async def fake_loader(admin_id, db):
+            calls.append(admin_id)
+            return {"video.read"}
+
+        monkeypatch.setattr(permissions_module, "get_admin_permissions_cached", fake_loader)
+        monkeypatch.setattr(permissions_module, "_compiled_permissions", {})
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_steady_state_no_reload(self, permissions_version, loader_calls):
+        """测试版本号不变时不重复加载"""
+        permissions_version(3)
+
+        for _ in range(3):
+            compiled = await get_admin_compiled_permissions(1, None)
+        assert compiled.allows("video.read")
+        assert loader_calls == [1]
+
+    @pytest.mark.asyncio
+    async def test_version_bump_reloads(self, permissions_version, loader_calls):
+        """测试版本号变化后重新加载"""
+        redis = await get_redis()
+        current = int(await redis.get(PERMISSION_VERSION_KEY) or 0)
+        permissions_version(current)
+
+        await get_admin_compiled_permissions(1, None)
+        await bump_permissions_version()
+        assert permissions_module._permission_version == current + 1
+
+        await get_admin_compiled_permissions(1, None)
+        assert loader_calls == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_not_subscribed_always_loads(self, permissions_version, loader_calls):
+        """测试未订阅版本变更时每次都重新加载"""
+        permissions_version(None)
+
+        await get_admin_compiled_permissions(1, None)
+        await get_admin_compiled_permissions(1, None)
+        assert loader_calls == [1, 1]
+
+
 # ===========================================
 # 测试总结
 # ===========================================
@@ -486,8 +571,9 @@ class TestPermissionUtils:
 ✅ 权限检查函数测试 - 6个测试用例
 ✅ 权限装饰器测试 - 6个测试用例
 ✅ 权限工具函数测试 - 8个测试用例
+✅ 编译权限与版本失效测试 - 6个测试用例
 
-总计：28个测试用例
+总计：34个测试用例
 
 测试场景：
 - 超级管理员权限
@@ -499,5 +585,6 @@ class TestPermissionUtils:
 - 所有权限检查
 - 权限装饰器验证
 - 权限摘要生成
+- 编译后的权限按版本号缓存与失效
 - 边界情况（无角色、管理员不存在等）
 """
@@ -0,0 +1,144 @@
+"""
+测试 app/utils/principal_cache.py - 已认证用户快照缓存
+"""
+import asyncio
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from app.models.user import AdminUser, User
+from app.utils import cache
+from app.utils.cache import get_redis
+from app.utils.principal_cache import (
+    principal_cache_key,
+    resolve_principal,
+    restore_principal,
+    snapshot_principal,
+)
+from app.utils.token_blacklist import get_token_hash
+
+
+def _make_user(user_id: int) -> User:
+    user = restore_principal(
+        User,
+        {
+            "id": user_id,
+            "email": f"u{user_id}@example.com",
+            "username": f"u{user_id}",
+            "hashed_password": "hash",
+            "oauth_id": f"google-{user_id}",
+            "is_active": True,
+            "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        },
+    )
+    return user
+
+
+@pytest.mark.unit
+class TestSnapshot:
+    """快照与重建测试"""
+
+    def test_round_trip_is_clean_and_detached(self):
+        """测试重建的对象为游离状态且没有待提交的修改"""
+        user = _make_user(1)
+        snapshot = snapshot_principal(user)
+        assert snapshot["username"] == "u1"
+        assert "comments" not in snapshot
+
+        restored = restore_principal(User, snapshot)
+        state = restored.__mapper__.class_manager.state_getter()(restored)
+        assert state.detached
+        assert not state.modified
+
+    def test_credentials_not_cached(self):
+        """测试快照不含凭据列，重建后这些属性为未加载状态"""
+        admin = restore_principal(
+            AdminUser,
+            {
+                "id": 1,
+                "username": "admin",
+                "hashed_password": "hash",
+                "totp_secret": "secret",
+                "backup_codes": "[]",
+            },
+        )
+        snapshot = snapshot_principal(admin)
+        assert snapshot == {"id": 1, "username": "admin"}
+        assert "oauth_id" not in snapshot_principal(_make_user(1))
+
+        restored = restore_principal(AdminUser, snapshot)
+        state = restored.__mapper__.class_manager.state_getter()(restored)
+        assert "hashed_password" in state.unloaded
+
+    def test_cache_key_per_model(self):
+        """测试用户与管理员使用不同的键"""
+        assert principal_cache_key(User, 1) != principal_cache_key(AdminUser, 1)
+
+
+@pytest.mark.unit
+@pytest.mark.requires_redis
+@pytest.mark.asyncio
+class TestResolvePrincipal:
+    """认证缓存测试"""
+
+    async def test_second_lookup_skips_database(self, fake_db):
+        """测试第二次认证命中快照，不查询数据库"""
+        user_id = random.randint(10**6, 10**9)
+        db = fake_db(_make_user(user_id))
+
+        revoked, first = await resolve_principal(db, User, user_id, "token-a")
+        assert not revoked and first.id == user_id
+        assert db.queries == 1
+
+        other = fake_db(None)
+        revoked, second = await resolve_principal(other, User, user_id, "token-a")
+        assert not revoked
+        assert other.queries == 0
+        assert second.username == f"u{user_id}"
+        assert second in other.sync_session
+        assert not other.sync_session.dirty
+
+    async def test_blacklisted_token(self, fake_db):
+        """测试黑名单中的token在同一次往返中被拒绝"""
+        user_id = random.randint(10**6, 10**9)
+        client = await get_redis()
+        await client.setex(f"token_blacklist:{get_token_hash('token-b')}", 60, "{}")
+
+        db = fake_db(_make_user(user_id))
+        assert await resolve_principal(db, User, user_id, "token-b") == (True, None)
+        assert db.queries == 0
+
+    async def test_token_version_bump_reloads(self, fake_db):
+        """测试token版本号变化后快照失效"""
+        user_id = random.randint(10**6, 10**9)
+        db = fake_db(_make_user(user_id))
+        await resolve_principal(db, User, user_id, "t")
+
+        client = await get_redis()
+        await client.incr(f"user_token_version:{user_id}")
+
+        db = fake_db(_make_user(user_id))
+        await resolve_principal(db, User, user_id, "t")
+        assert db.queries == 1
+
+    async def test_commit_invalidates_modified_principal(self, fake_db):
+        """测试修改用户并提交后快照被删除"""
+        user_id = random.randint(10**6, 10**9)
+        db = fake_db(_make_user(user_id))
+        await resolve_principal(db, User, user_id, "t")
+        client = await get_redis()
+        key = principal_cache_key(User, user_id)
+        assert await client.exists(key)
+
+        # 命中快照，得到挂在会话上的对象
+        db = fake_db(None)
+        _, user = await resolve_principal(db, User, user_id, "t")
+
+        # 模拟封禁：修改属性后 flush/commit 触发的事件
+        user.is_active = False
+        cache._collect_commit_invalidations(db.sync_session, None)
+        cache._run_commit_invalidations(db.sync_session)
+        await asyncio.gather(*cache._background_tasks)
+
+        assert not await client.exists(key)
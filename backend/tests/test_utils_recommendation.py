@@ -246,7 +246,7 @@ class TestCollaborativeFiltering:
         )
 
         # 应该推荐 sample_videos[5]
-        rec_ids = [v.id for v in recommendations]
+        rec_ids = recommendations
         assert sample_videos[5].id in rec_ids or len(recommendations) >= 0  # 可能因为数据不足
 
     @pytest.mark.asyncio
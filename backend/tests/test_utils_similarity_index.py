@@ -0,0 +1,91 @@
+"""
+测试 app/utils/similarity_index.py - 相似视频索引离线计算
+"""
+import pytest
+
+from app.utils.similarity_index import (
+    SIMILARITY_WEIGHTS,
+    VideoFeatures,
+    build_similarity_index,
+    normalize_co_watch,
+    similarity_score,
+)
+
+
+@pytest.mark.unit
+class TestSimilarityScore:
+    """相似度打分测试"""
+
+    def test_identical_features(self):
+        """测试特征完全相同时除共同观看外全部得分"""
+        feats = VideoFeatures([1], [2], [3], country_id=1, rating=8.0)
+        expected = sum(SIMILARITY_WEIGHTS.values()) - SIMILARITY_WEIGHTS["co_watch"]
+        assert similarity_score(feats, feats) == pytest.approx(expected)
+
+    def test_no_shared_features(self):
+        """测试没有共同特征时得分为0"""
+        a = VideoFeatures([1], [2], [3])
+        b = VideoFeatures([4], [5], [6])
+        assert similarity_score(a, b) == 0
+
+    def test_co_watch_is_capped(self):
+        """测试共同观看强度最多计为1"""
+        a = VideoFeatures()
+        assert similarity_score(a, a, co_watch=5.0) == pytest.approx(
+            SIMILARITY_WEIGHTS["co_watch"]
+        )
+
+
+@pytest.mark.unit
+class TestCoWatch:
+    """共同观看归一化测试"""
+
+    def test_cosine_normalization_is_symmetric(self):
+        """测试余弦归一化并生成对称邻接表"""
+        neighbors = normalize_co_watch({(1, 2): 2}, {1: 4, 2: 1})
+        assert neighbors[1][2] == pytest.approx(1.0)
+        assert neighbors[2][1] == pytest.approx(1.0)
+
+    def test_missing_watcher_counts_skipped(self):
+        """测试缺少观看人数的视频对被忽略"""
+        assert normalize_co_watch({(1, 2): 3}, {1: 5}) == {}
+
+
+@pytest.mark.unit
+class TestBuildSimilarityIndex:
+    """索引构建测试"""
+
+    def test_ranks_by_shared_features(self):
+        """测试共享特征越多排名越靠前，且不包含自身"""
+        features = {
+            1: VideoFeatures([10], [20], [30]),
+            2: VideoFeatures([10], [20], [30]),
+            3: VideoFeatures([10]),
+            4: VideoFeatures([99]),
+        }
+        index = build_similarity_index(features)
+        assert [v for v, _ in index[1]] == [2, 3]
+        assert 4 not in [v for v, _ in index[1]]
+        assert index[4] == []
+
+    def test_top_k_limit(self):
+        """测试每个视频只保留 top_k 个结果"""
+        features = {i: VideoFeatures([1]) for i in range(10)}
+        index = build_similarity_index(features, top_k=3)
+        assert all(len(neighbors) == 3 for neighbors in index.values())
+
+    def test_co_watch_adds_candidates(self):
+        """测试没有共同特征但有共同观看的视频也会成为候选"""
+        features = {1: VideoFeatures([1]), 2: VideoFeatures([2])}
+        co_watch = normalize_co_watch({(1, 2): 3}, {1: 3, 2: 3})
+        index = build_similarity_index(features, co_watch)
+        assert [v for v, _ in index[1]] == [2]
+
+    def test_long_posting_truncated_by_popularity(self):
+        """测试超长倒排表只保留最热门的视频"""
+        features = {i: VideoFeatures([1]) for i in range(6)}
+        popularity = {i: i for i in range(6)}
+        index = build_similarity_index(
+            features, popularity=popularity, max_posting_size=3
+        )
+        assert {v for v, _ in index[0]} == {3, 4, 5}
@@ -0,0 +1,136 @@
+"""
+测试 app/utils/thumbnail_sheet.py - 单次解码缩略图与雪碧图索引
+"""
+import pytest
+
+from app.utils.thumbnail_sheet import (
+    build_sprite_vtt,
+    build_thumbnail_command,
+    preview_timestamps,
+    sprite_interval,
+    upload_thumbnail_set,
+)
+
+
+@pytest.mark.unit
+class TestSpritePlanning:
+    """采样规划测试"""
+
+    def test_interval_has_floor(self):
+        """测试短视频使用最小采样间隔"""
+        assert sprite_interval(60) == 5
+
+    def test_interval_caps_tile_count(self):
+        """测试长视频加大间隔使格数不超过上限"""
+        interval = sprite_interval(7200)
+        assert interval == 12
+        assert 7200 / interval <= 600
+
+    def test_preview_timestamps(self):
+        """测试预览图均匀分布且不取首尾"""
+        assert preview_timestamps(60, 5) == [10, 20, 30, 40, 50]
+        assert preview_timestamps(6, 5) == [3]
+
+
+@pytest.mark.unit
+class TestSpriteVTT:
+    """WebVTT 索引测试"""
+
+    def test_cues_map_to_tiles(self):
+        """测试每个时间段指向正确的格子"""
+        vtt = build_sprite_vtt(
+            25, 10, ["s0.jpg"], tile_width=160, tile_height=90, columns=2, rows=2
+        )
+        lines = vtt.splitlines()
+        assert lines[0] == "WEBVTT"
+        assert "00:00:00.000 --> 00:00:10.000" in lines
+        assert "s0.jpg#xywh=0,0,160,90" in lines
+        assert "s0.jpg#xywh=160,0,160,90" in lines
+        # 最后一格在视频结束处截止
+        assert "00:00:20.000 --> 00:00:25.000" in lines
+        assert "s0.jpg#xywh=0,90,160,90" in lines
+
+    def test_tiles_span_sheets(self):
+        """测试超过单张容量的格子落到下一张雪碧图"""
+        vtt = build_sprite_vtt(50, 10, ["a.jpg", "b.jpg"], columns=2, rows=2)
+        assert vtt.count("a.jpg#") == 4
+        assert vtt.splitlines()[-1] == "b.jpg#xywh=0,0,160,90"
+
+    def test_long_timestamps(self):
+        """测试超过一小时的时间格式"""
+        vtt = build_sprite_vtt(3700, 3650, ["a.jpg"])
+        assert "01:00:50.000 --> 01:01:40.000" in vtt
+
+
+@pytest.mark.unit
+class TestThumbnailCommand:
+    """ffmpeg 命令测试"""
+
+    def test_single_process_three_outputs(self, tmp_path):
+        """测试一条命令输出封面、预览图和雪碧图，只解码关键帧"""
+        cmd = build_thumbnail_command(tmp_path / "in.mp4", tmp_path, 60, 5.0)
+        assert cmd.count("-i") == 1
+        assert cmd[cmd.index("-skip_frame") + 1] == "nokey"
+        assert cmd.index("-skip_frame") < cmd.index("-i")
+        assert [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-map"] == [
+            "[poster]",
+            "[previews]",
+            "[sprite]",
+        ]
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        assert "split=3" in graph
+        assert "fps=1/5" in graph
+        assert "tile=10x10" in graph
+
+    def test_full_decode(self, tmp_path):
+        """测试可以关闭只解码关键帧"""
+        cmd = build_thumbnail_command(
+            tmp_path / "in.mp4", tmp_path, 60, 5.0, keyframes_only=False
+        )
+        assert "-skip_frame" not in cmd
+
+
+class _FakeMinIO:
+    def __init__(self):
+        self.uploaded = {}
+
+    def upload_thumbnail(self, file, video_id, thumbnail_type="poster"):
+        name = f"thumbnails/video_{video_id}_{thumbnail_type}.jpg"
+        self.uploaded[name] = file.read()
+        return f"http://minio/{name}"
+
+    def upload_file(self, file_content, object_name, content_type):
+        # 与 MinIOClient.upload_file 一致，返回对象名而不是URL
+        self.uploaded[object_name] = file_content
+        return object_name
+
+    def get_file_url(self, object_name):
+        return f"http://minio/{object_name}"
+
+
+@pytest.mark.unit
+class TestUploadThumbnailSet:
+    """上传测试"""
+
+    def test_uploads_with_relative_sprite_urls(self, tmp_path):
+        """测试雪碧图经 upload_thumbnail 上传，VTT 使用相对路径引用"""
+        files = {}
+        for name in ("poster.jpg", "preview_01.jpg", "sprite_000.jpg"):
+            files[name] = tmp_path / name
+            files[name].write_bytes(name.encode())
+        thumbnails = {
+            "poster": files["poster.jpg"],
+            "previews": [files["preview_01.jpg"]],
+            "sprites": [files["sprite_000.jpg"]],
+            "interval": 5,
+        }
+
+        client = _FakeMinIO()
+        urls = upload_thumbnail_set(client, 7, thumbnails, 12, poster=False)
+
+        assert urls["poster_url"] is None
+        assert "thumbnails/video_7_poster.jpg" not in client.uploaded
+        assert client.uploaded["thumbnails/video_7_sprite_0.jpg"] == b"sprite_000.jpg"
+        assert urls["sprite_vtt_url"] == "http://minio/thumbnails/video_7_sprite.vtt"
+        vtt = client.uploaded["thumbnails/video_7_sprite.vtt"].decode()
+        assert "video_7_sprite_0.jpg#xywh=0,0,160,90" in vtt
@@ -0,0 +1,137 @@
+"""
+测试 app/utils/token_blacklist.py - 已撤销token的本地布隆过滤器
+"""
+import asyncio
+import uuid
+
+import pytest
+
+from app.utils import token_blacklist
+from app.utils.cache import get_redis
+from app.utils.token_blacklist import (
+    TOKEN_REVOCATION_CHANNEL,
+    RevocationBloomFilter,
+    add_to_blacklist,
+    get_token_hash,
+    is_blacklisted,
+    might_be_blacklisted,
+)
+
+
+def _random_hash() -> str:
+    return get_token_hash(uuid.uuid4().hex)
+
+
+@pytest.fixture
+def isolated_filter(monkeypatch):
+    """每个测试使用独立的过滤器和统计，结束后恢复模块状态"""
+    monkeypatch.setattr(
+        token_blacklist, "revocation_filter", RevocationBloomFilter(1000, 0.001)
+    )
+    monkeypatch.setattr(token_blacklist, "_filter_ready", False)
+    monkeypatch.setattr(
+        token_blacklist,
+        "_filter_counters",
+        dict.fromkeys(token_blacklist._filter_counters, 0),
+    )
+
+
+@pytest.mark.unit
+class TestRevocationBloomFilter:
+    """布隆过滤器测试"""
+
+    def test_sizing(self):
+        """测试按容量和误判率计算位数与哈希个数"""
+        bloom = RevocationBloomFilter(1000, 0.01)
+        assert bloom.num_bits == 9586
+        assert bloom.num_hashes == 7
+        assert bloom.size_bytes == 1199
+
+    def test_no_false_negatives(self):
+        """测试加入的哈希一定命中"""
+        bloom = RevocationBloomFilter(1000, 0.01)
+        hashes = [_random_hash() for _ in range(1000)]
+        for token_hash in hashes:
+            bloom.add(token_hash)
+        assert all(token_hash in bloom for token_hash in hashes)
+        assert bloom.estimated_error_rate() == pytest.approx(0.01, rel=0.05)
+
+    def test_false_positive_rate(self):
+        """测试未加入的哈希误判率接近目标值"""
+        bloom = RevocationBloomFilter(1000, 0.01)
+        for _ in range(1000):
+            bloom.add(_random_hash())
+        hits = sum(_random_hash() in bloom for _ in range(5000))
+        assert hits / 5000 < 0.03
+
+
+@pytest.mark.unit
+@pytest.mark.requires_redis
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("isolated_filter")
+class TestFilteredChecks:
+    """过滤器参与的黑名单检查测试"""
+
+    async def test_not_ready_always_asks_redis(self):
+        """测试过滤器未就绪时所有token都需要Redis确认"""
+        assert might_be_blacklisted(_random_hash())
+
+    async def test_rebuild_and_skip_redis(self, monkeypatch):
+        """测试从Redis重建后，未撤销的token不访问Redis"""
+        token = f"revoked-{uuid.uuid4().hex}"
+        client = await get_redis()
+        await client.setex(f"token_blacklist:{get_token_hash(token)}", 60, "{}")
+
+        await token_blacklist.rebuild_revocation_filter(client)
+        monkeypatch.setattr(token_blacklist, "_filter_ready", True)
+        assert await is_blacklisted(token)
+
+        async def unavailable():
+            raise ConnectionError("redis down")
+
+        # Redis不可用时is_blacklisted按已撤销处理，返回False说明没有访问Redis
+        monkeypatch.setattr(token_blacklist, "get_redis_client", unavailable)
+        assert not await is_blacklisted(f"valid-{uuid.uuid4().hex}")
+
+        stats = token_blacklist.get_revocation_filter_stats()
+        assert stats["checks"] == 2
+        assert stats["skipped"] == 1
+        assert stats["ready"] is True
+
+    async def test_add_publishes_and_applies_locally(self):
+        """测试撤销时本worker立即生效并广播哈希"""
+        client = await get_redis()
+        pubsub = client.pubsub()
+        await pubsub.subscribe(TOKEN_REVOCATION_CHANNEL)
+        await pubsub.get_message(timeout=1)
+
+        token = f"logout-{uuid.uuid4().hex}"
+        assert await add_to_blacklist(token, expires_in=60)
+        assert get_token_hash(token) in token_blacklist.revocation_filter
+
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=2)
+        await pubsub.aclose()
+        assert message["data"] == get_token_hash(token)
+
+    async def test_listener_tracks_revocations(self):
+        """测试监听任务重建过滤器并应用其他worker的撤销广播"""
+        task = asyncio.create_task(token_blacklist.start_token_blacklist_listener())
+        try:
+            for _ in range(50):
+                if token_blacklist._filter_ready:
+                    break
+                await asyncio.sleep(0.05)
+            assert token_blacklist._filter_ready
+
+            token_hash = _random_hash()
+            client = await get_redis()
+            await client.publish(TOKEN_REVOCATION_CHANNEL, token_hash)
+            for _ in range(50):
+                if token_hash in token_blacklist.revocation_filter:
+                    break
+                await asyncio.sleep(0.05)
+            assert might_be_blacklisted(token_hash)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        assert not token_blacklist._filter_ready
@@ -0,0 +1,133 @@
+"""
+测试 app/utils/transcode_scheduler.py - CPU核心预算与转码调度
+"""
+import threading
+import time
+
+import pytest
+
+from app.utils.av1_transcoder import parse_frame_rate
+from app.utils.transcode_scheduler import CoreBudget, TranscodeScheduler
+
+
+@pytest.mark.unit
+class TestCoreBudget:
+    """核心预算测试"""
+
+    def test_budget_shared_between_instances(self, tmp_path):
+        """测试不同实例（模拟不同worker进程）共享同一预算"""
+        a = CoreBudget(total_cores=4, lock_dir=str(tmp_path))
+        b = CoreBudget(total_cores=4, lock_dir=str(tmp_path))
+
+        lease = a.try_acquire(3)
+        assert lease.cores == 3
+        assert b.try_acquire(2) is None
+
+        small = b.try_acquire(1)
+        assert small.cores == 1
+
+        lease.release()
+        small.release()
+        assert b.try_acquire(4).cores == 4
+
+    def test_request_capped_at_budget(self, tmp_path):
+        """测试申请超过预算时按预算截断"""
+        budget = CoreBudget(total_cores=2, lock_dir=str(tmp_path))
+        with budget.try_acquire(8) as lease:
+            assert lease.cores == 2
+
+    def test_failed_acquire_releases_partial_slots(self, tmp_path):
+        """测试空闲核心不足时不占用部分槽位"""
+        budget = CoreBudget(total_cores=3, lock_dir=str(tmp_path))
+        held = budget.try_acquire(2)
+        assert budget.try_acquire(2) is None
+        assert budget.try_acquire(1) is not None
+        held.release()
+
+    def test_acquire_can_be_cancelled(self, tmp_path):
+        """测试等待中的申请可以取消"""
+        budget = CoreBudget(total_cores=1, lock_dir=str(tmp_path))
+        held = budget.try_acquire(1)
+        cancelled = threading.Event()
+        cancelled.set()
+        assert budget.acquire(1, cancelled, poll_interval=0.01) is None
+        held.release()
+
+
+@pytest.mark.unit
+class TestTranscodeScheduler:
+    """转码调度测试"""
+
+    def test_plan_lowest_first_with_threads(self, tmp_path):
+        """测试低分辨率优先，线程数不超过预算"""
+        scheduler = TranscodeScheduler(CoreBudget(total_cores=4, lock_dir=str(tmp_path)))
+        assert scheduler.plan(["1080p", "360p", "720p", "480p"]) == [
+            ("360p", 2),
+            ("480p", 2),
+            ("720p", 4),
+            ("1080p", 4),
+        ]
+
+    def test_concurrency_respects_budget(self, tmp_path):
+        """测试同时运行的线程总数不超过核心预算"""
+        scheduler = TranscodeScheduler(CoreBudget(total_cores=4, lock_dir=str(tmp_path)))
+        lock = threading.Lock()
+        usage = {"now": 0, "peak": 0}
+        started = []
+
+        def transcode(resolution, threads):
+            with lock:
+                started.append(resolution)
+                usage["now"] += threads
+                usage["peak"] = max(usage["peak"], usage["now"])
+            time.sleep(0.05)
+            with lock:
+                usage["now"] -= threads
+            return f"out/{resolution}"
+
+        results = list(
+            scheduler.run(["1080p", "720p", "480p", "360p"], transcode, frames=100)
+        )
+
+        assert started == ["360p", "480p", "720p", "1080p"]
+        assert usage["peak"] <= 4
+        assert {r.resolution for r in results} == {"360p", "480p", "720p", "1080p"}
+        assert all(r.fps > 0 and r.output == f"out/{r.resolution}" for r in results)
+
+    def test_failure_stops_remaining(self, tmp_path):
+        """测试某个分辨率失败时不再启动后续转码"""
+        scheduler = TranscodeScheduler(CoreBudget(total_cores=2, lock_dir=str(tmp_path)))
+        started = []
+
+        def transcode(resolution, threads):
+            started.append(resolution)
+            if resolution == "360p":
+                raise RuntimeError("ffmpeg failed")
+            time.sleep(0.2)
+            return resolution
+
+        with pytest.raises(RuntimeError):
+            list(scheduler.run(["360p", "480p", "720p"], transcode))
+        assert "720p" not in started
+
+    def test_result_stats(self, tmp_path):
+        """测试统计数据"""
+        scheduler = TranscodeScheduler(CoreBudget(total_cores=2, lock_dir=str(tmp_path)))
+        [result] = scheduler.run(["360p"], lambda res, threads: res, frames=0)
+        stats = result.to_dict()
+        assert stats["resolution"] == "360p"
+        assert stats["threads"] == 2
+        assert stats["fps"] == 0
+
+
+@pytest.mark.unit
+class TestParseFrameRate:
+    """帧率解析测试"""
+
+    def test_fraction(self):
+        assert parse_frame_rate("30000/1001") == pytest.approx(29.97, abs=0.001)
+
+    def test_invalid(self):
+        assert parse_frame_rate("0/0") == 0.0
+        assert parse_frame_rate(None) == 0.0
+        assert parse_frame_rate("25") == 25.0
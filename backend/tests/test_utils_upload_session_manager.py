@@ -0,0 +1,118 @@
+"""
+测试 app/utils/upload_session_manager.py - Redis 上传会话（Hash + Bitmap）
+"""
+import asyncio
+import uuid
+
+import pytest
+
+from app.utils.cache import get_redis
+from app.utils.upload_session_manager import UploadSessionManager
+
+
+async def _create(total_chunks: int = 4) -> str:
+    upload_id = uuid.uuid4().hex
+    await UploadSessionManager.create_session(
+        upload_id=upload_id,
+        filename="movie.mp4",
+        file_size=total_chunks * 100,
+        file_type="video/mp4",
+        total_chunks=total_chunks,
+        admin_id=1,
+    )
+    return upload_id
+
+
+@pytest.mark.unit
+@pytest.mark.requires_redis
+@pytest.mark.asyncio
+class TestUploadSessionManager:
+    """上传会话测试"""
+
+    async def test_session_fields_round_trip(self):
+        """测试字段类型在 Hash 中保持不变"""
+        upload_id = await _create()
+        assert await UploadSessionManager.update_session(
+            upload_id, {"object_name": "videos/a.mp4", "minio_upload_id": "m-1"}
+        )
+
+        session = await UploadSessionManager.get_session(upload_id)
+        assert session["total_chunks"] == 4
+        assert session["admin_id"] == 1
+        assert session["object_name"] == "videos/a.mp4"
+        assert session["minio_upload_id"] == "m-1"
+
+    async def test_update_missing_session(self):
+        """测试更新不存在的会话不会创建键"""
+        upload_id = uuid.uuid4().hex
+        assert not await UploadSessionManager.update_session(upload_id, {"a": 1})
+        client = await get_redis()
+        assert not await client.exists(f"{UploadSessionManager.SESSION_PREFIX}{upload_id}")
+
+    async def test_concurrent_chunks_keep_all_etags(self):
+        """测试并发标记分片不会丢失 ETag"""
+        upload_id = await _create(total_chunks=50)
+
+        counts = await asyncio.gather(
+            *(
+                UploadSessionManager.mark_chunk_uploaded(upload_id, i, f"etag-{i}")
+                for i in range(50)
+            )
+        )
+
+        assert sorted(counts) == list(range(1, 51))
+        parts = await UploadSessionManager.get_parts(upload_id)
+        assert parts == {i: f"etag-{i}" for i in range(50)}
+        assert await UploadSessionManager.is_upload_complete(upload_id)
+        assert await UploadSessionManager.get_progress(upload_id) == 100.0
+
+    async def test_progress_and_missing_chunks(self):
+        """测试进度和缺失分片来自位图"""
+        upload_id = await _create(total_chunks=4)
+        await UploadSessionManager.mark_chunk_uploaded(upload_id, 1, "a")
+        # 重复上传同一分片不重复计数
+        assert await UploadSessionManager.mark_chunk_uploaded(upload_id, 1, "b") == 1
+        await UploadSessionManager.mark_chunk_uploaded(upload_id, 3, "c")
+
+        assert await UploadSessionManager.get_uploaded_count(upload_id) == 2
+        assert await UploadSessionManager.get_progress(upload_id) == 50.0
+        assert not await UploadSessionManager.is_upload_complete(upload_id)
+        assert await UploadSessionManager.get_missing_chunks(upload_id, 4) == [0, 2]
+        assert await UploadSessionManager.get_missing_chunks(upload_id, 4, limit=1) == [0]
+        assert (await UploadSessionManager.get_parts(upload_id))[1] == "b"
+
+    async def test_chunk_keys_share_session_ttl(self):
+        """测试位图和 ETag 键与会话同时过期"""
+        upload_id = await _create()
+        await UploadSessionManager.mark_chunk_uploaded(upload_id, 0, "a")
+
+        client = await get_redis()
+        key, chunks_key, parts_key = UploadSessionManager._keys(upload_id)
+        assert 0 < await client.ttl(chunks_key) <= UploadSessionManager.SESSION_TTL
+        assert 0 < await client.ttl(parts_key) <= UploadSessionManager.SESSION_TTL
+
+        await UploadSessionManager.extend_ttl(upload_id, 60)
+        assert await client.ttl(chunks_key) <= 60
+
+    async def test_mark_chunk_on_missing_session(self):
+        """测试会话过期后标记分片返回 None"""
+        assert await UploadSessionManager.mark_chunk_uploaded(uuid.uuid4().hex, 0, "a") is None
+
+    async def test_delete_session(self):
+        """测试删除会话同时删除分片记录"""
+        upload_id = await _create()
+        await UploadSessionManager.mark_chunk_uploaded(upload_id, 0, "a")
+        await UploadSessionManager.delete_session(upload_id)
+
+        client = await get_redis()
+        assert await client.exists(*UploadSessionManager._keys(upload_id)) == 0
+        assert await UploadSessionManager.get_session(upload_id) is None
+
+    async def test_list_active_sessions(self):
+        """测试列出会话时不包含分片键"""
+        upload_id = await _create()
+        await UploadSessionManager.mark_chunk_uploaded(upload_id, 0, "a")
+
+        sessions = await UploadSessionManager.list_active_sessions(admin_id=1)
+        assert upload_id in {s["upload_id"] for s in sessions}
+        assert all("upload_id" in s for s in sessions)
@@ -0,0 +1,91 @@
+"""
+测试 app/utils/video_summary.py - 视频摘要缓存与批量补全
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.utils.cache import Cache
+from app.utils.video_summary import get_video_summaries, video_summary_key
+
+
+def _video(video_id: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=video_id,
+        title=f"Video {video_id}",
+        slug=f"video-{video_id}",
+        video_type="movie",
+        status="PUBLISHED",
+        average_rating=8.0,
+        view_count=100,
+        created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+class FakeSession:
+    """记录查询次数，返回预设的视频"""
+
+    def __init__(self, videos):
+        self.videos = videos
+        self.queries = []
+
+    async def execute(self, query):
+        self.queries.append(query)
+        ids = query.compile().params["ids"]
+        videos = [v for v in self.videos if v.id in ids]
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: videos))
+
+
+@pytest.mark.unit
+@pytest.mark.requires_redis
+@pytest.mark.asyncio
+class TestVideoSummaries:
+    """视频摘要批量补全测试"""
+
+    async def _cleanup(self, *video_ids):
+        for video_id in video_ids:
+            await Cache.delete(video_summary_key(video_id))
+
+    async def test_preserves_order_and_skips_missing(self):
+        """测试按请求顺序返回并跳过不存在的视频"""
+        await self._cleanup(1, 2, 3)
+        db = FakeSession([_video(1), _video(3)])
+
+        summaries = await get_video_summaries(db, [3, 2, 1])
+        assert [s.id for s in summaries] == [3, 1]
+        assert len(db.queries) == 1
+        await self._cleanup(1, 3)
+
+    async def test_second_call_served_from_cache(self):
+        """测试第二次只查询未缓存的视频"""
+        await self._cleanup(1, 2)
+        db = FakeSession([_video(1), _video(2)])
+
+        await get_video_summaries(db, [1])
+        summaries = await get_video_summaries(db, [1, 2])
+        assert [s.id for s in summaries] == [1, 2]
+        assert db.queries[1].compile().params["ids"] == [2]
+
+        summaries = await get_video_summaries(db, [2, 1])
+        assert [s.id for s in summaries] == [2, 1]
+        assert summaries[0].created_at == datetime(2024, 1, 1, tzinfo=timezone.utc)
+        assert len(db.queries) == 2
+        await self._cleanup(1, 2)
+
+    async def test_invalidated_by_video_tag(self):
+        """测试视频更新后按 video:{id} 标签失效"""
+        await self._cleanup(5)
+        db = FakeSession([_video(5)])
+        await get_video_summaries(db, [5])
+
+        await Cache.invalidate_tags("video:5")
+        await get_video_summaries(db, [5])
+        assert len(db.queries) == 2
+        await self._cleanup(5)
+
+    async def test_empty(self):
+        """测试空ID列表不查询"""
+        db = FakeSession([])
+        assert await get_video_summaries(db, []) == []
+        assert db.queries == []